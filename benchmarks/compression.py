@@ -0,0 +1,104 @@
+# benchmarks/compression.py
+
+"""
+Bytes-on-wire for the large JSON endpoints, per content encoding.
+
+Seeds the same dataset as benchmarks/run.py and requests each endpoint
+with Accept-Encoding identity, gzip and br (when the brotli package is
+installed), recording the body size as sent and the median latency.
+
+Usage:
+    python -m benchmarks.compression
+    python -m benchmarks.compression --events 400 --documents 400 --output compression.json
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from benchmarks.datasets import Dataset, DatasetSpec
+from benchmarks.run import percentile, seeded_client
+from core.compression import SUPPORTED_ENCODINGS
+
+
+class Endpoint(NamedTuple):
+    name: str
+    path: Callable[[Dataset, random.Random], str]
+
+
+ENDPOINTS = [
+    Endpoint("public_building_report", lambda d, rng: f"/reports/public/building/{rng.choice(d.building_slugs)}"),
+    Endpoint("public_unit_report", lambda d, rng: f"/reports/public/unit/{rng.choice(d.unit_ids)}"),
+    Endpoint("dashboard_building_report", lambda d, rng: f"/reports/dashboard/building/{rng.choice(d.building_ids)}"),
+    Endpoint("user_access_buildings", lambda d, rng: "/user-access/buildings"),
+    Endpoint("user_access_units", lambda d, rng: "/user-access/units"),
+    Endpoint("public_search", lambda d, rng: f"/reports/public/search?query={rng.choice(d.building_names).split()[0].lower()}"),
+]
+
+ENCODINGS = ("identity",) + tuple(reversed(SUPPORTED_ENCODINGS))
+
+
+def run_compression_benchmark(spec: DatasetSpec, iterations: int = 5) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with seeded_client(spec) as seeded:
+        for endpoint in ENDPOINTS:
+            path = endpoint.path(seeded.dataset, random.Random(spec.seed))
+            stats: Dict[str, Any] = {"path": path}
+            for encoding in ENCODINGS:
+                latencies: List[float] = []
+                for _ in range(iterations):
+                    t0 = time.perf_counter()
+                    response = seeded.client.get(path, headers={"Accept-Encoding": encoding})
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+                latencies.sort()
+                stats[encoding] = {
+                    "bytes": response.num_bytes_downloaded,
+                    "content_encoding": response.headers.get("content-encoding", "identity"),
+                    "p50_ms": round(percentile(latencies, 50), 2),
+                }
+            identity = stats["identity"]["bytes"]
+            for encoding in ENCODINGS[1:]:
+                stats[encoding]["ratio"] = round(identity / max(stats[encoding]["bytes"], 1), 2)
+            results[endpoint.name] = stats
+    return {"dataset": spec.__dict__, "iterations": iterations, "endpoints": results}
+
+
+def format_results(document: Dict[str, Any]) -> str:
+    header = f"{'endpoint':<28}" + "".join(f" {encoding + ' bytes':>15} {'ms':>7}" for encoding in ENCODINGS)
+    lines = [header]
+    for name, stats in document["endpoints"].items():
+        row = f"{name:<28}"
+        for encoding in ENCODINGS:
+            entry = stats[encoding]
+            size = f"{entry['bytes']}" + (f" ({entry['ratio']}x)" if "ratio" in entry else "")
+            row += f" {size:>15} {entry['p50_ms']:>7}"
+        lines.append(row)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buildings", type=int, default=DatasetSpec.buildings)
+    parser.add_argument("--units", type=int, default=DatasetSpec.units, help="Units per building")
+    parser.add_argument("--events", type=int, default=DatasetSpec.events, help="Events per building")
+    parser.add_argument("--documents", type=int, default=DatasetSpec.documents, help="Documents per building")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    logging.getLogger("aina").setLevel(logging.WARNING)
+    spec = DatasetSpec(buildings=args.buildings, units=args.units, events=args.events, documents=args.documents)
+    document = run_compression_benchmark(spec, args.iterations)
+    print(format_results(document))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
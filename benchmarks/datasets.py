@@ -0,0 +1,152 @@
+# benchmarks/datasets.py
+
+"""
+Synthetic, seeded datasets for the benchmark suite.
+
+generate_dataset() fills a FakeSupabase with N buildings × M units × K
+events/documents per building, plus the contractors, categories, access
+rows and auth users the endpoints join against. The same seed always
+produces the same data, so results are comparable across commits.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from tests.fake_supabase import FakeSupabase
+
+
+PUBLIC_DOCUMENTS_CATEGORY_ID = "f5ae850f-cc31-44ff-b5bc-ee7d708a0c31"
+ADMIN_USER_ID = "bench-admin"
+
+BUILDING_WORDS = ["Papakea", "Kaanapali", "Honua", "Kai", "Makani", "Hale", "Lani", "Nalu", "Moana", "Pua"]
+STREETS = ["Lower Honoapiilani Rd", "Kai Ala Dr", "S Kihei Rd", "Front St", "Wailea Alanui Dr"]
+CITIES = ["Lahaina", "Kihei", "Wailea", "Kahului", "Napili"]
+
+
+@dataclass
+class DatasetSpec:
+    buildings: int = 10
+    units: int = 50        # per building
+    events: int = 40       # per building
+    documents: int = 40    # per building
+    contractors: int = 20
+    uploaders: int = 5
+    seed: int = 1
+
+
+@dataclass
+class Dataset:
+    spec: DatasetSpec
+    building_ids: List[str] = field(default_factory=list)
+    building_slugs: List[str] = field(default_factory=list)
+    building_names: List[str] = field(default_factory=list)
+    unit_ids: List[str] = field(default_factory=list)
+    unit_numbers: List[str] = field(default_factory=list)
+    units_by_building: Dict[str, List[str]] = field(default_factory=dict)
+    admin_user_id: str = ADMIN_USER_ID
+
+
+def _uuid(rng: random.Random) -> str:
+    return "%08x-%04x-4%03x-8%03x-%012x" % (
+        rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(12), rng.getrandbits(12), rng.getrandbits(48)
+    )
+
+
+def _timestamp(rng: random.Random) -> str:
+    return f"20{rng.randint(15, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00+00:00"
+
+
+def generate_dataset(fake: FakeSupabase, spec: DatasetSpec) -> Dataset:
+    """Seed `fake` according to `spec` and return the ids scenarios need."""
+    rng = random.Random(spec.seed)
+    dataset = Dataset(spec=spec)
+
+    fake.seed("contractor_roles", [{"id": f"role-{n}", "name": name} for n, name in enumerate(["Plumber", "Electrician", "Roofer", "Inspector"])])
+    contractor_ids = [_uuid(rng) for _ in range(spec.contractors)]
+    fake.seed("contractors", [
+        {"id": cid, "company_name": f"{rng.choice(BUILDING_WORDS)} Services {n}",
+         "subscription_tier": "paid" if n % 4 == 0 else "free"}
+        for n, cid in enumerate(contractor_ids)
+    ])
+    fake.seed("contractor_role_assignments", [
+        {"contractor_id": cid, "role_id": f"role-{n % 4}"} for n, cid in enumerate(contractor_ids)
+    ])
+
+    fake.seed("event_categories", [{"id": f"event-cat-{n}", "name": name} for n, name in enumerate(["Maintenance", "Repair", "Inspection"])])
+    fake.seed("document_categories", [
+        {"id": PUBLIC_DOCUMENTS_CATEGORY_ID, "name": "Public Documents"},
+        {"id": "doc-cat-1", "name": "Financials"},
+    ])
+    fake.seed("document_subcategories", [{"id": "doc-sub-1", "name": "Permits", "category_id": PUBLIC_DOCUMENTS_CATEGORY_ID}])
+
+    fake.add_user(ADMIN_USER_ID, role="super_admin", full_name="Benchmark Admin")
+    uploader_ids = [f"bench-uploader-{n}" for n in range(spec.uploaders)]
+    for uid in uploader_ids:
+        fake.add_user(uid, role="property_manager", full_name=uid.title(), organization_name="Maui PM", pm_company_id="pm-1")
+
+    fake.seed("property_management_companies", [{"id": "pm-1", "name": "Maui PM", "subscription_tier": "paid"}])
+    fake.seed("aoao_organizations", [{"id": "aoao-1", "organization_name": "Maui AOAO"}])
+
+    for b in range(spec.buildings):
+        building_id = _uuid(rng)
+        name = f"{BUILDING_WORDS[b % len(BUILDING_WORDS)]} {rng.choice(['Resort', 'Shores', 'Towers', 'Villas'])} {b}"
+        slug = name.lower().replace(" ", "-")
+        fake.insert_row("buildings", {
+            "id": building_id, "name": name, "slug": slug,
+            "address": f"{rng.randint(100, 9999)} {rng.choice(STREETS)}",
+            "city": rng.choice(CITIES), "state": "HI", "zip": f"967{rng.randint(10, 99)}",
+        })
+        dataset.building_ids.append(building_id)
+        dataset.building_slugs.append(slug)
+        dataset.building_names.append(name)
+
+        unit_ids = []
+        for u in range(spec.units):
+            unit_id = _uuid(rng)
+            unit_number = str(100 * (1 + u // 20) + u % 20)
+            fake.insert_row("units", {
+                "id": unit_id, "building_id": building_id, "unit_number": unit_number,
+                "owner_name": f"Owner {b}-{u}", "bedrooms": rng.randint(0, 3),
+            })
+            unit_ids.append(unit_id)
+            dataset.unit_ids.append(unit_id)
+            dataset.unit_numbers.append(unit_number)
+        dataset.units_by_building[building_id] = unit_ids
+        if uploader_ids:
+            fake.seed("user_units_access", [
+                {"user_id": uploader_ids[n % len(uploader_ids)], "unit_id": uid, "created_at": "2024-01-01T00:00:00+00:00"}
+                for n, uid in enumerate(unit_ids)
+            ])
+
+        for _ in range(spec.events):
+            event_id = _uuid(rng)
+            fake.insert_row("events", {
+                "id": event_id, "building_id": building_id, "title": "Scheduled maintenance",
+                "event_type": "maintenance", "category_id": f"event-cat-{rng.randint(0, 2)}",
+                "body": "Work completed as scheduled.", "created_by": rng.choice(uploader_ids),
+                "occurred_at": _timestamp(rng), "created_at": _timestamp(rng),
+            })
+            if unit_ids:
+                fake.seed("event_units", [{"event_id": event_id, "unit_id": uid} for uid in rng.sample(unit_ids, min(3, len(unit_ids)))])
+            if contractor_ids:
+                fake.seed("event_contractors", [{"event_id": event_id, "contractor_id": rng.choice(contractor_ids)}])
+
+        for _ in range(spec.documents):
+            document_id = _uuid(rng)
+            fake.insert_row("documents", {
+                "id": document_id, "building_id": building_id, "title": "County Archive - Building Permit",
+                "category_id": PUBLIC_DOCUMENTS_CATEGORY_ID, "subcategory_id": "doc-sub-1",
+                "is_public": rng.random() < 0.8, "uploaded_by": rng.choice(uploader_ids),
+                "uploaded_by_role": "property_manager", "created_at": _timestamp(rng),
+                "s3_key": f"documents/{document_id}.pdf",
+            })
+            if unit_ids:
+                fake.seed("document_units", [{"document_id": document_id, "unit_id": rng.choice(unit_ids)}])
+            if contractor_ids:
+                fake.seed("document_contractors", [{"document_id": document_id, "contractor_id": rng.choice(contractor_ids)}])
+
+        fake.seed("pm_company_building_access", [{"pm_company_id": "pm-1", "building_id": building_id}])
+        fake.seed("aoao_organization_building_access", [{"aoao_organization_id": "aoao-1", "building_id": building_id}])
+
+    return dataset
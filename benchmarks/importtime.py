@@ -0,0 +1,109 @@
+# benchmarks/importtime.py
+
+"""
+Import-time profile of the application.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and
+summarizes the output: total cold import time, the slowest top-level
+packages by cumulative time, and whether any of the deferred heavy
+dependencies were pulled in at import.
+
+Usage:
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --top 40 --output importtime.txt
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level packages that must not be imported at startup
+DEFERRED_PACKAGES = ("pandas", "numpy", "openpyxl", "fitz", "pymupdf", "boto3", "botocore", "stripe", "reportlab")
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def profile_imports(target: str = "main") -> List[ImportRecord]:
+    """Import `target` in a fresh interpreter and parse -X importtime output."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+
+    records = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        records.append(ImportRecord(name.strip(), int(parts[0]), int(parts[1]), depth))
+    return records
+
+
+def top_level_packages(records: List[ImportRecord]) -> Dict[str, int]:
+    """Cumulative microseconds per top-level package (first import wins)."""
+    totals: Dict[str, int] = {}
+    for record in records:
+        package = record.module.split(".")[0]
+        if record.module == package:
+            totals.setdefault(package, record.cumulative_us)
+    return totals
+
+
+def deferred_packages_loaded(records: List[ImportRecord]) -> List[str]:
+    loaded = {record.module.split(".")[0] for record in records}
+    return [name for name in DEFERRED_PACKAGES if name in loaded]
+
+
+def format_report(records: List[ImportRecord], target: str = "main", top: int = 25) -> str:
+    total = next((r.cumulative_us for r in records if r.module == target), 0)
+    packages = sorted(top_level_packages(records).items(), key=lambda item: item[1], reverse=True)
+    slowest_self = sorted(records, key=lambda r: r.self_us, reverse=True)
+
+    lines = [
+        f"import {target}: {total / 1000:.1f} ms cumulative, {len(records)} modules",
+        "",
+        f"Top {top} packages by cumulative import time:",
+    ]
+    lines += [f"  {us / 1000:9.1f} ms  {name}" for name, us in packages[:top]]
+    lines += ["", f"Top {top} modules by self time:"]
+    lines += [f"  {r.self_us / 1000:9.1f} ms  {r.module}" for r in slowest_self[:top]]
+
+    loaded = deferred_packages_loaded(records)
+    lines += ["", f"Deferred packages imported at startup: {', '.join(loaded) if loaded else 'none'}"]
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize python -X importtime for the app.")
+    parser.add_argument("--target", default="main", help="Module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--output", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = format_report(profile_imports(args.target), args.target, args.top)
+    print(report, end="")
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
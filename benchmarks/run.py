@@ -0,0 +1,245 @@
+# benchmarks/run.py
+
+"""
+Benchmark runner.
+
+Seeds an in-memory Supabase and S3 stand-in with a synthetic dataset,
+injects them in place of get_supabase_client/get_s3, and drives each
+scenario through the full ASGI app (middleware included). Reports
+p50/p95/p99 latency, requests/sec and upstream calls per request, and
+writes the results as JSON so runs can be compared across commits.
+
+Usage:
+    python -m benchmarks.run
+    python -m benchmarks.run --buildings 50 --units 100 --iterations 200
+    python -m benchmarks.run --scenario public_search --scenario building_report
+    python -m benchmarks.run --baseline benchmarks/results/<commit>.json
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.datasets import Dataset, DatasetSpec, generate_dataset
+from benchmarks.scenarios import SCENARIOS
+from dependencies.auth import CurrentUser, get_current_user
+from tests.fake_s3 import FakeS3, install_fake_s3
+from tests.fake_supabase import FakeSupabase, install_fake_supabase
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_scenario(client, scenario, dataset, fake: FakeSupabase, s3: FakeS3, iterations: int, warmup: int, seed: int) -> Dict[str, Any]:
+    """Run one scenario and summarize its latencies."""
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        scenario.run(client, dataset, rng)
+
+    fake.reset_calls()
+    s3.reset_calls()
+    latencies: List[float] = []
+    status_codes: Dict[str, int] = {}
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        response = scenario.run(client, dataset, rng)
+        latencies.append(time.perf_counter() - t0)
+        status_codes[str(response.status_code)] = status_codes.get(str(response.status_code), 0) + 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)  # noqa: E731
+    return {
+        "description": scenario.description,
+        "requests": iterations,
+        "errors": sum(count for code, count in status_codes.items() if not code.startswith("2")),
+        "status_codes": status_codes,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+        "max_ms": ms(latencies[-1]) if latencies else 0.0,
+        "requests_per_sec": round(iterations / elapsed, 2) if elapsed else 0.0,
+        "supabase_calls_per_request": round(len(fake.calls) / iterations, 2) if iterations else 0.0,
+        "s3_calls_per_request": round(len(s3.calls) / iterations, 2) if iterations else 0.0,
+    }
+
+
+class SeededClient(NamedTuple):
+    client: TestClient
+    dataset: Dataset
+    fake: FakeSupabase
+    s3: FakeS3
+    seed_seconds: float
+
+
+@contextmanager
+def seeded_client(spec: DatasetSpec) -> Iterator[SeededClient]:
+    """Seed the stand-ins with `spec` and yield a client for the app, signed in as an admin."""
+    from main import create_app
+
+    patcher = pytest.MonkeyPatch()
+    fake = install_fake_supabase(FakeSupabase(), patcher)
+    s3 = install_fake_s3(FakeS3(), patcher)
+
+    seed_started = time.perf_counter()
+    dataset = generate_dataset(fake, spec)
+    seed_seconds = time.perf_counter() - seed_started
+
+    app = create_app()
+    admin = CurrentUser(id=dataset.admin_user_id, auth_user_id=dataset.admin_user_id, email="bench@example.com", role="super_admin")
+    app.dependency_overrides[get_current_user] = lambda: admin
+
+    try:
+        with TestClient(app) as client:
+            yield SeededClient(client, dataset, fake, s3, seed_seconds)
+    finally:
+        patcher.undo()
+
+
+def run_benchmarks(
+    spec: DatasetSpec,
+    scenario_names: Optional[Iterable[str]] = None,
+    iterations: int = 50,
+    warmup: int = 3,
+) -> Dict[str, Any]:
+    """Seed the stand-ins, run the selected scenarios and return the results document."""
+    names = list(scenario_names or SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {unknown}. Available: {list(SCENARIOS)}")
+
+    results: Dict[str, Any] = {}
+    with seeded_client(spec) as seeded:
+        for name in names:
+            scenario = SCENARIOS[name]
+            missing = [module for module in scenario.requires if importlib.util.find_spec(module) is None]
+            if missing:
+                results[name] = {"description": scenario.description, "skipped": f"missing {', '.join(missing)}"}
+                continue
+            results[name] = run_scenario(
+                seeded.client, scenario, seeded.dataset, seeded.fake, seeded.s3, iterations, warmup, spec.seed,
+            )
+    seed_seconds = seeded.seed_seconds
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {**asdict(spec), "seed_seconds": round(seed_seconds, 3)},
+        "iterations": iterations,
+        "warmup": warmup,
+        "scenarios": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Lines describing the change from `baseline` to `current` per scenario."""
+    lines = [f"{'scenario':<18} {'metric':<28} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for name, stats in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or "skipped" in stats or "skipped" in before:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "requests_per_sec", "supabase_calls_per_request"):
+            old, new = before.get(metric), stats.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            lines.append(f"{name:<18} {metric:<28} {old:>10} {new:>10} {change:>8}")
+    return lines
+
+
+def format_results(document: Dict[str, Any]) -> List[str]:
+    lines = [
+        f"commit {document['commit'] or 'unknown'} · dataset {document['dataset']} · {document['iterations']} iterations",
+        f"{'scenario':<18} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'db/req':>7} {'s3/req':>7} {'errors':>6}",
+    ]
+    for name, stats in document["scenarios"].items():
+        if "skipped" in stats:
+            lines.append(f"{name:<18} skipped ({stats['skipped']})")
+            continue
+        lines.append(
+            f"{name:<18} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['requests_per_sec']:>9} "
+            f"{stats['supabase_calls_per_request']:>7} {stats['s3_calls_per_request']:>7} {stats['errors']:>6}"
+        )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run API benchmarks against seeded in-memory Supabase/S3 stand-ins.")
+    parser.add_argument("--buildings", type=int, default=DatasetSpec.buildings)
+    parser.add_argument("--units", type=int, default=DatasetSpec.units, help="Units per building")
+    parser.add_argument("--events", type=int, default=DatasetSpec.events, help="Events per building")
+    parser.add_argument("--documents", type=int, default=DatasetSpec.documents, help="Documents per building")
+    parser.add_argument("--seed", type=int, default=DatasetSpec.seed)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run (repeatable; default all)")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Keep application logging")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logging.getLogger("aina").setLevel(logging.WARNING)
+
+    spec = DatasetSpec(
+        buildings=args.buildings, units=args.units, events=args.events,
+        documents=args.documents, seed=args.seed,
+    )
+    document = run_benchmarks(spec, args.scenario, iterations=args.iterations, warmup=args.warmup)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{document['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+
+    print("\n".join(format_results(document)))
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print("\n" + "\n".join(compare(document, json.load(f))))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
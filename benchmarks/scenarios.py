@@ -0,0 +1,101 @@
+# benchmarks/scenarios.py
+
+"""
+Benchmark scenarios.
+
+Each scenario issues one request against the app per call, picking its
+inputs from the seeded dataset with the runner's RNG so that runs are
+repeatable. Scenarios that need optional dependencies list them in
+`requires` and are skipped when they are missing.
+"""
+
+import io
+import json
+import random
+from typing import Callable, Dict, NamedTuple, Tuple
+
+from fastapi.testclient import TestClient
+
+from benchmarks.datasets import Dataset
+
+
+class Scenario(NamedTuple):
+    name: str
+    description: str
+    run: Callable[[TestClient, Dataset, random.Random], object]
+    requires: Tuple[str, ...] = ()
+
+
+def public_search(client: TestClient, dataset: Dataset, rng: random.Random):
+    name_word = rng.choice(dataset.building_names).split()[0].lower()
+    query = rng.choice([name_word, f"{name_word} {rng.choice(dataset.unit_numbers)}", rng.choice(dataset.unit_numbers)])
+    return client.get("/reports/public/search", params={"query": query})
+
+
+def building_report(client: TestClient, dataset: Dataset, rng: random.Random):
+    return client.get(f"/reports/public/building/{rng.choice(dataset.building_slugs)}")
+
+
+def document_listing(client: TestClient, dataset: Dataset, rng: random.Random):
+    return client.get("/documents", params={"building_id": rng.choice(dataset.building_ids), "limit": 100})
+
+
+BULK_IMPORT_ROWS = 100
+
+
+def bulk_import(client: TestClient, dataset: Dataset, rng: random.Random):
+    building_id = rng.choice(dataset.building_ids)
+    unit_ids = dataset.units_by_building.get(building_id) or [""]
+    lines = ["document_url,permit_number,permit_type,unit_id,project_name"]
+    for n in range(BULK_IMPORT_ROWS):
+        lines.append(
+            f"https://archive.example.com/{rng.getrandbits(32):08x}.pdf,BP-{n},Building,{rng.choice(unit_ids)},Lanai repair"
+        )
+    return client.post(
+        "/documents/bulk-upload",
+        files={"file": ("permits.csv", io.BytesIO("\n".join(lines).encode()), "text/csv")},
+        data={"building_id": building_id, "source": "Maui County Permits"},
+    )
+
+
+REDACTION_PAGES = 20
+_redaction_pdf: Dict[int, bytes] = {}
+
+
+def _sample_pdf(pages: int) -> bytes:
+    """A text PDF with `pages` pages, generated once per size."""
+    if pages not in _redaction_pdf:
+        import fitz
+
+        doc = fitz.open()
+        for n in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Owner: Jane Doe  SSN 123-45-{n:04d}", fontsize=12)
+            page.insert_text((72, 96), "Account 0001234567, phone (808) 555-0100", fontsize=12)
+        _redaction_pdf[pages] = doc.tobytes()
+        doc.close()
+    return _redaction_pdf[pages]
+
+
+def redaction(client: TestClient, dataset: Dataset, rng: random.Random):
+    boxes = [
+        {"page": page, "x": 70, "y": 60, "width": 300, "height": 20}
+        for page in rng.sample(range(1, REDACTION_PAGES + 1), 3)
+    ]
+    return client.post(
+        "/documents/redact-manual",
+        files={"file": ("owner-records.pdf", io.BytesIO(_sample_pdf(REDACTION_PAGES)), "application/pdf")},
+        data={"redaction_boxes": json.dumps(boxes)},
+    )
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("public_search", "GET /reports/public/search with building and unit terms", public_search),
+        Scenario("building_report", "GET /reports/public/building/{slug}", building_report),
+        Scenario("document_listing", "GET /documents for one building, 100 rows", document_listing),
+        Scenario("bulk_import", f"POST /documents/bulk-upload with {BULK_IMPORT_ROWS} CSV rows", bulk_import),
+        Scenario("redaction", f"POST /documents/redact-manual on a {REDACTION_PAGES}-page PDF", redaction, requires=("fitz",)),
+    ]
+}
@@ -0,0 +1,153 @@
+# benchmarks/serialization.py
+
+"""
+Response serialization benchmark on large list payloads.
+
+Serves the same synthetic event rows (as PostgREST returns them, plus
+columns the response model doesn't declare) through four routes of a
+bare FastAPI app and times full requests:
+
+- default:     return the rows (jsonable_encoder + json.dumps)
+- fast_json:   FastJSONResponse(rows) (orjson, no jsonable_encoder)
+- model:       response_model=List[EventRead] (validate + encode + dumps)
+- model_once:  model_list_response(rows, EventRead) (validate once, dump_json)
+
+Before timing, each fast path's parsed JSON body is checked against its
+counterpart.
+
+Usage:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --rows 10000 --iterations 20 --output serialization.json
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.run import percentile
+from core.responses import ORJSON_AVAILABLE, FastJSONResponse, model_list_response
+from models.event import EventRead
+
+
+ROUTES = ("default", "fast_json", "model", "model_once")
+
+# fast path -> route whose output it must reproduce
+PARITY = {"fast_json": "default", "model_once": "model"}
+
+
+def make_rows(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Event rows shaped like a select("*") response."""
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    building_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(20)]
+    rows = []
+    for n in range(count):
+        occurred_at = start + timedelta(minutes=rng.randrange(5_000_000))
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "building_id": rng.choice(building_ids),
+            "event_type": rng.choice(["maintenance", "notice", "assessment", "plumbing"]),
+            "title": f"Event {n}",
+            "body": "Replaced corroded supply line under the lanai sink. " * rng.randint(1, 4),
+            "occurred_at": occurred_at.isoformat(),
+            "severity": rng.choice(["low", "medium", "high"]),
+            "status": rng.choice(["open", "in_progress", "resolved"]),
+            "category_id": None,
+            "created_by": f"user-{rng.randrange(50)}",
+            "created_at": (occurred_at + timedelta(hours=1)).isoformat(),
+            # Not part of EventRead
+            "s3_key": None,
+            "contractor_notes": "Ladder in the garage",
+        })
+    return rows
+
+
+def build_app(rows: List[Dict[str, Any]]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/default")
+    def default():
+        return rows
+
+    @app.get("/fast_json")
+    def fast_json():
+        return FastJSONResponse(rows)
+
+    @app.get("/model", response_model=List[EventRead])
+    def model():
+        return rows
+
+    @app.get("/model_once", response_model=List[EventRead])
+    def model_once():
+        return model_list_response(rows, EventRead)
+
+    return app
+
+
+def run_serialization_benchmark(rows: int = 10_000, iterations: int = 10, warmup: int = 1) -> Dict[str, Any]:
+    client = TestClient(build_app(make_rows(rows)))
+
+    bodies = {route: client.get(f"/{route}").json() for route in ROUTES}
+    for fast, baseline in PARITY.items():
+        if bodies[fast] != bodies[baseline]:
+            raise AssertionError(f"{fast} output differs from {baseline}")
+
+    results: Dict[str, Any] = {}
+    for route in ROUTES:
+        for _ in range(warmup):
+            client.get(f"/{route}")
+        latencies = []
+        size = 0
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            response = client.get(f"/{route}")
+            latencies.append((time.perf_counter() - t0) * 1000)
+            size = len(response.content)
+        latencies.sort()
+        results[route] = {
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "bytes": size,
+        }
+
+    for fast, baseline in PARITY.items():
+        results[fast]["speedup"] = round(results[baseline]["p50_ms"] / max(results[fast]["p50_ms"], 1e-6), 2)
+
+    return {"rows": rows, "iterations": iterations, "orjson": ORJSON_AVAILABLE, "routes": results}
+
+
+def format_results(document: Dict[str, Any]) -> str:
+    lines = [
+        f"{document['rows']} rows, {document['iterations']} iterations, orjson={'yes' if document['orjson'] else 'no'}",
+        f"{'route':<12} {'p50 ms':>9} {'p95 ms':>9} {'bytes':>11} {'speedup':>8}",
+    ]
+    for route, stats in document["routes"].items():
+        speedup = f"{stats['speedup']:.2f}x" if "speedup" in stats else ""
+        lines.append(f"{route:<12} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['bytes']:>11} {speedup:>8}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    document = run_serialization_benchmark(args.rows, args.iterations, args.warmup)
+    print(format_results(document))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
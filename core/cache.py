@@ -1,103 +1,353 @@
 # core/cache.py
 
 """
-Simple in-memory caching utilities.
+Caching utilities with TTL support.
 
-For production, consider using Redis or a dedicated caching service.
-This implementation uses a simple in-memory cache with TTL support.
+- Bounded: with the default in-memory backend the cache gets its own
+  LRU store limited by CACHE_MAX_ENTRIES / CACHE_MAX_BYTES, so evictions
+  never touch rate limit or CSRF state. With STATE_BACKEND=sqlite/redis
+  entries live in the shared backend so every worker sees them.
+- TTLs use the monotonic clock and expire proactively (see MemoryBackend).
+- Keys are namespaced ("buildings:list:...") and can be invalidated by prefix.
+- Entries can declare the entities they depend on as tags
+  ("building:{id}", "user:{id}:access", "org:{id}"); write endpoints call
+  invalidate_tags() and every entry carrying one of those tags turns into
+  a miss, wherever it lives in the key space.
+- Hit/miss/set/eviction counters are available via cache_stats().
+- `cached` and `get_or_set` use per-key locks so concurrent misses for the
+  same key call the loader once instead of stampeding Supabase.
 """
 
-from typing import Optional, Any, Callable
-from datetime import datetime, timedelta
+import asyncio
+import functools
+import hashlib
+import inspect
+import uuid
 from threading import Lock
+from typing import Optional, Any, Callable, Dict, Iterable
+
+from core.config import settings
 from core.logging_config import logger
+from core.state_backend import StateBackend, MemoryBackend, get_state_backend
+
+
+# Key fragments longer than this are hashed to keep keys short
+MAX_KEY_ARGS_LENGTH = 200
+
+# Tag tokens live next to the entries, under "{cache prefix}tag:{tag}"
+TAG_KEY_PREFIX = "tag:"
+
+
+def building_tag(building_id: str) -> str:
+    """Tag for entries derived from one building (its units, events, documents)."""
+    return f"building:{building_id}"
+
+
+def user_access_tag(user_id: str) -> str:
+    """Tag for entries that depend on a user's building/unit grants."""
+    return f"user:{user_id}:access"
 
 
-class CacheEntry:
-    """Represents a cached value with expiration time."""
-    
-    def __init__(self, value: Any, ttl_seconds: int):
+def org_tag(organization_id: str) -> str:
+    """Tag for entries that depend on an AOAO organization's or PM company's grants."""
+    return f"org:{organization_id}"
+
+
+class _TaggedEntry:
+    """
+    Cached value plus the token each of its tags had when it was stored.
+    Invalidating a tag replaces the token, so the entry stops matching.
+    """
+
+    __slots__ = ("value", "tags")
+
+    def __init__(self, value: Any, tags: Dict[str, str]):
         self.value = value
-        self.expires_at = datetime.now() + timedelta(seconds=ttl_seconds)
-    
-    def is_expired(self) -> bool:
-        """Check if the cache entry has expired."""
-        return datetime.now() >= self.expires_at
+        self.tags = tags
+
+
+class _KeyLocks:
+    """
+    Reference-counted per-key locks (threading or asyncio), removed once
+    no caller holds or waits on them so the table doesn't grow unbounded.
+    """
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._locks: Dict[str, list] = {}
+        self._guard = Lock()
+
+    def acquire_ref(self, key: str):
+        with self._guard:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = [self._factory(), 0]
+                self._locks[key] = entry
+            entry[1] += 1
+            return entry[0]
+
+    def release_ref(self, key: str):
+        with self._guard:
+            entry = self._locks.get(key)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._locks[key]
 
 
 class SimpleCache:
     """
-    Simple in-memory cache with TTL support.
-    
-    Thread-safe for concurrent access.
+    Cache with TTL support on top of a StateBackend.
+
+    All keys are stored under `prefix` so the cache can be cleared without
+    touching other state in a shared backend.
     """
-    
-    def __init__(self):
-        self._cache: dict[str, CacheEntry] = {}
-        self._lock = Lock()
-    
+
+    def __init__(self, backend: Optional[StateBackend] = None, prefix: str = "cache:"):
+        self._backend = backend
+        self._prefix = prefix
+        self._stats_lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._sets = 0
+        self._thread_locks = _KeyLocks(Lock)
+        self._async_locks = _KeyLocks(asyncio.Lock)
+
+    @property
+    def backend(self) -> StateBackend:
+        return self._backend or _default_cache_backend()
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
     def get(self, key: str) -> Optional[Any]:
         """
         Get a value from the cache.
-        
+
         Args:
             key: Cache key
-        
+
         Returns:
             Cached value or None if not found or expired
         """
-        with self._lock:
-            entry = self._cache.get(key)
-            if entry is None:
-                return None
-            
-            if entry.is_expired():
-                del self._cache[key]
+        value = self._load(key)
+        self._count(value is not None)
+        return value
+
+    def _load(self, key: str) -> Optional[Any]:
+        """Backend read that unwraps tagged entries and drops stale ones."""
+        value = self.backend.get(self._prefix + key)
+        if not isinstance(value, _TaggedEntry):
+            return value
+
+        backend = self.backend
+        for tag, token in value.tags.items():
+            if backend.get(self._tag_key(tag)) != token:
+                backend.delete(self._prefix + key)
                 return None
-            
-            return entry.value
-    
-    def set(self, key: str, value: Any, ttl_seconds: int = 300):
+        return value.value
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self._prefix}{TAG_KEY_PREFIX}{tag}"
+
+    def tag_tokens(self, tags: Iterable[str]) -> Dict[str, str]:
+        """
+        Current token for each tag, creating tokens for tags never seen.
+
+        A tag token evicted from a bounded backend simply reads as a new
+        token, so entries stored under the old one become misses.
+        """
+        backend = self.backend
+        tokens = {}
+        for tag in tags:
+            token = backend.get(self._tag_key(tag))
+            if token is None:
+                token = uuid.uuid4().hex
+                backend.set(self._tag_key(tag), token)
+            tokens[tag] = token
+        return tokens
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: int = 300,
+        tags: Optional[Iterable[str]] = None,
+        tag_tokens: Optional[Dict[str, str]] = None,
+    ):
         """
         Set a value in the cache with TTL.
-        
+
         Args:
             key: Cache key
             value: Value to cache
             ttl_seconds: Time to live in seconds (default: 5 minutes)
+            tags: Entities the value depends on (see invalidate_tags)
+            tag_tokens: Tokens captured with tag_tokens() before the value
+                was loaded; preferred over `tags` so a write that lands
+                while loading still invalidates the entry
+        """
+        if tag_tokens is None and tags:
+            tag_tokens = self.tag_tokens(tags)
+        if tag_tokens:
+            value = _TaggedEntry(value, dict(tag_tokens))
+
+        self.backend.set(self._prefix + key, value, ttl_seconds)
+        with self._stats_lock:
+            self._sets += 1
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Invalidate every entry tagged with any of `tags`.
+
+        Returns:
+            Number of tags invalidated
         """
-        with self._lock:
-            self._cache[key] = CacheEntry(value, ttl_seconds)
-    
+        backend = self.backend
+        count = 0
+        for tag in tags:
+            if not tag:
+                continue
+            backend.set(self._tag_key(tag), uuid.uuid4().hex)
+            count += 1
+        return count
+
     def delete(self, key: str):
         """
         Delete a value from the cache.
-        
+
         Args:
             key: Cache key
         """
-        with self._lock:
-            self._cache.pop(key, None)
-    
+        self.backend.delete(self._prefix + key)
+
+    def delete_prefix(self, prefix: str) -> int:
+        """
+        Invalidate every entry whose key starts with prefix
+        (e.g. "buildings:list:" drops all cached building lists).
+
+        Returns:
+            Number of entries removed
+        """
+        return self.backend.delete_prefix(self._prefix + prefix)
+
     def clear(self):
         """Clear all cache entries."""
-        with self._lock:
-            self._cache.clear()
-    
+        self.backend.delete_prefix(self._prefix)
+
     def cleanup_expired(self):
-        """Remove all expired entries from the cache."""
-        with self._lock:
-            expired_keys = [
-                key for key, entry in self._cache.items()
-                if entry.is_expired()
-            ]
-            for key in expired_keys:
-                del self._cache[key]
-    
+        """Remove all expired entries from the backend."""
+        self.backend.cleanup_expired()
+
     def size(self) -> int:
-        """Get the number of entries in the cache."""
-        with self._lock:
-            return len(self._cache)
+        """Get the number of entries in the cache (tag tokens excluded)."""
+        backend = self.backend
+        return len(backend.keys(self._prefix)) - len(backend.keys(self._prefix + TAG_KEY_PREFIX))
+
+    def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: int = 300,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Any:
+        """
+        Return the cached value, or call loader() once per key on a miss.
+        Concurrent callers for the same key wait for the first loader.
+        Tag tokens are captured before loading (see set()).
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock = self._thread_locks.acquire_ref(key)
+        try:
+            with lock:
+                # Another thread may have filled it while we waited
+                value = self._load(key)
+                if value is not None:
+                    return value
+
+                tokens = self.tag_tokens(tags) if tags else None
+                value = loader()
+                if value is not None:
+                    self.set(key, value, ttl_seconds, tag_tokens=tokens)
+                return value
+        finally:
+            self._thread_locks.release_ref(key)
+
+    async def aget_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl_seconds: int = 300,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Any:
+        """Async variant of get_or_set; loader returns an awaitable."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock = self._async_locks.acquire_ref(key)
+        try:
+            async with lock:
+                value = self._load(key)
+                if value is not None:
+                    return value
+
+                tokens = self.tag_tokens(tags) if tags else None
+                value = await loader()
+                if value is not None:
+                    self.set(key, value, ttl_seconds, tag_tokens=tokens)
+                return value
+        finally:
+            self._async_locks.release_ref(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/set counters plus backend size and eviction stats."""
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+            result = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "sets": self._sets,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+        backend = self.backend
+        if isinstance(backend, MemoryBackend):
+            result.update(backend.stats())
+        return result
+
+    def reset_stats(self):
+        """Reset hit/miss/set counters."""
+        with self._stats_lock:
+            self._hits = self._misses = self._sets = 0
+
+
+# Dedicated bounded store used when STATE_BACKEND is the in-memory default
+_memory_cache_backend: Optional[MemoryBackend] = None
+_memory_cache_backend_lock = Lock()
+
+
+def _default_cache_backend() -> StateBackend:
+    global _memory_cache_backend
+
+    if (settings.STATE_BACKEND or "memory").lower() != "memory":
+        return get_state_backend()
+
+    if _memory_cache_backend is None:
+        with _memory_cache_backend_lock:
+            if _memory_cache_backend is None:
+                _memory_cache_backend = MemoryBackend(
+                    max_entries=settings.CACHE_MAX_ENTRIES,
+                    max_bytes=settings.CACHE_MAX_BYTES,
+                )
+    return _memory_cache_backend
 
 
 # Global cache instance
@@ -109,37 +359,67 @@ def get_cache() -> SimpleCache:
     return _cache
 
 
+def make_cache_key(namespace: str, *args, **kwargs) -> str:
+    """
+    Build a namespaced cache key from call arguments.
+
+    Arguments are rendered with repr (kwargs sorted) so equal calls produce
+    equal keys; long renderings are replaced by a SHA-1 digest.
+    """
+    rendered = repr(args)
+    if kwargs:
+        rendered += repr(sorted(kwargs.items()))
+
+    if len(rendered) > MAX_KEY_ARGS_LENGTH:
+        rendered = hashlib.sha1(rendered.encode("utf-8")).hexdigest()
+
+    return f"{namespace}:{rendered}"
+
+
 def cached(ttl_seconds: int = 300, key_prefix: str = ""):
     """
-    Decorator to cache function results.
-    
+    Decorator to cache function results (sync or async functions).
+
+    Keys live under "{key_prefix}:{function name}", so everything cached by
+    one function can be dropped with `func.invalidate_all()`;
+    `func.invalidate(*args, **kwargs)` drops a single call.
+
     Args:
         ttl_seconds: Time to live in seconds
         key_prefix: Optional prefix for cache keys
-    
+
     Example:
         @cached(ttl_seconds=600, key_prefix="buildings")
         def get_building(building_id: str):
             ...
     """
     def decorator(func: Callable) -> Callable:
-        def wrapper(*args, **kwargs):
-            # Generate cache key from function name and arguments
-            cache_key = f"{key_prefix}:{func.__name__}:{str(args)}:{str(sorted(kwargs.items()))}"
-            
-            # Try to get from cache
-            cached_value = _cache.get(cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache hit: {cache_key}")
-                return cached_value
-            
-            # Call function and cache result
-            result = func(*args, **kwargs)
-            _cache.set(cache_key, result, ttl_seconds)
-            logger.debug(f"Cache miss, stored: {cache_key}")
-            
-            return result
-        
+        namespace = f"{key_prefix}:{func.__qualname__}" if key_prefix else f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                cache_key = make_cache_key(namespace, *args, **kwargs)
+                return await _cache.aget_or_set(
+                    cache_key, lambda: func(*args, **kwargs), ttl_seconds
+                )
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                cache_key = make_cache_key(namespace, *args, **kwargs)
+                return _cache.get_or_set(
+                    cache_key, lambda: func(*args, **kwargs), ttl_seconds
+                )
+
+        def invalidate(*args, **kwargs):
+            _cache.delete(make_cache_key(namespace, *args, **kwargs))
+
+        def invalidate_all() -> int:
+            return _cache.delete_prefix(f"{namespace}:")
+
+        wrapper.invalidate = invalidate
+        wrapper.invalidate_all = invalidate_all
+        wrapper.cache_namespace = namespace
         return wrapper
     return decorator
 
@@ -147,39 +427,94 @@ def cached(ttl_seconds: int = 300, key_prefix: str = ""):
 def cache_get(key: str) -> Optional[Any]:
     """
     Get a value from the cache.
-    
+
     Args:
         key: Cache key
-    
+
     Returns:
         Cached value or None
     """
     return _cache.get(key)
 
 
-def cache_set(key: str, value: Any, ttl_seconds: int = 300):
+def cache_set(key: str, value: Any, ttl_seconds: int = 300, tags: Optional[Iterable[str]] = None):
     """
     Set a value in the cache.
-    
+
     Args:
         key: Cache key
         value: Value to cache
         ttl_seconds: Time to live in seconds
+        tags: Optional entity tags (e.g. building_tag(id)) for invalidation
     """
-    _cache.set(key, value, ttl_seconds)
+    _cache.set(key, value, ttl_seconds, tags=tags)
+
+
+def cache_get_or_set(
+    key: str,
+    loader: Callable[[], Any],
+    ttl_seconds: int = 300,
+    tags: Optional[Iterable[str]] = None,
+) -> Any:
+    """
+    Return the cached value or load it once (per key) and cache it.
+
+    Args:
+        key: Cache key
+        loader: Zero-argument callable producing the value
+        ttl_seconds: Time to live in seconds
+        tags: Optional entity tags for invalidation
+
+    Returns:
+        Cached or freshly loaded value
+    """
+    return _cache.get_or_set(key, loader, ttl_seconds, tags=tags)
 
 
 def cache_delete(key: str):
     """
     Delete a value from the cache.
-    
+
     Args:
         key: Cache key
     """
     _cache.delete(key)
 
 
+def cache_delete_prefix(prefix: str) -> int:
+    """
+    Delete every cache entry whose key starts with prefix.
+
+    Args:
+        prefix: Key prefix (e.g. "buildings:list:")
+
+    Returns:
+        Number of entries removed
+    """
+    return _cache.delete_prefix(prefix)
+
+
+def invalidate_tags(*tags: str) -> int:
+    """
+    Invalidate every cache entry tagged with any of `tags`.
+    Called by write endpoints after a successful write.
+
+    Args:
+        tags: Entity tags (e.g. building_tag(id), user_access_tag(id))
+
+    Returns:
+        Number of tags invalidated
+    """
+    count = _cache.invalidate_tags(*tags)
+    logger.debug(f"Invalidated cache tags: {', '.join(t for t in tags if t)}")
+    return count
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction statistics for the global cache."""
+    return _cache.stats()
+
+
 def cache_clear():
     """Clear all cache entries."""
     _cache.clear()
-
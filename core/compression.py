@@ -0,0 +1,269 @@
+# core/compression.py
+
+"""
+gzip / Brotli response compression.
+
+Building reports, the user-access listings and public search results are
+large, repetitive JSON that usually shrinks 5-10x. CompressionMiddleware
+picks an encoding from Accept-Encoding (q-values honoured, Brotli
+preferred when the brotli package is installed) and compresses:
+
+- Bodies with a known length (including ones an inner middleware passes
+  on in chunks) in one go, if they are at least COMPRESSION_MIN_BYTES.
+  Bodies of COMPRESSION_THREAD_BYTES or more are compressed in the
+  threadpool so a multi-megabyte report doesn't stall the event loop.
+- Streaming bodies without a Content-Length chunk by chunk, flushing after
+  each chunk so NDJSON/CSV exports still arrive progressively.
+
+A response is left alone when:
+
+- it already has a Content-Encoding;
+- its media type isn't text-like (PDFs, images and archives are already
+  compressed);
+- the route opted out with `dependencies=[Depends(no_compression)]`.
+  Routes whose responses carry secrets next to request-controlled data,
+  such as presigned URLs, opt out because compression makes them
+  BREACH-prone.
+"""
+
+import re
+import zlib
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import settings
+from core.lazy_imports import is_installed
+
+
+if is_installed("brotli"):
+    import brotli
+else:
+    brotli = None
+
+# Server preference when the client rates several encodings equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/problem+json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+_SKIP_STATE_KEY = "skip_compression"
+
+# Report formats answered with a presigned download URL (never compressed, see above)
+DOWNLOAD_URL_FORMATS = ("pdf", "xlsx")
+
+_CODING_RE = re.compile(r"^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$")
+
+
+def no_compression(request: Request):
+    """Route dependency: send this route's responses uncompressed."""
+    request.state.skip_compression = True
+
+
+def no_compression_for_downloads(request: Request, format: str = "json"):
+    """Route dependency for reports: these formats respond with a presigned download URL."""
+    if format in DOWNLOAD_URL_FORMATS:
+        no_compression(request)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The preferred supported encoding the client accepts, or None for identity."""
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        match = _CODING_RE.match(part)
+        if not match:
+            continue
+        try:
+            q = float(match.group(2)) if match.group(2) is not None else 1.0
+        except ValueError:
+            continue
+        weights[match.group(1).lower()] = q
+
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class _Compressor:
+    """Incremental compressor with the same interface for both encodings."""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+            self._gzip = None
+        else:
+            self._br = None
+            self._gzip = zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress `data` and flush, so the output is decodable up to here."""
+        if self._br is not None:
+            return self._br.process(data) + self._br.flush()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._br is not None:
+            return self._br.finish()
+        return self._gzip.flush(zlib.Z_FINISH)
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a complete body."""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    compressor = zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses per Accept-Encoding (see module docstring)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressingResponder(self.app, encoding)(scope, receive, send)
+
+
+class _CompressingResponder:
+    def __init__(self, app: ASGIApp, encoding: str):
+        self.app = app
+        self.encoding = encoding
+        self.send: Send = None
+        self.scope: Scope = None
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.buffer: Optional[List[bytes]] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.scope = scope
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _eligible(self) -> bool:
+        headers = Headers(raw=self.start_message["headers"])
+        if self.start_message["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        if (self.scope.get("state") or {}).get(_SKIP_STATE_KEY):
+            return False
+        return is_compressible(headers.get("content-type"))
+
+    def _content_length(self) -> Optional[int]:
+        value = Headers(raw=self.start_message["headers"]).get("content-length")
+        try:
+            return int(value) if value is not None else None
+        except ValueError:
+            return None
+
+    async def _send_uncompressed(self, message: Message):
+        self.passthrough = True
+        await self.send(self.start_message)
+        await self.send(message)
+
+    def _set_encoding_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        return headers
+
+    async def _send_complete(self, body: bytes):
+        if len(body) < settings.COMPRESSION_MIN_BYTES:
+            await self._send_uncompressed({"type": "http.response.body", "body": body, "more_body": False})
+            return
+
+        if len(body) >= settings.COMPRESSION_THREAD_BYTES:
+            compressed = await run_in_threadpool(compress_body, body, self.encoding)
+        else:
+            compressed = compress_body(body, self.encoding)
+
+        headers = self._set_encoding_headers()
+        headers["Content-Length"] = str(len(compressed))
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+    async def send_compressed(self, message: Message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Held back until the body decides the encoding
+            self.start_message = message
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is not None:
+            # Streaming response, already started
+            chunk = self.compressor.compress(body) if body else b""
+            if not more_body:
+                chunk += self.compressor.finish()
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        if self.buffer is not None:
+            self.buffer.append(body)
+            if not more_body:
+                await self._send_complete(b"".join(self.buffer))
+            return
+
+        # First body message
+        if not self._eligible():
+            await self._send_uncompressed(message)
+            return
+
+        if not more_body:
+            await self._send_complete(body)
+            return
+
+        # Known-length bodies arrive in chunks when an inner middleware
+        # re-streams them; collect them so the size threshold applies
+        length = self._content_length()
+        if length is not None:
+            if length < settings.COMPRESSION_MIN_BYTES:
+                await self._send_uncompressed(message)
+            else:
+                self.buffer = [body]
+            return
+
+        # A real stream: compress chunk by chunk
+        headers = self._set_encoding_headers()
+        del headers["Content-Length"]
+        self.compressor = _Compressor(self.encoding)
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": self.compressor.compress(body), "more_body": True})
@@ -60,6 +60,11 @@ class Settings(BaseSettings):
     # -------------------------------------------------
     STRIPE_SECRET_KEY: Optional[str] = Field(None, env="STRIPE_SECRET_KEY")
     STRIPE_WEBHOOK_SECRET: Optional[str] = Field(None, env="STRIPE_WEBHOOK_SECRET")
+    # Verified document purchases are trusted locally for this long before
+    # Stripe is asked again (refunds revoke them immediately via webhook)
+    VERIFIED_PURCHASE_TTL_DAYS: int = Field(30, env="VERIFIED_PURCHASE_TTL_DAYS")
+    # In-process/shared cache in front of the verified_document_purchases table
+    VERIFIED_PURCHASE_CACHE_SECONDS: int = Field(300, env="VERIFIED_PURCHASE_CACHE_SECONDS")
     
     # -------------------------------------------------
     # Subscription Trial Limits
@@ -72,6 +77,75 @@ class Settings(BaseSettings):
     TRIAL_ADMIN_MAX_DAYS: int = Field(180, env="TRIAL_ADMIN_MAX_DAYS", description="Maximum trial days admins can grant (default: 180)")
     TRIAL_ADMIN_MIN_DAYS: int = Field(1, env="TRIAL_ADMIN_MIN_DAYS", description="Minimum trial days for admin grants (default: 1)")
 
+    # -------------------------------------------------
+    # Shared state (cache, rate limits, CSRF tokens)
+    # -------------------------------------------------
+    # "memory" (per process), "sqlite" (shared by workers on one host) or "redis" (>= 7.0)
+    STATE_BACKEND: str = Field("memory", env="STATE_BACKEND")
+    # SQLite file path or Redis URL, depending on STATE_BACKEND
+    STATE_BACKEND_URL: Optional[str] = Field(None, env="STATE_BACKEND_URL")
+    # CSRF tokens expire with the session they belong to
+    CSRF_TOKEN_TTL_SECONDS: int = Field(24 * 60 * 60, env="CSRF_TOKEN_TTL_SECONDS")
+
+    # Bounds for the in-memory cache (LRU eviction beyond either limit)
+    CACHE_MAX_ENTRIES: int = Field(10000, env="CACHE_MAX_ENTRIES")
+    CACHE_MAX_BYTES: int = Field(64 * 1024 * 1024, env="CACHE_MAX_BYTES")
+
+    # Lookup tables (categories, contractor roles) are kept in memory and
+    # reloaded this often (see core/reference_data.py)
+    REFERENCE_DATA_REFRESH_SECONDS: int = Field(300, env="REFERENCE_DATA_REFRESH_SECONDS")
+    # Load them in the background at startup instead of on first use
+    PRELOAD_REFERENCE_DATA: bool = Field(True, env="PRELOAD_REFERENCE_DATA")
+
+    # -------------------------------------------------
+    # Metrics (GET /metrics, Prometheus text format)
+    # -------------------------------------------------
+    # When set, scrapers must send "Authorization: Bearer <token>"
+    METRICS_TOKEN: Optional[str] = Field(None, env="METRICS_TOKEN")
+
+    # -------------------------------------------------
+    # Startup
+    # -------------------------------------------------
+    # Log every registered route on startup
+    LOG_ROUTES: bool = Field(False, env="LOG_ROUTES")
+    # Import pandas/PyMuPDF/boto3/stripe in a background thread after startup
+    # instead of on the first request that needs them
+    PRELOAD_HEAVY_MODULES: bool = Field(False, env="PRELOAD_HEAVY_MODULES")
+
+    # -------------------------------------------------
+    # PDF redaction
+    # -------------------------------------------------
+    # Worker processes for PyMuPDF (0 runs redactions in the threadpool instead)
+    REDACTION_WORKERS: int = Field(2, env="REDACTION_WORKERS")
+    # Uploads larger than this are redacted as background jobs (0 disables)
+    REDACTION_JOB_THRESHOLD_BYTES: int = Field(25 * 1024 * 1024, env="REDACTION_JOB_THRESHOLD_BYTES")
+
+    # -------------------------------------------------
+    # Logo images
+    # -------------------------------------------------
+    # Worker processes for resizing logos (0 runs them in the threadpool instead)
+    IMAGE_WORKERS: int = Field(1, env="IMAGE_WORKERS")
+
+    # -------------------------------------------------
+    # XLSX reports
+    # -------------------------------------------------
+    # Worker processes for writing workbooks (0 runs them in the threadpool instead)
+    REPORT_WORKERS: int = Field(1, env="REPORT_WORKERS")
+    # S3 multipart part size for report uploads (S3's minimum is 5MB)
+    REPORT_UPLOAD_PART_BYTES: int = Field(8 * 1024 * 1024, env="REPORT_UPLOAD_PART_BYTES")
+
+    # -------------------------------------------------
+    # Response compression (gzip, Brotli when installed)
+    # -------------------------------------------------
+    COMPRESSION_ENABLED: bool = Field(True, env="COMPRESSION_ENABLED")
+    # Smaller bodies are sent as-is
+    COMPRESSION_MIN_BYTES: int = Field(1024, env="COMPRESSION_MIN_BYTES")
+    # Larger bodies are compressed in the threadpool instead of on the event loop
+    COMPRESSION_THREAD_BYTES: int = Field(256 * 1024, env="COMPRESSION_THREAD_BYTES")
+    GZIP_LEVEL: int = Field(6, env="GZIP_LEVEL")
+    # 4-5 is the usual trade-off for dynamic responses (11 is meant for static assets)
+    BROTLI_QUALITY: int = Field(5, env="BROTLI_QUALITY")
+
     # -------------------------------------------------
     # Model Config
     # -------------------------------------------------
@@ -14,12 +14,17 @@ However, this middleware provides an additional layer of security for web client
 
 from fastapi import Request, HTTPException, status
 from typing import Optional
+from core.config import settings
 from core.logging_config import logger
+from core.state_backend import get_state_backend
 import secrets
 
 
-# CSRF token storage (in production, use Redis or session storage)
-_csrf_tokens: dict[str, str] = {}
+# CSRF tokens live in the shared state backend so every worker can validate
+# them. Two keys per token: session -> token and token -> session, both
+# expiring after CSRF_TOKEN_TTL_SECONDS (a new token is issued after that).
+CSRF_SESSION_PREFIX = "csrf:session:"
+CSRF_TOKEN_PREFIX = "csrf:token:"
 
 
 def generate_csrf_token() -> str:
@@ -42,12 +47,18 @@ def get_csrf_token(session_id: Optional[str] = None) -> str:
     Returns:
         CSRF token string
     """
-    if session_id and session_id in _csrf_tokens:
-        return _csrf_tokens[session_id]
+    backend = get_state_backend()
+    
+    if session_id:
+        existing = backend.get(CSRF_SESSION_PREFIX + session_id)
+        if existing:
+            return existing
     
     token = generate_csrf_token()
     if session_id:
-        _csrf_tokens[session_id] = token
+        ttl = settings.CSRF_TOKEN_TTL_SECONDS
+        backend.set(CSRF_SESSION_PREFIX + session_id, token, ttl_seconds=ttl)
+        backend.set(CSRF_TOKEN_PREFIX + token, session_id, ttl_seconds=ttl)
     
     return token
 
@@ -87,9 +98,9 @@ def validate_csrf_token(request: Request, token: Optional[str] = None) -> bool:
     if not token:
         return False
     
-    # Validate token exists in our store
+    # Validate token exists in our store (O(1) reverse lookup)
     # In production, validate against session storage
-    return token in _csrf_tokens.values()
+    return get_state_backend().get(CSRF_TOKEN_PREFIX + token) is not None
 
 
 def require_csrf_token(request: Request):
@@ -0,0 +1,106 @@
+# core/junction_helpers.py
+# Set-based writes for the event/document junction tables
+
+from typing import Dict, Iterable, Tuple
+
+from fastapi import HTTPException
+
+from core.logging_config import logger
+from core.supabase_client import get_supabase_client
+from core.supabase_helpers import is_missing_function
+
+
+# junction table -> (owner column, target column)
+JUNCTION_TABLES: Dict[str, Tuple[str, str]] = {
+    "event_units": ("event_id", "unit_id"),
+    "event_contractors": ("event_id", "contractor_id"),
+    "document_units": ("document_id", "unit_id"),
+    "document_contractors": ("document_id", "contractor_id"),
+}
+
+
+def set_junction_links(table: str, owner_id: str, target_ids: Iterable, created: bool = False) -> Dict[str, int]:
+    """
+    Make the links of one event/document in a junction table exactly
+    `target_ids`, touching only the rows that differ.
+
+    The set_junction_links RPC applies the diff in one transaction (see
+    migrations/add_set_junction_links.sql). Until that migration is applied,
+    the diff is computed here and written as one bulk insert followed by one
+    bulk delete, so the owner is never left without links in between.
+
+    Args:
+        table: Junction table name (a key of JUNCTION_TABLES)
+        owner_id: Event or document ID
+        target_ids: Desired unit or contractor IDs
+        created: The owner was just created, so it has no links yet and an
+            empty target set needs no write at all
+
+    Returns:
+        {"inserted": n, "deleted": n}
+    """
+    if table not in JUNCTION_TABLES:
+        raise ValueError(f"Unknown junction table: {table}")
+
+    desired = list(dict.fromkeys(str(t) for t in target_ids if t))
+    if created and not desired:
+        return {"inserted": 0, "deleted": 0}
+
+    client = get_supabase_client()
+    try:
+        result = client.rpc("set_junction_links", {
+            "p_table": table,
+            "p_owner_id": str(owner_id),
+            "p_target_ids": desired,
+        }).execute()
+        row = (result.data or [{}])[0]
+        return {"inserted": row.get("inserted") or 0, "deleted": row.get("deleted") or 0}
+    except Exception as e:
+        if not is_missing_function(e):
+            logger.warning(f"Failed to update {table} for {owner_id}: {e}")
+            raise HTTPException(500, f"Failed to update {table}: {e}")
+
+    try:
+        return _apply_diff(client, table, str(owner_id), desired, created)
+    except Exception as e:
+        logger.warning(f"Failed to update {table} for {owner_id}: {e}")
+        raise HTTPException(500, f"Failed to update {table}: {e}")
+
+
+def _apply_diff(client, table: str, owner_id: str, desired: list, created: bool) -> Dict[str, int]:
+    owner_column, target_column = JUNCTION_TABLES[table]
+
+    current = set()
+    if not created:
+        rows = (
+            client.table(table)
+            .select(target_column)
+            .eq(owner_column, owner_id)
+            .execute()
+        ).data or []
+        current = {str(row[target_column]) for row in rows}
+
+    to_insert = [t for t in desired if t not in current]
+    to_delete = list(current - set(desired))
+
+    # Insert before deleting so readers never see an empty set
+    if to_insert:
+        (
+            client.table(table)
+            .upsert(
+                [{owner_column: owner_id, target_column: t} for t in to_insert],
+                on_conflict=f"{owner_column},{target_column}",
+                ignore_duplicates=True,
+            )
+            .execute()
+        )
+    if to_delete:
+        (
+            client.table(table)
+            .delete()
+            .eq(owner_column, owner_id)
+            .in_(target_column, to_delete)
+            .execute()
+        )
+
+    return {"inserted": len(to_insert), "deleted": len(to_delete)}
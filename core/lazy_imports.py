@@ -0,0 +1,93 @@
+# core/lazy_imports.py
+
+"""
+Deferred imports for heavy optional dependencies.
+
+pandas, PyMuPDF, boto3 and stripe together add well over a second to a cold
+start, yet most processes only ever serve a handful of endpoints that need
+them. optional_module() returns a stand-in that imports the real module on
+first attribute access, so call sites keep using `stripe.Subscription...`
+unchanged while the import cost moves to the first request that needs it.
+
+Example:
+    stripe = optional_module("stripe")   # None when not installed
+    STRIPE_AVAILABLE = stripe is not None
+"""
+
+import importlib
+import importlib.util
+import threading
+from types import ModuleType
+from typing import Iterable, List, Optional
+
+from core.logging_config import logger
+
+
+class LazyModule:
+    """Proxy that imports `name` on first attribute access."""
+
+    __slots__ = ("_name", "_module", "_lock")
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self) -> ModuleType:
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    object.__setattr__(self, "_module", importlib.import_module(self._name))
+                module = self._module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def is_installed(name: str) -> bool:
+    """Whether `name` can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def optional_module(name: str) -> Optional[LazyModule]:
+    """Lazy proxy for `name`, or None when the package is not installed."""
+    return LazyModule(name) if is_installed(name) else None
+
+
+# Modules deferred by the routers; preload_modules() warms them on demand
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "fitz", "PIL.Image", "boto3", "stripe", "reportlab.platypus")
+
+
+def preload_modules(names: Iterable[str] = HEAVY_MODULES) -> List[str]:
+    """
+    Import `names` now (e.g. from a background thread after startup).
+
+    Returns:
+        Names that were imported successfully
+    """
+    loaded = []
+    for name in names:
+        if not is_installed(name):
+            continue
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception as e:
+            logger.warning(f"Preloading {name} failed: {e}")
+    return loaded
@@ -0,0 +1,441 @@
+# core/metrics.py
+
+"""
+Request-level performance instrumentation.
+
+- Per-route latency histograms, labelled by route template ("/buildings/{building_id}")
+  rather than raw path so cardinality stays bounded.
+- Upstream call accounting (Supabase, S3, Stripe, SMTP): global counters and
+  latency histograms, plus a per-request tally kept in a context variable.
+  The per-request call counts feed a histogram per route, so an N+1
+  regression shows up as a jump in `aina_request_upstream_calls`.
+- A `Server-Timing` header on every response (app time plus one entry per
+  upstream service).
+- Prometheus text exposition without depending on prometheus_client;
+  render_metrics() is served on GET /metrics.
+
+Upstream clients are instrumented where they are created:
+instrument_supabase_client (httpx event hooks), instrument_s3_client (botocore
+events) and instrument_stripe (wraps the default HTTP client). Anything else
+can be wrapped with `track_upstream(service, operation)`.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Request
+
+
+# Prometheus' default latency buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upstream calls made while serving one request
+CALL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            return int(state[-1]) if state else 0
+
+    def total(self, **labels) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            return state[-2] if state else 0.0
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            for i, bound in enumerate(self.buckets):
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(state[i])}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry()
+
+REQUESTS_TOTAL = registry.register(Counter(
+    "aina_http_requests_total",
+    "HTTP requests by route and status code.",
+    ("method", "route", "status"),
+))
+REQUEST_LATENCY = registry.register(Histogram(
+    "aina_http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ("method", "route"),
+))
+REQUEST_UPSTREAM_CALLS = registry.register(Histogram(
+    "aina_request_upstream_calls",
+    "Upstream calls made while serving one request, by route and service.",
+    ("method", "route", "service"),
+    buckets=CALL_COUNT_BUCKETS,
+))
+UPSTREAM_CALLS_TOTAL = registry.register(Counter(
+    "aina_upstream_calls_total",
+    "Calls to upstream services (Supabase, S3, Stripe, SMTP).",
+    ("service", "operation"),
+))
+UPSTREAM_LATENCY = registry.register(Histogram(
+    "aina_upstream_call_duration_seconds",
+    "Upstream call latency by service.",
+    ("service",),
+))
+
+
+# -----------------------------------------------------
+# Per-request upstream accounting
+# -----------------------------------------------------
+class RequestStats:
+    """
+    Upstream calls made while serving one request. Shared by reference
+    with the threadpool running sync endpoints, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.calls: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.operations: Dict[Tuple[str, str], int] = {}
+
+    def record(self, service: str, operation: str, seconds: float):
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+            self.seconds[service] = self.seconds.get(service, 0.0) + seconds
+            op_key = (service, operation)
+            self.operations[op_key] = self.operations.get(op_key, 0) + 1
+
+    def count(self, service: Optional[str] = None, operation: Optional[str] = None) -> int:
+        with self._lock:
+            if operation is not None:
+                return sum(n for (s, op), n in self.operations.items()
+                           if op == operation and (service is None or s == service))
+            if service is not None:
+                return self.calls.get(service, 0)
+            return sum(self.calls.values())
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("aina_request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Upstream tally for the request being served, if any."""
+    return _request_stats.get()
+
+
+@contextmanager
+def collect_request_stats():
+    """
+    Tally upstream calls made inside the block (used by the middleware and
+    by tests/benchmarks that call code outside a request).
+    """
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def record_upstream(service: str, operation: str, seconds: float):
+    """Record one finished upstream call globally and on the current request."""
+    UPSTREAM_CALLS_TOTAL.inc(service=service, operation=operation)
+    UPSTREAM_LATENCY.observe(seconds, service=service)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(service, operation, seconds)
+
+
+@contextmanager
+def track_upstream(service: str, operation: str = ""):
+    """
+    Time an upstream call.
+
+    Example:
+        with track_upstream("smtp", "send"):
+            server.send_message(msg)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_upstream(service, operation, time.perf_counter() - start)
+
+
+# -----------------------------------------------------
+# Client instrumentation
+# -----------------------------------------------------
+_START_EXTENSION = "aina_metrics_start"
+
+
+def _postgrest_operation(request) -> str:
+    if "/rpc/" in request.url.path:
+        return "rpc"
+    method = request.method.upper()
+    if method == "POST":
+        prefer = request.headers.get("prefer", "")
+        return "upsert" if "resolution=" in prefer else "insert"
+    return {
+        "GET": "select",
+        "HEAD": "select",
+        "PATCH": "update",
+        "DELETE": "delete",
+    }.get(method, method.lower())
+
+
+def _add_httpx_hooks(http_client, service: str, operation_for):
+    hooks = http_client.event_hooks
+    if any(getattr(h, "_aina_metrics", False) for h in hooks.get("request", [])):
+        return
+
+    def on_request(request):
+        request.extensions[_START_EXTENSION] = time.perf_counter()
+
+    def on_response(response):
+        request = response.request
+        start = request.extensions.get(_START_EXTENSION)
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+        record_upstream(service, operation_for(request), elapsed)
+
+    on_request._aina_metrics = True
+    http_client.event_hooks = {
+        "request": list(hooks.get("request", [])) + [on_request],
+        "response": list(hooks.get("response", [])) + [on_response],
+    }
+
+
+def instrument_supabase_client(client):
+    """
+    Count and time PostgREST (table/rpc) and GoTrue (auth admin) calls made
+    through a supabase Client via httpx event hooks.
+    """
+    if client is None:
+        return client
+    try:
+        _add_httpx_hooks(client.postgrest.session, "supabase", _postgrest_operation)
+        _add_httpx_hooks(client.auth._http_client, "supabase", lambda request: "auth")
+    except AttributeError:
+        # Client layout changed; run uninstrumented rather than fail requests
+        pass
+    return client
+
+
+def instrument_s3_client(client):
+    """Count and time S3 calls through botocore's event system."""
+    events = client.meta.events
+
+    def before_call(context, model, **kwargs):
+        context[_START_EXTENSION] = time.perf_counter()
+
+    def after_call(context, model, **kwargs):
+        start = context.get(_START_EXTENSION)
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+        record_upstream("s3", model.name, elapsed)
+
+    events.register("before-call.s3", before_call)
+    events.register("after-call.s3", after_call)
+    return client
+
+
+def instrument_stripe(stripe_module):
+    """Count and time Stripe API calls by wrapping the default HTTP client."""
+    http_client = stripe_module.default_http_client
+    if http_client is None:
+        http_client = stripe_module.new_default_http_client(
+            verify_ssl_certs=stripe_module.verify_ssl_certs,
+            proxy=stripe_module.proxy,
+        )
+        stripe_module.default_http_client = http_client
+
+    if getattr(http_client, "_aina_metrics", False):
+        return stripe_module
+
+    original = http_client.request_with_retries
+
+    def request_with_retries(method, url, *args, **kwargs):
+        with track_upstream("stripe", str(method).lower()):
+            return original(method, url, *args, **kwargs)
+
+    http_client.request_with_retries = request_with_retries
+    http_client._aina_metrics = True
+    return stripe_module
+
+
+# -----------------------------------------------------
+# Middleware + exposition
+# -----------------------------------------------------
+def route_label(request: Request) -> str:
+    """Route template for the request, or UNMATCHED_ROUTE for 404s."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def server_timing_header(total_seconds: float, stats: RequestStats) -> str:
+    """Server-Timing value: total app time plus one entry per upstream service."""
+    parts = [f"app;dur={total_seconds * 1000:.1f}"]
+    for service in sorted(stats.calls):
+        calls = stats.calls[service]
+        parts.append(
+            f'{service};desc="{calls} call{"s" if calls != 1 else ""}";'
+            f"dur={stats.seconds[service] * 1000:.1f}"
+        )
+    return ", ".join(parts)
+
+
+async def instrument_requests(request: Request, call_next):
+    """HTTP middleware: latency histograms, upstream accounting and Server-Timing."""
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        _request_stats.reset(token)
+
+        method = request.method
+        route = route_label(request)
+        REQUESTS_TOTAL.inc(method=method, route=route, status=status)
+        REQUEST_LATENCY.observe(elapsed, method=method, route=route)
+        for service in ("supabase", "s3", "stripe", "smtp"):
+            REQUEST_UPSTREAM_CALLS.observe(
+                stats.calls.get(service, 0), method=method, route=route, service=service
+            )
+
+    response.headers["Server-Timing"] = server_timing_header(elapsed, stats)
+    return response
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text exposition format (0.0.4)."""
+    return registry.render()
+
+
+def reset_metrics():
+    """Clear all recorded metrics (used by tests)."""
+    registry.reset()
@@ -1,5 +1,4 @@
 # core/notifications.py
-import requests
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -9,6 +8,10 @@ from typing import List, Optional
 from io import BytesIO
 from core.config import settings
 from core.logging_config import logger
+from core.metrics import track_upstream
+from core.lazy_imports import LazyModule
+
+requests = LazyModule("requests")
 
 # -----------------------------------------------------
 # 📨 Send webhook (Discord, Slack, etc.)
@@ -112,7 +115,7 @@ def send_email(
                     except Exception as e:
                         logger.warning(f"Failed to attach {attachment['filename']} from URL: {e}")
 
-        with smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
+        with track_upstream("smtp", "send"), smtplib.SMTP_SSL(smtp_host, smtp_port) as server:
             server.login(smtp_user, smtp_pass)
             server.send_message(msg)
 
@@ -3,6 +3,7 @@ from typing import List, Optional
 from dependencies.auth import get_current_user, CurrentUser
 from core.permissions import ROLE_PERMISSIONS
 from core.supabase_client import get_supabase_client
+from core.cache import user_access_tag, org_tag
 
 
 # -----------------------------------------------------
@@ -510,3 +511,21 @@ def get_user_accessible_building_ids(user: CurrentUser) -> List[str]:
     building_ids.update([row["building_id"] for row in (user_result.data or [])])
     
     return list(building_ids)
+
+
+def access_cache_tags(user: CurrentUser) -> List[str]:
+    """
+    Cache tags for results filtered by the user's access grants:
+    the user's own grants plus those of their AOAO organization / PM company.
+    The user_access endpoints invalidate these when grants change.
+    """
+    tags = [user_access_tag(user.auth_user_id)]
+
+    aoao_org_id = getattr(user, "aoao_organization_id", None)
+    pm_company_id = getattr(user, "pm_company_id", None)
+    if aoao_org_id:
+        tags.append(org_tag(aoao_org_id))
+    if pm_company_id:
+        tags.append(org_tag(pm_company_id))
+
+    return tags
@@ -0,0 +1,139 @@
+# core/projections.py
+
+"""
+Role-aware column projections for report queries.
+
+Reports used to select("*") from events and documents and then copy every
+row just to pop the note / owner-contact columns the viewer may not see,
+and the public building report copied the building and units once more to
+drop internal fields. The registry below lists, per entity, the columns
+every role gets and the restricted columns with the roles allowed to read
+them; projection() turns that into the PostgREST select list, so
+restricted columns never leave the database.
+
+Roles an entity doesn't list in PROJECTED_ROLES select "*", as they did
+before.
+
+Not every deployment has every column (the note and owner-contact
+columns in particular): if PostgREST reports a projected column as
+missing, select_projected() drops it for the rest of the process and
+retries.
+"""
+
+import re
+from threading import Lock
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from core.logging_config import logger
+from core.supabase_client import get_supabase_client
+
+
+_REPORT_ROLES = ("public", "owner", "contractor", "property_manager", "aoao", "admin")
+
+# entity -> roles with an explicit column list (others select "*")
+PROJECTED_ROLES: Dict[str, Tuple[str, ...]] = {
+    "events": _REPORT_ROLES,
+    "documents": _REPORT_ROLES,
+    # Only the public building report trims buildings and units
+    "buildings": ("public",),
+    "units": ("public",),
+}
+
+# Columns every projected role may read
+PUBLIC_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "events": (
+        "id", "building_id", "event_type", "title", "body", "occurred_at",
+        "severity", "status", "category_id", "s3_key", "created_by", "created_at",
+    ),
+    "documents": (
+        "id", "building_id", "event_id", "category_id", "subcategory_id", "title",
+        "s3_key", "size_bytes", "document_url", "is_public",
+        "uploaded_by", "uploaded_by_role", "created_at",
+        # County-archive metadata written by the bulk upload (routers/documents_bulk.py)
+        "document_type", "permit_number", "permit_type", "folder", "tmk", "description", "source",
+    ),
+    "buildings": (
+        "id", "name", "slug", "address", "city", "state", "zip", "tmk", "zoning",
+        "year_built", "description", "floors", "units",
+    ),
+    "units": (
+        "id", "building_id", "unit_number", "floor", "owner_name",
+    ),
+}
+
+_NOT_PUBLIC = ("owner", "contractor", "property_manager", "aoao", "admin")
+_OWNER_CONTACT_ROLES = ("owner", "property_manager", "aoao", "admin")
+
+# entity -> restricted column -> roles that may read it
+RESTRICTED_COLUMNS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "events": {
+        "contractor_notes": _NOT_PUBLIC,
+        "pm_notes": ("property_manager", "aoao", "admin"),
+        "aoao_notes": ("aoao", "admin"),
+        "admin_notes": ("admin",),
+        "owner_name": _OWNER_CONTACT_ROLES,
+        "owner_email": _OWNER_CONTACT_ROLES,
+        "owner_phone": _OWNER_CONTACT_ROLES,
+    },
+    "documents": {
+        "owner_name": _OWNER_CONTACT_ROLES,
+        "owner_email": _OWNER_CONTACT_ROLES,
+        "owner_phone": _OWNER_CONTACT_ROLES,
+        "filename": _NOT_PUBLIC,
+        "is_redacted": _NOT_PUBLIC,
+        # Legacy single-unit link (bulk uploads); the public report never showed it
+        "unit_id": _NOT_PUBLIC,
+        # Key of the unredacted upload when s3_key points at a redacted copy
+        "original_s3_key": ("admin",),
+    },
+}
+
+# (entity, column) pairs PostgREST reported as missing
+_missing_columns: Set[Tuple[str, str]] = set()
+_missing_lock = Lock()
+
+_MISSING_COLUMN_RE = re.compile(r'column "?(?:\w+\.)?(\w+)"? does not exist', re.IGNORECASE)
+
+
+def visible_columns(entity: str, role: str) -> Tuple[str, ...]:
+    """Columns of `entity` that `role` may read, in select order ("*" if unprojected)."""
+    if entity not in PROJECTED_ROLES:
+        raise KeyError(f"No projection registered for {entity}")
+    if role not in PROJECTED_ROLES[entity]:
+        return ("*",)
+
+    allowed = [c for c, roles in RESTRICTED_COLUMNS.get(entity, {}).items() if role in roles]
+    return tuple(
+        c for c in (*PUBLIC_COLUMNS[entity], *allowed)
+        if (entity, c) not in _missing_columns
+    )
+
+
+def projection(entity: str, role: str) -> str:
+    """PostgREST select list of `entity` for `role`."""
+    return ", ".join(visible_columns(entity, role))
+
+
+def select_projected(entity: str, role: str, build: Optional[Callable] = None):
+    """
+    Run `build(client.table(entity).select(projection(entity, role)))` and
+    return the response.
+
+    Args:
+        build: Adds filters/ordering to the query builder (defaults to none)
+    """
+    client = get_supabase_client()
+    build = build or (lambda query: query)
+
+    while True:
+        columns = visible_columns(entity, role)
+        try:
+            return build(client.table(entity).select(", ".join(columns))).execute()
+        except Exception as e:
+            match = _MISSING_COLUMN_RE.search(str(e))
+            missing = match.group(1) if match else None
+            if missing is None or missing == "id" or missing not in columns:
+                raise
+            logger.warning(f"Column {entity}.{missing} does not exist; leaving it out of report queries")
+            with _missing_lock:
+                _missing_columns.add((entity, missing))
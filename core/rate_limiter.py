@@ -1,15 +1,116 @@
 # core/rate_limiter.py
 
-from typing import Dict, Tuple, Optional
-from datetime import datetime, timedelta
+"""
+Sliding-window-counter rate limiter on top of the shared state backend.
+
+Each (identifier, window) pair uses two integer counters in the backend:
+the current fixed window and the previous one. The previous window's count
+is weighted by how much of it still overlaps the sliding window, which
+approximates a true sliding log without storing timestamps.
+
+Counters expire after two windows, so idle identifiers are evicted by the
+backend (background sweeper for memory/SQLite, native TTL for Redis).
+With STATE_BACKEND=sqlite or redis the limits hold across all workers.
+"""
+
+from typing import Dict, Tuple, Optional, NamedTuple
 from fastapi import HTTPException, Request
-from collections import defaultdict
+import math
 import time
 
+from core.state_backend import StateBackend, get_state_backend
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a single rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: int
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding-window-counter rate limiter. Counter updates are atomic in the
+    backend, so it is safe across threads and (with a shared backend) workers.
+    """
+
+    def __init__(self, backend: Optional[StateBackend] = None, prefix: str = "ratelimit:"):
+        self._backend = backend
+        self._prefix = prefix
+
+    @property
+    def backend(self) -> StateBackend:
+        return self._backend or get_state_backend()
+
+    def _key(self, identifier: str, window_seconds: int, window_index: int) -> str:
+        return f"{self._prefix}{identifier}:{window_seconds}:{window_index}"
+
+    def hit(self, identifier: str, max_requests: int, window_seconds: int) -> RateLimitResult:
+        """
+        Count one request for `identifier` and report whether it is allowed.
+
+        Args:
+            identifier: Unique identifier (IP address, user ID, etc.)
+            max_requests: Maximum number of requests allowed per window
+            window_seconds: Window length in seconds
+
+        Returns:
+            RateLimitResult with the decision and header values
+        """
+        backend = self.backend
+
+        # Wall clock, so windows line up across worker processes
+        now = time.time()
+        window_index = int(now // window_seconds)
+        elapsed = now - window_index * window_seconds
+        reset_seconds = max(1, math.ceil(window_seconds - elapsed))
+
+        current_key = self._key(identifier, window_seconds, window_index)
+        current = backend.incr(current_key, 1, ttl_seconds=2 * window_seconds)
+        previous = backend.get(self._key(identifier, window_seconds, window_index - 1)) or 0
+
+        weight = 1.0 - (elapsed / window_seconds)
+        estimated = previous * weight + current
+
+        if estimated > max_requests:
+            # Denied requests do not consume quota
+            backend.incr(current_key, -1)
+            return RateLimitResult(False, max_requests, 0, reset_seconds)
+
+        remaining = max(0, int(max_requests - estimated))
+        return RateLimitResult(True, max_requests, remaining, reset_seconds)
+
+    def sweep(self) -> int:
+        """
+        Purge expired counters from the backend.
+
+        Returns:
+            Number of evicted keys
+        """
+        return self.backend.cleanup_expired()
+
+    def reset(self):
+        """Drop all rate limit state."""
+        self.backend.delete_prefix(self._prefix)
+
+    def size(self) -> int:
+        """Number of live counters."""
+        return len(self.backend.keys(self._prefix))
 
-# Simple in-memory rate limiter
-# For production, consider using Redis or a dedicated rate limiting service
-_rate_limit_store: Dict[str, list] = defaultdict(list)
+
+# Global limiter instance
+_limiter = SlidingWindowRateLimiter()
+
+
+def get_rate_limiter() -> SlidingWindowRateLimiter:
+    """Get the global rate limiter instance."""
+    return _limiter
+
+
+def reset_rate_limits():
+    """Clear all rate limit state (used by tests)."""
+    _limiter.reset()
 
 
 def check_rate_limit(
@@ -20,68 +121,57 @@ def check_rate_limit(
 ) -> Tuple[bool, int]:
     """
     Check if a request should be rate limited.
-    
+
     Args:
         identifier: Unique identifier (IP address, user ID, etc.)
         max_requests: Maximum number of requests allowed
         window_seconds: Time window in seconds
-        clear_expired: Whether to clean up expired entries
-    
+        clear_expired: Kept for backwards compatibility; idle keys are
+            evicted by the background sweeper
+
     Returns:
         Tuple of (allowed: bool, remaining: int)
     """
-    now = time.time()
-    window_start = now - window_seconds
-    
-    # Get request timestamps for this identifier
-    requests = _rate_limit_store[identifier]
-    
-    # Remove expired entries
-    if clear_expired:
-        _rate_limit_store[identifier] = [
-            ts for ts in requests if ts > window_start
-        ]
-        requests = _rate_limit_store[identifier]
-    
-    # Check if limit exceeded
-    if len(requests) >= max_requests:
-        return False, 0
-    
-    # Add current request
-    requests.append(now)
-    _rate_limit_store[identifier] = requests
-    
-    remaining = max_requests - len(requests)
-    return True, remaining
+    result = _limiter.hit(identifier, max_requests, window_seconds)
+    return result.allowed, result.remaining
 
 
 def get_rate_limit_identifier(request: Request, user_id: Optional[str] = None) -> str:
     """
     Get a unique identifier for rate limiting.
     Prefers user_id if available, otherwise uses IP address.
-    
+
     Args:
         request: FastAPI Request object
         user_id: Optional user ID
-    
+
     Returns:
         Unique identifier string
     """
     if user_id:
         return f"user:{user_id}"
-    
+
     # Get client IP
     client_ip = request.client.host if request.client else "unknown"
-    
+
     # Check for forwarded IP (common behind proxies)
     forwarded_for = request.headers.get("X-Forwarded-For")
     if forwarded_for:
         # Take the first IP (original client)
         client_ip = forwarded_for.split(",")[0].strip()
-    
+
     return f"ip:{client_ip}"
 
 
+def rate_limit_headers(result: RateLimitResult) -> Dict[str, str]:
+    """Standard X-RateLimit-* headers for a check result."""
+    return {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(result.remaining),
+        "X-RateLimit-Reset": str(result.reset_seconds),
+    }
+
+
 def require_rate_limit(
     request: Request,
     identifier: Optional[str] = None,
@@ -90,31 +180,47 @@ def require_rate_limit(
 ):
     """
     Rate limit decorator/helper that raises HTTPException if limit exceeded.
-    
+
+    On success the result is stored on `request.state.rate_limit` and
+    `add_rate_limit_headers` (registered as middleware in main.py) copies
+    the X-RateLimit-* headers onto the response.
+
     Args:
         request: FastAPI Request object
         identifier: Optional custom identifier (defaults to IP or user)
         max_requests: Maximum requests allowed
         window_seconds: Time window in seconds
-    
+
     Raises:
         HTTPException: 429 Too Many Requests if limit exceeded
     """
     if identifier is None:
         identifier = get_rate_limit_identifier(request)
-    
-    allowed, remaining = check_rate_limit(identifier, max_requests, window_seconds)
-    
-    if not allowed:
+
+    result = _limiter.hit(identifier, max_requests, window_seconds)
+
+    if not result.allowed:
         raise HTTPException(
             status_code=429,
             detail=f"Rate limit exceeded. Maximum {max_requests} requests per {window_seconds} seconds.",
             headers={
-                "X-RateLimit-Limit": str(max_requests),
+                **rate_limit_headers(result),
                 "X-RateLimit-Window": str(window_seconds),
-                "Retry-After": str(window_seconds),
+                "Retry-After": str(result.reset_seconds),
             }
         )
-    
-    return remaining
 
+    request.state.rate_limit = result
+    return result.remaining
+
+
+async def add_rate_limit_headers(request: Request, call_next):
+    """HTTP middleware: expose the last successful rate limit check as headers."""
+    response = await call_next(request)
+
+    result = getattr(request.state, "rate_limit", None)
+    if result is not None:
+        for name, value in rate_limit_headers(result).items():
+            response.headers.setdefault(name, value)
+
+    return response
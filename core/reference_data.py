@@ -0,0 +1,239 @@
+# core/reference_data.py
+
+"""
+Registry of small lookup tables (document categories and subcategories,
+event categories, contractor roles).
+
+These tables change rarely but were queried on every document create,
+every bulk-upload row, every report and every contractor role filter.
+The registry keeps an immutable snapshot of each table (id -> row and
+lower-cased name -> id) in process memory:
+
+- Loaded in the background at startup and refreshed every
+  REFERENCE_DATA_REFRESH_SECONDS by a daemon thread.
+- Where the refresher isn't running (jobs, tests) a snapshot older than
+  two refresh intervals is reloaded on access.
+- invalidate_reference_data() drops a snapshot after a write so the next
+  lookup reloads it.
+- A validation miss (ID/name not in the snapshot) reloads the table at most
+  once every MISS_RELOAD_SECONDS, so rows added directly in Supabase are
+  accepted without waiting for the next refresh.
+- If a reload fails, the previous snapshot keeps serving.
+"""
+
+import time
+from threading import Event, Lock, Thread
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from fastapi import HTTPException
+
+from core.config import settings
+from core.logging_config import logger
+from core.supabase_client import get_supabase_client
+
+
+# table -> columns kept in the snapshot
+REFERENCE_TABLES: Dict[str, str] = {
+    "document_categories": "id, name",
+    "document_subcategories": "id, name, category_id",
+    "event_categories": "id, name",
+    "contractor_roles": "id, name",
+}
+
+# Minimum snapshot age before a lookup miss triggers a reload
+MISS_RELOAD_SECONDS = 10
+
+
+class ReferenceTable:
+    """Read-only snapshot of one lookup table."""
+
+    __slots__ = ("name", "by_id", "id_by_name", "loaded_at")
+
+    def __init__(self, name: str, rows: Iterable[Dict[str, Any]]):
+        by_id = {}
+        id_by_name = {}
+        for row in rows:
+            row_id = str(row["id"])
+            by_id[row_id] = MappingProxyType(dict(row))
+            if row.get("name"):
+                id_by_name.setdefault(row["name"].lower(), row_id)
+        self.name = name
+        self.by_id: Mapping[str, Mapping[str, Any]] = MappingProxyType(by_id)
+        self.id_by_name: Mapping[str, str] = MappingProxyType(id_by_name)
+        self.loaded_at = time.monotonic()
+
+    def __contains__(self, row_id: Any) -> bool:
+        return row_id is not None and str(row_id) in self.by_id
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, row_id: Any) -> Optional[Mapping[str, Any]]:
+        return self.by_id.get(str(row_id)) if row_id is not None else None
+
+    def name_of(self, row_id: Any) -> Optional[str]:
+        row = self.get(row_id)
+        return row.get("name") if row else None
+
+    def id_for(self, name: Optional[str]) -> Optional[str]:
+        """ID for a name (case-insensitive)."""
+        return self.id_by_name.get(name.lower()) if name else None
+
+
+class ReferenceRegistry:
+    """Process-wide snapshots of REFERENCE_TABLES."""
+
+    def __init__(self, refresh_seconds: Optional[int] = None):
+        self._refresh_seconds = refresh_seconds
+        self._tables: Dict[str, ReferenceTable] = {}
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+        self._stop = Event()
+
+    @property
+    def refresh_seconds(self) -> int:
+        return self._refresh_seconds or settings.REFERENCE_DATA_REFRESH_SECONDS
+
+    def _load(self, name: str) -> ReferenceTable:
+        client = get_supabase_client()
+        rows = client.table(name).select(REFERENCE_TABLES[name]).execute().data or []
+        return ReferenceTable(name, rows)
+
+    def get(self, name: str) -> ReferenceTable:
+        if name not in REFERENCE_TABLES:
+            raise KeyError(f"Unknown reference table: {name}")
+
+        table = self._tables.get(name)
+        if table is not None and time.monotonic() - table.loaded_at < 2 * self.refresh_seconds:
+            return table
+
+        with self._lock:
+            table = self._tables.get(name)
+            if table is not None and time.monotonic() - table.loaded_at < 2 * self.refresh_seconds:
+                return table
+            try:
+                table = self._load(name)
+            except Exception as e:
+                if table is None:
+                    raise
+                logger.warning(f"Reloading {name} failed, serving the previous snapshot: {e}")
+                return table
+            self._tables[name] = table
+            return table
+
+    def reload_on_miss(self, name: str) -> ReferenceTable:
+        """Reload after a lookup miss, unless the snapshot is only seconds old."""
+        table = self.get(name)
+        if time.monotonic() - table.loaded_at < MISS_RELOAD_SECONDS:
+            return table
+        self.refresh([name])
+        return self.get(name)
+
+    def refresh(self, names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Reload tables now. Returns {table: row count} for the ones that loaded."""
+        loaded = {}
+        for name in (names or REFERENCE_TABLES):
+            try:
+                table = self._load(name)
+            except Exception as e:
+                logger.warning(f"Loading reference table {name} failed: {e}")
+                continue
+            self._tables[name] = table
+            loaded[name] = len(table)
+        return loaded
+
+    def invalidate(self, *names: str):
+        """Drop snapshots (all if no names) so the next lookup reloads them."""
+        for name in (names or list(self._tables)):
+            self._tables.pop(name, None)
+
+    def start_refresher(self):
+        """Load every table in the background, then refresh on a timer."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="reference-data-refresher", daemon=True)
+        self._thread.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            loaded = self.refresh()
+            logger.debug(f"Reference data refreshed: {loaded}")
+            if self._stop.wait(self.refresh_seconds):
+                return
+
+
+_registry = ReferenceRegistry()
+
+
+def get_reference_registry() -> ReferenceRegistry:
+    return _registry
+
+
+def reference_table(name: str) -> ReferenceTable:
+    """Current snapshot of a lookup table (see REFERENCE_TABLES)."""
+    return _registry.get(name)
+
+
+def invalidate_reference_data(*names: str):
+    """Call after writing to a lookup table."""
+    _registry.invalidate(*names)
+
+
+def lookup_reference(name: str, row_id: Any) -> Optional[Mapping[str, Any]]:
+    """Row by ID, reloading the table once if it isn't in the snapshot."""
+    row = reference_table(name).get(row_id)
+    if row is None and row_id:
+        row = _registry.reload_on_miss(name).get(row_id)
+    return row
+
+
+def reference_names(name: str, row_ids: Iterable[Any]) -> Dict[Any, str]:
+    """{id: name} for the IDs present in the snapshot (report enrichment)."""
+    table = reference_table(name)
+    names = {}
+    for row_id in row_ids:
+        row_name = table.name_of(row_id)
+        if row_name is not None:
+            names[row_id] = row_name
+    return names
+
+
+def lookup_reference_id(name: str, value: Optional[str]) -> Optional[str]:
+    """ID by name (case-insensitive), reloading the table once on a miss."""
+    row_id = reference_table(name).id_for(value)
+    if row_id is None and value:
+        row_id = _registry.reload_on_miss(name).id_for(value)
+    return row_id
+
+
+# ============================================================
+# Validation helpers
+# ============================================================
+def require_document_category(category_id: Any = None, subcategory_id: Any = None) -> Optional[Mapping[str, Any]]:
+    """
+    400 unless category_id / subcategory_id exist (when given) and the
+    subcategory belongs to the category.
+
+    Returns:
+        The category row, if category_id was given
+    """
+    category = None
+    if category_id:
+        category = lookup_reference("document_categories", category_id)
+        if category is None:
+            raise HTTPException(400, f"Category ID {category_id} not found in document_categories table")
+
+    if subcategory_id:
+        subcategory = lookup_reference("document_subcategories", subcategory_id)
+        if subcategory is None:
+            raise HTTPException(400, f"Subcategory ID {subcategory_id} not found in document_subcategories table")
+        if category_id and str(subcategory.get("category_id")) != str(category_id):
+            raise HTTPException(400, f"Subcategory {subcategory_id} does not belong to category {category_id}")
+
+    return category
@@ -0,0 +1,114 @@
+# core/responses.py
+
+"""
+Fast JSON responses for large payloads.
+
+FastAPI serializes a returned dict/list in up to three passes: it validates
+the rows against response_model, walks the result with jsonable_encoder,
+and then json.dumps() the copy. For building reports with thousands of
+events, or document lists of up to 1000 rows, those passes cost more than
+the queries behind them.
+
+- FastJSONResponse renders with orjson, which handles datetime, date, UUID
+  and Enum natively. Without orjson it falls back to json.dumps with the
+  same conversions. Returning one from an endpoint skips jsonable_encoder.
+- model_list_response() is the validated-once path for list endpoints with
+  a response_model. The rows are validated once against a cached
+  TypeAdapter, which still drops columns the model doesn't declare. The
+  result is then dumped straight to JSON bytes by pydantic-core.
+
+Keep response_model on the route when using model_list_response so the
+OpenAPI schema stays the same. FastAPI doesn't re-validate a returned
+Response.
+
+See benchmarks/serialization.py for numbers on 10k-row payloads.
+"""
+
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Iterable, List, Type
+from uuid import UUID
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+from core.lazy_imports import is_installed
+
+
+if is_installed("orjson"):
+    import orjson
+else:
+    orjson = None
+
+ORJSON_AVAILABLE = orjson is not None
+
+# orjson options: dict keys may be ints (e.g. counts per year), as with json.dumps
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def _default(value: Any) -> Any:
+    """Types neither serializer handles natively (mirrors jsonable_encoder)."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        # Same as jsonable_encoder: whole numbers stay ints
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    # Only reached by the json.dumps fallback
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize `content` to compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (stdlib json when not installed)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def model_list_response(rows: Iterable[Any], model: Type[BaseModel], status_code: int = 200) -> Response:
+    """
+    Validate `rows` against List[model] once and return them as JSON.
+
+    Rows that are already `model` instances are not validated again.
+    Validation errors propagate, as they would from response_model.
+    """
+    adapter = _list_adapter(model)
+    validated = adapter.validate_python(list(rows))
+    return Response(
+        content=adapter.dump_json(validated, by_alias=True),
+        status_code=status_code,
+        media_type="application/json",
+    )
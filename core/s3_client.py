@@ -1,11 +1,12 @@
 # core/s3_client.py
 
 import os
-import boto3
-from typing import Tuple
+from typing import Any, Tuple
 
+from core.metrics import instrument_s3_client
 
-def get_s3() -> Tuple[boto3.client, str, str]:
+
+def get_s3() -> Tuple[Any, str, str]:
     """
     Get S3 client, bucket name, and region.
     Returns: (s3_client, bucket_name, region)
@@ -19,6 +20,9 @@ def get_s3() -> Tuple[boto3.client, str, str]:
     if not all([key, secret, bucket]):
         raise RuntimeError("Missing AWS credentials")
 
+    # boto3 is imported on first use to keep it out of cold start
+    import boto3
+
     client = boto3.client(
         "s3",
         aws_access_key_id=key,
@@ -26,5 +30,5 @@ def get_s3() -> Tuple[boto3.client, str, str]:
         region_name=region,
     )
 
-    return client, bucket, region
+    return instrument_s3_client(client), bucket, region
 
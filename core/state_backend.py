@@ -0,0 +1,499 @@
+# core/state_backend.py
+
+"""
+Pluggable key/value state backend shared by the cache, rate limiter and
+CSRF token store.
+
+Backends:
+- memory: per-process dict (default; fine for a single worker)
+- sqlite: file-backed store shared by all workers on one host
+- redis:  shared across hosts (requires the optional `redis` package)
+
+Select with the STATE_BACKEND setting ("memory", "sqlite", "redis") and
+STATE_BACKEND_URL (SQLite file path or Redis URL).
+"""
+
+import heapq
+import pickle
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from threading import Lock, Thread, Event, local
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.logging_config import logger
+
+
+# How often the memory/sqlite backends purge expired keys in the background
+SWEEP_INTERVAL_SECONDS = 60
+
+DEFAULT_SQLITE_PATH = "/tmp/aina_state.sqlite3"
+
+
+class StateBackend:
+    """
+    Interface for key/value state with optional TTL.
+
+    Keys are strings; callers namespace them with a prefix
+    (e.g. "cache:", "ratelimit:", "csrf:").
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None if missing or expired."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
+        """Store a value, optionally expiring after ttl_seconds."""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Remove a key (no-op if missing)."""
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1, ttl_seconds: Optional[int] = None) -> int:
+        """
+        Atomically add `amount` to an integer counter and return the new value.
+        The TTL is only applied when the counter is created.
+        """
+        raise NotImplementedError
+
+    def keys(self, prefix: str = "") -> List[str]:
+        """Live keys starting with prefix."""
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove every key starting with prefix. Returns the number removed."""
+        raise NotImplementedError
+
+    def cleanup_expired(self) -> int:
+        """Purge expired keys. Returns the number removed."""
+        return 0
+
+
+class _ExpirySweeper:
+    """Daemon thread that periodically calls cleanup_expired() on a backend."""
+
+    def __init__(self, backend: StateBackend, interval: int = SWEEP_INTERVAL_SECONDS):
+        self._backend = backend
+        self._interval = interval
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+        self._stop = Event()
+
+    def ensure_started(self):
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = Thread(
+                target=self._run,
+                name="state-backend-sweeper",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                removed = self._backend.cleanup_expired()
+                if removed:
+                    logger.debug(f"State backend evicted {removed} expired keys")
+            except Exception as e:
+                logger.warning(f"State backend sweep failed: {e}")
+
+
+# ============================================================
+# In-memory backend
+# ============================================================
+class _MemoryEntry:
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value: Any, expires_at: Optional[float], size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate size of a value in bytes (pickled length)."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class MemoryBackend(StateBackend):
+    """
+    Per-process backend with optional LRU bounds. Thread-safe.
+
+    - max_entries / max_bytes: least recently used keys are evicted when
+      either bound is exceeded (unbounded when None)
+    - TTLs use the monotonic clock and are tracked in a min-heap, so
+      expired keys are purged proactively (on writes and by a background
+      sweeper) in O(expired * log n) instead of scanning every key
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sweep_interval: int = SWEEP_INTERVAL_SECONDS,
+    ):
+        self._data: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, int, str]] = []
+        self._heap_seq = 0
+        self._lock = Lock()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._sweeper = _ExpirySweeper(self, sweep_interval)
+
+    # -- internal helpers (caller holds the lock) --
+
+    def _remove(self, key: str) -> Optional[_MemoryEntry]:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def _store(self, key: str, value: Any, expires_at: Optional[float]):
+        size = estimate_size(value) if self._max_bytes else 0
+        self._remove(key)
+        self._data[key] = _MemoryEntry(value, expires_at, size)
+        self._bytes += size
+
+        if expires_at is not None:
+            self._heap_seq += 1
+            heapq.heappush(self._expiry_heap, (expires_at, self._heap_seq, key))
+            # Overwritten keys leave stale heap items behind; compact occasionally
+            if len(self._expiry_heap) > 2 * len(self._data) + 64:
+                self._expiry_heap = [
+                    (e.expires_at, i, k) for i, (k, e) in enumerate(self._data.items())
+                    if e.expires_at is not None
+                ]
+                heapq.heapify(self._expiry_heap)
+
+    def _expire(self, now: float) -> int:
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            # Skip stale heap items for keys that were overwritten or deleted
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                removed += 1
+        self._expirations += removed
+        return removed
+
+    def _enforce_bounds(self):
+        while self._data and (
+            (self._max_entries is not None and len(self._data) > self._max_entries)
+            or (self._max_bytes is not None and self._bytes > self._max_bytes)
+        ):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self._evictions += 1
+
+    def _live_entry(self, key: str, now: float) -> Optional[_MemoryEntry]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and now >= entry.expires_at:
+            self._remove(key)
+            self._expirations += 1
+            return None
+        return entry
+
+    # -- StateBackend --
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live_entry(key, time.monotonic())
+            if entry is None:
+                return None
+
+            self._data.move_to_end(key)
+            return entry.value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
+        self._sweeper.ensure_started()
+        now = time.monotonic()
+        expires_at = now + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._expire(now)
+            self._store(key, value, expires_at)
+            self._enforce_bounds()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def incr(self, key: str, amount: int = 1, ttl_seconds: Optional[int] = None) -> int:
+        self._sweeper.ensure_started()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live_entry(key, now)
+            if entry is None:
+                value = amount
+                self._store(key, value, now + ttl_seconds if ttl_seconds else None)
+                self._enforce_bounds()
+            else:
+                # Counters keep their original expiry
+                entry.value += amount
+                value = entry.value
+                self._data.move_to_end(key)
+            return value
+
+    def keys(self, prefix: str = "") -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                k for k, e in self._data.items()
+                if k.startswith(prefix) and (e.expires_at is None or now < e.expires_at)
+            ]
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            matched = [k for k in self._data if k.startswith(prefix)]
+            for k in matched:
+                self._remove(k)
+            return len(matched)
+
+    def cleanup_expired(self) -> int:
+        with self._lock:
+            return self._expire(time.monotonic())
+
+    def stats(self) -> Dict[str, int]:
+        """Entry/byte totals and eviction/expiration counters."""
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self._max_entries,
+                "max_bytes": self._max_bytes,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+# ============================================================
+# SQLite backend (single host, multiple workers)
+# ============================================================
+class SQLiteBackend(StateBackend):
+    """
+    File-backed store shared by every worker process on one host.
+    Uses WAL mode and one connection per thread; values are pickled.
+    Expiry uses wall-clock time because monotonic clocks are per-process.
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, sweep_interval: int = SWEEP_INTERVAL_SECONDS):
+        self._path = path
+        self._local = local()
+        self._sweeper = _ExpirySweeper(self, sweep_interval)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_state_expires_at ON state(expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _expires_at(ttl_seconds: Optional[int]) -> Optional[float]:
+        return time.time() + ttl_seconds if ttl_seconds else None
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
+        if ttl_seconds:
+            self._sweeper.ensure_started()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, pickle.dumps(value), self._expires_at(ttl_seconds)),
+        )
+
+    def delete(self, key: str):
+        self._connect().execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl_seconds: Optional[int] = None) -> int:
+        if ttl_seconds:
+            self._sweeper.ensure_started()
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, expires_at FROM state WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                value, expires_at = amount, self._expires_at(ttl_seconds)
+            else:
+                value, expires_at = pickle.loads(row[0]) + amount, row[1]
+            conn.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value), expires_at),
+            )
+            conn.execute("COMMIT")
+            return value
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _like_pattern(prefix: str) -> str:
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return escaped + "%"
+
+    def keys(self, prefix: str = "") -> List[str]:
+        rows = self._connect().execute(
+            "SELECT key FROM state WHERE key LIKE ? ESCAPE '\\'"
+            " AND (expires_at IS NULL OR expires_at > ?)",
+            (self._like_pattern(prefix), time.time()),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def delete_prefix(self, prefix: str) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM state WHERE key LIKE ? ESCAPE '\\'",
+            (self._like_pattern(prefix),),
+        )
+        return cursor.rowcount
+
+    def cleanup_expired(self) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+
+# ============================================================
+# Redis backend (multiple hosts)
+# ============================================================
+class RedisBackend(StateBackend):
+    """
+    Redis-backed store. Requires the optional `redis` package.
+    All keys are stored under `namespace` so clearing never touches
+    unrelated data in a shared Redis.
+    """
+
+    def __init__(self, url: str, namespace: str = "aina:", client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package")
+            client = redis.Redis.from_url(url)
+
+        self._redis = client
+        self._ns = namespace
+
+    def _key(self, key: str) -> str:
+        return f"{self._ns}{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._redis.get(self._key(key))
+        if raw is None:
+            return None
+        # Pickles start with the protocol opcode; INCRBY counters are plain digits
+        if raw[:1] == b"\x80":
+            return pickle.loads(raw)
+        return int(raw)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
+        self._redis.set(self._key(key), pickle.dumps(value), ex=ttl_seconds or None)
+
+    def delete(self, key: str):
+        self._redis.delete(self._key(key))
+
+    def incr(self, key: str, amount: int = 1, ttl_seconds: Optional[int] = None) -> int:
+        # Counters are stored as raw integers (INCRBY), not pickles
+        full_key = self._key(key)
+        if not ttl_seconds:
+            return self._redis.incrby(full_key, amount)
+
+        # INCRBY and EXPIRE in one MULTI/EXEC: a counter can never be left
+        # without a TTL (a rate limit that never resets). NX keeps the
+        # expiry of an existing counter (Redis >= 7.0).
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.incrby(full_key, amount)
+        pipe.expire(full_key, ttl_seconds, nx=True)
+        value, _ = pipe.execute()
+        return value
+
+    def keys(self, prefix: str = "") -> List[str]:
+        start = len(self._ns)
+        return [
+            (k.decode() if isinstance(k, bytes) else k)[start:]
+            for k in self._redis.scan_iter(match=f"{self._ns}{prefix}*")
+        ]
+
+    def delete_prefix(self, prefix: str) -> int:
+        matched = [self._key(k) for k in self.keys(prefix)]
+        if matched:
+            self._redis.delete(*matched)
+        return len(matched)
+
+
+# ============================================================
+# Global backend
+# ============================================================
+_backend: Optional[StateBackend] = None
+_backend_lock = Lock()
+
+
+def create_state_backend(kind: Optional[str] = None, url: Optional[str] = None) -> StateBackend:
+    """Build a backend from explicit arguments or the STATE_BACKEND settings."""
+    kind = (kind or settings.STATE_BACKEND or "memory").lower()
+    url = url or settings.STATE_BACKEND_URL
+
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(url or DEFAULT_SQLITE_PATH)
+    if kind == "redis":
+        if not url:
+            raise RuntimeError("STATE_BACKEND=redis requires STATE_BACKEND_URL")
+        return RedisBackend(url)
+
+    raise RuntimeError(f"Unknown STATE_BACKEND '{kind}' (expected memory, sqlite or redis)")
+
+
+def get_state_backend() -> StateBackend:
+    """Get the process-wide state backend (created on first use)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_state_backend()
+                logger.info(f"State backend: {type(_backend).__name__}")
+    return _backend
+
+
+def set_state_backend(backend: StateBackend):
+    """Replace the process-wide state backend (used by tests)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
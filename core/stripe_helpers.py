@@ -5,13 +5,12 @@ from datetime import datetime
 from fastapi import HTTPException
 from core.config import settings
 from core.logging_config import logger
+from core.metrics import instrument_stripe
+from core.lazy_imports import optional_module
 
-try:
-    import stripe
-    STRIPE_AVAILABLE = True
-except ImportError:
-    STRIPE_AVAILABLE = False
-    stripe = None
+# Imported on first use (the SDK is slow to import and most requests never touch it)
+stripe = optional_module("stripe")
+STRIPE_AVAILABLE = stripe is not None
 
 
 def get_stripe_client():
@@ -22,26 +21,26 @@ def get_stripe_client():
     if not settings.STRIPE_SECRET_KEY:
         raise HTTPException(500, "Stripe secret key not configured")
     
-    return stripe
+    return instrument_stripe(stripe)
 
 
-def verify_stripe_session(
+def get_verified_stripe_session(
     session_id: str,
     document_id: Optional[str] = None
-) -> bool:
+):
     """
-    Verify a Stripe Checkout Session.
+    Retrieve a Stripe Checkout Session if it is paid and complete.
     
     Args:
         session_id: Stripe Checkout Session ID
         document_id: Optional document ID to verify access for
     
     Returns:
-        True if session is valid and paid, False otherwise
+        The Stripe session object, or None if the session is invalid or unpaid
     """
     if not STRIPE_AVAILABLE or not settings.STRIPE_SECRET_KEY:
         logger.warning("Stripe not configured - payment verification disabled")
-        return False
+        return None
     
     try:
         stripe_client = get_stripe_client()
@@ -53,12 +52,12 @@ def verify_stripe_session(
         # Check if session is completed and paid
         if session.payment_status != "paid":
             logger.warning(f"Stripe session {session_id} not paid: {session.payment_status}")
-            return False
+            return None
         
         # Check if session status is complete
         if session.status != "complete":
             logger.warning(f"Stripe session {session_id} not complete: {session.status}")
-            return False
+            return None
         
         # If document_id provided, verify it's in the session metadata or line items
         if document_id:
@@ -71,7 +70,7 @@ def verify_stripe_session(
                 doc_ids = [d.strip() for d in session_doc_ids.split(",")]
                 if document_id not in doc_ids:
                     logger.warning(f"Document {document_id} not in session {session_id} metadata")
-                    return False
+                    return None
             
             # Also check line items metadata if available
             if hasattr(session, "line_items"):
@@ -80,18 +79,35 @@ def verify_stripe_session(
                     for item in line_items.data:
                         item_metadata = item.price.metadata or {}
                         if item_metadata.get("document_id") == document_id:
-                            return True
+                            return session
                 except Exception as e:
                     logger.debug(f"Could not check line items: {e}")
         
-        return True
+        return session
         
     except stripe.error.StripeError as e:
         logger.error(f"Stripe API error verifying session {session_id}: {e}")
-        return False
+        return None
     except Exception as e:
         logger.error(f"Error verifying Stripe session {session_id}: {e}")
-        return False
+        return None
+
+
+def verify_stripe_session(
+    session_id: str,
+    document_id: Optional[str] = None
+) -> bool:
+    """
+    Verify a Stripe Checkout Session.
+    
+    Args:
+        session_id: Stripe Checkout Session ID
+        document_id: Optional document ID to verify access for
+    
+    Returns:
+        True if session is valid and paid, False otherwise
+    """
+    return get_verified_stripe_session(session_id, document_id) is not None
 
 
 def verify_stripe_payment_intent(
@@ -145,6 +161,31 @@ def verify_stripe_payment_intent(
         return False
 
 
+def get_refunded_charge_payment_intent(charge_id: str) -> Optional[str]:
+    """
+    Confirm with Stripe that a charge has been fully refunded.
+    
+    Args:
+        charge_id: Stripe Charge ID
+    
+    Returns:
+        The charge's payment intent ID if it is fully refunded, None if it
+        isn't (or Stripe is not configured). Stripe API errors are raised
+        so the webhook inbox retries the event.
+    """
+    if not STRIPE_AVAILABLE or not settings.STRIPE_SECRET_KEY:
+        logger.warning("Stripe not configured - refund verification disabled")
+        return None
+    
+    stripe_client = get_stripe_client()
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    
+    charge = stripe_client.Charge.retrieve(charge_id)
+    if not charge.refunded:
+        return None
+    return charge.payment_intent
+
+
 def verify_contractor_subscription(
     stripe_customer_id: Optional[str] = None,
     stripe_subscription_id: Optional[str] = None
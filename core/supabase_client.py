@@ -3,6 +3,7 @@
 from supabase import create_client, Client
 from core.config import settings
 from core.logging_config import logger
+from core.metrics import instrument_supabase_client
 import traceback
 
 
@@ -29,9 +30,9 @@ def get_supabase_client() -> Client:
             logger.error(f"   SERVICE ROLE KEY: {'SET' if supabase_key else 'MISSING'}")
             return None
 
-        # Create client
+        # Create client (upstream calls are counted per request, see core/metrics.py)
         client = create_client(supabase_url, supabase_key)
-        return client
+        return instrument_supabase_client(client)
 
     except Exception as e:
         logger.error(f"Supabase Init Error: {e}", exc_info=True)
@@ -72,6 +72,12 @@ def safe_update(table: str, filters: dict, data: dict):
         supabase_error(e, f"Failed to update {table}")
 
 
+def is_missing_function(error: Exception) -> bool:
+    """True if an RPC failed because its migration hasn't been applied yet."""
+    message = str(error).lower()
+    return "pgrst202" in message or "could not find the function" in message
+
+
 # =================================================================
 #  SUPABASE AUTH ADMIN HELPERS — NEW
 # =================================================================
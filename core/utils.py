@@ -1,5 +1,9 @@
 # core/utils.py
 
+# Leading characters that make spreadsheet apps treat a cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
 def sanitize(data: dict) -> dict:
     """
     Sanitize dictionary data:
@@ -51,3 +55,14 @@ def sanitize(data: dict) -> dict:
         clean[k] = v
 
     return clean
+
+
+def neutralize_formula(value):
+    """
+    Prefix strings that a spreadsheet would evaluate as a formula with "'",
+    so user-entered text in CSV/XLSX exports stays text. Other values are
+    returned unchanged.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
@@ -0,0 +1,63 @@
+# jobs/auto_redact_job.py
+
+import argparse
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+from core.supabase_client import get_supabase_client
+from services.pdf_redaction import shutdown_redaction_pool
+from services.pii_redaction import run_auto_redaction
+
+
+# Failed scans (e.g. S3 unavailable) are retried after this long
+FAILED_SCAN_RETRY_HOURS = 24
+
+
+def find_unscanned_documents(limit: int) -> list:
+    """
+    PDFs that were never scanned for PII, newest first, plus failed
+    scans older than FAILED_SCAN_RETRY_HOURS. Every scan is recorded on
+    the document (pii_scanned_at), so each run moves further back.
+    """
+    client = get_supabase_client()
+    retry_before = (datetime.utcnow() - timedelta(hours=FAILED_SCAN_RETRY_HOURS)).isoformat()
+    rows = (
+        client.table("documents")
+        .select("id")
+        .eq("is_redacted", False)
+        .ilike("s3_key", "%.pdf")
+        .or_(f"pii_scanned_at.is.null,and(pii_scan_status.eq.failed,pii_scanned_at.lt.{retry_before})")
+        .order("created_at", desc=True)
+        .limit(limit)
+        .execute()
+    ).data or []
+    return [r["id"] for r in rows]
+
+
+def run(limit: int = 200, replace_original: bool = False):
+    """
+    CLI entry point for the batch PII redaction pass.
+    Scans the most recent not yet scanned PDFs in the redaction worker pool.
+    """
+    client = get_supabase_client()
+    if not client:
+        raise RuntimeError("Supabase not configured")
+
+    document_ids = find_unscanned_documents(limit)
+    try:
+        results = asyncio.run(run_auto_redaction(document_ids, replace_original=replace_original))
+    finally:
+        shutdown_redaction_pool()
+
+    summary = Counter(r["status"] for r in results)
+    print(f"Auto-redaction: {len(results)} document(s) — " + ", ".join(f"{k}: {v}" for k, v in sorted(summary.items())))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Redact PII in stored PDFs.")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--replace-original", action="store_true")
+    args = parser.parse_args()
+    run(limit=args.limit, replace_original=args.replace_original)
@@ -0,0 +1,30 @@
+# jobs/stripe_webhook_worker.py
+
+import argparse
+from collections import Counter
+
+from core.supabase_client import get_supabase_client
+from services.stripe_webhook_inbox import process_pending_events
+
+
+def run(limit: int = 100):
+    """
+    CLI entry point for the Stripe webhook inbox worker.
+    Processes events that were not handled right after delivery: failed
+    attempts (up to MAX_WEBHOOK_ATTEMPTS) and claims left by a crashed process.
+    """
+    client = get_supabase_client()
+    if not client:
+        raise RuntimeError("Supabase not configured")
+
+    results = process_pending_events(limit=limit)
+    summary = Counter(r.get("status") for r in results)
+    print(f"Stripe webhook worker: {len(results)} event(s) — " + ", ".join(f"{k}: {v}" for k, v in sorted(summary.items())))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process pending Stripe webhook events.")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    run(limit=args.limit)
@@ -1,6 +1,7 @@
 import os
 import sys
-from fastapi import FastAPI, Request
+import threading
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, RedirectResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -11,6 +12,15 @@ sys.path.append(os.path.dirname(__file__))
 # Core
 from core.config import settings
 from core.logging_config import logger
+from core.rate_limiter import add_rate_limit_headers
+from core.metrics import instrument_requests
+from core.responses import FastJSONResponse
+from core.compression import CompressionMiddleware, no_compression
+from core.lazy_imports import preload_modules
+from services.pdf_redaction import shutdown_redaction_pool
+from services.logo_images import shutdown_image_pool
+from services.report_xlsx import shutdown_report_pool
+from core.reference_data import get_reference_registry
 
 # -------------------------------------------------
 # Routers — Updated (NO _supabase, NO /api/v1)
@@ -33,12 +43,15 @@ from routers.requests import router as requests_router
 from routers.messages import router as messages_router
 from routers.financials import router as financials_router
 from routers.reports import router as reports_router
+from routers.exports import router as exports_router
 from routers.subscriptions import router as subscriptions_router
 from routers.stripe_webhooks import router as stripe_webhooks_router
 from routers.manual_redact import router as manual_redact_router
+from routers.auto_redact import router as auto_redact_router
 
 from routers.uploads import router as uploads_router
 from routers.health import router as health_router
+from routers.metrics import router as metrics_router
 from routers.public import router as public_router
 
 # Admin Routers — restored
@@ -57,6 +70,7 @@ def create_app() -> FastAPI:
         title=settings.PROJECT_NAME,
         version="1.0.0",
         description="Aina Protocol API — Supabase-powered Real Estate Reporting",
+        default_response_class=FastJSONResponse,
     )
 
     # -------------------------------------------------
@@ -68,19 +82,55 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[
+            "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After",
+            "Server-Timing",
+        ],
     )
 
+    # -------------------------------------------------
+    # Rate limit headers (X-RateLimit-*) on successful responses
+    # -------------------------------------------------
+    app.middleware("http")(add_rate_limit_headers)
+
+    # -------------------------------------------------
+    # gzip / Brotli compression (routes opt out with Depends(no_compression))
+    # -------------------------------------------------
+    app.add_middleware(CompressionMiddleware)
+
+    # -------------------------------------------------
+    # Instrumentation: route latency, upstream call counts, Server-Timing
+    # (registered last so it wraps everything else)
+    # -------------------------------------------------
+    app.middleware("http")(instrument_requests)
+
     # -------------------------------------------------
     # Startup logging
     # -------------------------------------------------
     @app.on_event("startup")
     async def on_startup():
         logger.info("🚀 Starting Aina Protocol API")
-        print("\n📍 Registered Routes:\n")
-        for route in app.routes:
-            methods = ",".join(route.methods or [])
-            print(f"➡️ {methods:10s} {route.path}")
-        print("\n✅ Route log complete.\n")
+
+        # Heavy optional dependencies load on first use unless preloading is on
+        if settings.PRELOAD_HEAVY_MODULES:
+            threading.Thread(target=preload_modules, name="preload-modules", daemon=True).start()
+
+        # Categories / contractor roles are validated against an in-memory snapshot
+        if settings.PRELOAD_REFERENCE_DATA and settings.SUPABASE_URL:
+            get_reference_registry().start_refresher()
+
+        if settings.LOG_ROUTES:
+            logger.info("📍 Registered Routes:")
+            for route in app.routes:
+                methods = ",".join(getattr(route, "methods", None) or [])
+                logger.info(f"➡️ {methods:10s} {route.path}")
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        shutdown_redaction_pool()
+        shutdown_image_pool()
+        shutdown_report_pool()
+        get_reference_registry().stop_refresher()
 
     # -------------------------------------------------
     # Error handling
@@ -91,7 +141,11 @@ def create_app() -> FastAPI:
             logger.warning(
                 f"HTTP {exc.status_code} at {request.url} — {exc.detail}"
             )
-        return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": exc.detail},
+            headers=getattr(exc, "headers", None),
+        )
 
     @app.exception_handler(Exception)
     async def handle_unhandled(request: Request, exc: Exception):
@@ -126,6 +180,7 @@ def create_app() -> FastAPI:
     app.include_router(requests_router)
     app.include_router(messages_router)
     app.include_router(reports_router)
+    app.include_router(exports_router)
     app.include_router(financials_router)
     app.include_router(subscriptions_router)
 
@@ -140,9 +195,11 @@ def create_app() -> FastAPI:
     app.include_router(uploads_router)
     app.include_router(stripe_webhooks_router)
     app.include_router(manual_redact_router)
+    app.include_router(auto_redact_router)
 
     # Health
     app.include_router(health_router)
+    app.include_router(metrics_router)
 
     # Public (for ainareports.com)
     app.include_router(public_router)
@@ -150,7 +207,7 @@ def create_app() -> FastAPI:
     # -------------------------------------------------
     # Root Redirect (Cloudflare Frontend)
     # -------------------------------------------------
-    @app.get("/", include_in_schema=False)
+    @app.get("/", include_in_schema=False, dependencies=[Depends(no_compression)])
     async def root():
         return RedirectResponse("https://ainaprotocol.com/auth/login.html")
 
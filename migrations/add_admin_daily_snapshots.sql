@@ -0,0 +1,47 @@
+-- Migration: Create admin_daily_snapshots table
+-- Stores one admin daily snapshot per day. The window_end of the previous day's
+-- row is the watermark for the next incremental run (a re-run on the same day
+-- recomputes and replaces that day's row), and /admin-daily/preview serves the
+-- stored snapshot instead of rebuilding it.
+
+CREATE TABLE IF NOT EXISTS admin_daily_snapshots (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    snapshot_date DATE NOT NULL UNIQUE,
+    window_start TIMESTAMPTZ NOT NULL,
+    window_end TIMESTAMPTZ NOT NULL,
+    snapshot JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Time-window filters used by the incremental snapshot
+CREATE INDEX IF NOT EXISTS idx_buildings_created_at ON buildings(created_at);
+CREATE INDEX IF NOT EXISTS idx_events_created_at ON events(created_at);
+CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents(created_at);
+
+-- RLS policies
+-- Note: RLS is disabled for this table because:
+-- 1. The API endpoints (/admin-daily/*) already enforce admin:daily_send
+-- 2. The cron job writes snapshots with the service role
+ALTER TABLE admin_daily_snapshots DISABLE ROW LEVEL SECURITY;
+
+-- Create function to update updated_at timestamp
+CREATE OR REPLACE FUNCTION update_admin_daily_snapshots_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create trigger to auto-update updated_at
+DROP TRIGGER IF EXISTS update_admin_daily_snapshots_updated_at ON admin_daily_snapshots;
+CREATE TRIGGER update_admin_daily_snapshots_updated_at
+    BEFORE UPDATE ON admin_daily_snapshots
+    FOR EACH ROW
+    EXECUTE FUNCTION update_admin_daily_snapshots_updated_at();
+
+-- Comments
+COMMENT ON TABLE admin_daily_snapshots IS 'Persisted admin daily snapshots (one per day)';
+COMMENT ON COLUMN admin_daily_snapshots.window_start IS 'Start of the window (exclusive watermark from the previous day''s row)';
+COMMENT ON COLUMN admin_daily_snapshots.window_end IS 'End of the window; watermark for the next day''s run';
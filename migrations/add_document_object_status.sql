@@ -0,0 +1,40 @@
+-- Migration: Track whether a content-addressed document object is in S3
+-- acquire_document_object() registered the object before its S3 PUT, so a
+-- concurrent upload of the same content could reuse a key that was never
+-- written (e.g. when the first PUT failed). Rows are now registered as
+-- 'pending' and marked 'stored' after the PUT; uploads that find a pending
+-- row check S3 and upload the object themselves if it is missing.
+
+ALTER TABLE document_objects
+ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'stored'
+    CHECK (status IN ('pending', 'stored'));
+
+COMMENT ON COLUMN document_objects.status IS 'pending: registered, S3 upload not confirmed yet. stored: the object is in S3.';
+
+-- The return type changes, so the function is dropped first
+DROP FUNCTION IF EXISTS acquire_document_object(TEXT, TEXT, BIGINT, TEXT);
+
+-- Take a reference to the object for p_sha256, registering it as pending if
+-- it is new. created = true means the caller must upload the object to
+-- p_s3_key; status = 'pending' on an existing row means it may not be in S3.
+CREATE OR REPLACE FUNCTION acquire_document_object(
+    p_sha256 TEXT,
+    p_s3_key TEXT,
+    p_size_bytes BIGINT,
+    p_content_type TEXT
+)
+RETURNS TABLE (
+    s3_key TEXT,
+    created BOOLEAN,
+    status TEXT
+)
+LANGUAGE sql
+AS $$
+    INSERT INTO document_objects AS o (sha256, s3_key, size_bytes, content_type, ref_count, status)
+    VALUES (p_sha256, p_s3_key, p_size_bytes, p_content_type, 1, 'pending')
+    ON CONFLICT (sha256) DO UPDATE
+        SET ref_count = o.ref_count + 1,
+            updated_at = NOW()
+    -- xmax is 0 only for a freshly inserted row
+    RETURNING o.s3_key, (o.xmax = 0), o.status;
+$$;
@@ -0,0 +1,85 @@
+-- Migration: Content-addressed document storage
+-- Every upload used to be written to a new S3 object, so the same PDF
+-- uploaded several times (county-archive imports, owners re-uploading)
+-- was stored several times. Uploads are now stored once per SHA-256 under
+-- documents/sha256/<hash>, and document_objects counts how many documents
+-- point at each object so it is only deleted with the last of them.
+
+CREATE TABLE IF NOT EXISTS document_objects (
+    sha256 TEXT PRIMARY KEY CHECK (sha256 ~ '^[0-9a-f]{64}$'),
+    s3_key TEXT NOT NULL UNIQUE,
+    size_bytes BIGINT,
+    content_type TEXT,
+    ref_count INTEGER NOT NULL DEFAULT 1 CHECK (ref_count >= 0),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Only the API (service role) reads and writes storage objects
+ALTER TABLE document_objects DISABLE ROW LEVEL SECURITY;
+
+ALTER TABLE documents
+ADD COLUMN IF NOT EXISTS content_sha256 TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_documents_content_sha256
+    ON documents(content_sha256)
+    WHERE content_sha256 IS NOT NULL;
+
+COMMENT ON TABLE document_objects IS 'One row per content-addressed S3 object, with the number of documents that reference it.';
+COMMENT ON COLUMN documents.content_sha256 IS 'SHA-256 of the uploaded file (document_objects.sha256). NULL for documents uploaded before content-addressed storage.';
+
+-- Take a reference to the object for p_sha256, registering it if it is new.
+-- created = true means the caller must upload the object to p_s3_key.
+CREATE OR REPLACE FUNCTION acquire_document_object(
+    p_sha256 TEXT,
+    p_s3_key TEXT,
+    p_size_bytes BIGINT,
+    p_content_type TEXT
+)
+RETURNS TABLE (
+    s3_key TEXT,
+    created BOOLEAN
+)
+LANGUAGE sql
+AS $$
+    INSERT INTO document_objects AS o (sha256, s3_key, size_bytes, content_type, ref_count)
+    VALUES (p_sha256, p_s3_key, p_size_bytes, p_content_type, 1)
+    ON CONFLICT (sha256) DO UPDATE
+        SET ref_count = o.ref_count + 1,
+            updated_at = NOW()
+    -- xmax is 0 only for a freshly inserted row
+    RETURNING o.s3_key, (o.xmax = 0);
+$$;
+
+-- Drop one reference. When it was the last one the row is removed and
+-- its key returned (ref_count = 0) so the caller deletes the S3 object.
+CREATE OR REPLACE FUNCTION release_document_object(
+    p_sha256 TEXT
+)
+RETURNS TABLE (
+    s3_key TEXT,
+    ref_count INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_s3_key TEXT;
+    v_ref_count INTEGER;
+BEGIN
+    UPDATE document_objects o
+    SET ref_count = GREATEST(o.ref_count - 1, 0),
+        updated_at = NOW()
+    WHERE o.sha256 = p_sha256
+    RETURNING o.s3_key, o.ref_count INTO v_s3_key, v_ref_count;
+
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    IF v_ref_count = 0 THEN
+        DELETE FROM document_objects o WHERE o.sha256 = p_sha256;
+    END IF;
+
+    RETURN QUERY SELECT v_s3_key, v_ref_count;
+END;
+$$;
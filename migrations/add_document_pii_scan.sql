@@ -0,0 +1,21 @@
+-- Migration: Record automatic PII scans on documents
+-- services/pii_redaction.py stores the outcome of every scan (clean, redacted
+-- or failed) so jobs/auto_redact_job.py only picks up documents that were
+-- never scanned. Set pii_scanned_at back to NULL to queue a rescan.
+
+ALTER TABLE documents
+ADD COLUMN IF NOT EXISTS pii_scanned_at TIMESTAMPTZ,
+ADD COLUMN IF NOT EXISTS pii_scan_status TEXT CHECK (pii_scan_status IN ('clean', 'redacted', 'failed')),
+ADD COLUMN IF NOT EXISTS pii_scanned_sha256 TEXT,
+ADD COLUMN IF NOT EXISTS pii_redacted_s3_key TEXT;
+
+-- The batch job scans unscanned PDFs newest first
+CREATE INDEX IF NOT EXISTS idx_documents_pii_unscanned
+    ON documents(created_at DESC)
+    WHERE pii_scanned_at IS NULL;
+
+-- Add comments
+COMMENT ON COLUMN documents.pii_scanned_at IS 'When the automatic PII scan last ran on this document. NULL if never scanned.';
+COMMENT ON COLUMN documents.pii_scan_status IS 'Outcome of the last automatic PII scan: clean, redacted or failed.';
+COMMENT ON COLUMN documents.pii_scanned_sha256 IS 'sha256 of the file that was scanned.';
+COMMENT ON COLUMN documents.pii_redacted_s3_key IS 'S3 key of the redacted copy from the last scan, if PII was found.';
@@ -0,0 +1,81 @@
+-- Migration: Add financial aggregation functions
+-- Lets /financials/* group subscription tiers/statuses and premium report
+-- revenue inside Postgres instead of fetching every row into the API.
+
+-- Subscription counts grouped by source table, tier, status and trial flag.
+-- created_in_period counts rows created inside [p_start, p_end].
+CREATE OR REPLACE FUNCTION financial_subscription_counts(
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ
+)
+RETURNS TABLE (
+    source TEXT,
+    subscription_tier TEXT,
+    subscription_status TEXT,
+    is_trial BOOLEAN,
+    total BIGINT,
+    created_in_period BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT 'user_subscriptions', s.subscription_tier, s.subscription_status, COALESCE(s.is_trial, FALSE),
+           COUNT(*), COUNT(*) FILTER (WHERE s.created_at >= p_start AND s.created_at <= p_end)
+    FROM user_subscriptions s
+    GROUP BY s.subscription_tier, s.subscription_status, COALESCE(s.is_trial, FALSE)
+
+    UNION ALL
+
+    SELECT 'contractors', c.subscription_tier, c.subscription_status, FALSE,
+           COUNT(*), COUNT(*) FILTER (WHERE c.created_at >= p_start AND c.created_at <= p_end)
+    FROM contractors c
+    GROUP BY c.subscription_tier, c.subscription_status
+
+    UNION ALL
+
+    SELECT 'aoao_organizations', o.subscription_tier, o.subscription_status, FALSE,
+           COUNT(*), COUNT(*) FILTER (WHERE o.created_at >= p_start AND o.created_at <= p_end)
+    FROM aoao_organizations o
+    GROUP BY o.subscription_tier, o.subscription_status
+
+    UNION ALL
+
+    SELECT 'pm_companies', p.subscription_tier, p.subscription_status, FALSE,
+           COUNT(*), COUNT(*) FILTER (WHERE p.created_at >= p_start AND p.created_at <= p_end)
+    FROM property_management_companies p
+    GROUP BY p.subscription_tier, p.subscription_status;
+$$;
+
+-- Paid premium report revenue inside [p_start, p_end], grouped by report type.
+CREATE OR REPLACE FUNCTION financial_premium_report_totals(
+    p_start TIMESTAMPTZ,
+    p_end TIMESTAMPTZ
+)
+RETURNS TABLE (
+    report_type TEXT,
+    purchase_count BIGINT,
+    revenue_cents BIGINT,
+    revenue_decimal NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(r.report_type, 'unknown'),
+           COUNT(*),
+           COALESCE(SUM(r.amount_cents), 0),
+           COALESCE(SUM(r.amount_decimal), 0)
+    FROM premium_report_purchases r
+    WHERE r.payment_status = 'paid'
+      AND r.purchased_at >= p_start
+      AND r.purchased_at <= p_end
+    GROUP BY COALESCE(r.report_type, 'unknown');
+$$;
+
+-- Indexes for the window filter on paid purchases
+CREATE INDEX IF NOT EXISTS idx_premium_report_purchases_paid_purchased_at
+    ON premium_report_purchases(purchased_at DESC)
+    WHERE payment_status = 'paid';
+
+-- Comments
+COMMENT ON FUNCTION financial_subscription_counts(TIMESTAMPTZ, TIMESTAMPTZ) IS 'Subscription counts grouped by source/tier/status for /financials/revenue';
+COMMENT ON FUNCTION financial_premium_report_totals(TIMESTAMPTZ, TIMESTAMPTZ) IS 'Paid premium report revenue grouped by report_type for a date window';
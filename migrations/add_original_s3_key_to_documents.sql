@@ -0,0 +1,9 @@
+-- Migration: Keep the original S3 key when a document is replaced by its redacted copy
+-- Automatic PII redaction (POST /documents/auto-redact with replace_original=true)
+-- points documents.s3_key at the redacted PDF and stores the previous key here
+
+ALTER TABLE documents
+ADD COLUMN IF NOT EXISTS original_s3_key TEXT;
+
+-- Add comment
+COMMENT ON COLUMN documents.original_s3_key IS 'S3 key of the unredacted upload when s3_key was replaced by an automatically redacted copy. NULL if never replaced.';
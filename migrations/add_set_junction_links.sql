@@ -0,0 +1,60 @@
+-- Migration: Set-based junction table writes
+-- Event/document units and contractors used to be rewritten by deleting
+-- every junction row and inserting the new ones one request at a time,
+-- leaving a window where the event/document had no links at all.
+-- set_junction_links applies only the difference, in one transaction.
+
+-- ON CONFLICT below needs a unique index on each (owner, target) pair
+CREATE UNIQUE INDEX IF NOT EXISTS uq_event_units_event_unit ON event_units(event_id, unit_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_event_contractors_event_contractor ON event_contractors(event_id, contractor_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_document_units_document_unit ON document_units(document_id, unit_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_document_contractors_document_contractor ON document_contractors(document_id, contractor_id);
+
+-- Make the links of p_owner_id in p_table exactly p_target_ids.
+-- Returns how many rows were inserted and deleted.
+CREATE OR REPLACE FUNCTION set_junction_links(
+    p_table TEXT,
+    p_owner_id UUID,
+    p_target_ids UUID[]
+)
+RETURNS TABLE (
+    inserted INTEGER,
+    deleted INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_owner_column TEXT;
+    v_target_column TEXT;
+    v_inserted INTEGER;
+    v_deleted INTEGER;
+BEGIN
+    -- Table names are interpolated below, so only the known junctions are allowed
+    CASE p_table
+        WHEN 'event_units' THEN v_owner_column := 'event_id'; v_target_column := 'unit_id';
+        WHEN 'event_contractors' THEN v_owner_column := 'event_id'; v_target_column := 'contractor_id';
+        WHEN 'document_units' THEN v_owner_column := 'document_id'; v_target_column := 'unit_id';
+        WHEN 'document_contractors' THEN v_owner_column := 'document_id'; v_target_column := 'contractor_id';
+        ELSE RAISE EXCEPTION 'Unknown junction table: %', p_table;
+    END CASE;
+
+    -- Serialize concurrent updates of the same owner
+    PERFORM pg_advisory_xact_lock(hashtext(p_table || ':' || p_owner_id::TEXT));
+
+    EXECUTE format(
+        'INSERT INTO %1$I (%2$I, %3$I)
+         SELECT $1, t FROM unnest($2) AS t
+         ON CONFLICT (%2$I, %3$I) DO NOTHING',
+        p_table, v_owner_column, v_target_column
+    ) USING p_owner_id, COALESCE(p_target_ids, '{}');
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    EXECUTE format(
+        'DELETE FROM %1$I WHERE %2$I = $1 AND %3$I <> ALL($2)',
+        p_table, v_owner_column, v_target_column
+    ) USING p_owner_id, COALESCE(p_target_ids, '{}');
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+
+    RETURN QUERY SELECT v_inserted, v_deleted;
+END;
+$$;
@@ -0,0 +1,65 @@
+-- Migration: Stripe webhook inbox and billing owner lookup
+-- Webhook events are persisted by Stripe event ID before processing, so
+-- retried deliveries are acknowledged without being processed twice.
+-- stripe_billing_owners resolves a Stripe customer/subscription ID to the
+-- contractor, AOAO organization, PM company or user subscription it
+-- belongs to in one indexed query.
+
+CREATE TABLE IF NOT EXISTS stripe_webhook_events (
+    id TEXT PRIMARY KEY,                 -- Stripe event ID (evt_...)
+    type TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'processed', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result JSONB,
+    last_error TEXT,
+    received_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMPTZ,
+    processed_at TIMESTAMPTZ
+);
+
+-- Worker scans for pending/failed events in arrival order
+CREATE INDEX IF NOT EXISTS idx_stripe_webhook_events_status_received_at
+    ON stripe_webhook_events(status, received_at)
+    WHERE status <> 'processed';
+
+-- Only the API (service role) touches the inbox
+ALTER TABLE stripe_webhook_events DISABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE stripe_webhook_events IS 'Inbox of received Stripe webhook events, deduplicated by event ID and processed asynchronously.';
+
+-- Indexes backing the owner lookup (customer IDs are already indexed on most tables)
+CREATE INDEX IF NOT EXISTS idx_contractors_stripe_subscription_id ON contractors(stripe_subscription_id) WHERE stripe_subscription_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_pm_companies_stripe_subscription_id ON property_management_companies(stripe_subscription_id) WHERE stripe_subscription_id IS NOT NULL;
+
+CREATE OR REPLACE VIEW stripe_billing_owners AS
+    SELECT 'contractor'::TEXT AS owner_type, c.id AS owner_id, NULL::UUID AS user_id, NULL::TEXT AS role,
+           c.stripe_customer_id, c.stripe_subscription_id
+    FROM contractors c
+    WHERE c.stripe_customer_id IS NOT NULL OR c.stripe_subscription_id IS NOT NULL
+
+    UNION ALL
+
+    SELECT 'aoao_organization'::TEXT, o.id, NULL::UUID, NULL::TEXT,
+           o.stripe_customer_id, o.stripe_subscription_id
+    FROM aoao_organizations o
+    WHERE o.stripe_customer_id IS NOT NULL OR o.stripe_subscription_id IS NOT NULL
+
+    UNION ALL
+
+    SELECT 'pm_company'::TEXT, p.id, NULL::UUID, NULL::TEXT,
+           p.stripe_customer_id, p.stripe_subscription_id
+    FROM property_management_companies p
+    WHERE p.stripe_customer_id IS NOT NULL OR p.stripe_subscription_id IS NOT NULL
+
+    UNION ALL
+
+    SELECT 'user_subscription'::TEXT, s.id, s.user_id, s.role,
+           s.stripe_customer_id, s.stripe_subscription_id
+    FROM user_subscriptions s
+    WHERE s.stripe_customer_id IS NOT NULL OR s.stripe_subscription_id IS NOT NULL;
+
+COMMENT ON VIEW stripe_billing_owners IS 'Stripe customer/subscription ID to owning entity (contractor, AOAO organization, PM company or user subscription).';
+
+-- Billing data is for the API only
+REVOKE ALL ON stripe_billing_owners FROM anon, authenticated;
@@ -0,0 +1,110 @@
+-- Migration: Create subscription_ledger view
+-- Unified, filterable view over user, contractor, AOAO organization and PM
+-- company subscriptions. Used by GET /subscriptions/all so tier/status/type
+-- filters, sorting and pagination run in Postgres instead of in the API.
+
+CREATE OR REPLACE VIEW subscription_ledger AS
+    SELECT
+        'user'::TEXT AS subscription_type,
+        s.id,
+        s.user_id,
+        u.email::TEXT AS user_email,
+        COALESCE(u.raw_user_meta_data->>'full_name', u.email::TEXT) AS user_name,
+        s.role,
+        NULL::TEXT AS company_name,
+        NULL::TEXT AS organization_name,
+        s.subscription_tier,
+        s.subscription_status,
+        s.stripe_customer_id,
+        s.stripe_subscription_id,
+        COALESCE(s.is_trial, FALSE) AS is_trial,
+        s.trial_started_at,
+        s.trial_ends_at,
+        s.created_at,
+        s.updated_at
+    FROM user_subscriptions s
+    LEFT JOIN auth.users u ON u.id = s.user_id
+
+    UNION ALL
+
+    SELECT
+        'contractor'::TEXT,
+        c.id,
+        NULL::UUID,
+        NULL::TEXT,
+        NULL::TEXT,
+        NULL::TEXT,
+        c.company_name,
+        NULL::TEXT,
+        c.subscription_tier,
+        c.subscription_status,
+        c.stripe_customer_id,
+        c.stripe_subscription_id,
+        COALESCE(c.subscription_status = 'trialing', FALSE),
+        -- Trial start is not tracked on business entities; created_at is the proxy
+        CASE WHEN c.subscription_status = 'trialing' THEN c.created_at END,
+        NULL::TIMESTAMPTZ,
+        c.created_at,
+        c.updated_at
+    FROM contractors c
+
+    UNION ALL
+
+    SELECT
+        'aoao_organization'::TEXT,
+        o.id,
+        NULL::UUID,
+        NULL::TEXT,
+        NULL::TEXT,
+        NULL::TEXT,
+        NULL::TEXT,
+        o.organization_name,
+        o.subscription_tier,
+        o.subscription_status,
+        o.stripe_customer_id,
+        o.stripe_subscription_id,
+        COALESCE(o.subscription_status = 'trialing', FALSE),
+        CASE WHEN o.subscription_status = 'trialing' THEN o.created_at END,
+        NULL::TIMESTAMPTZ,
+        o.created_at,
+        o.updated_at
+    FROM aoao_organizations o
+
+    UNION ALL
+
+    SELECT
+        'pm_company'::TEXT,
+        p.id,
+        NULL::UUID,
+        NULL::TEXT,
+        NULL::TEXT,
+        NULL::TEXT,
+        p.company_name,
+        NULL::TEXT,
+        p.subscription_tier,
+        p.subscription_status,
+        p.stripe_customer_id,
+        p.stripe_subscription_id,
+        COALESCE(p.subscription_status = 'trialing', FALSE),
+        CASE WHEN p.subscription_status = 'trialing' THEN p.created_at END,
+        NULL::TIMESTAMPTZ,
+        p.created_at,
+        p.updated_at
+    FROM property_management_companies p;
+
+-- The view reads auth.users, so only the service role may query it
+REVOKE ALL ON subscription_ledger FROM anon, authenticated;
+
+-- Indexes so filters and the created_at sort push down into each branch
+CREATE INDEX IF NOT EXISTS idx_user_subscriptions_subscription_status ON user_subscriptions(subscription_status);
+CREATE INDEX IF NOT EXISTS idx_user_subscriptions_created_at ON user_subscriptions(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_contractors_subscription_status ON contractors(subscription_status);
+CREATE INDEX IF NOT EXISTS idx_contractors_created_at ON contractors(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_aoao_organizations_subscription_status ON aoao_organizations(subscription_status);
+CREATE INDEX IF NOT EXISTS idx_aoao_organizations_created_at ON aoao_organizations(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_pm_companies_subscription_tier ON property_management_companies(subscription_tier);
+CREATE INDEX IF NOT EXISTS idx_pm_companies_subscription_status ON property_management_companies(subscription_status);
+CREATE INDEX IF NOT EXISTS idx_pm_companies_created_at ON property_management_companies(created_at DESC);
+
+-- Comments
+COMMENT ON VIEW subscription_ledger IS 'Unified subscriptions across users, contractors, AOAO organizations and PM companies (service role only)';
@@ -0,0 +1,28 @@
+-- Migration: Verified document purchases
+-- Paid document downloads used to ask Stripe to verify the Checkout
+-- Session / Payment Intent on every request. A purchase is now recorded
+-- here the first time it is verified (or when checkout.session.completed
+-- arrives) and later downloads are resolved locally until expires_at.
+-- charge.refunded webhooks set revoked_at.
+
+CREATE TABLE IF NOT EXISTS verified_document_purchases (
+    stripe_ref TEXT NOT NULL,                -- Checkout Session ID (cs_...) or Payment Intent ID (pi_...)
+    document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    ref_type TEXT NOT NULL CHECK (ref_type IN ('session', 'payment_intent')),
+    stripe_payment_intent_id TEXT,           -- Used to revoke session purchases on refund
+    source TEXT NOT NULL CHECK (source IN ('verification', 'webhook')),
+    verified_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    revoked_at TIMESTAMPTZ,
+    PRIMARY KEY (stripe_ref, document_id)
+);
+
+-- Refunds arrive keyed by payment intent
+CREATE INDEX IF NOT EXISTS idx_verified_document_purchases_payment_intent
+    ON verified_document_purchases(stripe_payment_intent_id)
+    WHERE stripe_payment_intent_id IS NOT NULL;
+
+-- Only the API (service role) reads and writes purchases
+ALTER TABLE verified_document_purchases DISABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE verified_document_purchases IS 'Stripe-verified purchases of paid documents, so repeat downloads skip the Stripe API until expires_at or a refund.';
@@ -25,6 +25,7 @@ from .event import (
     EventType,
     EventBase,
     EventCreate,
+    EventBulkCreate,
     EventRead,
     EventUpdate,
 )
@@ -103,6 +104,7 @@ __all__ = [
     "EventType",
     "EventBase",
     "EventCreate",
+    "EventBulkCreate",
     "EventRead",
     "EventUpdate",
     
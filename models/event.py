@@ -106,6 +106,14 @@ class EventCreate(EventBase):
     pass
 
 
+# -------------------------------------------------
+# Bulk Create Events
+# -------------------------------------------------
+class EventBulkCreate(BaseModel):
+    """Batch of events for POST /events/bulk (imports, contractor logs)."""
+    events: List[EventCreate] = Field(..., min_length=1, max_length=1000)
+
+
 # -------------------------------------------------
 # Read Event (ALWAYS STRING SAFE)
 # -------------------------------------------------
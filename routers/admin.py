@@ -14,7 +14,9 @@ from dependencies.auth import (
 from core.permission_helpers import requires_permission
 from core.permissions import ROLE_PERMISSIONS
 from core.supabase_client import get_supabase_client
+from core.responses import FastJSONResponse
 from core.logging_config import logger
+from core.cache import invalidate_tags, user_access_tag
 from models.user_create import AdminCreateUser
 
 
@@ -263,7 +265,7 @@ def list_users(role: str | None = None):
 
     results.sort(key=lambda x: x.get("created_at") or "", reverse=True)
 
-    return {"success": True, "data": results}
+    return FastJSONResponse({"success": True, "data": results})
 
 
 # -----------------------------------------------------
@@ -476,6 +478,8 @@ def update_user(
         
         raise HTTPException(500, f"Supabase update error: {error_msg}")
 
+    # Role / organization changes alter which buildings the user can see
+    invalidate_tags(user_access_tag(user_id))
     return {"success": True, "data": merged}
 
 
@@ -509,6 +513,7 @@ def delete_user(
     except Exception as e:
         raise HTTPException(500, f"Supabase delete error: {e}")
 
+    invalidate_tags(user_access_tag(user_id))
     return {"success": True, "data": {"user_id": user_id}}
 
 
@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 
 from dependencies.auth import (
     get_current_user,
@@ -10,7 +11,7 @@ from dependencies.auth import (
 
 from core.permission_helpers import requires_permission
 from core.supabase_client import get_supabase_client
-from core.supabase_helpers import safe_select
+from core.logging_config import logger
 
 
 router = APIRouter(
@@ -19,6 +20,18 @@ router = APIRouter(
     dependencies=[Depends(requires_permission("admin:daily_send"))],
 )
 
+SNAPSHOTS_TABLE = "admin_daily_snapshots"
+
+# Default window when no watermark exists yet
+DEFAULT_WINDOW = timedelta(hours=24)
+
+# Never scan further back than this, even if the cron job missed runs
+MAX_WINDOW = timedelta(days=7)
+
+# Page size when walking Supabase Auth users (newest first)
+AUTH_USERS_PAGE_SIZE = 200
+
+
 # ============================================================
 # Helper — Deep JSON sanitizer (fixes datetime errors)
 # ============================================================
@@ -39,11 +52,30 @@ def sanitize_json(obj):
 # ============================================================
 # SAFE: Fetch & normalize Supabase Auth users
 # ============================================================
-def fetch_auth_users():
+def normalize_auth_user(u) -> dict:
+    if isinstance(u, dict):
+        return {
+            "id": u.get("id"),
+            "email": u.get("email"),
+            "created_at": u.get("created_at"),
+            "last_sign_in_at": u.get("last_sign_in_at"),
+            "user_metadata": u.get("user_metadata") or {},
+        }
+
+    return {
+        "id": getattr(u, "id", None),
+        "email": getattr(u, "email", None),
+        "created_at": getattr(u, "created_at", None),
+        "last_sign_in_at": getattr(u, "last_sign_in_at", None),
+        "user_metadata": getattr(u, "user_metadata", {}) or {},
+    }
+
+
+def list_auth_users_page(page: int, per_page: int = AUTH_USERS_PAGE_SIZE) -> list:
     client = get_supabase_client()
 
     try:
-        result = client.auth.admin.list_users()
+        result = client.auth.admin.list_users(page=page, per_page=per_page)
 
         if hasattr(result, "users"):
             raw_users = result.users
@@ -52,46 +84,157 @@ def fetch_auth_users():
         else:
             raw_users = result.get("users", [])
 
-        normalized = []
-
-        for u in raw_users:
-            if isinstance(u, dict):
-                normalized.append({
-                    "id": u.get("id"),
-                    "email": u.get("email"),
-                    "created_at": u.get("created_at"),
-                    "last_sign_in_at": u.get("last_sign_in_at"),
-                    "user_metadata": u.get("user_metadata") or {},
-                })
-            else:
-                normalized.append({
-                    "id": getattr(u, "id", None),
-                    "email": getattr(u, "email", None),
-                    "created_at": getattr(u, "created_at", None),
-                    "last_sign_in_at": getattr(u, "last_sign_in_at", None),
-                    "user_metadata": getattr(u, "user_metadata", {}) or {},
-                })
-
-        return normalized
+        return [normalize_auth_user(u) for u in raw_users]
 
     except Exception as e:
         raise HTTPException(500, f"Supabase user fetch failed: {e}")
 
 
+def scan_auth_users(since: datetime, until: datetime) -> Tuple[int, list]:
+    """
+    Walk every auth user once. Returns the exact user count and the
+    users created inside (since, until].
+
+    The total is recounted on every run rather than carried forward from
+    the previous snapshot, so deleted users drop out of it.
+    """
+    total = 0
+    new_users = []
+    page = 1
+
+    while True:
+        users = list_auth_users_page(page)
+        total += len(users)
+
+        for u in users:
+            ts = parse_timestamp(u.get("created_at"))
+            if ts is not None and since < ts <= until:
+                new_users.append(u)
+
+        if len(users) < AUTH_USERS_PAGE_SIZE:
+            return total, new_users
+
+        page += 1
+
+
+def fetch_auth_user(user_id: str) -> Optional[dict]:
+    client = get_supabase_client()
+
+    try:
+        result = client.auth.admin.get_user_by_id(user_id)
+        user = getattr(result, "user", None)
+        return normalize_auth_user(user) if user else None
+    except Exception as e:
+        logger.warning(f"Could not fetch auth user {user_id}: {e}")
+        return None
+
+
 # ============================================================
-# Basic DB fetch helper
+# Pushed-down DB helpers
 # ============================================================
-def fetch_rows(table: str):
+def count_rows(table: str) -> int:
+    """Row count via PostgREST count=exact (no rows transferred)."""
+    client = get_supabase_client()
+
+    try:
+        result = client.table(table).select("id", count="exact").limit(1).execute()
+        return result.count or 0
+    except Exception as e:
+        raise HTTPException(500, f"Count failed for table '{table}': {e}")
+
+
+def fetch_rows_since(table: str, since: datetime, until: datetime, columns: str = "*"):
+    """Fetch rows created inside (since, until]."""
+    client = get_supabase_client()
+
     try:
-        rows = safe_select(table) or []
+        result = (
+            client.table(table)
+            .select(columns)
+            .gt("created_at", since.isoformat())
+            .lte("created_at", until.isoformat())
+            .order("created_at")
+            .execute()
+        )
         return [
             r if isinstance(r, dict) else dict(r)
-            for r in rows
+            for r in (result.data or [])
         ]
     except Exception as e:
         raise HTTPException(500, f"Fetch failed for table '{table}': {e}")
 
 
+def fetch_building_names(building_ids: list) -> dict:
+    if not building_ids:
+        return {}
+
+    client = get_supabase_client()
+    result = (
+        client.table("buildings")
+        .select("id, name")
+        .in_("id", building_ids)
+        .execute()
+    )
+    return {b["id"]: b.get("name") for b in (result.data or [])}
+
+
+# ============================================================
+# Persisted snapshots + watermark
+# ============================================================
+def get_window_snapshot(snapshot_date: str) -> Optional[dict]:
+    """
+    The stored snapshot row that fixes the window for `snapshot_date`:
+    that day's own row if it was already run, otherwise the latest
+    earlier row (whose window_end is the watermark).
+    """
+    client = get_supabase_client()
+
+    try:
+        result = (
+            client.table(SNAPSHOTS_TABLE)
+            .select("snapshot_date, window_start, window_end")
+            .lte("snapshot_date", snapshot_date)
+            .order("snapshot_date", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return result.data[0] if result.data else None
+    except Exception as e:
+        logger.warning(f"Could not read admin daily snapshot window: {e}")
+        return None
+
+
+def get_stored_snapshot(snapshot_date: str) -> Optional[dict]:
+    client = get_supabase_client()
+
+    try:
+        result = (
+            client.table(SNAPSHOTS_TABLE)
+            .select("snapshot")
+            .eq("snapshot_date", snapshot_date)
+            .limit(1)
+            .execute()
+        )
+        return result.data[0]["snapshot"] if result.data else None
+    except Exception as e:
+        logger.warning(f"Could not read admin daily snapshot for {snapshot_date}: {e}")
+        return None
+
+
+def save_snapshot(snapshot: dict):
+    client = get_supabase_client()
+
+    client.table(SNAPSHOTS_TABLE).upsert(
+        {
+            "snapshot_date": snapshot["snapshot_date"],
+            "window_start": snapshot["window_start"],
+            "window_end": snapshot["generated_at"],
+            "snapshot": snapshot,
+        },
+        on_conflict="snapshot_date",
+    ).execute()
+
+
 # ============================================================
 # Timestamp helpers
 # ============================================================
@@ -112,47 +255,70 @@ def parse_timestamp(value):
     return None
 
 
-def is_within_last_24h(obj: dict, since: datetime):
-    ts = parse_timestamp(obj.get("created_at"))
-    return ts is not None and ts >= since
+def resolve_window_start(now: datetime, stored: Optional[dict]) -> datetime:
+    """
+    Start of today's window. A second run on the same day keeps the start
+    of today's stored row, so it rebuilds the whole day and replaces the
+    row rather than covering only the time since the first run.
+    """
+    stored = stored or {}
+
+    if stored.get("snapshot_date") == now.date().isoformat():
+        start = parse_timestamp(stored.get("window_start"))
+        if start is not None and start < now:
+            return start
+
+    watermark = parse_timestamp(stored.get("window_end"))
+
+    if watermark is None or watermark >= now:
+        return now - DEFAULT_WINDOW
+
+    return max(watermark, now - MAX_WINDOW)
 
 
 # ============================================================
-# Build daily snapshot with full safety
+# Build daily snapshot incrementally
 # ============================================================
 def build_snapshot():
+    """
+    Build the admin snapshot from rows created since the end of the
+    previous day's stored snapshot (or the last 24h on the first run).
+
+    Totals come from count queries and only the new rows are fetched,
+    so the cost tracks daily activity rather than table size.
+    """
     now = datetime.now(timezone.utc)
-    since = now - timedelta(hours=24)
+    snapshot_date = now.date().isoformat()
+    since = resolve_window_start(now, get_window_snapshot(snapshot_date))
 
     snapshot = {
         "generated_at": now.isoformat(),
+        "snapshot_date": snapshot_date,
+        "window_start": since.isoformat(),
         "range": f"{since.isoformat()} → {now.isoformat()}",
     }
 
     # BUILDINGS
     try:
-        buildings = fetch_rows("buildings")
-        snapshot["buildings_total"] = len(buildings)
-        snapshot["new_buildings"] = [
-            b for b in buildings if is_within_last_24h(b, since)
-        ]
-        building_lookup = {b.get("id"): b for b in buildings}
+        snapshot["buildings_total"] = count_rows("buildings")
+        snapshot["new_buildings"] = fetch_rows_since("buildings", since, now)
     except Exception as e:
         snapshot["buildings_error"] = str(e)
-        buildings = []
-        building_lookup = {}
 
     # EVENTS
     try:
-        events = fetch_rows("events")
-        snapshot["events_total"] = len(events)
-        snapshot["new_events"] = [
-            e for e in events if is_within_last_24h(e, since)
-        ]
+        snapshot["events_total"] = count_rows("events")
+        snapshot["new_events"] = fetch_rows_since("events", since, now)
+
+        building_ids = list({
+            e["building_id"] for e in snapshot["new_events"] if e.get("building_id")
+        })
+        building_names = fetch_building_names(building_ids)
+
         snapshot["buildings_updated"] = [
             {
                 "building_id": e.get("building_id"),
-                "name": building_lookup.get(e.get("building_id"), {}).get("name", "Unknown"),
+                "name": building_names.get(e.get("building_id")) or "Unknown",
             }
             for e in snapshot["new_events"]
             if e.get("building_id")
@@ -162,24 +328,16 @@ def build_snapshot():
 
     # DOCUMENTS
     try:
-        documents = fetch_rows("documents")
-        snapshot["documents_total"] = len(documents)
-        snapshot["new_documents"] = [
-            d for d in documents if is_within_last_24h(d, since)
-        ]
+        snapshot["documents_total"] = count_rows("documents")
+        snapshot["new_documents"] = fetch_rows_since("documents", since, now)
     except Exception as e:
         snapshot["documents_error"] = str(e)
 
     # USERS
     try:
-        users = fetch_auth_users()
-        snapshot["users_total"] = len(users)
-        snapshot["new_users"] = [
-            u for u in users if is_within_last_24h(u, since)
-        ]
+        snapshot["users_total"], snapshot["new_users"] = scan_auth_users(since, now)
     except Exception as e:
         snapshot["users_error"] = str(e)
-        users = []
 
     # ACTIVE USERS
     try:
@@ -199,11 +357,6 @@ def build_snapshot():
 
     # CONTRACTORS
     try:
-        contractors = [
-            u for u in users
-            if (u.get("user_metadata") or {}).get("role") == "contractor"
-        ]
-
         contractor_activity = {}
         for e in snapshot.get("new_events", []):
             uid = e.get("created_by")
@@ -212,33 +365,81 @@ def build_snapshot():
 
         snapshot["contractor_activity"] = contractor_activity
 
+        snapshot["top_contractor"] = None
         if contractor_activity:
             top_id = max(contractor_activity, key=contractor_activity.get)
-            snapshot["top_contractor"] = next(
-                (u for u in contractors if u.get("id") == top_id),
-                None,
-            )
-        else:
-            snapshot["top_contractor"] = None
+            top_user = fetch_auth_user(top_id)
+            if top_user and (top_user.get("user_metadata") or {}).get("role") == "contractor":
+                snapshot["top_contractor"] = top_user
     except Exception as e:
         snapshot["contractor_error"] = str(e)
 
     return snapshot
 
 
+def get_daily_snapshot():
+    """
+    Build the snapshot and persist it as today's row, advancing the
+    watermark for tomorrow's run.
+    Used by POST /admin-daily/run and jobs/admin_daily_job.py.
+    """
+    snap = sanitize_json(build_snapshot())
+
+    try:
+        save_snapshot(snap)
+    except Exception as e:
+        logger.error(f"Failed to persist admin daily snapshot: {e}")
+
+    return snap
+
+
+def format_daily_email(snapshot: dict) -> str:
+    """Plain-text body for the daily admin email."""
+    top = snapshot.get("top_contractor") or {}
+
+    lines = [
+        "Aina Protocol — Daily Update",
+        f"Window: {snapshot.get('range')}",
+        "",
+        f"Buildings: {snapshot.get('buildings_total', 'n/a')} total, {len(snapshot.get('new_buildings', []))} new",
+        f"Events: {snapshot.get('events_total', 'n/a')} total, {len(snapshot.get('new_events', []))} new",
+        f"Documents: {snapshot.get('documents_total', 'n/a')} total, {len(snapshot.get('new_documents', []))} new",
+        f"Users: {snapshot.get('users_total', 'n/a')} total, {len(snapshot.get('new_users', []))} new",
+        f"Active users: {snapshot.get('active_users', 0)}",
+        f"Top contractor: {top.get('email') or 'None'}",
+    ]
+
+    errors = [f"{k}: {v}" for k, v in snapshot.items() if k.endswith("_error")]
+    if errors:
+        lines += ["", "Errors:"] + errors
+
+    return "\n".join(lines)
+
+
 # ============================================================
 # Endpoints
 # ============================================================
 @router.post("/run")
 def run_daily_snapshot(current_user: CurrentUser = Depends(get_current_user)):
     try:
-        snap = build_snapshot()
-        snap = sanitize_json(snap)   # <— FIX: makes JSONResponse safe
+        snap = get_daily_snapshot()
         return JSONResponse({"success": True, "snapshot": snap})
     except Exception as e:
         raise HTTPException(500, f"Daily snapshot failed: {e}")
 
 
 @router.get("/preview")
-def preview_daily_snapshot(current_user: CurrentUser = Depends(get_current_user)):
-    return {"success": True, "data": sanitize_json(build_snapshot())}
+def preview_daily_snapshot(
+    refresh: bool = False,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Return today's stored snapshot if one exists; otherwise (or with
+    refresh=true) build a fresh one without advancing the watermark.
+    """
+    if not refresh:
+        stored = get_stored_snapshot(datetime.now(timezone.utc).date().isoformat())
+        if stored:
+            return {"success": True, "data": stored, "stored": True}
+
+    return {"success": True, "data": sanitize_json(build_snapshot()), "stored": False}
@@ -0,0 +1,133 @@
+"""
+Automatic PII Redaction Router
+
+Starts batched background jobs that scan stored PDFs for SSNs, phone
+numbers, emails, account numbers and unit owner names, and upload
+redacted copies. See services/pii_redaction.py.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from uuid import UUID
+import uuid
+from datetime import datetime
+
+from dependencies.auth import (
+    get_current_user,
+    CurrentUser,
+    requires_permission,
+)
+
+from core.lazy_imports import is_installed
+from core.logging_config import logger
+from core.permission_helpers import is_admin, require_building_access
+from core.supabase_client import get_supabase_client
+from services.pdf_redaction import save_job, get_job
+from services.pii_redaction import PII_KINDS, run_auto_redaction
+
+# Documents per auto-redaction job
+MAX_DOCUMENTS_PER_JOB = 500
+
+router = APIRouter(
+    prefix="/documents",
+    tags=["Auto Redaction"],
+)
+
+
+# ======================================================
+# Models
+# ======================================================
+
+class AutoRedactRequest(BaseModel):
+    """Documents to scan and what to look for."""
+    document_ids: List[UUID] = Field(..., min_length=1, max_length=MAX_DOCUMENTS_PER_JOB)
+    kinds: Optional[List[Literal["ssn", "phone", "email", "account_number", "owner_name"]]] = Field(
+        None, description="PII kinds to redact (default: all)"
+    )
+    replace_original: bool = Field(
+        False, description="Point each document at its redacted copy (original key kept in original_s3_key)"
+    )
+
+
+# ======================================================
+# Endpoints
+# ======================================================
+
+@router.post(
+    "/auto-redact",
+    summary="Automatically redact PII in stored PDFs (background job)",
+    dependencies=[Depends(requires_permission("documents:write"))],
+)
+async def auto_redact_documents(
+    payload: AutoRedactRequest,
+    background_tasks: BackgroundTasks,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Queue an auto-redaction job over up to 500 documents.
+
+    Documents are processed in parallel in the redaction worker pool.
+    Poll GET /documents/auto-redact/jobs/{job_id} for per-document results.
+    """
+    if not is_installed("fitz"):
+        raise HTTPException(500, "PyMuPDF (fitz) is required for PDF redaction. Install with: pip install PyMuPDF")
+
+    document_ids = list(dict.fromkeys(str(d) for d in payload.document_ids))
+
+    # Non-admins may only redact documents in buildings they can access
+    if not is_admin(current_user):
+        client = get_supabase_client()
+        rows = (
+            client.table("documents")
+            .select("building_id")
+            .in_("id", document_ids)
+            .execute()
+        ).data or []
+        for building_id in {r["building_id"] for r in rows if r.get("building_id")}:
+            require_building_access(current_user, building_id)
+
+    job = save_job({
+        "job_id": str(uuid.uuid4()),
+        "kind": "auto_redact",
+        "status": "queued",
+        "user_id": current_user.id,
+        "total": len(document_ids),
+        "processed": 0,
+        "kinds": payload.kinds or list(PII_KINDS),
+        "replace_original": payload.replace_original,
+        "created_at": datetime.utcnow().isoformat(),
+    })
+    background_tasks.add_task(
+        run_auto_redaction, document_ids, job["kinds"], payload.replace_original, job["job_id"],
+    )
+    logger.info(f"Queued auto-redaction job {job['job_id']} for {len(document_ids)} document(s)")
+
+    return {
+        "success": True,
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/documents/auto-redact/jobs/{job['job_id']}",
+        "total": job["total"],
+    }
+
+
+@router.get(
+    "/auto-redact/jobs/{job_id}",
+    summary="Get the status of an auto-redaction job",
+    dependencies=[Depends(requires_permission("documents:read"))],
+)
+async def get_auto_redact_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """Progress and per-document results (matches by kind, redacted S3 key)."""
+    job = get_job(job_id)
+    if (
+        not job
+        or job.get("kind") != "auto_redact"
+        or (job.get("user_id") != current_user.id and not is_admin(current_user))
+    ):
+        raise HTTPException(404, "Auto-redaction job not found")
+
+    return {k: v for k, v in job.items() if k != "user_id"}
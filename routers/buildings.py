@@ -10,11 +10,12 @@ from core.permission_helpers import (
     is_admin,
     require_building_access,
     get_user_accessible_building_ids,
+    access_cache_tags,
 )
 
 from core.supabase_client import get_supabase_client
 from core.utils import sanitize
-from core.cache import cache_get, cache_set
+from core.cache import cache_get_or_set, invalidate_tags, building_tag
 
 from models.building import BuildingCreate, BuildingUpdate, BuildingRead
 
@@ -30,6 +31,11 @@ router = APIRouter(
     tags=["Buildings"]
 )
 
+# Collection tag: any building insert/update/delete can change list results
+BUILDINGS_TAG = "buildings"
+BUILDINGS_CACHE_TTL = 300
+BUILDING_DETAIL_CACHE_TTL = 120
+
 
 # ============================================================
 # LIST BUILDINGS
@@ -40,7 +46,7 @@ router = APIRouter(
     description="""
     Retrieve a list of buildings with optional filtering.
     
-    **Caching:** Results are cached for 5 minutes to improve performance.
+    **Caching:** Results are cached for 5 minutes and invalidated when buildings or access grants change.
     **Permissions:** Requires `buildings:read` permission.
     **Filtering:** Non-admin users only see buildings they have access to.
     
@@ -66,49 +72,57 @@ def list_buildings(
     """
     List buildings with optional filtering.
     
-    Results are cached for 5 minutes. Cache is keyed by user permissions and filter parameters.
+    Results are cached for 5 minutes. Cache is keyed by user and filter parameters and
+    tagged with "buildings" plus the user's access tags, so building writes and access
+    grant changes invalidate it.
     """
     # Generate cache key based on user and filters
     cache_key = f"buildings:list:{current_user.id}:{limit}:{name}:{city}:{state}"
-    
-    # Try cache first (only for simple queries without filters to avoid cache complexity)
-    if not name and not city and not state:
-        cached_result = cache_get(cache_key)
-        if cached_result is not None:
-            return cached_result
-    
-    client = get_supabase_client()
+    tags = [BUILDINGS_TAG] + access_cache_tags(current_user)
 
     try:
-        query = client.table("buildings").select("*").limit(limit)
-
-        # Apply permission-based filtering for non-admin users
-        if not is_admin(current_user):
-            accessible_building_ids = get_user_accessible_building_ids(current_user)
-            if accessible_building_ids is not None:
-                query = query.in_("id", accessible_building_ids)
-
-        if name:
-            query = query.ilike("name", f"%{name}%")
-        if city:
-            query = query.ilike("city", f"%{city}%")
-        if state:
-            query = query.ilike("state", f"%{state}%")
-
-        res = query.execute()
-        result = {"success": True, "data": res.data or []}
-        
-        # Cache result for 5 minutes (only for simple queries)
-        if not name and not city and not state:
-            cache_set(cache_key, result, ttl_seconds=300)
-        
-        return result
+        return cache_get_or_set(
+            cache_key,
+            lambda: _load_buildings(current_user, limit, name, city, state),
+            ttl_seconds=BUILDINGS_CACHE_TTL,
+            tags=tags,
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
         from core.errors import handle_supabase_error
         raise handle_supabase_error(e, "Failed to fetch buildings", 500)
 
 
+def _load_buildings(
+    current_user: CurrentUser,
+    limit: int,
+    name: Optional[str],
+    city: Optional[str],
+    state: Optional[str],
+) -> dict:
+    client = get_supabase_client()
+
+    query = client.table("buildings").select("*").limit(limit)
+
+    # Apply permission-based filtering for non-admin users
+    if not is_admin(current_user):
+        accessible_building_ids = get_user_accessible_building_ids(current_user)
+        if accessible_building_ids is not None:
+            query = query.in_("id", accessible_building_ids)
+
+    if name:
+        query = query.ilike("name", f"%{name}%")
+    if city:
+        query = query.ilike("city", f"%{city}%")
+    if state:
+        query = query.ilike("state", f"%{state}%")
+
+    res = query.execute()
+    return {"success": True, "data": res.data or []}
+
+
 # ============================================================
 # CREATE BUILDING
 # ============================================================
@@ -140,6 +154,7 @@ def create_building(payload: BuildingCreate):
         if not fetch_res.data:
             raise HTTPException(500, "Inserted building not found")
 
+        invalidate_tags(BUILDINGS_TAG)
         return fetch_res.data[0]
 
     except Exception as e:
@@ -188,6 +203,7 @@ def update_building(building_id: str, payload: BuildingUpdate, current_user: Cur
         if not fetch_res.data:
             raise HTTPException(500, "Updated building not found")
 
+        invalidate_tags(BUILDINGS_TAG, building_tag(building_id))
         return fetch_res.data[0]
 
     except Exception as e:
@@ -221,6 +237,7 @@ def delete_building(building_id: str, current_user: CurrentUser = Depends(get_cu
         if not delete_res.data:
             raise HTTPException(404, f"Building '{building_id}' not found")
 
+        invalidate_tags(BUILDINGS_TAG, building_tag(building_id))
         return {"success": True, "deleted_id": building_id}
 
     except Exception as e:
@@ -249,56 +266,80 @@ def get_building_events(
     if not is_admin(current_user):
         require_building_access(current_user, building_id)
     
-    client = get_supabase_client()
+    cache_key = (
+        f"buildings:events:{building_id}:{current_user.id}:"
+        f"{unit_id}:{event_type}:{contractor_id}:{severity}:{status}"
+    )
+    tags = [building_tag(building_id)] + access_cache_tags(current_user)
 
     try:
-        query = (
-            client.table("events")
-            .select("*")
-            .eq("building_id", building_id)
-            .order("occurred_at", desc=True)
+        return cache_get_or_set(
+            cache_key,
+            lambda: _load_building_events(building_id, unit_id, event_type, contractor_id, severity, status),
+            ttl_seconds=BUILDING_DETAIL_CACHE_TTL,
+            tags=tags,
         )
 
-        if unit_id:
-            query = query.eq("unit_id", unit_id)
-        if event_type:
-            query = query.eq("event_type", event_type)
-        if contractor_id:
-            # Get event IDs from event_contractors junction table
-            event_contractors_result = (
-                client.table("event_contractors")
-                .select("event_id")
-                .eq("contractor_id", contractor_id)
-                .execute()
-            )
-            contractor_event_ids = [row["event_id"] for row in (event_contractors_result.data or [])]
-            if contractor_event_ids:
-                query = query.in_("id", contractor_event_ids)
-            else:
-                # No events match, return empty result
-                query = query.eq("id", "00000000-0000-0000-0000-000000000000")  # Non-existent ID
-        # Validate enum values
-        if severity:
-            from models.enums import EventSeverity
-            valid_severities = [s.value for s in EventSeverity]
-            if severity not in valid_severities:
-                raise HTTPException(400, f"Invalid severity. Must be one of: {', '.join(valid_severities)}")
-            query = query.eq("severity", severity)
-        if status:
-            from models.enums import EventStatus
-            valid_statuses = [s.value for s in EventStatus]
-            if status not in valid_statuses:
-                raise HTTPException(400, f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
-            query = query.eq("status", status)
-
-        res = query.execute()
-        return {"success": True, "data": res.data or []}
-
+    except HTTPException:
+        raise
     except Exception as e:
         from core.errors import handle_supabase_error
         raise handle_supabase_error(e, "Failed to fetch building events", 500)
 
 
+def _load_building_events(
+    building_id: str,
+    unit_id: Optional[str],
+    event_type: Optional[str],
+    contractor_id: Optional[str],
+    severity: Optional[str],
+    status: Optional[str],
+) -> dict:
+    client = get_supabase_client()
+
+    query = (
+        client.table("events")
+        .select("*")
+        .eq("building_id", building_id)
+        .order("occurred_at", desc=True)
+    )
+
+    if unit_id:
+        query = query.eq("unit_id", unit_id)
+    if event_type:
+        query = query.eq("event_type", event_type)
+    if contractor_id:
+        # Get event IDs from event_contractors junction table
+        event_contractors_result = (
+            client.table("event_contractors")
+            .select("event_id")
+            .eq("contractor_id", contractor_id)
+            .execute()
+        )
+        contractor_event_ids = [row["event_id"] for row in (event_contractors_result.data or [])]
+        if contractor_event_ids:
+            query = query.in_("id", contractor_event_ids)
+        else:
+            # No events match, return empty result
+            query = query.eq("id", "00000000-0000-0000-0000-000000000000")  # Non-existent ID
+    # Validate enum values
+    if severity:
+        from models.enums import EventSeverity
+        valid_severities = [s.value for s in EventSeverity]
+        if severity not in valid_severities:
+            raise HTTPException(400, f"Invalid severity. Must be one of: {', '.join(valid_severities)}")
+        query = query.eq("severity", severity)
+    if status:
+        from models.enums import EventStatus
+        valid_statuses = [s.value for s in EventStatus]
+        if status not in valid_statuses:
+            raise HTTPException(400, f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
+        query = query.eq("status", status)
+
+    res = query.execute()
+    return {"success": True, "data": res.data or []}
+
+
 # ============================================================
 # LIST UNITS FOR BUILDING (from units table)
 # ============================================================
@@ -315,37 +356,51 @@ def get_building_units(
     if not is_admin(current_user):
         require_building_access(current_user, building_id)
     
-    client = get_supabase_client()
+    cache_key = f"buildings:units:{building_id}:{current_user.id}"
+    tags = [building_tag(building_id)] + access_cache_tags(current_user)
 
     try:
-        query = (
-            client.table("units")
-            .select("*")
-            .eq("building_id", building_id)
+        return cache_get_or_set(
+            cache_key,
+            lambda: _load_building_units(building_id, current_user),
+            ttl_seconds=BUILDING_DETAIL_CACHE_TTL,
+            tags=tags,
         )
-        
-        # For non-admin users, filter to only units they have access to
-        if not is_admin(current_user):
-            from core.permission_helpers import get_user_accessible_unit_ids
-            accessible_unit_ids = get_user_accessible_unit_ids(current_user)
-            if accessible_unit_ids is not None:
-                query = query.in_("id", accessible_unit_ids)
-        
-        result = query.order("unit_number").execute()
-        rows = result.data or []
-
-        return {
-            "success": True,
-            "building_id": building_id,
-            "units": rows,
-            "unit_count": len(rows),
-        }
 
+    except HTTPException:
+        raise
     except Exception as e:
         from core.errors import handle_supabase_error
         raise handle_supabase_error(e, "Database operation failed", 500)
 
 
+def _load_building_units(building_id: str, current_user: CurrentUser) -> dict:
+    client = get_supabase_client()
+
+    query = (
+        client.table("units")
+        .select("*")
+        .eq("building_id", building_id)
+    )
+
+    # For non-admin users, filter to only units they have access to
+    if not is_admin(current_user):
+        from core.permission_helpers import get_user_accessible_unit_ids
+        accessible_unit_ids = get_user_accessible_unit_ids(current_user)
+        if accessible_unit_ids is not None:
+            query = query.in_("id", accessible_unit_ids)
+
+    result = query.order("unit_number").execute()
+    rows = result.data or []
+
+    return {
+        "success": True,
+        "building_id": building_id,
+        "units": rows,
+        "unit_count": len(rows),
+    }
+
+
 # ============================================================
 # CONTRACTORS WHO WORKED ON A BUILDING
 # ============================================================
@@ -1,13 +1,8 @@
 # routers/contractors.py
 
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
-import os
-import tempfile
-from pathlib import Path as PathLib
-from datetime import datetime
-import uuid
 
 from dependencies.auth import (
     get_current_user,
@@ -16,10 +11,12 @@ from dependencies.auth import (
 )
 
 from core.supabase_client import get_supabase_client
+from core.responses import model_list_response
 from core.utils import sanitize
-from core.s3_client import get_s3
 from core.logging_config import logger
+from services.logo_images import process_logo_upload
 from core.stripe_helpers import verify_contractor_subscription, get_subscription_tier_from_stripe
+from core.reference_data import lookup_reference_id, reference_table
 from models.enums import SubscriptionTier, SubscriptionStatus
 
 
@@ -59,32 +56,15 @@ def validate_role_names(role_names: List[str]) -> List[str]:
     if not role_names:
         return []
     
-    client = get_supabase_client()
-    
-    # Get all valid role names from contractor_roles table
-    roles_result = (
-        client.table("contractor_roles")
-        .select("name")
-        .execute()
-    )
-    
-    valid_role_names = {row["name"].lower() for row in (roles_result.data or [])}
-    
-    # Validate each provided role name
+    # Validate each provided role name (case-insensitive, returned with the database casing)
     validated_roles = []
     for role_name in role_names:
         if not role_name or not isinstance(role_name, str):
             continue
-        role_lower = role_name.lower()
-        # Check if role exists (case-insensitive)
-        if role_lower in valid_role_names:
-            # Find the exact case from database
-            for db_role in roles_result.data:
-                if db_role["name"].lower() == role_lower:
-                    validated_roles.append(db_role["name"])
-                    break
-        else:
+        role_id = lookup_reference_id("contractor_roles", role_name)
+        if role_id is None:
             raise HTTPException(400, detail={"error": f"Invalid role: {role_name}"})
+        validated_roles.append(reference_table("contractor_roles").name_of(role_id))
     
     # Remove duplicates while preserving order
     return list(dict.fromkeys(validated_roles))
@@ -98,27 +78,8 @@ def get_role_ids(role_names: List[str]) -> List[str]:
     if not role_names:
         return []
     
-    client = get_supabase_client()
-    
-    # Get role IDs for the validated role names
-    role_names_lower = [name.lower() for name in role_names]
-    roles_result = (
-        client.table("contractor_roles")
-        .select("id, name")
-        .execute()
-    )
-    
-    role_id_map = {}
-    for row in (roles_result.data or []):
-        role_id_map[row["name"].lower()] = row["id"]
-    
-    role_ids = []
-    for role_name in role_names:
-        role_lower = role_name.lower()
-        if role_lower in role_id_map:
-            role_ids.append(role_id_map[role_lower])
-    
-    return role_ids
+    roles = reference_table("contractor_roles")
+    return [roles.id_for(name) for name in role_names if roles.id_for(name)]
 
 
 # ============================================================
@@ -310,6 +271,7 @@ class LogoUploadResponse(BaseModel):
     success: bool
     logo_url: str
     s3_key: str
+    renditions: Dict[str, str] = Field(default_factory=dict, description="Resized logo URLs by <rendition>_<format> (e.g. thumbnail_webp, report_header_png)")
     message: str
 
 
@@ -323,19 +285,10 @@ def apply_contractor_filters(query, params: dict):
     # role filter (via contractor_role_assignments junction table)
     if params.get("role"):
         # Validate role exists in contractor_roles table
-        role_result = (
-            client.table("contractor_roles")
-            .select("id, name")
-            .ilike("name", params["role"])
-            .limit(1)
-            .execute()
-        )
-        
-        if not role_result.data:
+        role_id = lookup_reference_id("contractor_roles", params["role"])
+        if role_id is None:
             raise HTTPException(400, detail={"error": "Invalid role filter"})
         
-        role_id = role_result.data[0]["id"]
-        
         # Get contractor IDs that have this role
         assignments_result = (
             client.table("contractor_role_assignments")
@@ -456,7 +409,7 @@ def list_contractors(
     from core.contractor_helpers import batch_enrich_contractors_with_roles
     enriched_contractors = batch_enrich_contractors_with_roles(contractors)
     
-    return enriched_contractors
+    return model_list_response(enriched_contractors, ContractorRead)
 
 
 # ============================================================
@@ -745,7 +698,7 @@ async def upload_contractor_logo(
     """
     Upload a logo image for a contractor.
     
-    The image is uploaded to S3 and optionally updates the contractor's logo_url field.
+    The image is resized into WebP/PNG renditions, uploaded to S3 and optionally updates the contractor's logo_url field.
     """
     # Validate contractor exists
     client = get_supabase_client()
@@ -760,77 +713,9 @@ async def upload_contractor_logo(
     if not contractor_check.data:
         raise HTTPException(404, f"Contractor '{contractor_id}' not found")
     
-    # Validate file type
-    allowed_extensions = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
-    file_extension = PathLib(file.filename or "").suffix.lower()
-    
-    if file_extension not in allowed_extensions:
-        raise HTTPException(
-            400,
-            f"Invalid file type. Allowed formats: {', '.join(allowed_extensions)}"
-        )
-    
-    # Validate file size (5MB max)
-    MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(400, f"File size exceeds maximum of {MAX_FILE_SIZE / 1024 / 1024}MB")
-    
-    # Get S3 client
-    try:
-        s3, bucket, region = get_s3()
-    except RuntimeError as e:
-        logger.error(f"S3 configuration error: {e}")
-        raise HTTPException(500, "File storage not configured")
-    
-    # Generate S3 key
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
-    safe_company_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in contractor_check.data[0]["company_name"])[:50]
-    s3_key = f"contractors/logos/{contractor_id}/{safe_company_name}_{timestamp}_{unique_id}{file_extension}"
-    
-    # Upload to S3
-    temp_file_path = None
-    try:
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(content)
-            temp_file.flush()
-        
-        # Upload to S3 (bucket policy should allow public access to logos)
-        try:
-            content_type = file.content_type or "image/jpeg"
-            s3.upload_file(
-                Filename=temp_file_path,
-                Bucket=bucket,
-                Key=s3_key,
-                ExtraArgs={"ContentType": content_type},
-            )
-            logger.info(f"Uploaded contractor logo to S3: {s3_key}")
-        except Exception as e:
-            logger.error(f"S3 upload error: {e}")
-            raise HTTPException(500, f"Failed to upload logo: {e}")
-    finally:
-        # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete temp file {temp_file_path}: {e}")
-    
-    # Generate permanent public URL (no expiration)
-    # Note: This requires bucket policy to allow public access to logo paths
-    try:
-        # Public URL format: https://{bucket}.s3.{region}.amazonaws.com/{key}
-        if region == "us-east-1":
-            # us-east-1 uses a different URL format
-            logo_url = f"https://{bucket}.s3.amazonaws.com/{s3_key}"
-        else:
-            logo_url = f"https://{bucket}.s3.{region}.amazonaws.com/{s3_key}"
-    except Exception as e:
-        logger.error(f"Failed to generate public URL: {e}")
-        raise HTTPException(500, "Failed to generate logo URL")
+    # Validate (magic bytes), resize and upload the renditions
+    logo = await process_logo_upload(file, f"contractors/logos/{contractor_id}")
+    logo_url = logo.logo_url
     
     # Optionally update contractor's logo_url field
     if update_contractor:
@@ -846,7 +731,8 @@ async def upload_contractor_logo(
     return {
         "success": True,
         "logo_url": logo_url,
-        "s3_key": s3_key,
+        "s3_key": logo.s3_key,
+        "renditions": logo.renditions,
         "message": "Logo uploaded successfully" + (" and contractor updated" if update_contractor else "")
     }
 
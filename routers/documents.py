@@ -11,8 +11,14 @@ from dependencies.auth import (
 )
 
 from core.supabase_client import get_supabase_client
+from core.responses import FastJSONResponse
 from core.logging_config import logger
 from core.utils import sanitize
+from core.cache import invalidate_tags, building_tag
+from core.junction_helpers import set_junction_links
+from core.reference_data import require_document_category
+from services.document_storage import release_document_files
+from services.pii_redaction import delete_redacted_copies
 from core.permission_helpers import (
     is_admin,
     require_building_access,
@@ -109,80 +115,6 @@ def validate_units_in_building(unit_ids: list, building_id: str):
             raise HTTPException(400, f"Unit {unit_id} does not belong to the specified building")
 
 
-# -----------------------------------------------------
-# NEW — Create document_units junction table entries
-# -----------------------------------------------------
-def create_document_units(document_id: str, unit_ids: list):
-    if not unit_ids:
-        return
-    
-    client = get_supabase_client()
-    for unit_id in unit_ids:
-        try:
-            client.table("document_units").insert({
-                "document_id": document_id,
-                "unit_id": str(unit_id)
-            }).execute()
-        except Exception as e:
-            error_msg = str(e).lower()
-            if "duplicate" in error_msg or "unique" in error_msg:
-                # Expected: duplicate key errors are okay (idempotent operation)
-                logger.debug(f"Duplicate document_unit relationship ignored: document_id={document_id}, unit_id={unit_id}")
-            else:
-                logger.warning(f"Failed to create document_unit relationship: {e}")
-                raise HTTPException(500, f"Failed to create document_unit relationship: {e}")
-
-
-# -----------------------------------------------------
-# NEW — Create document_contractors junction table entries
-# -----------------------------------------------------
-def create_document_contractors(document_id: str, contractor_ids: list):
-    if not contractor_ids:
-        return
-    
-    client = get_supabase_client()
-    for contractor_id in contractor_ids:
-        try:
-            client.table("document_contractors").insert({
-                "document_id": document_id,
-                "contractor_id": str(contractor_id)
-            }).execute()
-        except Exception as e:
-            error_msg = str(e).lower()
-            if "duplicate" in error_msg or "unique" in error_msg:
-                # Expected: duplicate key errors are okay (idempotent operation)
-                logger.debug(f"Duplicate document_contractor relationship ignored: document_id={document_id}, contractor_id={contractor_id}")
-            else:
-                logger.warning(f"Failed to create document_contractor relationship: {e}")
-                raise HTTPException(500, f"Failed to create document_contractor relationship: {e}")
-
-
-# -----------------------------------------------------
-# NEW — Update document_units junction table (replace all)
-# -----------------------------------------------------
-def update_document_units(document_id: str, unit_ids: list):
-    client = get_supabase_client()
-    
-    # Delete existing relationships
-    client.table("document_units").delete().eq("document_id", document_id).execute()
-    
-    # Create new relationships
-    create_document_units(document_id, unit_ids)
-
-
-# -----------------------------------------------------
-# NEW — Update document_contractors junction table (replace all)
-# -----------------------------------------------------
-def update_document_contractors(document_id: str, contractor_ids: list):
-    client = get_supabase_client()
-    
-    # Delete existing relationships
-    client.table("document_contractors").delete().eq("document_id", document_id).execute()
-    
-    # Create new relationships
-    create_document_contractors(document_id, contractor_ids)
-
-
 # -----------------------------------------------------
 # NEW — Fetch units for a document
 # -----------------------------------------------------
@@ -475,7 +407,7 @@ def list_documents(
     from core.batch_helpers import batch_enrich_documents_with_relations
     enriched_documents = batch_enrich_documents_with_relations(documents)
     
-    return enriched_documents
+    return FastJSONResponse(enriched_documents)
 
 
 # -----------------------------------------------------
@@ -532,32 +464,8 @@ def create_document(payload: DocumentCreate, current_user: CurrentUser = Depends
         if missing_contractors:
             raise HTTPException(400, f"Contractors do not exist: {', '.join(missing_contractors)}")
     
-    # Validate category_id exists if provided
-    if payload.category_id:
-        category_result = (
-            client.table("document_categories")
-            .select("id")
-            .eq("id", str(payload.category_id))
-            .limit(1)
-            .execute()
-        )
-        if not category_result.data:
-            raise HTTPException(400, f"Category ID {payload.category_id} not found in document_categories table")
-    
-    # Validate subcategory_id exists if provided
-    if payload.subcategory_id:
-        subcategory_result = (
-            client.table("document_subcategories")
-            .select("id, category_id")
-            .eq("id", str(payload.subcategory_id))
-            .limit(1)
-            .execute()
-        )
-        if not subcategory_result.data:
-            raise HTTPException(400, f"Subcategory ID {payload.subcategory_id} not found in document_subcategories table")
-        # Validate that subcategory belongs to the provided category (if category_id is also provided)
-        if payload.category_id and subcategory_result.data[0]["category_id"] != str(payload.category_id):
-            raise HTTPException(400, f"Subcategory {payload.subcategory_id} does not belong to category {payload.category_id}")
+    # Validate category_id / subcategory_id against the reference data registry
+    require_document_category(payload.category_id, payload.subcategory_id)
 
     # -------------------------------------------------
     # Determine building based on payload
@@ -631,11 +539,9 @@ def create_document(payload: DocumentCreate, current_user: CurrentUser = Depends
 
     doc_id = insert_res.data[0]["id"]
 
-    # Create junction table entries for units
-    create_document_units(doc_id, unit_ids)
-    
-    # Create junction table entries for contractors
-    create_document_contractors(doc_id, contractor_ids)
+    # Create junction table entries for units and contractors
+    set_junction_links("document_units", doc_id, unit_ids, created=True)
+    set_junction_links("document_contractors", doc_id, contractor_ids, created=True)
 
     fetch_res = (
         client.table("documents")
@@ -652,6 +558,7 @@ def create_document(payload: DocumentCreate, current_user: CurrentUser = Depends
     # Enrich with units and contractors
     document = enrich_document_with_relations(document)
 
+    invalidate_tags(building_tag(building_id))
     return document
 
 
@@ -682,6 +589,7 @@ def update_document(document_id: str, payload: DocumentUpdate, current_user: Cur
         raise HTTPException(404, "Document not found")
     
     building_id = current_doc[0]["building_id"]
+    previous_building_id = building_id
     
     # Handle unit_ids update
     unit_ids = None
@@ -716,32 +624,8 @@ def update_document(document_id: str, payload: DocumentUpdate, current_user: Cur
                 if not contractor_rows:
                     raise HTTPException(400, f"Contractor {cid} does not exist")
     
-    # Validate category_id exists if provided
-    if payload.category_id is not None:
-        category_result = (
-            client.table("document_categories")
-            .select("id")
-            .eq("id", str(payload.category_id))
-            .limit(1)
-            .execute()
-        )
-        if not category_result.data:
-            raise HTTPException(400, f"Category ID {payload.category_id} not found in document_categories table")
-    
-    # Validate subcategory_id exists if provided
-    if payload.subcategory_id is not None:
-        subcategory_result = (
-            client.table("document_subcategories")
-            .select("id, category_id")
-            .eq("id", str(payload.subcategory_id))
-            .limit(1)
-            .execute()
-        )
-        if not subcategory_result.data:
-            raise HTTPException(400, f"Subcategory ID {payload.subcategory_id} not found in document_subcategories table")
-        # Validate that subcategory belongs to the provided category (if category_id is also provided)
-        if payload.category_id is not None and subcategory_result.data[0]["category_id"] != str(payload.category_id):
-            raise HTTPException(400, f"Subcategory {payload.subcategory_id} does not belong to category {payload.category_id}")
+    # Validate category_id / subcategory_id against the reference data registry
+    require_document_category(payload.category_id, payload.subcategory_id)
 
     # Prepare update data (exclude junction table fields)
     update_data = sanitize(payload.model_dump(exclude_unset=True, exclude={"unit_ids", "contractor_ids", "document_url"}))
@@ -784,10 +668,10 @@ def update_document(document_id: str, payload: DocumentUpdate, current_user: Cur
 
     # Update junction tables if provided
     if unit_ids is not None:
-        update_document_units(document_id, unit_ids)
+        set_junction_links("document_units", document_id, unit_ids)
     
     if contractor_ids is not None:
-        update_document_contractors(document_id, contractor_ids)
+        set_junction_links("document_contractors", document_id, contractor_ids)
 
     # Step 2 — Fetch updated
     fetch_res = (
@@ -805,6 +689,7 @@ def update_document(document_id: str, payload: DocumentUpdate, current_user: Cur
     # Enrich with units and contractors
     document = enrich_document_with_relations(document)
 
+    invalidate_tags(*{building_tag(b) for b in (previous_building_id, document.get("building_id")) if b})
     return document
 
 
@@ -832,4 +717,10 @@ def delete_document(document_id: str):
     if not delete_res.data:
         raise HTTPException(404, "Document not found")
 
+    invalidate_tags(*{building_tag(row["building_id"]) for row in delete_res.data if row.get("building_id")})
+
+    # Deletes the S3 object only if no other document shares its content
+    release_document_files(row.get("content_sha256") for row in delete_res.data)
+    # Redacted copies are stored per document, outside the refcount
+    delete_redacted_copies(delete_res.data)
     return {"status": "deleted", "id": document_id}
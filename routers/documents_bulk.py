@@ -3,8 +3,6 @@
 import uuid
 import tempfile
 import re
-import pandas as pd
-import numpy as np
 from urllib.parse import urlparse, unquote, parse_qs
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
 from typing import Optional
@@ -18,6 +16,7 @@ from dependencies.auth import (
 from core.supabase_client import get_supabase_client
 from core.utils import sanitize
 from core.permission_helpers import require_building_access, is_admin
+from core.reference_data import lookup_reference
 from core.logging_config import logger
 
 router = APIRouter(
@@ -48,6 +47,9 @@ async def bulk_upload_documents(
     - If `source` is provided, it will be applied to all documents.
     - All bulk upload documents are automatically set to `is_public=True`.
     """
+    # pandas/numpy are imported here, not at module load, to keep them out of cold start
+    import numpy as np
+    import pandas as pd
 
     # ------------------------------
     # Validate extension
@@ -195,11 +197,21 @@ async def bulk_upload_documents(
         raise HTTPException(400, error_msg)
 
     created_docs = []
+    errors = []
+
+    # Public documents category UUID for bulk uploads - validate it exists once per upload
+    PUBLIC_DOCUMENTS_CATEGORY_ID = "f5ae850f-cc31-44ff-b5bc-ee7d708a0c31"
+    category_error = None
+    try:
+        if lookup_reference("document_categories", PUBLIC_DOCUMENTS_CATEGORY_ID) is None:
+            category_error = f"Public documents category {PUBLIC_DOCUMENTS_CATEGORY_ID} not found in document_categories table"
+    except Exception as e:
+        category_error = f"Error validating public documents category: {e}"
 
     # ------------------------------
-    # Loop through all rows and insert with validation
+    # Convert rows to native Python values
     # ------------------------------
-    errors = []
+    rows = []
     for idx, row in df.iterrows():
         row_num = idx + 2  # +2 because Excel/CSV is 1-indexed and has header
         # Convert row to dict and handle pandas types
@@ -221,8 +233,63 @@ async def bulk_upload_documents(
                 row_dict[col] = None
             else:
                 row_dict[col] = value
-        row = row_dict
-        
+        rows.append((row_num, row_dict))
+
+    # ------------------------------
+    # Look up every referenced building, unit and event up front
+    # (one query per table instead of one per row)
+    # ------------------------------
+    existing_building_ids, building_lookup_error = set(), None
+    if not global_building_id:
+        row_building_ids = list({str(r["building_id"]) for _, r in rows if r.get("building_id")})
+        if row_building_ids:
+            try:
+                buildings_result = (
+                    client.table("buildings")
+                    .select("id")
+                    .in_("id", row_building_ids)
+                    .execute()
+                )
+                existing_building_ids = {str(b["id"]) for b in (buildings_result.data or [])}
+            except Exception as e:
+                building_lookup_error = e
+
+    unit_building_map, unit_lookup_error = {}, None
+    row_unit_ids = list({str(r["unit_id"]) for _, r in rows if r.get("unit_id")})
+    if row_unit_ids:
+        try:
+            units_result = (
+                client.table("units")
+                .select("id, building_id")
+                .in_("id", row_unit_ids)
+                .execute()
+            )
+            unit_building_map = {str(u["id"]): u.get("building_id") for u in (units_result.data or [])}
+        except Exception as e:
+            unit_lookup_error = e
+
+    existing_event_ids, event_lookup_error = set(), None
+    row_event_ids = list({str(r["event_id"]) for _, r in rows if r.get("event_id")})
+    if row_event_ids:
+        try:
+            events_result = (
+                client.table("events")
+                .select("id")
+                .in_("id", row_event_ids)
+                .execute()
+            )
+            existing_event_ids = {str(e["id"]) for e in (events_result.data or [])}
+        except Exception as e:
+            event_lookup_error = e
+
+    # Building access is checked once per distinct building
+    building_access: dict = {}
+
+    # ------------------------------
+    # Validate rows and build insert payloads
+    # ------------------------------
+    pending = []
+    for row_num, row in rows:
         # Use global building_id if provided, otherwise use row's building_id
         row_building_id = row.get("building_id")
         if global_building_id:
@@ -237,28 +304,24 @@ async def bulk_upload_documents(
             building_id_str = str(row_building_id)
             
             # Validate row-level building_id exists
-            try:
-                building_check = (
-                    client.table("buildings")
-                    .select("id")
-                    .eq("id", building_id_str)
-                    .limit(1)
-                    .execute()
-                )
-                if not building_check.data:
-                    errors.append(f"Row {row_num}: Building {building_id_str} does not exist")
-                    continue
-                
-                # Check user has access to building
-                if not is_admin(current_user):
+            if building_lookup_error:
+                errors.append(f"Row {row_num}: Error validating building: {building_lookup_error}")
+                continue
+            if building_id_str not in existing_building_ids:
+                errors.append(f"Row {row_num}: Building {building_id_str} does not exist")
+                continue
+            
+            # Check user has access to building
+            if not is_admin(current_user):
+                if building_id_str not in building_access:
                     try:
                         require_building_access(current_user, building_id_str)
+                        building_access[building_id_str] = True
                     except HTTPException:
-                        errors.append(f"Row {row_num}: You do not have access to building {building_id_str}")
-                        continue
-            except Exception as e:
-                errors.append(f"Row {row_num}: Error validating building: {e}")
-                continue
+                        building_access[building_id_str] = False
+                if not building_access[building_id_str]:
+                    errors.append(f"Row {row_num}: You do not have access to building {building_id_str}")
+                    continue
         
         unit_id = row.get("unit_id")
         event_id = row.get("event_id")
@@ -266,58 +329,29 @@ async def bulk_upload_documents(
         # Validate unit_id exists and belongs to building
         if unit_id and building_id_str:
             unit_id_str = str(unit_id)
-            try:
-                unit_check = (
-                    client.table("units")
-                    .select("id, building_id")
-                    .eq("id", unit_id_str)
-                    .limit(1)
-                    .execute()
-                )
-                if not unit_check.data:
-                    errors.append(f"Row {row_num}: Unit {unit_id_str} does not exist")
-                    continue
-                unit_building_id = unit_check.data[0].get("building_id")
-                if unit_building_id and str(unit_building_id) != building_id_str:
-                    errors.append(f"Row {row_num}: Unit {unit_id_str} does not belong to building {building_id_str}")
-                    continue
-            except Exception as e:
-                errors.append(f"Row {row_num}: Error validating unit: {e}")
+            if unit_lookup_error:
+                errors.append(f"Row {row_num}: Error validating unit: {unit_lookup_error}")
+                continue
+            if unit_id_str not in unit_building_map:
+                errors.append(f"Row {row_num}: Unit {unit_id_str} does not exist")
+                continue
+            unit_building_id = unit_building_map[unit_id_str]
+            if unit_building_id and str(unit_building_id) != building_id_str:
+                errors.append(f"Row {row_num}: Unit {unit_id_str} does not belong to building {building_id_str}")
                 continue
         
         # Validate event_id exists
         if event_id:
             event_id_str = str(event_id)
-            try:
-                event_check = (
-                    client.table("events")
-                    .select("id")
-                    .eq("id", event_id_str)
-                    .limit(1)
-                    .execute()
-                )
-                if not event_check.data:
-                    errors.append(f"Row {row_num}: Event {event_id_str} does not exist")
-                    continue
-            except Exception as e:
-                errors.append(f"Row {row_num}: Error validating event: {e}")
+            if event_lookup_error:
+                errors.append(f"Row {row_num}: Error validating event: {event_lookup_error}")
                 continue
-        
-        # Public documents category UUID for bulk uploads - validate it exists
-        PUBLIC_DOCUMENTS_CATEGORY_ID = "f5ae850f-cc31-44ff-b5bc-ee7d708a0c31"
-        try:
-            category_check = (
-                client.table("document_categories")
-                .select("id")
-                .eq("id", PUBLIC_DOCUMENTS_CATEGORY_ID)
-                .limit(1)
-                .execute()
-            )
-            if not category_check.data:
-                errors.append(f"Row {row_num}: Public documents category {PUBLIC_DOCUMENTS_CATEGORY_ID} not found in document_categories table")
+            if event_id_str not in existing_event_ids:
+                errors.append(f"Row {row_num}: Event {event_id_str} does not exist")
                 continue
-        except Exception as e:
-            errors.append(f"Row {row_num}: Error validating public documents category: {e}")
+        
+        if category_error:
+            errors.append(f"Row {row_num}: {category_error}")
             continue
         
         # Helper function to convert pandas types to Python native types
@@ -430,25 +464,48 @@ async def bulk_upload_documents(
         if row_num <= 5:
             logger.info(f"Bulk upload row {row_num} data: {final_data}")
 
-        try:
-            res = client.table("documents").insert(final_data).execute()
-            if res.data:
-                created_docs.append(res.data[0])
-            else:
-                errors.append(f"Row {row_num}: Insert returned no data")
-        except Exception as e:
-            error_msg = str(e)
-            # Log the actual data that failed for debugging
-            logger.error(f"Bulk upload error on row {row_num}: {e}. Data: {final_data}")
-            if "foreign key" in error_msg.lower() or "violates foreign key" in error_msg.lower():
-                errors.append(f"Row {row_num}: Invalid reference (building_id, unit_id, or event_id)")
-            elif "duplicate" in error_msg.lower():
-                errors.append(f"Row {row_num}: Duplicate entry")
-            elif "empty or invalid json" in error_msg.lower() or "pgrst102" in error_msg.lower():
-                errors.append(f"Row {row_num}: Invalid data format - check for empty or malformed values")
-            else:
-                errors.append(f"Row {row_num}: Insert failed: {error_msg}")
-            logger.warning(f"Bulk upload error on row {row_num}: {e}")
+        pending.append((row_num, final_data))
+
+    # ------------------------------
+    # Insert in batches of 100. PostgREST takes the column list of a bulk
+    # insert from its first object, so rows are grouped by the columns they
+    # set. A failed batch is retried row by row to report the bad rows.
+    # ------------------------------
+    batch_size = 100
+    groups: dict = {}
+    for row_num, final_data in pending:
+        groups.setdefault(tuple(sorted(final_data)), []).append((row_num, final_data))
+
+    for group in groups.values():
+        for i in range(0, len(group), batch_size):
+            batch = group[i:i + batch_size]
+            try:
+                res = client.table("documents").insert([data for _, data in batch]).execute()
+                created_docs.extend(res.data or [])
+                continue
+            except Exception as e:
+                logger.warning(f"Bulk upload batch starting at row {batch[0][0]} failed, retrying row by row: {e}")
+
+            for row_num, final_data in batch:
+                try:
+                    res = client.table("documents").insert(final_data).execute()
+                    if res.data:
+                        created_docs.append(res.data[0])
+                    else:
+                        errors.append(f"Row {row_num}: Insert returned no data")
+                except Exception as e:
+                    error_msg = str(e)
+                    # Log the actual data that failed for debugging
+                    logger.error(f"Bulk upload error on row {row_num}: {e}. Data: {final_data}")
+                    if "foreign key" in error_msg.lower() or "violates foreign key" in error_msg.lower():
+                        errors.append(f"Row {row_num}: Invalid reference (building_id, unit_id, or event_id)")
+                    elif "duplicate" in error_msg.lower():
+                        errors.append(f"Row {row_num}: Duplicate entry")
+                    elif "empty or invalid json" in error_msg.lower() or "pgrst102" in error_msg.lower():
+                        errors.append(f"Row {row_num}: Invalid data format - check for empty or malformed values")
+                    else:
+                        errors.append(f"Row {row_num}: Insert failed: {error_msg}")
+                    logger.warning(f"Bulk upload error on row {row_num}: {e}")
 
     if errors:
         return {
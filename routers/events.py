@@ -1,5 +1,7 @@
 # routers/events.py
 
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Optional, List
 
@@ -10,8 +12,11 @@ from dependencies.auth import (
 )
 
 from core.supabase_client import get_supabase_client
+from core.responses import model_list_response
 from core.logging_config import logger
-from models.event import EventCreate, EventUpdate, EventRead
+from core.cache import invalidate_tags, building_tag
+from core.junction_helpers import set_junction_links
+from models.event import EventCreate, EventBulkCreate, EventUpdate, EventRead
 from models.event_comment import EventCommentCreate, EventCommentRead
 
 
@@ -37,6 +42,11 @@ def sanitize(data: dict) -> dict:
 # -----------------------------------------------------
 # Check building access
 # -----------------------------------------------------
+# Roles that can post events without a user_building_access grant
+# (contractors have hardcoded access to post events for any building/unit)
+BUILDING_ACCESS_EXEMPT_ROLES = ["admin", "manager", "contractor", "contractor_staff"]
+
+
 def verify_user_building_access_supabase(user_id: str, building_id: str):
     client = get_supabase_client()
     result = (
@@ -67,68 +77,6 @@ def get_event_building_id(event_id: str) -> str:
     return result.data["building_id"]
 
 
-# -----------------------------------------------------
-# Helper — Create event_units junction table entries
-# -----------------------------------------------------
-def create_event_units(event_id: str, unit_ids: list):
-    if not unit_ids:
-        return
-    client = get_supabase_client()
-    for unit_id in unit_ids:
-        try:
-            client.table("event_units").insert({
-                "event_id": event_id,
-                "unit_id": str(unit_id)
-            }).execute()
-        except Exception as e:
-            error_msg = str(e).lower()
-            if "duplicate" in error_msg or "unique" in error_msg:
-                logger.debug(f"Duplicate event_unit relationship ignored: event_id={event_id}, unit_id={unit_id}")
-            else:
-                logger.warning(f"Failed to create event_unit relationship: {e}")
-                raise HTTPException(500, f"Failed to create event_unit relationship: {e}")
-
-
-# -----------------------------------------------------
-# Helper — Create event_contractors junction table entries
-# -----------------------------------------------------
-def create_event_contractors(event_id: str, contractor_ids: list):
-    if not contractor_ids:
-        return
-    client = get_supabase_client()
-    for contractor_id in contractor_ids:
-        try:
-            client.table("event_contractors").insert({
-                "event_id": event_id,
-                "contractor_id": str(contractor_id)
-            }).execute()
-        except Exception as e:
-            error_msg = str(e).lower()
-            if "duplicate" in error_msg or "unique" in error_msg:
-                logger.debug(f"Duplicate event_contractor relationship ignored: event_id={event_id}, contractor_id={contractor_id}")
-            else:
-                logger.warning(f"Failed to create event_contractor relationship: {e}")
-                raise HTTPException(500, f"Failed to create event_contractor relationship: {e}")
-
-
-# -----------------------------------------------------
-# Helper — Update event_units junction table (replace all)
-# -----------------------------------------------------
-def update_event_units(event_id: str, unit_ids: list):
-    client = get_supabase_client()
-    client.table("event_units").delete().eq("event_id", event_id).execute()
-    create_event_units(event_id, unit_ids)
-
-
-# -----------------------------------------------------
-# Helper — Update event_contractors junction table (replace all)
-# -----------------------------------------------------
-def update_event_contractors(event_id: str, contractor_ids: list):
-    client = get_supabase_client()
-    client.table("event_contractors").delete().eq("event_id", event_id).execute()
-    create_event_contractors(event_id, contractor_ids)
-
-
 # -----------------------------------------------------
 # LIST EVENTS
 # -----------------------------------------------------
@@ -142,7 +90,7 @@ def list_events(limit: int = 200, current_user: CurrentUser = Depends(get_curren
         .limit(limit)
         .execute()
     )
-    return result.data or []
+    return model_list_response(result.data or [], EventRead)
 
 
 # -----------------------------------------------------
@@ -177,8 +125,7 @@ def create_event(payload: EventCreate, current_user: CurrentUser = Depends(get_c
 
     # Building access check for non-admin, non-manager, non-contractor roles
     # Contractors have hardcoded access to post events for any building/unit
-    contractor_roles = ["contractor", "contractor_staff"]
-    if current_user.role not in ["admin", "manager"] + contractor_roles:
+    if current_user.role not in BUILDING_ACCESS_EXEMPT_ROLES:
         verify_user_building_access_supabase(current_user.id, building_id)
 
     # Create event
@@ -195,12 +142,189 @@ def create_event(payload: EventCreate, current_user: CurrentUser = Depends(get_c
     event_id = result.data["id"]
 
     # Create junction table entries
-    create_event_units(event_id, unit_ids)
-    create_event_contractors(event_id, contractor_ids)
+    set_junction_links("event_units", event_id, unit_ids, created=True)
+    set_junction_links("event_contractors", event_id, contractor_ids, created=True)
 
+    invalidate_tags(building_tag(building_id))
     return result.data
 
 
+# -----------------------------------------------------
+# BULK CREATE EVENTS
+# -----------------------------------------------------
+BULK_INSERT_BATCH_SIZE = 100
+BULK_JUNCTION_BATCH_SIZE = 500
+
+
+def _existing_ids(client, table: str, ids, columns: str = "id") -> dict:
+    """id -> row for the ids that exist in `table` (one query)."""
+    ids = list(ids)
+    if not ids:
+        return {}
+    rows = client.table(table).select(columns).in_("id", ids).execute().data or []
+    return {str(row["id"]): row for row in rows}
+
+
+def _normalize_id(value: str) -> str:
+    """Canonical UUID string (as stored), or the value unchanged if it isn't a UUID."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return value
+
+
+def _insert_junction_rows(client, table: str, target_column: str, rows: list) -> set:
+    """
+    Multi-row insert; returns the event IDs whose rows failed. Rows that
+    already exist are skipped (same upsert as core.junction_helpers), so a
+    repeated link can't fail the whole batch.
+    """
+    failed = set()
+    for i in range(0, len(rows), BULK_JUNCTION_BATCH_SIZE):
+        batch = rows[i:i + BULK_JUNCTION_BATCH_SIZE]
+        try:
+            (
+                client.table(table)
+                .upsert(batch, on_conflict=f"event_id,{target_column}", ignore_duplicates=True)
+                .execute()
+            )
+        except Exception as e:
+            logger.warning(f"Bulk {table} insert failed: {e}")
+            failed.update(row["event_id"] for row in batch)
+    return failed
+
+
+@router.post(
+    "/bulk",
+    dependencies=[Depends(requires_permission("events:write"))],
+    summary="Create Events in Bulk",
+)
+def bulk_create_events(payload: EventBulkCreate, current_user: CurrentUser = Depends(get_current_user)):
+    """
+    Create up to 1000 events in one request (building onboarding imports,
+    contractor maintenance logs).
+
+    Buildings, units and contractors are validated with one query per table,
+    events and their unit/contractor links are inserted in multi-row batches.
+    Items are independent: each gets its own result and one invalid item
+    doesn't block the rest.
+    """
+    client = get_supabase_client()
+
+    if current_user.role == "contractor" and not getattr(current_user, "contractor_id", None):
+        raise HTTPException(400, "Contractor account missing contractor_id.")
+
+    items = []
+    for event in payload.events:
+        # building_id is compared against IDs as the database formats them
+        event.building_id = _normalize_id(event.building_id)
+        contractor_ids = list(event.contractor_ids or [])
+        if current_user.role == "contractor":
+            contractor_ids.append(current_user.contractor_id)
+        items.append((event, list(dict.fromkeys(event.unit_ids or [])), list(dict.fromkeys(contractor_ids))))
+
+    # -------------------------------------------------
+    # Set-based reference and permission checks
+    # -------------------------------------------------
+    building_ids = {event.building_id for event, _, _ in items}
+    buildings = _existing_ids(client, "buildings", building_ids)
+    units = _existing_ids(client, "units", {u for _, unit_ids, _ in items for u in unit_ids}, "id, building_id")
+    contractors = _existing_ids(client, "contractors", {c for _, _, contractor_ids in items for c in contractor_ids})
+
+    accessible_buildings = building_ids
+    if current_user.role not in BUILDING_ACCESS_EXEMPT_ROLES:
+        rows = (
+            client.table("user_building_access")
+            .select("building_id")
+            .eq("user_id", current_user.id)
+            .in_("building_id", list(building_ids))
+            .execute()
+        ).data or []
+        accessible_buildings = {str(row["building_id"]) for row in rows}
+
+    results = [None] * len(items)
+    pending = []
+    for index, (event, unit_ids, contractor_ids) in enumerate(items):
+        building_id = event.building_id
+        error = None
+        if building_id not in buildings:
+            error = f"Building {building_id} does not exist"
+        elif building_id not in accessible_buildings:
+            error = "You do not have permission for this building."
+        else:
+            missing_units = [u for u in unit_ids if u not in units]
+            foreign_units = [u for u in unit_ids if u in units and str(units[u]["building_id"]) != building_id]
+            missing_contractors = [c for c in contractor_ids if c not in contractors]
+            if missing_units:
+                error = f"Units not found: {', '.join(missing_units)}"
+            elif foreign_units:
+                error = f"Units do not belong to building {building_id}: {', '.join(foreign_units)}"
+            elif missing_contractors:
+                error = f"Contractors not found: {', '.join(missing_contractors)}"
+
+        if error:
+            results[index] = {"index": index, "status": "error", "error": error}
+            continue
+
+        event_data = sanitize(event.model_dump(mode="json", exclude={"unit_ids", "contractor_ids"}))
+        event_data["id"] = str(uuid.uuid4())
+        event_data["created_by"] = current_user.id
+        pending.append((index, event_data, unit_ids, contractor_ids))
+
+    # -------------------------------------------------
+    # Insert events in batches (row by row if a batch fails)
+    # -------------------------------------------------
+    created = []
+    for i in range(0, len(pending), BULK_INSERT_BATCH_SIZE):
+        batch = pending[i:i + BULK_INSERT_BATCH_SIZE]
+        try:
+            rows = client.table("events").insert([data for _, data, _, _ in batch]).execute().data or []
+            by_id = {str(row["id"]): row for row in rows}
+            created.extend((item, by_id.get(item[1]["id"], item[1])) for item in batch)
+            continue
+        except Exception as e:
+            logger.warning(f"Bulk event batch starting at item {batch[0][0]} failed, retrying one by one: {e}")
+
+        for item in batch:
+            try:
+                rows = client.table("events").insert(item[1]).execute().data or []
+                created.append((item, rows[0] if rows else item[1]))
+            except Exception as e:
+                results[item[0]] = {"index": item[0], "status": "error", "error": f"Insert failed: {e}"}
+
+    # -------------------------------------------------
+    # Junction rows for every created event
+    # -------------------------------------------------
+    failed_units = _insert_junction_rows(client, "event_units", "unit_id", [
+        {"event_id": data["id"], "unit_id": u} for (_, data, unit_ids, _), _ in created for u in unit_ids
+    ])
+    failed_contractors = _insert_junction_rows(client, "event_contractors", "contractor_id", [
+        {"event_id": data["id"], "contractor_id": c} for (_, data, _, contractor_ids), _ in created for c in contractor_ids
+    ])
+
+    for (index, data, _, _), row in created:
+        result = {"index": index, "status": "created", "event": row}
+        warnings = []
+        if data["id"] in failed_units:
+            warnings.append("Failed to link units")
+        if data["id"] in failed_contractors:
+            warnings.append("Failed to link contractors")
+        if warnings:
+            result["warnings"] = warnings
+        results[index] = result
+
+    if created:
+        invalidate_tags(*{building_tag(data["building_id"]) for (_, data, _, _), _ in created})
+
+    errors = sum(1 for r in results if r["status"] == "error")
+    return {
+        "status": "success" if not errors else ("partial_success" if created else "failed"),
+        "count": len(created),
+        "errors": errors,
+        "results": results,
+    }
+
+
 # -----------------------------------------------------
 # UPDATE EVENT
 # -----------------------------------------------------
@@ -229,6 +353,19 @@ def update_event(event_id: str, payload: EventUpdate, current_user: CurrentUser
         if not update_data:
             raise HTTPException(400, "Contractors can only update event status.")
     
+    # Moving an event also changes the building it leaves
+    previous_building_id = None
+    if "building_id" in update_data:
+        previous = (
+            client.table("events")
+            .select("building_id")
+            .eq("id", event_id)
+            .limit(1)
+            .execute()
+        )
+        if previous.data:
+            previous_building_id = previous.data[0]["building_id"]
+
     # Update event table
     try:
         result = (
@@ -246,11 +383,16 @@ def update_event(event_id: str, payload: EventUpdate, current_user: CurrentUser
 
     # Update junction tables if provided
     if unit_ids is not None:
-        update_event_units(event_id, unit_ids)
+        set_junction_links("event_units", event_id, unit_ids)
     
     if contractor_ids is not None:
-        update_event_contractors(event_id, contractor_ids)
+        set_junction_links("event_contractors", event_id, contractor_ids)
 
+    invalidate_tags(*{
+        building_tag(b)
+        for b in (result.data.get("building_id"), previous_building_id)
+        if b
+    })
     return result.data
 
 
@@ -299,6 +441,8 @@ def delete_event(event_id: str, current_user: CurrentUser = Depends(get_current_
     if not result.data:
         raise HTTPException(404, "Event not found")
 
+    if result.data.get("building_id"):
+        invalidate_tags(building_tag(result.data["building_id"]))
     return {"status": "deleted", "id": event_id}
 
 
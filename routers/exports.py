@@ -0,0 +1,79 @@
+# routers/exports.py
+
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from dependencies.auth import get_current_user, CurrentUser
+from core.supabase_client import get_supabase_client
+from core.permission_helpers import is_admin, require_building_access
+from services.exports import EXPORT_FORMATS, stream_export
+from services.report_generator import get_effective_role
+
+router = APIRouter(
+    prefix="/exports",
+    tags=["Exports"],
+)
+
+
+def _building_export(building_id: str, entity: str, format: str, current_user: CurrentUser) -> StreamingResponse:
+    if not is_admin(current_user):
+        require_building_access(current_user, building_id)
+
+    client = get_supabase_client()
+    building = (
+        client.table("buildings")
+        .select("id")
+        .eq("id", building_id)
+        .limit(1)
+        .execute()
+    ).data
+    if not building:
+        raise HTTPException(404, f"Building {building_id} not found")
+
+    return StreamingResponse(
+        stream_export(client, entity, building_id, current_user, get_effective_role(current_user), format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="building-{building_id}-{entity}.{format}"'},
+    )
+
+
+# ============================================================
+# GET — Building events export
+# ============================================================
+@router.get(
+    "/buildings/{building_id}/events.{format}",
+    summary="Export a building's events as CSV or NDJSON",
+)
+def export_building_events(
+    building_id: str,
+    format: Literal["csv", "ndjson"],
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Stream every event of a building, oldest first.
+    Columns follow the same role rules as the reports; non-admin users
+    only get events linked to units they can access.
+    """
+    return _building_export(building_id, "events", format, current_user)
+
+
+# ============================================================
+# GET — Building documents export
+# ============================================================
+@router.get(
+    "/buildings/{building_id}/documents.{format}",
+    summary="Export a building's documents as CSV or NDJSON",
+)
+def export_building_documents(
+    building_id: str,
+    format: Literal["csv", "ndjson"],
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Stream the metadata of every document of a building, oldest first.
+    Columns follow the same role rules as the reports; non-admin users
+    only get documents they can access.
+    """
+    return _building_export(building_id, "documents", format, current_user)
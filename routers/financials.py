@@ -8,12 +8,173 @@ from dependencies.auth import get_current_user, CurrentUser
 from core.supabase_client import get_supabase_client
 from core.logging_config import logger
 from core.stripe_helpers import get_subscription_revenue, get_total_revenue_for_period
+from core.cache import cache_get, cache_set
 
 router = APIRouter(
     prefix="/financials",
     tags=["Financials"],
 )
 
+# Short TTL: the finance dashboard polls, numbers only need to be near-real-time
+FINANCIALS_CACHE_TTL = 60
+
+SUBSCRIPTION_SOURCES = ["user_subscriptions", "contractors", "aoao_organizations", "pm_companies"]
+
+# Stripe prices rarely change; each subscription's revenue is cached on its own
+# so the breakdown doesn't re-fetch every subscription when its cache expires
+STRIPE_REVENUE_CACHE_TTL = 15 * 60
+
+# Paid subscriptions listed by /subscriptions/breakdown:
+# (RPC source, table, subscription_type, name column)
+BREAKDOWN_SOURCES = [
+    ("user_subscriptions", "user_subscriptions", "user", "user_id"),
+    ("contractors", "contractors", "contractor", "company_name"),
+    ("aoao_organizations", "aoao_organizations", "aoao_organization", "organization_name"),
+    ("pm_companies", "property_management_companies", "pm_company", "company_name"),
+]
+
+BREAKDOWN_STATUSES = ["active", "trialing"]
+
+
+def parse_period(start_date: Optional[str], end_date: Optional[str]):
+    """
+    Parse the ISO start/end window (defaults to the last 30 days).
+    Default bounds are truncated to the minute so they produce stable cache keys.
+    """
+    now = datetime.now().replace(second=0, microsecond=0)
+
+    if start_date:
+        try:
+            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+        except:
+            raise HTTPException(400, "Invalid start_date format. Use ISO format.")
+    else:
+        start_dt = now - timedelta(days=30)  # Default to last 30 days
+
+    if end_date:
+        try:
+            end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        except:
+            raise HTTPException(400, "Invalid end_date format. Use ISO format.")
+    else:
+        end_dt = now
+
+    return start_dt, end_dt
+
+
+def fetch_subscription_counts(client, start_dt: datetime, end_dt: datetime) -> dict:
+    """
+    Subscription counts per source, aggregated in Postgres
+    (financial_subscription_counts RPC groups by tier/status/trial).
+    """
+    counts = {
+        source: {"total": 0, "active_paid": 0, "trials": 0, "new_in_period": 0}
+        for source in SUBSCRIPTION_SOURCES
+    }
+
+    result = client.rpc(
+        "financial_subscription_counts",
+        {"p_start": start_dt.isoformat(), "p_end": end_dt.isoformat()},
+    ).execute()
+
+    for row in (result.data or []):
+        bucket = counts.get(row.get("source"))
+        if bucket is None:
+            continue
+
+        total = row.get("total") or 0
+        bucket["total"] += total
+        bucket["new_in_period"] += row.get("created_in_period") or 0
+        # Active paid = paid tier with active status (NOT trialing)
+        if row.get("subscription_tier") == "paid" and row.get("subscription_status") == "active":
+            bucket["active_paid"] += total
+        if row.get("is_trial") or row.get("subscription_status") == "trialing":
+            bucket["trials"] += total
+
+    return counts
+
+
+def fetch_premium_report_totals(client, start_dt: datetime, end_dt: datetime) -> dict:
+    """
+    Paid premium report revenue per report_type inside the window,
+    aggregated in Postgres (financial_premium_report_totals RPC).
+    """
+    result = client.rpc(
+        "financial_premium_report_totals",
+        {"p_start": start_dt.isoformat(), "p_end": end_dt.isoformat()},
+    ).execute()
+
+    totals = {}
+    for row in (result.data or []):
+        totals[row.get("report_type") or "unknown"] = {
+            "count": row.get("purchase_count") or 0,
+            "revenue_cents": row.get("revenue_cents") or 0,
+            "revenue_decimal": round(float(row.get("revenue_decimal") or 0.0), 2),
+        }
+
+    return totals
+
+
+def fetch_paid_status_counts(client) -> dict:
+    """
+    Paid subscriptions per subscription_type and status, from the
+    financial_subscription_counts RPC (no subscription rows are fetched).
+    """
+    types = {source: subscription_type for source, _, subscription_type, _ in BREAKDOWN_SOURCES}
+    counts = {subscription_type: {} for subscription_type in types.values()}
+
+    # The window only feeds created_in_period, which isn't used here
+    now = datetime.now().replace(second=0, microsecond=0)
+    result = client.rpc(
+        "financial_subscription_counts",
+        {"p_start": now.isoformat(), "p_end": now.isoformat()},
+    ).execute()
+
+    for row in (result.data or []):
+        subscription_type = types.get(row.get("source"))
+        if subscription_type is None or row.get("subscription_tier") != "paid":
+            continue
+        status = row.get("subscription_status") or "unknown"
+        bucket = counts[subscription_type]
+        bucket[status] = bucket.get(status, 0) + (row.get("total") or 0)
+
+    return counts
+
+
+def get_cached_subscription_revenue(stripe_subscription_id: Optional[str], stripe_customer_id: Optional[str]) -> dict:
+    """Stripe revenue for one subscription, cached per subscription."""
+    cache_key = f"financials:stripe_revenue:{stripe_subscription_id or ''}:{stripe_customer_id or ''}"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    revenue_info = get_subscription_revenue(
+        stripe_subscription_id=stripe_subscription_id,
+        stripe_customer_id=stripe_customer_id,
+    )
+    # Errors (e.g. Stripe unreachable) are retried on the next request
+    if "error" not in revenue_info:
+        cache_set(cache_key, revenue_info, ttl_seconds=STRIPE_REVENUE_CACHE_TTL)
+    return revenue_info
+
+
+def summarize_premium_purchases(purchases: list) -> dict:
+    """Per report_type count and revenue for already-fetched paid purchases."""
+    totals = {}
+    for purchase in purchases:
+        bucket = totals.setdefault(
+            purchase.get("report_type") or "unknown",
+            {"count": 0, "revenue_cents": 0, "revenue_decimal": 0.0},
+        )
+        bucket["count"] += 1
+        bucket["revenue_cents"] += purchase.get("amount_cents") or 0
+        bucket["revenue_decimal"] += float(purchase.get("amount_decimal") or 0.0)
+
+    for bucket in totals.values():
+        bucket["revenue_decimal"] = round(bucket["revenue_decimal"], 2)
+
+    return totals
+
 
 @router.get("/revenue")
 def get_revenue(
@@ -33,141 +194,30 @@ def get_revenue(
     if current_user.role != "super_admin":
         raise HTTPException(403, "Only super admins can view financial data")
     
+    start_dt, end_dt = parse_period(start_date, end_date)
+
+    cache_key = f"financials:revenue:{start_dt.isoformat()}:{end_dt.isoformat()}"
+    cached_result = cache_get(cache_key)
+    if cached_result is not None:
+        return cached_result
+
     client = get_supabase_client()
     
     try:
-        # Parse dates
-        if start_date:
-            try:
-                start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            except:
-                raise HTTPException(400, "Invalid start_date format. Use ISO format.")
-        else:
-            start_dt = datetime.now() - timedelta(days=30)  # Default to last 30 days
-        
-        if end_date:
-            try:
-                end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            except:
-                raise HTTPException(400, "Invalid end_date format. Use ISO format.")
-        else:
-            end_dt = datetime.now()
-        
         revenue_data = {
             "period": {
                 "start_date": start_dt.isoformat(),
                 "end_date": end_dt.isoformat()
             },
-            "subscriptions": {
-                "user_subscriptions": {
-                    "total": 0,
-                    "active_paid": 0,
-                    "trials": 0
-                },
-                "contractors": {
-                    "total": 0,
-                    "active_paid": 0,
-                    "trials": 0
-                },
-                "aoao_organizations": {
-                    "total": 0,
-                    "active_paid": 0,
-                    "trials": 0
-                },
-                "pm_companies": {
-                    "total": 0,
-                    "active_paid": 0,
-                    "trials": 0
-                }
-            },
-            "summary": {
-                "total_subscriptions": 0,
-                "total_active_paid": 0,
-                "total_trials": 0
-            }
+            "subscriptions": fetch_subscription_counts(client, start_dt, end_dt),
+            "summary": {}
         }
         
-        # Count user subscriptions
-        user_subs_result = (
-            client.table("user_subscriptions")
-            .select("subscription_tier, subscription_status, is_trial")
-            .execute()
-        )
-        
-        for sub in (user_subs_result.data or []):
-            revenue_data["subscriptions"]["user_subscriptions"]["total"] += 1
-            # Active paid = paid tier with active status (NOT trialing)
-            if sub.get("subscription_tier") == "paid" and sub.get("subscription_status") == "active":
-                revenue_data["subscriptions"]["user_subscriptions"]["active_paid"] += 1
-            if sub.get("is_trial") or sub.get("subscription_status") == "trialing":
-                revenue_data["subscriptions"]["user_subscriptions"]["trials"] += 1
-        
-        # Count contractor subscriptions
-        contractors_result = (
-            client.table("contractors")
-            .select("subscription_tier, subscription_status")
-            .execute()
-        )
-        
-        for contractor in (contractors_result.data or []):
-            revenue_data["subscriptions"]["contractors"]["total"] += 1
-            # Active paid = paid tier with active status (NOT trialing)
-            if contractor.get("subscription_tier") == "paid" and contractor.get("subscription_status") == "active":
-                revenue_data["subscriptions"]["contractors"]["active_paid"] += 1
-            if contractor.get("subscription_status") == "trialing":
-                revenue_data["subscriptions"]["contractors"]["trials"] += 1
-        
-        # Count AOAO organization subscriptions
-        aoao_result = (
-            client.table("aoao_organizations")
-            .select("subscription_tier, subscription_status")
-            .execute()
-        )
-        
-        for org in (aoao_result.data or []):
-            revenue_data["subscriptions"]["aoao_organizations"]["total"] += 1
-            # Active paid = paid tier with active status (NOT trialing)
-            if org.get("subscription_tier") == "paid" and org.get("subscription_status") == "active":
-                revenue_data["subscriptions"]["aoao_organizations"]["active_paid"] += 1
-            if org.get("subscription_status") == "trialing":
-                revenue_data["subscriptions"]["aoao_organizations"]["trials"] += 1
-        
-        # Count PM company subscriptions
-        pm_result = (
-            client.table("property_management_companies")
-            .select("subscription_tier, subscription_status")
-            .execute()
-        )
-        
-        for company in (pm_result.data or []):
-            revenue_data["subscriptions"]["pm_companies"]["total"] += 1
-            # Active paid = paid tier with active status (NOT trialing)
-            if company.get("subscription_tier") == "paid" and company.get("subscription_status") == "active":
-                revenue_data["subscriptions"]["pm_companies"]["active_paid"] += 1
-            if company.get("subscription_status") == "trialing":
-                revenue_data["subscriptions"]["pm_companies"]["trials"] += 1
-        
         # Calculate summary
-        revenue_data["summary"]["total_subscriptions"] = (
-            revenue_data["subscriptions"]["user_subscriptions"]["total"] +
-            revenue_data["subscriptions"]["contractors"]["total"] +
-            revenue_data["subscriptions"]["aoao_organizations"]["total"] +
-            revenue_data["subscriptions"]["pm_companies"]["total"]
-        )
-        
-        revenue_data["summary"]["total_active_paid"] = (
-            revenue_data["subscriptions"]["user_subscriptions"]["active_paid"] +
-            revenue_data["subscriptions"]["contractors"]["active_paid"] +
-            revenue_data["subscriptions"]["aoao_organizations"]["active_paid"] +
-            revenue_data["subscriptions"]["pm_companies"]["active_paid"]
-        )
-        
-        revenue_data["summary"]["total_trials"] = (
-            revenue_data["subscriptions"]["user_subscriptions"]["trials"] +
-            revenue_data["subscriptions"]["contractors"]["trials"] +
-            revenue_data["subscriptions"]["aoao_organizations"]["trials"] +
-            revenue_data["subscriptions"]["pm_companies"]["trials"]
-        )
+        subscription_counts = revenue_data["subscriptions"].values()
+        revenue_data["summary"]["total_subscriptions"] = sum(c["total"] for c in subscription_counts)
+        revenue_data["summary"]["total_active_paid"] = sum(c["active_paid"] for c in subscription_counts)
+        revenue_data["summary"]["total_trials"] = sum(c["trials"] for c in subscription_counts)
         
         # Fetch actual revenue from Stripe
         stripe_revenue = get_total_revenue_for_period(start_dt, end_dt)
@@ -187,23 +237,11 @@ def get_revenue(
             }
         
         # Fetch premium report purchase revenue
-        premium_reports_result = (
-            client.table("premium_report_purchases")
-            .select("amount_cents, amount_decimal, currency, payment_status, purchased_at")
-            .eq("payment_status", "paid")
-            .gte("purchased_at", start_dt.isoformat())
-            .lte("purchased_at", end_dt.isoformat())
-            .execute()
-        )
-        
-        premium_reports_total_cents = 0
-        premium_reports_total_decimal = 0.0
-        premium_reports_count = 0
+        premium_totals = fetch_premium_report_totals(client, start_dt, end_dt)
         
-        for purchase in (premium_reports_result.data or []):
-            premium_reports_total_cents += purchase.get("amount_cents", 0)
-            premium_reports_total_decimal += purchase.get("amount_decimal", 0.0)
-            premium_reports_count += 1
+        premium_reports_total_cents = sum(t["revenue_cents"] for t in premium_totals.values())
+        premium_reports_total_decimal = sum(t["revenue_decimal"] for t in premium_totals.values())
+        premium_reports_count = sum(t["count"] for t in premium_totals.values())
         
         revenue_data["premium_reports"] = {
             "total_revenue_cents": premium_reports_total_cents,
@@ -220,6 +258,7 @@ def get_revenue(
             revenue_data.get("stripe", {}).get("total_revenue_decimal", 0.0) + premium_reports_total_decimal, 2
         )
         
+        cache_set(cache_key, revenue_data, ttl_seconds=FINANCIALS_CACHE_TTL)
         return revenue_data
     except HTTPException:
         raise
@@ -236,126 +275,52 @@ def get_subscription_breakdown(
     Get detailed subscription breakdown (Super Admin only).
     
     Returns detailed list of all paid subscriptions with revenue information from Stripe.
+    Counts per type and status come from Postgres; Stripe is only asked for
+    the live price of each listed subscription, cached per subscription.
     """
     if current_user.role != "super_admin":
         raise HTTPException(403, "Only super admins can view financial data")
     
+    cache_key = "financials:subscriptions:breakdown"
+    cached_result = cache_get(cache_key)
+    if cached_result is not None:
+        return cached_result
+    
     client = get_supabase_client()
     
     try:
+        status_counts = fetch_paid_status_counts(client)
         subscriptions = []
         
-        # Get user subscriptions with Stripe revenue
-        user_subs_result = (
-            client.table("user_subscriptions")
-            .select("id, user_id, subscription_tier, subscription_status, stripe_subscription_id, stripe_customer_id, created_at")
-            .eq("subscription_tier", "paid")
-            .in_("subscription_status", ["active", "trialing"])
-            .execute()
-        )
-        
-        for sub in (user_subs_result.data or []):
-            revenue_info = {}
-            if sub.get("stripe_subscription_id") or sub.get("stripe_customer_id"):
-                revenue_info = get_subscription_revenue(
-                    stripe_subscription_id=sub.get("stripe_subscription_id"),
-                    stripe_customer_id=sub.get("stripe_customer_id")
-                )
-            
-            subscriptions.append({
-                "subscription_type": "user",
-                "subscription_id": sub.get("id"),
-                "user_id": sub.get("user_id"),
-                "subscription_tier": sub.get("subscription_tier"),
-                "subscription_status": sub.get("subscription_status"),
-                "stripe_subscription_id": sub.get("stripe_subscription_id"),
-                "revenue": revenue_info,
-                "created_at": sub.get("created_at"),
-            })
-        
-        # Get contractor subscriptions with Stripe revenue
-        contractors_result = (
-            client.table("contractors")
-            .select("id, company_name, subscription_tier, subscription_status, stripe_subscription_id, stripe_customer_id, created_at")
-            .eq("subscription_tier", "paid")
-            .in_("subscription_status", ["active", "trialing"])
-            .execute()
-        )
-        
-        for contractor in (contractors_result.data or []):
-            revenue_info = {}
-            if contractor.get("stripe_subscription_id") or contractor.get("stripe_customer_id"):
-                revenue_info = get_subscription_revenue(
-                    stripe_subscription_id=contractor.get("stripe_subscription_id"),
-                    stripe_customer_id=contractor.get("stripe_customer_id")
-                )
-            
-            subscriptions.append({
-                "subscription_type": "contractor",
-                "subscription_id": contractor.get("id"),
-                "company_name": contractor.get("company_name"),
-                "subscription_tier": contractor.get("subscription_tier"),
-                "subscription_status": contractor.get("subscription_status"),
-                "stripe_subscription_id": contractor.get("stripe_subscription_id"),
-                "revenue": revenue_info,
-                "created_at": contractor.get("created_at"),
-            })
-        
-        # Get AOAO organization subscriptions with Stripe revenue
-        aoao_result = (
-            client.table("aoao_organizations")
-            .select("id, organization_name, subscription_tier, subscription_status, stripe_subscription_id, stripe_customer_id, created_at")
-            .eq("subscription_tier", "paid")
-            .in_("subscription_status", ["active", "trialing"])
-            .execute()
-        )
-        
-        for org in (aoao_result.data or []):
-            revenue_info = {}
-            if org.get("stripe_subscription_id") or org.get("stripe_customer_id"):
-                revenue_info = get_subscription_revenue(
-                    stripe_subscription_id=org.get("stripe_subscription_id"),
-                    stripe_customer_id=org.get("stripe_customer_id")
-                )
-            
-            subscriptions.append({
-                "subscription_type": "aoao_organization",
-                "subscription_id": org.get("id"),
-                "organization_name": org.get("organization_name"),
-                "subscription_tier": org.get("subscription_tier"),
-                "subscription_status": org.get("subscription_status"),
-                "stripe_subscription_id": org.get("stripe_subscription_id"),
-                "revenue": revenue_info,
-                "created_at": org.get("created_at"),
-            })
-        
-        # Get PM company subscriptions with Stripe revenue
-        pm_result = (
-            client.table("property_management_companies")
-            .select("id, company_name, subscription_tier, subscription_status, stripe_subscription_id, stripe_customer_id, created_at")
-            .eq("subscription_tier", "paid")
-            .in_("subscription_status", ["active", "trialing"])
-            .execute()
-        )
-        
-        for company in (pm_result.data or []):
-            revenue_info = {}
-            if company.get("stripe_subscription_id") or company.get("stripe_customer_id"):
-                revenue_info = get_subscription_revenue(
-                    stripe_subscription_id=company.get("stripe_subscription_id"),
-                    stripe_customer_id=company.get("stripe_customer_id")
-                )
-            
-            subscriptions.append({
-                "subscription_type": "pm_company",
-                "subscription_id": company.get("id"),
-                "company_name": company.get("company_name"),
-                "subscription_tier": company.get("subscription_tier"),
-                "subscription_status": company.get("subscription_status"),
-                "stripe_subscription_id": company.get("stripe_subscription_id"),
-                "revenue": revenue_info,
-                "created_at": company.get("created_at"),
-            })
+        for _, table, subscription_type, name_column in BREAKDOWN_SOURCES:
+            if not any(status_counts[subscription_type].get(status) for status in BREAKDOWN_STATUSES):
+                continue
+
+            result = (
+                client.table(table)
+                .select(f"id, {name_column}, subscription_tier, subscription_status, stripe_subscription_id, stripe_customer_id, created_at")
+                .eq("subscription_tier", "paid")
+                .in_("subscription_status", BREAKDOWN_STATUSES)
+                .execute()
+            )
+
+            for sub in (result.data or []):
+                revenue_info = {}
+                if sub.get("stripe_subscription_id") or sub.get("stripe_customer_id"):
+                    revenue_info = get_cached_subscription_revenue(
+                        sub.get("stripe_subscription_id"), sub.get("stripe_customer_id"),
+                    )
+
+                subscriptions.append({
+                    "subscription_type": subscription_type,
+                    "subscription_id": sub.get("id"),
+                    name_column: sub.get(name_column),
+                    "subscription_tier": sub.get("subscription_tier"),
+                    "subscription_status": sub.get("subscription_status"),
+                    "stripe_subscription_id": sub.get("stripe_subscription_id"),
+                    "revenue": revenue_info,
+                    "created_at": sub.get("created_at"),
+                })
         
         # Calculate totals
         total_monthly_revenue = 0
@@ -374,15 +339,19 @@ def get_subscription_breakdown(
                     total_annual_revenue += amount
                     total_monthly_revenue += amount / 12
         
-        return {
+        breakdown = {
             "success": True,
             "total_subscriptions": len(subscriptions),
             "total_monthly_revenue": total_monthly_revenue,
             "total_monthly_revenue_decimal": total_monthly_revenue / 100.0,
             "total_annual_revenue": total_annual_revenue,
             "total_annual_revenue_decimal": total_annual_revenue / 100.0,
+            "status_counts": status_counts,
             "subscriptions": subscriptions,
         }
+        
+        cache_set(cache_key, breakdown, ttl_seconds=FINANCIALS_CACHE_TTL)
+        return breakdown
     except HTTPException:
         raise
     except Exception as e:
@@ -400,30 +369,21 @@ def get_premium_reports_breakdown(
     Get detailed premium report purchase breakdown (Super Admin only).
     
     Returns list of all premium report purchases with revenue information.
+    The per-type totals are summed from the same rows, in one query.
     """
     if current_user.role != "super_admin":
         raise HTTPException(403, "Only super admins can view financial data")
     
+    start_dt, end_dt = parse_period(start_date, end_date)
+
+    cache_key = f"financials:premium_reports:{start_dt.isoformat()}:{end_dt.isoformat()}"
+    cached_result = cache_get(cache_key)
+    if cached_result is not None:
+        return cached_result
+
     client = get_supabase_client()
     
     try:
-        # Parse dates
-        if start_date:
-            try:
-                start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            except:
-                raise HTTPException(400, "Invalid start_date format. Use ISO format.")
-        else:
-            start_dt = datetime.now() - timedelta(days=30)  # Default to last 30 days
-        
-        if end_date:
-            try:
-                end_dt = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-            except:
-                raise HTTPException(400, "Invalid end_date format. Use ISO format.")
-        else:
-            end_dt = datetime.now()
-        
         # Fetch premium report purchases
         query = (
             client.table("premium_report_purchases")
@@ -437,34 +397,11 @@ def get_premium_reports_breakdown(
         result = query.execute()
         purchases = result.data or []
         
-        # Calculate totals
-        total_revenue_cents = 0
-        total_revenue_decimal = 0.0
-        report_type_counts = {}
-        
-        for purchase in purchases:
-            amount_cents = purchase.get("amount_cents", 0)
-            amount_decimal = purchase.get("amount_decimal", 0.0)
-            report_type = purchase.get("report_type", "unknown")
-            
-            total_revenue_cents += amount_cents
-            total_revenue_decimal += amount_decimal
-            
-            if report_type not in report_type_counts:
-                report_type_counts[report_type] = {"count": 0, "revenue_cents": 0, "revenue_decimal": 0.0}
-            
-            report_type_counts[report_type]["count"] += 1
-            report_type_counts[report_type]["revenue_cents"] += amount_cents
-            report_type_counts[report_type]["revenue_decimal"] += amount_decimal
+        report_type_counts = summarize_premium_purchases(purchases)
+        total_revenue_cents = sum(t["revenue_cents"] for t in report_type_counts.values())
+        total_revenue_decimal = round(sum(t["revenue_decimal"] for t in report_type_counts.values()), 2)
         
-        # Round decimal values
-        total_revenue_decimal = round(total_revenue_decimal, 2)
-        for report_type in report_type_counts:
-            report_type_counts[report_type]["revenue_decimal"] = round(
-                report_type_counts[report_type]["revenue_decimal"], 2
-            )
-        
-        return {
+        breakdown = {
             "success": True,
             "period": {
                 "start_date": start_dt.isoformat(),
@@ -477,6 +414,9 @@ def get_premium_reports_breakdown(
             "report_type_breakdown": report_type_counts,
             "purchases": purchases
         }
+        
+        cache_set(cache_key, breakdown, ttl_seconds=FINANCIALS_CACHE_TTL)
+        return breakdown
     except HTTPException:
         raise
     except Exception as e:
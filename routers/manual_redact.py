@@ -7,21 +7,21 @@ on a PDF and the server applies them using PyMuPDF.
 
 from fastapi import (
     APIRouter, UploadFile, File, Form,
-    Depends, HTTPException
+    Depends, HTTPException, BackgroundTasks
 )
 from pydantic import BaseModel, Field
-from typing import List
-import io
-import tempfile
-import os
+from typing import List, Literal
+import json
+import uuid
+from datetime import datetime
 from pathlib import Path as PathLib
 
-try:
-    import fitz  # PyMuPDF
-    FITZ_AVAILABLE = True
-except ImportError:
-    FITZ_AVAILABLE = False
-    fitz = None
+from starlette.concurrency import run_in_threadpool
+
+from core.lazy_imports import is_installed
+
+# PyMuPDF itself is only imported by the redaction worker processes
+FITZ_AVAILABLE = is_installed("fitz")
 
 from dependencies.auth import (
     get_current_user,
@@ -29,9 +29,21 @@ from dependencies.auth import (
     requires_permission,
 )
 
-from core.supabase_client import get_supabase_client
 from core.logging_config import logger
+from core.permission_helpers import is_admin
 from core.s3_client import get_s3
+from core.compression import no_compression
+from services.pdf_redaction import (
+    Box,
+    InvalidPDFError,
+    RedactionWorkspace,
+    redact_pdf,
+    upload_redacted_pdf,
+    is_large_upload,
+    save_job,
+    get_job,
+    update_job,
+)
 
 # Constants
 REDACTED_PDF_PRESIGNED_URL_EXPIRY_SECONDS = 86400  # 1 day
@@ -55,6 +67,95 @@ class RedactionBox(BaseModel):
     height: float = Field(..., description="Height of the redaction box")
 
 
+# ======================================================
+# Helpers
+# ======================================================
+
+def parse_redaction_boxes(raw: str) -> List[RedactionBox]:
+    try:
+        boxes_data = json.loads(raw)
+        boxes = [RedactionBox(**box) for box in boxes_data]
+    except json.JSONDecodeError as e:
+        raise HTTPException(400, f"Invalid JSON in redaction_boxes: {e}")
+    except Exception as e:
+        raise HTTPException(400, f"Invalid redaction box format: {e}")
+
+    if not boxes:
+        raise HTTPException(400, "At least one redaction box is required")
+    return boxes
+
+
+def to_engine_boxes(boxes: List[RedactionBox]) -> List[Box]:
+    """1-indexed canvas boxes -> (page_index, x, y, width, height) for the engine."""
+    return [(box.page - 1, box.x, box.y, box.width, box.height) for box in boxes]
+
+
+def redacted_s3_key(filename: str) -> str:
+    # Timestamp avoids conflicts between redactions of the same file
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    original_filename = PathLib(filename or "document.pdf").stem
+    return f"redacted/{timestamp}_{original_filename}_redacted.pdf"
+
+
+def presign(s3, bucket: str, s3_key: str) -> str:
+    return s3.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": bucket, "Key": s3_key},
+        ExpiresIn=REDACTED_PDF_PRESIGNED_URL_EXPIRY_SECONDS,
+    )
+
+
+async def redact_and_upload(workspace: RedactionWorkspace, boxes: List[Box], filename: str) -> dict:
+    """
+    Run the redaction in the worker pool and stream the result to S3.
+
+    Raises HTTPException with the same status codes the endpoint has
+    always used (400 unreadable PDF, 500 redaction/upload failure).
+    """
+    try:
+        stats = await redact_pdf(workspace.input_path, workspace.output_path, boxes, flip_y=True)
+    except InvalidPDFError as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Failed to apply redactions: {e}")
+
+    if stats["boxes_skipped"]:
+        logger.warning(f"Skipped {stats['boxes_skipped']} redaction box(es) on invalid pages (PDF has {stats['pages']} pages)")
+    logger.info(f"Applied redactions to {stats['pages_redacted']} of {stats['pages']} page(s)")
+
+    try:
+        s3, bucket, _ = get_s3()
+        s3_key = redacted_s3_key(filename)
+        await run_in_threadpool(upload_redacted_pdf, s3, bucket, workspace, s3_key)
+        logger.info(f"Uploaded redacted PDF to S3: {s3_key}")
+        return {"s3_key": s3_key, "document_url": presign(s3, bucket, s3_key), **stats}
+    except Exception as e:
+        logger.error(f"Failed to upload redacted PDF to S3: {e}")
+        raise HTTPException(500, f"Failed to upload redacted PDF: {e}")
+
+
+async def run_redaction_job(job_id: str, workspace: RedactionWorkspace, boxes: List[Box], filename: str):
+    """Background task for job mode; the outcome is recorded on the job."""
+    update_job(job_id, status="running", started_at=datetime.utcnow().isoformat())
+    try:
+        result = await redact_and_upload(workspace, boxes, filename)
+        update_job(
+            job_id,
+            status="succeeded",
+            s3_key=result["s3_key"],
+            pages=result["pages"],
+            pages_redacted=result["pages_redacted"],
+            finished_at=datetime.utcnow().isoformat(),
+        )
+    except HTTPException as e:
+        update_job(job_id, status="failed", error=e.detail, finished_at=datetime.utcnow().isoformat())
+    except Exception as e:
+        logger.error(f"Redaction job {job_id} failed: {e}")
+        update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow().isoformat())
+    finally:
+        workspace.cleanup()
+
+
 # ======================================================
 # Manual Redaction Endpoint
 # ======================================================
@@ -62,11 +163,14 @@ class RedactionBox(BaseModel):
 @router.post(
     "/redact-manual",
     summary="Apply manual redactions to a PDF",
-    dependencies=[Depends(requires_permission("upload:write"))],
+    # Responses carry presigned URLs
+    dependencies=[Depends(requires_permission("upload:write")), Depends(no_compression)],
 )
 async def redact_manual(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(..., description="PDF file to redact"),
     redaction_boxes: str = Form(..., description="JSON array of redaction boxes"),
+    mode: Literal["auto", "sync", "job"] = Form("auto", description="auto: run large PDFs as a background job"),
     current_user: CurrentUser = Depends(get_current_user),
 ):
     """
@@ -75,9 +179,12 @@ async def redact_manual(
     Receives:
     - PDF file
     - JSON array of redaction boxes: [{"page": 1, "x": 100, "y": 200, "width": 150, "height": 30}, ...]
+    - mode: "sync" waits for the result, "job" always returns a job id,
+      "auto" (default) uses a job for uploads above REDACTION_JOB_THRESHOLD_BYTES
     
     Returns:
-    - Final redacted PDF URL (S3 presigned URL)
+    - Final redacted PDF URL (S3 presigned URL), or a job id to poll at
+      GET /documents/redact-manual/jobs/{job_id}
     """
     
     if not FITZ_AVAILABLE:
@@ -88,116 +195,77 @@ async def redact_manual(
         if file.content_type != 'application/pdf':
             raise HTTPException(400, "File must be a PDF")
     
-    # Parse redaction boxes
-    import json
-    try:
-        boxes_data = json.loads(redaction_boxes)
-        boxes = [RedactionBox(**box) for box in boxes_data]
-    except json.JSONDecodeError as e:
-        raise HTTPException(400, f"Invalid JSON in redaction_boxes: {e}")
-    except Exception as e:
-        raise HTTPException(400, f"Invalid redaction box format: {e}")
-    
-    if not boxes:
-        raise HTTPException(400, "At least one redaction box is required")
-    
-    logger.info(f"Applying {len(boxes)} redaction box(es) to PDF: {file.filename}")
-    
-    # Read PDF file
-    pdf_content = await file.read()
-    
-    # Open PDF with PyMuPDF
-    try:
-        doc = fitz.open(stream=pdf_content, filetype="pdf")
-    except Exception as e:
-        raise HTTPException(400, f"Failed to open PDF: {e}")
+    boxes = parse_redaction_boxes(redaction_boxes)
+    filename = file.filename or "document.pdf"
     
-    # Apply redactions
-    try:
-        for box in boxes:
-            # Extract coordinates
-            x = box.x
-            y = box.y
-            w = box.width
-            h = box.height
-            page_index = box.page - 1  # Convert 1-indexed to 0-indexed
-            
-            if page_index < 0 or page_index >= len(doc):
-                logger.warning(f"Skipping redaction box on invalid page {box.page} (PDF has {len(doc)} pages)")
-                continue
-            
-            page = doc.load_page(page_index)
-            page_height = page.rect.height
-            
-            # Convert top-left origin (canvas) to bottom-left origin (PDF)
-            # incoming: x, y, width, height (top-left origin)
-            pdf_y = page_height - (y + h)
-            
-            # Create rectangle in PDF coordinate system
-            rect = fitz.Rect(x, pdf_y, x + w, pdf_y + h)
-            
-            # Add redaction annotation with black fill
-            page.add_redact_annot(rect, fill=(0, 0, 0))
-            
-            logger.debug(f"Added redaction box on page {box.page}: {rect} (canvas y={y} -> PDF y={pdf_y})")
-        
-        # Apply all redactions after adding all annotations
-        # This actually removes the content and applies black fill
-        for page in doc:
-            page.apply_redactions()
-        
-        logger.info(f"Successfully applied redactions to {len(doc)} page(s)")
-        
-    except Exception as e:
-        doc.close()
-        raise HTTPException(500, f"Failed to apply redactions: {e}")
+    logger.info(f"Applying {len(boxes)} redaction box(es) to PDF: {filename}")
     
-    # Save redacted PDF to BytesIO
+    # Spool the upload to disk; the worker reads it from there
+    workspace = RedactionWorkspace()
     try:
-        output_pdf = io.BytesIO()
-        doc.save(output_pdf, deflate=True, clean=True)
-        output_pdf.seek(0)
-        pdf_bytes = output_pdf.read()
-        doc.close()
+        size_bytes = await workspace.spool(file.file)
     except Exception as e:
-        doc.close()
-        raise HTTPException(500, f"Failed to save redacted PDF: {e}")
+        workspace.cleanup()
+        raise HTTPException(400, f"Failed to read uploaded PDF: {e}")
     
-    # Upload to S3
-    try:
-        s3, bucket, region = get_s3()
-        
-        # Generate S3 key (use timestamp to avoid conflicts)
-        from datetime import datetime
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        original_filename = PathLib(file.filename or "document.pdf").stem
-        s3_key = f"redacted/{timestamp}_{original_filename}_redacted.pdf"
-        
-        # Upload to S3
-        s3.upload_fileobj(
-            Fileobj=io.BytesIO(pdf_bytes),
-            Bucket=bucket,
-            Key=s3_key,
-            ExtraArgs={"ContentType": "application/pdf"},
-        )
-        
-        logger.info(f"Uploaded redacted PDF to S3: {s3_key}")
-        
-        # Generate presigned URL (valid for 1 day)
-        presigned_url = s3.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": bucket, "Key": s3_key},
-            ExpiresIn=REDACTED_PDF_PRESIGNED_URL_EXPIRY_SECONDS,
-        )
-        
+    if mode == "job" or (mode == "auto" and is_large_upload(size_bytes)):
+        job = save_job({
+            "job_id": str(uuid.uuid4()),
+            "status": "queued",
+            "user_id": current_user.id,
+            "filename": filename,
+            "size_bytes": size_bytes,
+            "redaction_count": len(boxes),
+            "created_at": datetime.utcnow().isoformat(),
+        })
+        # The background task owns the workspace from here on
+        background_tasks.add_task(run_redaction_job, job["job_id"], workspace, to_engine_boxes(boxes), filename)
+        logger.info(f"Queued redaction job {job['job_id']} for {filename} ({size_bytes} bytes)")
         return {
             "success": True,
-            "document_url": presigned_url,
-            "s3_key": s3_key,
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "status_url": f"/documents/redact-manual/jobs/{job['job_id']}",
             "redaction_count": len(boxes),
         }
-        
-    except Exception as e:
-        logger.error(f"Failed to upload redacted PDF to S3: {e}")
-        raise HTTPException(500, f"Failed to upload redacted PDF: {e}")
+    
+    try:
+        result = await redact_and_upload(workspace, to_engine_boxes(boxes), filename)
+    finally:
+        workspace.cleanup()
+    
+    return {
+        "success": True,
+        "document_url": result["document_url"],
+        "s3_key": result["s3_key"],
+        "redaction_count": len(boxes),
+    }
+
 
+@router.get(
+    "/redact-manual/jobs/{job_id}",
+    summary="Get the status of a background redaction job",
+    dependencies=[Depends(requires_permission("upload:write")), Depends(no_compression)],
+)
+async def get_redaction_job(
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Status of a redaction job started with mode=job (or a large upload).
+    Once it has succeeded, the response includes a fresh presigned URL.
+    """
+    job = get_job(job_id)
+    if not job or (job.get("user_id") != current_user.id and not is_admin(current_user)):
+        raise HTTPException(404, "Redaction job not found")
+    
+    response = {k: v for k, v in job.items() if k != "user_id"}
+    if job.get("status") == "succeeded" and job.get("s3_key"):
+        try:
+            s3, bucket, _ = get_s3()
+            response["document_url"] = presign(s3, bucket, job["s3_key"])
+        except Exception as e:
+            logger.error(f"Failed to presign redacted PDF {job['s3_key']}: {e}")
+            raise HTTPException(500, f"Failed to generate download URL: {e}")
+    
+    return response
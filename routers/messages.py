@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 
 from dependencies.auth import get_current_user, CurrentUser
 from core.supabase_client import get_supabase_client
+from core.responses import model_list_response
 from core.logging_config import logger
 from core.permission_helpers import requires_permission
 from models.message import MessageCreate, MessageUpdate, MessageRead, BulkMessageCreate
@@ -172,7 +173,7 @@ def list_messages(
         if unread_only:
             filtered = [msg for msg in filtered if not msg.get("is_read", False)]
         
-        return filtered
+        return model_list_response(filtered, MessageRead)
     except Exception as e:
         logger.error(f"Failed to list messages: {e}")
         raise HTTPException(500, f"Failed to list messages: {str(e)}")
@@ -193,7 +194,7 @@ def list_sent_messages(
             .order("created_at", desc=True)
             .execute()
         )
-        return result.data or []
+        return model_list_response(result.data or [], MessageRead)
     except Exception as e:
         logger.error(f"Failed to list sent messages: {e}")
         raise HTTPException(500, f"Failed to list sent messages: {str(e)}")
@@ -226,7 +227,7 @@ def list_admin_messages(
             query = query.eq("is_read", False)
         
         result = query.execute()
-        return result.data or []
+        return model_list_response(result.data or [], MessageRead)
     except Exception as e:
         logger.error(f"Failed to list admin messages: {e}")
         raise HTTPException(500, f"Failed to list admin messages: {str(e)}")
@@ -0,0 +1,34 @@
+# routers/metrics.py
+
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from core.config import settings
+from core.metrics import render_metrics
+
+router = APIRouter(
+    tags=["Health"],
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# -----------------------------------------------------
+# GET /metrics
+# Prometheus scrape endpoint
+# -----------------------------------------------------
+@router.get("/metrics", summary="Prometheus metrics", include_in_schema=False)
+def metrics(authorization: Optional[str] = Header(None)):
+    """
+    Per-route latency histograms, upstream call counters (Supabase, S3,
+    Stripe, SMTP) and per-request upstream call histograms.
+
+    Open when METRICS_TOKEN is unset; otherwise requires
+    `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    if settings.METRICS_TOKEN and authorization != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(401, "Invalid metrics token")
+
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,20 +1,15 @@
 # routers/pm_companies.py
 
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
-from typing import List, Optional
-from pydantic import BaseModel
-import os
-import tempfile
-from pathlib import Path as PathLib
-from datetime import datetime
-import uuid
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
 
 from dependencies.auth import get_current_user, CurrentUser, requires_permission
 from core.supabase_client import get_supabase_client
 from core.utils import sanitize
 from core.logging_config import logger
+from services.logo_images import process_logo_upload
 from core.errors import handle_supabase_error
-from core.s3_client import get_s3
 from models.pm_company import (
     PMCompanyCreate,
     PMCompanyUpdate,
@@ -362,6 +357,7 @@ class LogoUploadResponse(BaseModel):
     success: bool
     logo_url: str
     s3_key: str
+    renditions: Dict[str, str] = Field(default_factory=dict, description="Resized logo URLs by <rendition>_<format> (e.g. thumbnail_webp, report_header_png)")
     message: str
 
 
@@ -381,7 +377,7 @@ async def upload_pm_company_logo(
     """
     Upload a logo image for a property management company.
     
-    The image is uploaded to S3 and optionally updates the company's logo_url field.
+    The image is resized into WebP/PNG renditions, uploaded to S3 and optionally updates the company's logo_url field.
     """
     # Check access
     ensure_pm_company_access(current_user, company_id)
@@ -399,77 +395,9 @@ async def upload_pm_company_logo(
     if not company_check.data:
         raise HTTPException(404, f"Property management company '{company_id}' not found")
     
-    # Validate file type
-    allowed_extensions = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
-    file_extension = PathLib(file.filename or "").suffix.lower()
-    
-    if file_extension not in allowed_extensions:
-        raise HTTPException(
-            400,
-            f"Invalid file type. Allowed formats: {', '.join(allowed_extensions)}"
-        )
-    
-    # Validate file size (5MB max)
-    MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(400, f"File size exceeds maximum of {MAX_FILE_SIZE / 1024 / 1024}MB")
-    
-    # Get S3 client
-    try:
-        s3, bucket, region = get_s3()
-    except RuntimeError as e:
-        logger.error(f"S3 configuration error: {e}")
-        raise HTTPException(500, "File storage not configured")
-    
-    # Generate S3 key
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    unique_id = str(uuid.uuid4())[:8]
-    safe_company_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in company_check.data[0]["company_name"])[:50]
-    s3_key = f"pm-companies/logos/{company_id}/{safe_company_name}_{timestamp}_{unique_id}{file_extension}"
-    
-    # Upload to S3
-    temp_file_path = None
-    try:
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(content)
-            temp_file.flush()
-        
-        # Upload to S3 (bucket policy should allow public access to logos)
-        try:
-            content_type = file.content_type or "image/jpeg"
-            s3.upload_file(
-                Filename=temp_file_path,
-                Bucket=bucket,
-                Key=s3_key,
-                ExtraArgs={"ContentType": content_type},
-            )
-            logger.info(f"Uploaded PM company logo to S3: {s3_key}")
-        except Exception as e:
-            logger.error(f"S3 upload error: {e}")
-            raise HTTPException(500, f"Failed to upload logo: {e}")
-    finally:
-        # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete temp file {temp_file_path}: {e}")
-    
-    # Generate permanent public URL (no expiration)
-    # Note: This requires bucket policy to allow public access to logo paths
-    try:
-        # Public URL format: https://{bucket}.s3.{region}.amazonaws.com/{key}
-        if region == "us-east-1":
-            # us-east-1 uses a different URL format
-            logo_url = f"https://{bucket}.s3.amazonaws.com/{s3_key}"
-        else:
-            logo_url = f"https://{bucket}.s3.{region}.amazonaws.com/{s3_key}"
-    except Exception as e:
-        logger.error(f"Failed to generate public URL: {e}")
-        raise HTTPException(500, "Failed to generate logo URL")
+    # Validate (magic bytes), resize and upload the renditions
+    logo = await process_logo_upload(file, f"pm-companies/logos/{company_id}")
+    logo_url = logo.logo_url
     
     # Optionally update company's logo_url field
     if update_company:
@@ -485,7 +413,8 @@ async def upload_pm_company_logo(
     return {
         "success": True,
         "logo_url": logo_url,
-        "s3_key": s3_key,
+        "s3_key": logo.s3_key,
+        "renditions": logo.renditions,
         "message": "Logo uploaded successfully" + (" and company updated" if update_company else "")
     }
 
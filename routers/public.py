@@ -1,10 +1,12 @@
 # routers/public.py
 
 import re
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional
 
 from core.supabase_client import get_supabase_client
+from core.responses import FastJSONResponse
+from core.compression import no_compression_for_downloads
 from services.report_generator import (
     generate_building_report,
     generate_unit_report,
@@ -514,6 +516,7 @@ def search_public(query: Optional[str] = None):
 @router.get(
     "/building/{identifier}",
     summary="Get public building report (AinaReports.com)",
+    dependencies=[Depends(no_compression_for_downloads)],
 )
 async def get_public_building_report(identifier: str, format: str = "json"):
     """
@@ -569,7 +572,7 @@ async def get_public_building_report(identifier: str, format: str = "json"):
             format=format
         )
         
-        return result.to_dict()
+        return FastJSONResponse(result.to_dict())
     except HTTPException:
         raise
     except ValueError as e:
@@ -584,6 +587,7 @@ async def get_public_building_report(identifier: str, format: str = "json"):
 @router.get(
     "/unit/{identifier}",
     summary="Get public unit report (AinaReports.com)",
+    dependencies=[Depends(no_compression_for_downloads)],
 )
 async def get_public_unit_report(
     identifier: str, 
@@ -662,7 +666,7 @@ async def get_public_unit_report(
             format=format
         )
         
-        return result.to_dict()
+        return FastJSONResponse(result.to_dict())
     except HTTPException:
         raise
     except ValueError as e:
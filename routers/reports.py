@@ -1,12 +1,14 @@
 # routers/reports.py
 
-from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi import APIRouter, HTTPException, Depends, Body, Request
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from pydantic import BaseModel, Field
 
 from dependencies.auth import get_current_user, CurrentUser
 from core.supabase_client import get_supabase_client
+from core.responses import FastJSONResponse
+from core.compression import DOWNLOAD_URL_FORMATS, no_compression, no_compression_for_downloads
 from core.permission_helpers import (
     is_admin,
     require_building_access,
@@ -25,6 +27,9 @@ from services.report_generator import (
     CustomReportFilters,
 )
 
+# pdf and xlsx respond with a presigned download URL instead of the data
+REPORT_FORMATS = ("json", *DOWNLOAD_URL_FORMATS)
+
 router = APIRouter(
     prefix="/reports",
     # Tags are set per-endpoint to organize into "Reports" and "Reports - Public" sections
@@ -43,7 +48,7 @@ class CustomReportRequest(BaseModel):
     end_date: Optional[datetime] = None
     include_documents: bool = True
     include_events: bool = True
-    format: str = Field(default="json", description="Report format: 'json' or 'pdf'")
+    format: str = Field(default="json", description="Report format: 'json', 'pdf' or 'xlsx'")
 
 
 # ============================================================
@@ -54,6 +59,7 @@ class CustomReportRequest(BaseModel):
     "/dashboard/building/{building_id}",
     summary="Generate internal building report (Dashboard)",
     tags=["Reports"],
+    dependencies=[Depends(no_compression_for_downloads)],
 )
 async def get_dashboard_building_report(
     building_id: str,
@@ -71,8 +77,8 @@ async def get_dashboard_building_report(
     
     try:
         # Validate format
-        if format not in ["json", "pdf"]:
-            raise HTTPException(400, "format must be 'json' or 'pdf'")
+        if format not in REPORT_FORMATS:
+            raise HTTPException(400, "format must be 'json', 'pdf' or 'xlsx'")
         
         context_role = get_effective_role(current_user)
         result = await generate_building_report(
@@ -85,7 +91,7 @@ async def get_dashboard_building_report(
         
         response = result.to_dict()
         response["user_role"] = current_user.role
-        return response
+        return FastJSONResponse(response)
     except ValueError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
@@ -96,6 +102,7 @@ async def get_dashboard_building_report(
     "/dashboard/unit/{unit_id}",
     summary="Generate internal unit report (Dashboard)",
     tags=["Reports"],
+    dependencies=[Depends(no_compression_for_downloads)],
 )
 async def get_dashboard_unit_report(
     unit_id: str,
@@ -113,8 +120,8 @@ async def get_dashboard_unit_report(
     
     try:
         # Validate format
-        if format not in ["json", "pdf"]:
-            raise HTTPException(400, "format must be 'json' or 'pdf'")
+        if format not in REPORT_FORMATS:
+            raise HTTPException(400, "format must be 'json', 'pdf' or 'xlsx'")
         
         context_role = get_effective_role(current_user)
         result = await generate_unit_report(
@@ -127,7 +134,7 @@ async def get_dashboard_unit_report(
         
         response = result.to_dict()
         response["user_role"] = current_user.role
-        return response
+        return FastJSONResponse(response)
     except ValueError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
@@ -138,6 +145,7 @@ async def get_dashboard_unit_report(
     "/dashboard/owner/unit/{unit_id}",
     summary="Generate owner-focused unit report (Dashboard)",
     tags=["Reports"],
+    dependencies=[Depends(no_compression_for_downloads)],
 )
 async def get_dashboard_owner_unit_report(
     unit_id: str,
@@ -159,8 +167,8 @@ async def get_dashboard_owner_unit_report(
     
     try:
         # Validate format
-        if format not in ["json", "pdf"]:
-            raise HTTPException(400, "format must be 'json' or 'pdf'")
+        if format not in REPORT_FORMATS:
+            raise HTTPException(400, "format must be 'json', 'pdf' or 'xlsx'")
         
         # Use "owner" context role for sanitization
         result = await generate_unit_report(
@@ -173,7 +181,7 @@ async def get_dashboard_owner_unit_report(
         
         response = result.to_dict()
         response["user_role"] = current_user.role
-        return response
+        return FastJSONResponse(response)
     except ValueError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
@@ -184,6 +192,7 @@ async def get_dashboard_owner_unit_report(
     "/dashboard/contractor/{contractor_id}",
     summary="Generate contractor activity report (Dashboard)",
     tags=["Reports"],
+    dependencies=[Depends(no_compression_for_downloads)],
 )
 async def get_dashboard_contractor_report(
     contractor_id: str,
@@ -222,8 +231,8 @@ async def get_dashboard_contractor_report(
     
     try:
         # Validate format
-        if format not in ["json", "pdf"]:
-            raise HTTPException(400, "format must be 'json' or 'pdf'")
+        if format not in REPORT_FORMATS:
+            raise HTTPException(400, "format must be 'json', 'pdf' or 'xlsx'")
         
         context_role = get_effective_role(current_user)
         
@@ -240,7 +249,7 @@ async def get_dashboard_contractor_report(
         
         response = result.to_dict()
         response["user_role"] = current_user.role
-        return response
+        return FastJSONResponse(response)
     except ValueError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
@@ -253,6 +262,7 @@ async def get_dashboard_contractor_report(
     tags=["Reports"],
 )
 async def post_dashboard_custom_report(
+    http_request: Request,
     request: CustomReportRequest = Body(...),
     current_user: CurrentUser = Depends(get_current_user),
 ):
@@ -262,8 +272,11 @@ async def post_dashboard_custom_report(
     Applies role-based permissions and visibility rules.
     """
     # Validate format
-    if request.format not in ["json", "pdf"]:
-        raise HTTPException(400, "format must be 'json' or 'pdf'")
+    if request.format not in REPORT_FORMATS:
+        raise HTTPException(400, "format must be 'json', 'pdf' or 'xlsx'")
+    if request.format in DOWNLOAD_URL_FORMATS:
+        # The format is in the body, so no_compression_for_downloads can't see it
+        no_compression(http_request)
     
     # Permission checks based on filters
     if not is_admin(current_user):
@@ -322,7 +335,7 @@ async def post_dashboard_custom_report(
         
         response = result.to_dict()
         response["user_role"] = current_user.role
-        return response
+        return FastJSONResponse(response)
     except ValueError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
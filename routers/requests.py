@@ -8,6 +8,7 @@ from dependencies.auth import get_current_user, CurrentUser
 from core.supabase_client import get_supabase_client
 from core.logging_config import logger
 from core.permission_helpers import requires_permission
+from core.cache import invalidate_tags, user_access_tag, org_tag
 from models.access_request import AccessRequestCreate, AccessRequestUpdate, AccessRequestRead
 
 router = APIRouter(
@@ -402,6 +403,12 @@ def update_access_request(
                                 .execute()
                             )
                             logger.info(f"Granted unit {unit_id} access to individual user {requester_user_id}")
+
+                # Cached building/unit lists depend on these grants
+                if organization_type and organization_id:
+                    invalidate_tags(org_tag(organization_id))
+                else:
+                    invalidate_tags(user_access_tag(requester_user_id))
             except Exception as e:
                 logger.error(f"Failed to grant access after approval: {e}")
                 # Don't fail the request update, just log the error
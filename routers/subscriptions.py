@@ -8,6 +8,7 @@ from dependencies.auth import get_current_user, CurrentUser
 from core.supabase_client import get_supabase_client
 from core.logging_config import logger
 from core.config import settings
+from core.cache import cache_get, cache_set
 from core.subscription_helpers import (
     get_user_subscription,
     get_user_subscriptions,
@@ -648,11 +649,55 @@ def start_pm_company_trial(
 # LIST ALL SUBSCRIPTIONS (Admin Only)
 # ============================================================
 
+# Columns shared by every subscription type in the subscription_ledger view
+LEDGER_COMMON_FIELDS = [
+    "subscription_type",
+    "id",
+    "subscription_tier",
+    "subscription_status",
+    "stripe_customer_id",
+    "stripe_subscription_id",
+    "is_trial",
+    "trial_started_at",
+    "trial_ends_at",
+    "created_at",
+    "updated_at",
+]
+
+# Type-specific columns (keeps the per-type response shape)
+LEDGER_TYPE_FIELDS = {
+    "user": ["user_id", "user_email", "user_name", "role"],
+    "contractor": ["company_name"],
+    "aoao_organization": ["organization_name"],
+    "pm_company": ["company_name"],
+}
+
+LEDGER_SORT_FIELDS = ["created_at", "updated_at", "subscription_tier", "subscription_status", "subscription_type"]
+
+# The admin subscription screen polls; keep the cache short
+LEDGER_CACHE_TTL = 30
+
+
+def ledger_row_to_entry(row: dict) -> dict:
+    entry = {field: row.get(field) for field in LEDGER_COMMON_FIELDS}
+    for field in LEDGER_TYPE_FIELDS.get(row.get("subscription_type"), []):
+        entry[field] = row.get(field)
+
+    if entry["subscription_type"] == "user" and not entry.get("user_name"):
+        entry["user_name"] = f"User {entry.get('user_id')}"
+
+    return entry
+
+
 @router.get("/all")
 def list_all_subscriptions(
     subscription_tier: Optional[str] = Query(None, description="Filter by subscription tier (free, paid)"),
     subscription_status: Optional[str] = Query(None, description="Filter by subscription status (active, canceled, past_due, trialing, etc.)"),
     subscription_type: Optional[str] = Query(None, description="Filter by subscription type (user, contractor, aoao_organization, pm_company)"),
+    sort_by: str = Query("created_at", description="Sort field (created_at, updated_at, subscription_tier, subscription_status, subscription_type)"),
+    sort_order: str = Query("desc", description="Sort order (asc, desc)"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size (default 100, max 1000)"),
+    offset: int = Query(0, ge=0, description="Number of rows to skip"),
     current_user: CurrentUser = Depends(get_current_user)
 ):
     """
@@ -660,199 +705,63 @@ def list_all_subscriptions(
     
     **Admin Only:** Only admins and super_admins can view all subscriptions.
     
-    Returns a comprehensive list of all subscriptions with their details.
+    Reads the `subscription_ledger` view, so filters, sorting and pagination
+    run in the database. `total` is the number of matching subscriptions,
+    not the page size. Pages are cached for 30 seconds.
+
+    Results are paginated: without `limit`/`offset` only the first 100
+    subscriptions are returned. Page through with `offset` until it
+    reaches `total`.
     """
     if current_user.role not in ["admin", "super_admin"]:
         raise HTTPException(403, "Only admins can view all subscriptions")
     
+    if subscription_type and subscription_type not in LEDGER_TYPE_FIELDS:
+        raise HTTPException(400, f"Invalid subscription_type. Must be one of: {', '.join(LEDGER_TYPE_FIELDS)}")
+    if sort_by not in LEDGER_SORT_FIELDS:
+        raise HTTPException(400, f"Invalid sort_by. Must be one of: {', '.join(LEDGER_SORT_FIELDS)}")
+    if sort_order not in ["asc", "desc"]:
+        raise HTTPException(400, "Invalid sort_order. Must be 'asc' or 'desc'")
+    
+    cache_key = (
+        f"subscriptions:ledger:{subscription_tier}:{subscription_status}:{subscription_type}:"
+        f"{sort_by}:{sort_order}:{limit}:{offset}"
+    )
+    cached_result = cache_get(cache_key)
+    if cached_result is not None:
+        return cached_result
+    
     client = get_supabase_client()
-    all_subscriptions = []
     
     try:
-        # 1. Get all user subscriptions
-        user_subscriptions_result = (
-            client.table("user_subscriptions")
-            .select("*")
-            .execute()
-        )
-        
-        for sub in (user_subscriptions_result.data or []):
-            # Get user details
-            try:
-                user_resp = client.auth.admin.get_user_by_id(sub["user_id"])
-                user_email = user_resp.user.email if user_resp.user else None
-                user_metadata = user_resp.user.user_metadata or {} if user_resp.user else {}
-                user_name = user_metadata.get("full_name") or user_email
-            except:
-                user_email = None
-                user_name = f"User {sub['user_id']}"
-            
-            subscription_entry = {
-                "subscription_type": "user",
-                "id": sub["id"],
-                "user_id": sub["user_id"],
-                "user_email": user_email,
-                "user_name": user_name,
-                "role": sub.get("role"),
-                "subscription_tier": sub.get("subscription_tier"),
-                "subscription_status": sub.get("subscription_status"),
-                "stripe_customer_id": sub.get("stripe_customer_id"),
-                "stripe_subscription_id": sub.get("stripe_subscription_id"),
-                "is_trial": sub.get("is_trial", False),
-                "trial_started_at": sub.get("trial_started_at"),
-                "trial_ends_at": sub.get("trial_ends_at"),
-                "created_at": sub.get("created_at"),
-                "updated_at": sub.get("updated_at"),
-            }
-            
-            # Apply filters
-            if subscription_tier and subscription_entry["subscription_tier"] != subscription_tier:
-                continue
-            if subscription_status and subscription_entry["subscription_status"] != subscription_status:
-                continue
-            if subscription_type and subscription_entry["subscription_type"] != subscription_type:
-                continue
-            
-            all_subscriptions.append(subscription_entry)
-        
-        # 2. Get all contractor subscriptions
-        # Note: contractors table may not have is_trial, trial_started_at, trial_ends_at columns
-        contractors_result = (
-            client.table("contractors")
-            .select("id, company_name, subscription_tier, subscription_status, stripe_customer_id, stripe_subscription_id, created_at, updated_at")
-            .execute()
-        )
+        query = client.table("subscription_ledger").select("*", count="exact")
         
-        for contractor in (contractors_result.data or []):
-            # Check if subscription_status is "trialing" to determine if it's a trial
-            subscription_status = contractor.get("subscription_status")
-            is_trial = subscription_status == "trialing" if subscription_status else False
-            
-            # For business entities, use created_at as proxy for trial_started_at if trialing
-            # Trial end date is not tracked in contractors table, so we'll leave it as None
-            created_at_str = contractor.get("created_at")
-            trial_started_at = created_at_str if is_trial else None
-            
-            subscription_entry = {
-                "subscription_type": "contractor",
-                "id": contractor["id"],
-                "company_name": contractor.get("company_name"),
-                "subscription_tier": contractor.get("subscription_tier"),
-                "subscription_status": subscription_status,
-                "stripe_customer_id": contractor.get("stripe_customer_id"),
-                "stripe_subscription_id": contractor.get("stripe_subscription_id"),
-                "is_trial": is_trial,
-                "trial_started_at": trial_started_at,
-                "trial_ends_at": None,  # Not tracked in contractors table
-                "created_at": created_at_str,
-                "updated_at": contractor.get("updated_at"),
-            }
-            
-            # Apply filters
-            if subscription_tier and subscription_entry["subscription_tier"] != subscription_tier:
-                continue
-            if subscription_status and subscription_entry["subscription_status"] != subscription_status:
-                continue
-            if subscription_type and subscription_entry["subscription_type"] != subscription_type:
-                continue
-            
-            all_subscriptions.append(subscription_entry)
+        if subscription_tier:
+            query = query.eq("subscription_tier", subscription_tier)
+        if subscription_status:
+            query = query.eq("subscription_status", subscription_status)
+        if subscription_type:
+            query = query.eq("subscription_type", subscription_type)
         
-        # 3. Get all AOAO organization subscriptions
-        # Note: aoao_organizations table doesn't have is_trial, trial_started_at, trial_ends_at columns
-        aoao_orgs_result = (
-            client.table("aoao_organizations")
-            .select("id, organization_name, subscription_tier, subscription_status, stripe_customer_id, stripe_subscription_id, created_at, updated_at")
+        result = (
+            query
+            .order(sort_by, desc=(sort_order == "desc"))
+            .order("id")
+            .range(offset, offset + limit - 1)
             .execute()
         )
         
-        for org in (aoao_orgs_result.data or []):
-            # Check if subscription_status is "trialing" to determine if it's a trial
-            subscription_status = org.get("subscription_status")
-            is_trial = subscription_status == "trialing" if subscription_status else False
-            
-            # For business entities, use created_at as proxy for trial_started_at if trialing
-            # Trial end date is not tracked in aoao_organizations table, so we'll leave it as None
-            created_at_str = org.get("created_at")
-            trial_started_at = created_at_str if is_trial else None
-            
-            subscription_entry = {
-                "subscription_type": "aoao_organization",
-                "id": org["id"],
-                "organization_name": org.get("organization_name"),
-                "subscription_tier": org.get("subscription_tier"),
-                "subscription_status": subscription_status,
-                "stripe_customer_id": org.get("stripe_customer_id"),
-                "stripe_subscription_id": org.get("stripe_subscription_id"),
-                "is_trial": is_trial,
-                "trial_started_at": trial_started_at,
-                "trial_ends_at": None,  # Not tracked in aoao_organizations table
-                "created_at": created_at_str,
-                "updated_at": org.get("updated_at"),
-            }
-            
-            # Apply filters
-            if subscription_tier and subscription_entry["subscription_tier"] != subscription_tier:
-                continue
-            if subscription_status and subscription_entry["subscription_status"] != subscription_status:
-                continue
-            if subscription_type and subscription_entry["subscription_type"] != subscription_type:
-                continue
-            
-            all_subscriptions.append(subscription_entry)
-        
-        # 4. Get all PM company subscriptions
-        # Note: property_management_companies table doesn't have is_trial, trial_started_at, trial_ends_at columns
-        pm_companies_result = (
-            client.table("property_management_companies")
-            .select("id, company_name, subscription_tier, subscription_status, stripe_customer_id, stripe_subscription_id, created_at, updated_at")
-            .execute()
-        )
-        
-        for company in (pm_companies_result.data or []):
-            # Check if subscription_status is "trialing" to determine if it's a trial
-            subscription_status = company.get("subscription_status")
-            is_trial = subscription_status == "trialing" if subscription_status else False
-            
-            # For business entities, use created_at as proxy for trial_started_at if trialing
-            # Trial end date is not tracked in property_management_companies table, so we'll leave it as None
-            created_at_str = company.get("created_at")
-            trial_started_at = created_at_str if is_trial else None
-            
-            subscription_entry = {
-                "subscription_type": "pm_company",
-                "id": company["id"],
-                "company_name": company.get("company_name"),
-                "subscription_tier": company.get("subscription_tier"),
-                "subscription_status": subscription_status,
-                "stripe_customer_id": company.get("stripe_customer_id"),
-                "stripe_subscription_id": company.get("stripe_subscription_id"),
-                "is_trial": is_trial,
-                "trial_started_at": trial_started_at,
-                "trial_ends_at": None,  # Not tracked in property_management_companies table
-                "created_at": created_at_str,
-                "updated_at": company.get("updated_at"),
-            }
-            
-            # Apply filters
-            if subscription_tier and subscription_entry["subscription_tier"] != subscription_tier:
-                continue
-            if subscription_status and subscription_entry["subscription_status"] != subscription_status:
-                continue
-            if subscription_type and subscription_entry["subscription_type"] != subscription_type:
-                continue
-            
-            all_subscriptions.append(subscription_entry)
-        
-        # Sort by created_at (newest first)
-        all_subscriptions.sort(key=lambda x: x.get("created_at") or "", reverse=True)
-        
-        return {
+        response = {
             "success": True,
-            "total": len(all_subscriptions),
-            "subscriptions": all_subscriptions
+            "total": result.count if result.count is not None else len(result.data or []),
+            "limit": limit,
+            "offset": offset,
+            "subscriptions": [ledger_row_to_entry(row) for row in (result.data or [])]
         }
         
+        cache_set(cache_key, response, ttl_seconds=LEDGER_CACHE_TTL)
+        return response
+        
     except Exception as e:
         logger.error(f"Error listing all subscriptions: {e}")
         raise HTTPException(500, f"Failed to list subscriptions: {str(e)}")
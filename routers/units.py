@@ -10,6 +10,7 @@ import io
 from dependencies.auth import get_current_user, CurrentUser
 from core.supabase_client import get_supabase_client
 from core.logging_config import logger
+from core.cache import invalidate_tags, building_tag
 from core.permission_helpers import (
     is_admin,
     require_unit_access as require_unit_access_helper,
@@ -36,6 +37,13 @@ def require_unit_access(user: CurrentUser):
         raise HTTPException(403, "You do not have permission to manage units.")
 
 
+# -------------------------------------------------------------
+# Cache invalidation — unit writes change their building's cached views
+# -------------------------------------------------------------
+def invalidate_unit_buildings(*building_ids: Optional[str]):
+    invalidate_tags(*{building_tag(b) for b in building_ids if b})
+
+
 # -------------------------------------------------------------
 # Normalize blank → None
 # -------------------------------------------------------------
@@ -175,6 +183,7 @@ def create_unit(payload: UnitCreate, current_user: CurrentUser = Depends(get_cur
         )
         if not result.data:
             raise HTTPException(500, "Unit creation failed - no data returned")
+        invalidate_unit_buildings(result.data[0].get("building_id"))
         return result.data[0]
     except HTTPException:
         raise
@@ -219,6 +228,19 @@ def update_unit(unit_id: str, payload: UnitUpdate, current_user: CurrentUser = D
                 cleaned[k] = cleaned_value
 
     try:
+        # Moving a unit also changes the building it leaves
+        previous_building_id = None
+        if "building_id" in cleaned:
+            previous = (
+                client.table("units")
+                .select("building_id")
+                .eq("id", unit_id)
+                .limit(1)
+                .execute()
+            )
+            if previous.data:
+                previous_building_id = previous.data[0]["building_id"]
+
         result = (
             client.table("units")
             .update(cleaned, returning="representation")
@@ -227,6 +249,7 @@ def update_unit(unit_id: str, payload: UnitUpdate, current_user: CurrentUser = D
         )
         if not result.data:
             raise HTTPException(404, f"Unit {unit_id} not found")
+        invalidate_unit_buildings(result.data[0].get("building_id"), previous_building_id)
         return result.data[0]
     except HTTPException:
         raise
@@ -245,7 +268,8 @@ def delete_unit(unit_id: str, current_user: CurrentUser = Depends(get_current_us
     client = get_supabase_client()
 
     try:
-        client.table("units").delete().eq("id", unit_id).execute()
+        result = client.table("units").delete().eq("id", unit_id).execute()
+        invalidate_unit_buildings(*[row.get("building_id") for row in (result.data or [])])
         return {"success": True}
     except Exception as e:
         from core.errors import handle_supabase_error
@@ -333,6 +357,7 @@ def bulk_upload_units(
         from core.errors import handle_supabase_error
         raise handle_supabase_error(e, "Bulk unit upload failed", 500)
 
+    invalidate_unit_buildings(building_id)
     return {"success": True, "inserted": len(rows_to_insert)}
 
 
@@ -4,14 +4,11 @@ from fastapi import (
     APIRouter, UploadFile, File, Form,
     Depends, HTTPException, Path, Request, Query
 )
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 from datetime import datetime
-import boto3
-import os
 import re
-import tempfile
 from pathlib import Path as PathLib
-from botocore.exceptions import ClientError, NoCredentialsError
 
 from dependencies.auth import (
     get_current_user,
@@ -27,12 +24,16 @@ from core.permission_helpers import (
     require_units_access,
     require_document_access,
 )
-from core.stripe_helpers import verify_stripe_session, verify_stripe_payment_intent
+from services.document_purchases import verify_document_purchase
 from core.rate_limiter import require_rate_limit, get_rate_limit_identifier
 from core.logging_config import logger
 from core.utils import sanitize
 from core.s3_client import get_s3
+from core.compression import no_compression
+from core.junction_helpers import set_junction_links
+from core.reference_data import require_document_category
 from core.contractor_helpers import enrich_contractor_with_roles
+from services.document_storage import discard_spooled, release_document_files, spool_upload, store_document_file
 
 router = APIRouter(
     prefix="/uploads",
@@ -137,7 +138,8 @@ def get_unit_building(unit_id: str | None):
 @router.post(
     "/",
     summary="Upload a document and create a document record",
-    dependencies=[Depends(requires_permission("upload:write"))],
+    # The response carries a presigned URL
+    dependencies=[Depends(requires_permission("upload:write")), Depends(no_compression)],
 )
 async def upload_document(
     file: UploadFile = File(...),
@@ -293,70 +295,17 @@ async def upload_document(
                 require_units_access(current_user, parsed_unit_ids)
 
     # -----------------------------------------------------
-    # Prepare S3 key
+    # Validate title, category and building
     # -----------------------------------------------------
-    s3, bucket, region = get_s3()
-
     # Generate filename from title (required for database)
     if not title or not title.strip():
         raise HTTPException(400, "title is required and cannot be empty")
     # Sanitize title to create a safe filename
     clean_filename = safe_filename(title.strip())[:100] + ".pdf"
 
-    # Look up category name from document_categories table if category_id is provided
-    safe_category = "general"  # default
-    if category_id:
-        try:
-            category_result = (
-                client.table("document_categories")
-                .select("name")
-                .eq("id", category_id)
-                .limit(1)
-                .execute()
-            )
-            if category_result.data:
-                safe_category = category_result.data[0]["name"].replace(" ", "_").lower()
-            else:
-                raise HTTPException(400, f"Category ID {category_id} not found in document_categories table")
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.warning(f"Error looking up category: {e}")
-            raise HTTPException(400, f"Invalid category_id: {category_id}")
-    
-    # Validate subcategory_id exists if provided
-    if subcategory_id:
-        try:
-            subcategory_result = (
-                client.table("document_subcategories")
-                .select("id, category_id")
-                .eq("id", subcategory_id)
-                .limit(1)
-                .execute()
-            )
-            if not subcategory_result.data:
-                raise HTTPException(400, f"Subcategory ID {subcategory_id} not found in document_subcategories table")
-            # Validate that subcategory belongs to the provided category (if category_id is also provided)
-            if category_id and subcategory_result.data[0]["category_id"] != category_id:
-                raise HTTPException(400, f"Subcategory {subcategory_id} does not belong to category {category_id}")
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.warning(f"Error looking up subcategory: {e}")
-            raise HTTPException(400, f"Invalid subcategory_id: {subcategory_id}")
-
-    # NEW S3 path rules
-    if event_id:
-        # Use first unit if available, otherwise 'none'
-        first_unit = parsed_unit_ids[0] if parsed_unit_ids else 'none'
-        s3_key = f"events/{event_id}/units/{first_unit}/documents/{safe_category}/{clean_filename}"
-
-    elif parsed_unit_ids:
-        s3_key = f"units/{parsed_unit_ids[0]}/documents/{safe_category}/{clean_filename}"
+    # Category/subcategory checks come from the reference data registry
+    require_document_category(category_id, subcategory_id)
 
-    else:
-        s3_key = f"buildings/{building_id}/documents/{safe_category}/{clean_filename}"
-    
     # Final validation: building_id must be set at this point
     if not building_id:
         raise HTTPException(400, "building_id is required and cannot be null")
@@ -373,40 +322,20 @@ async def upload_document(
         raise HTTPException(400, f"Building {building_id} does not exist")
 
     # -----------------------------------------------------
-    # Save file temporarily and upload to S3
+    # Hash while spooling, then store under the content key
+    # (identical files share one S3 object — see services/document_storage.py)
     # -----------------------------------------------------
-    temp_file_path = None
-
+    file_extension = PathLib(file.filename or clean_filename).suffix.lower()
+    spooled = await spool_upload(file, suffix=file_extension)
     try:
-        # Save uploaded file to temporary location
-        file_extension = PathLib(file.filename or clean_filename).suffix.lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            temp_file_path = temp_file.name
-            # Read and write the file content
-            content = await file.read()
-            temp_file.write(content)
-            temp_file.flush()
-
-        # Upload file to S3
-        try:
-            s3.upload_file(
-                Filename=temp_file_path,
-                Bucket=bucket,
-                Key=s3_key,
-                ExtraArgs={"ContentType": file.content_type},
-            )
-        except Exception as e:
-            raise HTTPException(500, f"S3 upload error: {e}")
+        stored = await run_in_threadpool(store_document_file, spooled, file_extension, file.content_type)
     finally:
-        # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete temp file {temp_file_path}: {e}")
+        discard_spooled(spooled.path)
+    s3_key = stored.s3_key
 
     # Generate presigned URL for immediate use (expires in 1 day)
     # Note: For long-term access, use the /documents/{id}/download endpoint
+    s3, bucket, region = get_s3()
     presigned_url = s3.generate_presigned_url(
         "get_object",
         Params={"Bucket": bucket, "Key": s3_key},
@@ -426,6 +355,7 @@ async def upload_document(
         "title": title.strip(),  # Use title as primary field
         "filename": clean_filename,  # Auto-generated from title for database compatibility
         "s3_key": s3_key,
+        "content_sha256": stored.sha256,
         "uploaded_by": current_user.id,
         "uploaded_by_role": "admin" if current_user.role in ["admin", "super_admin"] else current_user.role,  # Denormalized for performance (normalize admin roles)
         "is_redacted": False,  # Manual redaction is handled via separate endpoint
@@ -434,42 +364,29 @@ async def upload_document(
     })
 
     # Step 1 — Insert
-    insert_res = (
-        client.table("documents")
-        .insert(payload)
-        .execute()
-    )
+    try:
+        insert_res = (
+            client.table("documents")
+            .insert(payload)
+            .execute()
+        )
+    except Exception as e:
+        release_document_files([stored.sha256])
+        raise HTTPException(500, f"Failed to create document: {e}")
 
     if not insert_res.data:
+        release_document_files([stored.sha256])
         raise HTTPException(500, "Insert returned no data")
 
     doc_id = insert_res.data[0]["id"]
 
-    # Step 2 — Create junction table entries for units
-    if parsed_unit_ids:
-        for unit_id_val in parsed_unit_ids:
-            try:
-                client.table("document_units").insert({
-                    "document_id": doc_id,
-                    "unit_id": unit_id_val
-                }).execute()
-            except Exception as e:
-                # Ignore duplicate key errors (unique constraint)
-                if "duplicate" not in str(e).lower():
-                    logger.warning(f"Failed to create document_unit relationship: {e}")
-    
-    # Step 3 — Create junction table entries for contractors
-    if parsed_contractor_ids:
-        for contractor_id_val in parsed_contractor_ids:
-            try:
-                client.table("document_contractors").insert({
-                    "document_id": doc_id,
-                    "contractor_id": contractor_id_val
-                }).execute()
-            except Exception as e:
-                # Ignore duplicate key errors (unique constraint)
-                if "duplicate" not in str(e).lower():
-                    logger.warning(f"Failed to create document_contractor relationship: {e}")
+    # Step 2 — Create junction table entries for units and contractors
+    for table, ids in (("document_units", parsed_unit_ids), ("document_contractors", parsed_contractor_ids)):
+        try:
+            set_junction_links(table, doc_id, ids, created=True)
+        except HTTPException as e:
+            # The upload itself succeeded; keep it even if tagging failed
+            logger.warning(f"Failed to create {table} relationships: {e.detail}")
 
     # Step 4 — Fetch with relations
     fetch_res = (
@@ -538,6 +455,8 @@ async def upload_document(
             "title": title.strip(),
             "filename": clean_filename,  # Auto-generated from title
             "s3_key": s3_key,
+            "sha256": stored.sha256,
+            "deduplicated": stored.deduplicated,  # True if identical content was already stored
             "presigned_url": presigned_url,  # Valid for 1 day
             "uploaded_at": datetime.utcnow().isoformat(),
         },
@@ -551,6 +470,7 @@ async def upload_document(
 @router.get(
     "/documents/{document_id}/download",
     summary="Get a presigned URL for downloading a document (hybrid: free/paid/auth)",
+    dependencies=[Depends(no_compression)],
 )
 async def get_document_download_url(
     request: Request,
@@ -609,7 +529,7 @@ async def get_document_download_url(
         
         # Check if Stripe payment provided for paid public documents
         if stripe_session_id:
-            if verify_stripe_session(stripe_session_id, document_id):
+            if verify_document_purchase(document_id, session_id=stripe_session_id):
                 access_granted = True
                 access_method = "stripe_session"
                 logger.info(f"Public document {document_id} accessed via Stripe session {stripe_session_id}")
@@ -619,7 +539,7 @@ async def get_document_download_url(
                     detail="Payment verification failed. Please ensure your payment was completed successfully."
                 )
         elif stripe_payment_intent_id:
-            if verify_stripe_payment_intent(stripe_payment_intent_id, document_id):
+            if verify_document_purchase(document_id, payment_intent_id=stripe_payment_intent_id):
                 access_granted = True
                 access_method = "stripe_payment_intent"
                 logger.info(f"Public document {document_id} accessed via Stripe payment intent {stripe_payment_intent_id}")
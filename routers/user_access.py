@@ -2,8 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
 from core.supabase_client import get_supabase_client
+from core.responses import FastJSONResponse
 from core.utils import sanitize
 from core.logging_config import logger
+from core.cache import invalidate_tags, user_access_tag, org_tag
 from dependencies.auth import (
     get_current_user,
     CurrentUser,
@@ -202,7 +204,7 @@ def list_building_access():
             for entry in direct_access
         ]
         
-        return direct_with_type + inherited_access
+        return FastJSONResponse(direct_with_type + inherited_access)
 
     except Exception as e:
         raise HTTPException(500, f"Supabase error: {e}")
@@ -485,7 +487,7 @@ def list_unit_access():
             for entry in direct_access
         ]
         
-        return direct_with_type + inherited_access
+        return FastJSONResponse(direct_with_type + inherited_access)
 
     except Exception as e:
         raise HTTPException(500, f"Supabase error: {e}")
@@ -611,6 +613,7 @@ def add_building_access(payload: UserBuildingAccessCreate):
         if not result.data:
             raise HTTPException(500, "Insert failed — no data returned")
 
+        invalidate_tags(user_access_tag(payload.user_id))
         return result.data[0]
 
     except Exception as e:
@@ -653,6 +656,7 @@ def add_unit_access(payload: UserUnitAccessCreate):
         if not result.data:
             raise HTTPException(500, "Insert failed — no data returned")
 
+        invalidate_tags(user_access_tag(payload.user_id))
         return result.data[0]
 
     except Exception as e:
@@ -701,6 +705,7 @@ def delete_building_access(user_id: str, building_id: str):
         )
 
         logger.info(f"Successfully deleted building access: user_id={user_id}, building_id={building_id}")
+        invalidate_tags(user_access_tag(user_id))
         return {
             "status": "deleted",
             "user_id": user_id,
@@ -753,6 +758,7 @@ def delete_unit_access(user_id: str, unit_id: str):
         )
 
         logger.info(f"Successfully deleted unit access: user_id={user_id}, unit_id={unit_id}")
+        invalidate_tags(user_access_tag(user_id))
         return {
             "status": "deleted",
             "user_id": user_id,
@@ -887,6 +893,7 @@ def add_aoao_org_building_access(
         )
         
         logger.info(f"Granted building {payload.building_id} access to AOAO organization {organization_id}")
+        invalidate_tags(org_tag(organization_id))
         return result.data[0]
     except Exception as e:
         raise HTTPException(500, f"Failed to grant building access: {e}")
@@ -945,6 +952,7 @@ def delete_aoao_org_building_access(organization_id: str, building_id: str):
         )
         
         logger.info(f"Removed building {building_id} access from AOAO organization {organization_id}")
+        invalidate_tags(org_tag(organization_id))
         return {
             "status": "deleted",
             "organization_id": organization_id,
@@ -1019,6 +1027,7 @@ def add_aoao_org_unit_access(
         )
         
         logger.info(f"Granted unit {payload.unit_id} access to AOAO organization {organization_id}")
+        invalidate_tags(org_tag(organization_id))
         return result.data[0]
     except Exception as e:
         raise HTTPException(500, f"Failed to grant unit access: {e}")
@@ -1123,6 +1132,7 @@ def delete_aoao_org_unit_access(organization_id: str, unit_id: str):
         )
         
         logger.info(f"Removed unit {unit_id} access from AOAO organization {organization_id}")
+        invalidate_tags(org_tag(organization_id))
         return {
             "status": "deleted",
             "organization_id": organization_id,
@@ -1197,6 +1207,7 @@ def add_pm_company_building_access(
         )
         
         logger.info(f"Granted building {payload.building_id} access to PM company {company_id}")
+        invalidate_tags(org_tag(company_id))
         return result.data[0]
     except Exception as e:
         raise HTTPException(500, f"Failed to grant building access: {e}")
@@ -1255,6 +1266,7 @@ def delete_pm_company_building_access(company_id: str, building_id: str):
         )
         
         logger.info(f"Removed building {building_id} access from PM company {company_id}")
+        invalidate_tags(org_tag(company_id))
         return {
             "status": "deleted",
             "company_id": company_id,
@@ -1329,6 +1341,7 @@ def add_pm_company_unit_access(
         )
         
         logger.info(f"Granted unit {payload.unit_id} access to PM company {company_id}")
+        invalidate_tags(org_tag(company_id))
         return result.data[0]
     except Exception as e:
         raise HTTPException(500, f"Failed to grant unit access: {e}")
@@ -1433,6 +1446,7 @@ def delete_pm_company_unit_access(company_id: str, unit_id: str):
         )
         
         logger.info(f"Removed unit {unit_id} access from PM company {company_id}")
+        invalidate_tags(org_tag(company_id))
         return {
             "status": "deleted",
             "company_id": company_id,
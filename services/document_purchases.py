@@ -0,0 +1,242 @@
+# services/document_purchases.py
+
+"""
+Verified purchases of paid documents.
+
+A buyer re-downloading a purchased document used to cost one Stripe API
+call per request. The first successful verification (or the
+checkout.session.completed webhook, whichever comes first) is now recorded
+in verified_document_purchases, keyed by (Stripe session / payment intent
+ID, document ID), and later downloads are resolved from a short-lived
+cache entry in front of that table.
+
+Records expire after VERIFIED_PURCHASE_TTL_DAYS, after which Stripe is
+asked again. charge.refunded webhooks revoke them straight away. Webhook
+payloads are never trusted on their own: both grants and revocations are
+confirmed with Stripe first.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.cache import cache_get, cache_set, invalidate_tags
+from core.config import settings
+from core.logging_config import logger
+from core.stripe_helpers import (
+    get_refunded_charge_payment_intent,
+    get_verified_stripe_session,
+    verify_stripe_payment_intent,
+)
+from core.supabase_client import get_supabase_client
+
+
+PURCHASES_TABLE = "verified_document_purchases"
+
+CACHE_KEY_PREFIX = "purchases:verified:"
+
+
+def purchase_tag(stripe_ref: str) -> str:
+    """Cache tag for every entry granted by one Stripe session or payment intent."""
+    return f"stripe_purchase:{stripe_ref}"
+
+
+def _cache_key(stripe_ref: str, document_id: str) -> str:
+    return f"{CACHE_KEY_PREFIX}{stripe_ref}:{document_id}"
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def parse_document_ids(value: Optional[str]) -> List[str]:
+    """Document IDs from comma-separated Stripe metadata."""
+    return [d.strip() for d in (value or "").split(",") if d.strip()]
+
+
+# ============================================================
+# Lookup
+# ============================================================
+def lookup_verified_purchase(stripe_ref: str, document_id: str) -> Optional[bool]:
+    """
+    Local verdict for (stripe_ref, document_id).
+
+    Returns:
+        True for a recorded, unexpired purchase, False if it was revoked
+        (refunded), None if there is no record or it expired and Stripe
+        has to be asked. Only True is cached.
+    """
+    key = _cache_key(stripe_ref, document_id)
+    if cache_get(key):
+        return True
+
+    client = get_supabase_client()
+    rows = (
+        client.table(PURCHASES_TABLE)
+        .select("expires_at, revoked_at, stripe_payment_intent_id")
+        .eq("stripe_ref", stripe_ref)
+        .eq("document_id", document_id)
+        .limit(1)
+        .execute()
+    ).data
+    if not rows:
+        return None
+    if rows[0].get("revoked_at"):
+        return False
+
+    remaining = (_parse_time(rows[0]["expires_at"]) - datetime.now(timezone.utc)).total_seconds()
+    if remaining <= 0:
+        return None
+
+    tags = [purchase_tag(stripe_ref)]
+    if rows[0].get("stripe_payment_intent_id"):
+        tags.append(purchase_tag(rows[0]["stripe_payment_intent_id"]))
+    cache_set(key, True, ttl_seconds=int(min(remaining, settings.VERIFIED_PURCHASE_CACHE_SECONDS)), tags=tags)
+    return True
+
+
+# ============================================================
+# Recording / revocation
+# ============================================================
+def record_verified_purchase(
+    stripe_ref: str,
+    ref_type: str,
+    document_ids: Iterable[str],
+    source: str,
+    payment_intent_id: Optional[str] = None,
+) -> int:
+    """
+    Upsert verified purchases for one Stripe session or payment intent.
+    Re-verifying a purchase renews its expiry; revoked purchases stay revoked.
+
+    Returns:
+        Number of documents recorded
+    """
+    document_ids = list(dict.fromkeys(document_ids))
+    if not document_ids:
+        return 0
+
+    now = datetime.now(timezone.utc)
+    expires_at = (now + timedelta(days=settings.VERIFIED_PURCHASE_TTL_DAYS)).isoformat()
+    rows = []
+    for document_id in document_ids:
+        row = {
+            "stripe_ref": stripe_ref,
+            "document_id": document_id,
+            "ref_type": ref_type,
+            "source": source,
+            "verified_at": now.isoformat(),
+            "expires_at": expires_at,
+        }
+        if payment_intent_id:
+            row["stripe_payment_intent_id"] = payment_intent_id
+        rows.append(row)
+
+    client = get_supabase_client()
+    client.table(PURCHASES_TABLE).upsert(rows, on_conflict="stripe_ref,document_id").execute()
+    logger.info(f"Recorded verified purchase of {len(rows)} document(s) for Stripe {ref_type} {stripe_ref}")
+    return len(rows)
+
+
+def revoke_purchases(payment_intent_id: str) -> int:
+    """
+    Revoke every purchase paid with a payment intent, whether it was
+    recorded under the payment intent itself or its Checkout Session.
+
+    Returns:
+        Number of purchases revoked
+    """
+    client = get_supabase_client()
+    revoked = (
+        client.table(PURCHASES_TABLE)
+        .update({"revoked_at": datetime.now(timezone.utc).isoformat()})
+        .or_(f"stripe_ref.eq.{payment_intent_id},stripe_payment_intent_id.eq.{payment_intent_id}")
+        .is_("revoked_at", "null")
+        .execute()
+    ).data or []
+
+    refs = {payment_intent_id} | {row["stripe_ref"] for row in revoked}
+    invalidate_tags(*(purchase_tag(ref) for ref in refs))
+    if revoked:
+        logger.info(f"Revoked {len(revoked)} document purchase(s) for refunded payment intent {payment_intent_id}")
+    return len(revoked)
+
+
+# ============================================================
+# Download access
+# ============================================================
+def verify_document_purchase(
+    document_id: str,
+    session_id: Optional[str] = None,
+    payment_intent_id: Optional[str] = None,
+) -> bool:
+    """
+    Check a paid download against local records first and fall back to
+    the Stripe API, recording the purchase when Stripe confirms it.
+    """
+    stripe_ref = session_id or payment_intent_id
+    if not stripe_ref:
+        return False
+    verdict = lookup_verified_purchase(stripe_ref, document_id)
+    if verdict is not None:
+        # A refunded payment intent still reads as "succeeded" in Stripe,
+        # so a revoked record is final
+        return verdict
+
+    if session_id:
+        session = get_verified_stripe_session(session_id, document_id)
+        if session is None:
+            return False
+        _record_quietly(session_id, "session", document_id, getattr(session, "payment_intent", None))
+        return True
+
+    if not verify_stripe_payment_intent(payment_intent_id, document_id):
+        return False
+    _record_quietly(payment_intent_id, "payment_intent", document_id, payment_intent_id)
+    return True
+
+
+def _record_quietly(stripe_ref: str, ref_type: str, document_id: str, payment_intent_id: Optional[str]):
+    # The buyer has paid; failing to write the record must not block the download
+    try:
+        record_verified_purchase(stripe_ref, ref_type, [document_id], "verification", payment_intent_id)
+    except Exception as e:
+        logger.warning(f"Failed to record verified purchase for {stripe_ref}: {e}")
+
+
+# ============================================================
+# Webhooks
+# ============================================================
+def record_checkout_session(event_data: Dict[str, Any]) -> int:
+    """
+    Record the documents bought in a paid checkout.session.completed event.
+
+    Only the session ID is taken from the payload: the session is retrieved
+    from Stripe and the documents come from its metadata, so a forged event
+    cannot grant access.
+    """
+    if event_data.get("payment_status") != "paid":
+        return 0
+    session = get_verified_stripe_session(event_data["id"])
+    if session is None:
+        logger.warning(f"Checkout session {event_data['id']} was not confirmed by Stripe; no purchases recorded")
+        return 0
+    document_ids = parse_document_ids((getattr(session, "metadata", None) or {}).get("document_ids"))
+    return record_verified_purchase(
+        event_data["id"], "session", document_ids, "webhook", getattr(session, "payment_intent", None)
+    )
+
+
+def handle_charge_refunded(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    charge.refunded: revoke document purchases paid by the charge's payment
+    intent, once Stripe confirms the charge is fully refunded.
+    """
+    if not event_data.get("payment_intent"):
+        return {"status": "ignored", "reason": "no_payment_intent"}
+    if not event_data.get("refunded"):
+        # Partial refund - the buyer keeps access
+        return {"status": "ignored", "reason": "partial_refund"}
+    payment_intent_id = get_refunded_charge_payment_intent(event_data["id"])
+    if not payment_intent_id:
+        return {"status": "ignored", "reason": "refund_not_confirmed"}
+    return {"status": "success", "purchases_revoked": revoke_purchases(payment_intent_id)}
@@ -0,0 +1,305 @@
+# services/document_storage.py
+
+"""
+Content-addressed storage for uploaded documents.
+
+Uploads are hashed with SHA-256 while they are spooled to disk and stored
+once per hash under documents/sha256/<aa>/<hash><ext>. document_objects
+keeps a reference count per object:
+
+- An upload whose hash is already registered takes a reference and skips
+  the S3 PUT entirely, once the object is known to be stored.
+- Deleting a document drops its reference; the S3 object is deleted with
+  the last one.
+
+A row is registered as "pending" before its S3 PUT and marked "stored"
+after it. An upload that finds a pending row (another upload of the same
+content in flight, or one that failed) checks S3 with head_object and
+uploads the object itself if it isn't there yet. The key is derived from
+the content, so a second PUT writes the same bytes.
+
+The acquire/release RPCs (migrations/add_document_objects.sql) update the
+count atomically. Until that migration is applied the same steps run as
+plain table reads and writes.
+"""
+
+import hashlib
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from core.logging_config import logger
+from core.s3_client import get_s3
+from core.supabase_client import get_supabase_client
+from core.supabase_helpers import is_missing_function
+
+
+OBJECTS_TABLE = "document_objects"
+
+# document_objects.status
+OBJECT_PENDING = "pending"
+OBJECT_STORED = "stored"
+
+CONTENT_KEY_PREFIX = "documents/sha256"
+
+# Read size while hashing and spooling an upload
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class SpooledUpload(NamedTuple):
+    path: str
+    sha256: str
+    size_bytes: int
+
+
+class ObjectReference(NamedTuple):
+    s3_key: str
+    created: bool           # True if this call registered the hash
+    status: Optional[str]   # OBJECT_PENDING / OBJECT_STORED (None before the status migration)
+
+
+class StoredDocument(NamedTuple):
+    s3_key: str
+    sha256: str
+    deduplicated: bool      # True if an existing object was reused (no PUT)
+
+
+def content_key(sha256: str, extension: str = "") -> str:
+    """S3 key of the object holding the content with this hash."""
+    return f"{CONTENT_KEY_PREFIX}/{sha256[:2]}/{sha256}{extension.lower()}"
+
+
+async def spool_upload(file: UploadFile, suffix: str = "") -> SpooledUpload:
+    """
+    Copy an upload to a temporary file in chunks, hashing it on the way.
+    The caller removes the file (see discard_spooled).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        try:
+            while True:
+                chunk = await file.read(HASH_CHUNK_BYTES)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                temp_file.write(chunk)
+                size += len(chunk)
+        except Exception:
+            temp_file.close()
+            discard_spooled(temp_file.name)
+            raise
+    return SpooledUpload(temp_file.name, digest.hexdigest(), size)
+
+
+def discard_spooled(path: Optional[str]):
+    if path and os.path.exists(path):
+        try:
+            os.unlink(path)
+        except Exception as e:
+            logger.warning(f"Failed to delete temp file {path}: {e}")
+
+
+# ============================================================
+# Reference counting
+# ============================================================
+def acquire_object(sha256: str, s3_key: str, size_bytes: int, content_type: Optional[str]) -> ObjectReference:
+    """
+    Take a reference to the object for `sha256`, registering it under
+    `s3_key` (as pending) if the hash is new.
+
+    Returns:
+        The object's key, whether this call created the row (the caller
+        must upload it), and its status
+    """
+    client = get_supabase_client()
+    try:
+        result = client.rpc("acquire_document_object", {
+            "p_sha256": sha256,
+            "p_s3_key": s3_key,
+            "p_size_bytes": size_bytes,
+            "p_content_type": content_type,
+        }).execute()
+        row = (result.data or [{}])[0]
+        return ObjectReference(row.get("s3_key") or s3_key, bool(row.get("created")), row.get("status"))
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+
+    rows = (
+        client.table(OBJECTS_TABLE)
+        .select("s3_key, ref_count, status")
+        .eq("sha256", sha256)
+        .limit(1)
+        .execute()
+    ).data or []
+    if rows:
+        (
+            client.table(OBJECTS_TABLE)
+            .update({"ref_count": (rows[0].get("ref_count") or 0) + 1, "updated_at": _now()})
+            .eq("sha256", sha256)
+            .execute()
+        )
+        return ObjectReference(rows[0]["s3_key"], False, rows[0].get("status"))
+
+    client.table(OBJECTS_TABLE).insert({
+        "sha256": sha256,
+        "s3_key": s3_key,
+        "size_bytes": size_bytes,
+        "content_type": content_type,
+        "ref_count": 1,
+        "status": OBJECT_PENDING,
+    }).execute()
+    return ObjectReference(s3_key, True, OBJECT_PENDING)
+
+
+def mark_object_stored(sha256: str):
+    """Record that the object for `sha256` is in S3, so later uploads reuse it without checking."""
+    client = get_supabase_client()
+    try:
+        (
+            client.table(OBJECTS_TABLE)
+            .update({"status": OBJECT_STORED, "updated_at": _now()})
+            .eq("sha256", sha256)
+            .execute()
+        )
+    except Exception as e:
+        # Later uploads of this content fall back to head_object
+        logger.warning(f"Failed to mark document object {sha256} as stored: {e}")
+
+
+def _object_exists(s3, bucket: str, s3_key: str) -> bool:
+    try:
+        s3.head_object(Bucket=bucket, Key=s3_key)
+        return True
+    except Exception:
+        return False
+
+
+def release_object(sha256: str) -> Optional[str]:
+    """
+    Drop one reference to the object for `sha256`.
+
+    Returns:
+        The S3 key if that was the last reference (the row is gone and the
+        object should be deleted), else None
+    """
+    client = get_supabase_client()
+    try:
+        result = client.rpc("release_document_object", {"p_sha256": sha256}).execute()
+        row = (result.data or [None])[0]
+        if row and row.get("ref_count") == 0:
+            return row.get("s3_key")
+        return None
+    except Exception as e:
+        if not is_missing_function(e):
+            raise
+
+    rows = (
+        client.table(OBJECTS_TABLE)
+        .select("s3_key, ref_count")
+        .eq("sha256", sha256)
+        .limit(1)
+        .execute()
+    ).data or []
+    if not rows:
+        return None
+
+    remaining = max((rows[0].get("ref_count") or 0) - 1, 0)
+    if remaining:
+        (
+            client.table(OBJECTS_TABLE)
+            .update({"ref_count": remaining, "updated_at": _now()})
+            .eq("sha256", sha256)
+            .execute()
+        )
+        return None
+
+    client.table(OBJECTS_TABLE).delete().eq("sha256", sha256).execute()
+    return rows[0]["s3_key"]
+
+
+# ============================================================
+# Store / release documents
+# ============================================================
+def store_document_file(spooled: SpooledUpload, extension: str = "", content_type: Optional[str] = None) -> StoredDocument:
+    """
+    Store a spooled upload under its content key, or reuse the object
+    already stored for the same content.
+    """
+    try:
+        reference = acquire_object(spooled.sha256, content_key(spooled.sha256, extension), spooled.size_bytes, content_type)
+    except Exception as e:
+        raise HTTPException(500, f"Failed to register document object: {e}")
+    s3_key = reference.s3_key
+
+    if reference.status == OBJECT_STORED:
+        logger.info(f"Upload {spooled.sha256[:12]} matches stored object {s3_key}, skipping S3 upload")
+        return StoredDocument(s3_key, spooled.sha256, True)
+
+    s3, bucket, region = get_s3()
+    if not reference.created and _object_exists(s3, bucket, s3_key):
+        # The first upload finished but didn't get to mark the row
+        logger.info(f"Upload {spooled.sha256[:12]} matches object {s3_key} found in S3, skipping S3 upload")
+        mark_object_stored(spooled.sha256)
+        return StoredDocument(s3_key, spooled.sha256, True)
+
+    try:
+        s3.upload_file(
+            Filename=spooled.path,
+            Bucket=bucket,
+            Key=s3_key,
+            ExtraArgs={"ContentType": content_type} if content_type else None,
+        )
+    except Exception as e:
+        # Drop our reference; the row only goes away with the last one, and
+        # any other upload still holding it stores the object itself
+        try:
+            release_object(spooled.sha256)
+        except Exception as release_error:
+            logger.warning(f"Failed to release document object {spooled.sha256}: {release_error}")
+        raise HTTPException(500, f"S3 upload error: {e}")
+
+    mark_object_stored(spooled.sha256)
+    return StoredDocument(s3_key, spooled.sha256, False)
+
+
+def release_document_files(sha256s: Iterable[Optional[str]]) -> Dict[str, int]:
+    """
+    Drop the references held by deleted documents and delete objects that
+    are no longer referenced. Failures are logged, not raised — the
+    documents are already gone.
+
+    Returns:
+        {"released": n, "deleted": n}
+    """
+    released = deleted = 0
+    s3 = bucket = None
+    for sha256 in sha256s:
+        if not sha256:
+            continue
+        try:
+            orphan_key = release_object(sha256)
+        except Exception as e:
+            logger.warning(f"Failed to release document object {sha256}: {e}")
+            continue
+        released += 1
+        if not orphan_key:
+            continue
+
+        if s3 is None:
+            s3, bucket, region = get_s3()
+        try:
+            s3.delete_object(Bucket=bucket, Key=orphan_key)
+            deleted += 1
+        except Exception as e:
+            logger.warning(f"Failed to delete unreferenced S3 object {orphan_key}: {e}")
+
+    return {"released": released, "deleted": deleted}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,191 @@
+# services/exports.py
+
+"""
+Streaming CSV / NDJSON exports of a building's events and documents.
+
+The report JSON is assembled in memory. Exports instead page through the
+table with keyset pagination on (created_at, id), EXPORT_PAGE_SIZE rows
+at a time, and yield each page as soon as it is encoded. Memory stays
+proportional to one page, however large the building is.
+
+Per row:
+- Columns come from the viewer's role projection (core/projections.py).
+  Roles without explicit rules get the public columns.
+- Non-admin viewers only get rows linked to units they can access, with
+  the same rules as the building report (events) and the document list
+  (documents).
+- unit_ids is attached from the junction table, one query per page.
+"""
+
+import csv
+import io
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from core.logging_config import logger
+from core.permission_helpers import get_user_accessible_unit_ids, is_admin
+from core.projections import PROJECTED_ROLES, select_projected, visible_columns
+from core.responses import dumps
+from core.utils import neutralize_formula
+from dependencies.auth import CurrentUser
+
+
+EXPORT_PAGE_SIZE = 500
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# entity -> (junction table, foreign key column)
+_UNIT_LINKS = {
+    "events": ("event_units", "event_id"),
+    "documents": ("document_units", "document_id"),
+}
+
+# Roles whose document access is checked per building, not per unit
+_BUILDING_LEVEL_DOCUMENT_ROLES = ("aoao", "aoao_staff")
+
+
+def export_role(entity: str, role: str) -> str:
+    """Projection role for exports (roles without explicit rules get the public columns)."""
+    return role if role in PROJECTED_ROLES[entity] else "public"
+
+
+def export_columns(entity: str, role: str) -> List[str]:
+    """Columns of one exported row, in output order."""
+    return [*visible_columns(entity, export_role(entity, role)), "unit_ids"]
+
+
+def iter_keyset_pages(
+    entity: str,
+    role: str,
+    build: Callable,
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield pages of `entity` in (created_at, id) order.
+
+    Each page starts after the last row of the previous one, so a page
+    costs the same however deep into the table it is.
+    """
+    after: Optional[Tuple[str, str]] = None
+    while True:
+        def page_query(query, after=after):
+            query = build(query)
+            if after is not None:
+                created_at, row_id = after
+                query = query.or_(
+                    f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{row_id}")'
+                )
+            return query.order("created_at").order("id").limit(page_size)
+
+        rows = select_projected(entity, role, page_query).data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        after = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def _unit_links(client, entity: str, row_ids: List[str]) -> Dict[str, List[str]]:
+    table, key = _UNIT_LINKS[entity]
+    links: Dict[str, List[str]] = {}
+    if not row_ids:
+        return links
+    result = client.table(table).select(f"{key}, unit_id").in_(key, row_ids).execute()
+    for link in result.data or []:
+        if link.get(key) and link.get("unit_id"):
+            links.setdefault(link[key], []).append(link["unit_id"])
+    return links
+
+
+def _row_visible(entity: str, user: CurrentUser, unit_ids: List[str], accessible: Optional[Set[str]]) -> bool:
+    if accessible is None:
+        return True
+    if entity == "events":
+        # Same as the building report: events must touch an accessible unit
+        return any(uid in accessible for uid in unit_ids)
+    if user.role in _BUILDING_LEVEL_DOCUMENT_ROLES or not unit_ids:
+        # Building access was checked before the export started
+        return True
+    return any(uid in accessible for uid in unit_ids)
+
+
+def iter_export_rows(
+    client,
+    entity: str,
+    building_id: str,
+    user: CurrentUser,
+    role: str,
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield pages of sanitized rows for one building."""
+    columns = export_columns(entity, role)
+    projection_role = export_role(entity, role)
+
+    accessible: Optional[Set[str]] = None
+    if not is_admin(user):
+        unit_ids = get_user_accessible_unit_ids(user)
+        accessible = set(unit_ids) if unit_ids is not None else None
+
+    pages = iter_keyset_pages(
+        entity, projection_role, lambda q: q.eq("building_id", building_id), page_size,
+    )
+    for page in pages:
+        links = _unit_links(client, entity, [row["id"] for row in page])
+        rows = []
+        for row in page:
+            unit_ids = links.get(row["id"], [])
+            if not _row_visible(entity, user, unit_ids, accessible):
+                continue
+            row["unit_ids"] = unit_ids
+            rows.append({column: row.get(column) for column in columns})
+        if rows:
+            yield rows
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, list):
+        value = ";".join(str(item) for item in value)
+    elif isinstance(value, dict):
+        value = dumps(value).decode()
+    # Exports are opened in spreadsheet apps: user text must not run as a formula
+    return neutralize_formula(value)
+
+
+def encode_csv(pages: Iterator[List[Dict[str, Any]]], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+    for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow([_csv_value(row.get(column)) for column in columns])
+        yield buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(pages: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for rows in pages:
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def stream_export(
+    client,
+    entity: str,
+    building_id: str,
+    user: CurrentUser,
+    role: str,
+    format: str,
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> Iterator[bytes]:
+    """Encoded chunks of the export, one per page (the CSV header comes first)."""
+    pages = iter_export_rows(client, entity, building_id, user, role, page_size)
+    chunks = encode_csv(pages, export_columns(entity, role)) if format == "csv" else encode_ndjson(pages)
+    try:
+        yield from chunks
+    except Exception as e:
+        # Headers are already sent; the client sees a truncated body
+        logger.error(f"{entity} export for building {building_id} failed mid-stream: {e}")
+        raise
@@ -0,0 +1,281 @@
+# services/logo_images.py
+
+"""
+Logo image pipeline for contractors, PM companies and AOAO organizations.
+
+Logos used to be stored exactly as uploaded, so a multi-megabyte PNG was
+downloaded with every public report. Uploads are now:
+
+1. Spooled to disk in chunks (at most MAX_LOGO_BYTES) and identified by
+   their magic bytes, not the filename extension.
+2. Resized in a worker pool (Pillow) into the LOGO_RENDITIONS, each as
+   WebP and PNG (PNG for PDF reports and email clients without WebP).
+3. Uploaded under a content-hash prefix with an immutable Cache-Control
+   header — a new logo gets new keys, so the old URLs never go stale.
+
+logo_url points at the WebP report-header rendition.
+
+Settings:
+- IMAGE_WORKERS: pool size (0 runs in the threadpool, in-process)
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.lazy_imports import is_installed
+from core.logging_config import logger
+from core.s3_client import get_s3
+
+
+MAX_LOGO_BYTES = 5 * 1024 * 1024  # 5MB
+
+# Decoded size limit (decompression bombs fit easily in 5MB)
+MAX_LOGO_PIXELS = 40_000_000
+
+SPOOL_CHUNK_BYTES = 256 * 1024
+
+# name -> bounding box (width, height); images are never upscaled
+LOGO_RENDITIONS: Dict[str, Tuple[int, int]] = {
+    "thumbnail": (128, 128),
+    "report_header": (600, 200),
+}
+RENDITION_FORMATS = ("webp", "png")
+
+# Rendition used for logo_url
+DEFAULT_RENDITION = ("report_header", "webp")
+
+# Keys are content-addressed, so objects can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# format -> (extension, content type)
+IMAGE_TYPES = {
+    "jpeg": (".jpg", "image/jpeg"),
+    "png": (".png", "image/png"),
+    "gif": (".gif", "image/gif"),
+    "webp": (".webp", "image/webp"),
+}
+
+
+class InvalidImageError(ValueError):
+    """The input is not a supported image."""
+
+
+class Rendition(NamedTuple):
+    name: str
+    format: str
+    path: str
+    width: int
+    height: int
+
+
+class LogoUpload(NamedTuple):
+    s3_key: str                     # original image
+    logo_url: str                   # DEFAULT_RENDITION
+    renditions: Dict[str, str]      # "<name>_<format>" -> public URL
+
+
+def detect_image_format(head: bytes) -> Optional[str]:
+    """Image format from the first bytes of a file (a key of IMAGE_TYPES), or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+# ============================================================
+# Worker side (runs in the pool processes)
+# ============================================================
+def render_logo(input_path: str, output_dir: str) -> List[Rendition]:
+    """Write every LOGO_RENDITIONS x RENDITION_FORMATS rendition of one image to output_dir."""
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(input_path) as image:
+            if image.width * image.height > MAX_LOGO_PIXELS:
+                raise InvalidImageError(f"Image is too large ({image.width}x{image.height})")
+            image.seek(0)  # first frame of animated GIF/WebP
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+    except InvalidImageError:
+        raise
+    except Exception as e:
+        raise InvalidImageError(f"Failed to read image: {e}")
+
+    renditions = []
+    for name, box in LOGO_RENDITIONS.items():
+        resized = image.copy()
+        resized.thumbnail(box, Image.LANCZOS)
+        for fmt in RENDITION_FORMATS:
+            path = os.path.join(output_dir, f"{name}.{fmt}")
+            if fmt == "webp":
+                resized.save(path, "WEBP", quality=85, method=4)
+            else:
+                resized.save(path, "PNG", optimize=True)
+            renditions.append(Rendition(name, fmt, path, resized.width, resized.height))
+    return renditions
+
+
+def _has_alpha(image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+# ============================================================
+# Pool management (API side)
+# ============================================================
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def get_image_pool() -> Optional[ProcessPoolExecutor]:
+    """The shared process pool, or None when IMAGE_WORKERS is 0."""
+    global _pool
+    if settings.IMAGE_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, for the same reason as the redaction pool
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown_image_pool(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+async def run_in_image_pool(func, *args):
+    """Run func(*args) in the image pool (or the threadpool when disabled)."""
+    pool = get_image_pool()
+    if pool is None:
+        return await run_in_threadpool(func, *args)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        logger.error("Image worker pool broke; recreating on next request")
+        shutdown_image_pool(wait=False)
+        raise
+
+
+# ============================================================
+# Upload
+# ============================================================
+def public_url(bucket: str, region: str, s3_key: str) -> str:
+    """Permanent public URL (the bucket policy allows public reads of logo paths)."""
+    if region == "us-east-1":
+        # us-east-1 uses a different URL format
+        return f"https://{bucket}.s3.amazonaws.com/{s3_key}"
+    return f"https://{bucket}.s3.{region}.amazonaws.com/{s3_key}"
+
+
+async def _spool(file: UploadFile, path: str) -> Tuple[str, str]:
+    """Copy the upload to `path`, enforcing MAX_LOGO_BYTES. Returns (format, sha256)."""
+    digest = hashlib.sha256()
+    size = 0
+    image_format = None
+    with open(path, "wb") as out:
+        while True:
+            chunk = await file.read(SPOOL_CHUNK_BYTES)
+            if not chunk:
+                break
+            if image_format is None:
+                image_format = detect_image_format(chunk[:16])
+                if image_format is None:
+                    raise HTTPException(400, f"Invalid file type. Allowed formats: {', '.join(IMAGE_TYPES)}")
+            size += len(chunk)
+            if size > MAX_LOGO_BYTES:
+                raise HTTPException(400, f"File size exceeds maximum of {MAX_LOGO_BYTES / 1024 / 1024}MB")
+            digest.update(chunk)
+            out.write(chunk)
+    if image_format is None:
+        raise HTTPException(400, "Uploaded file is empty")
+    return image_format, digest.hexdigest()
+
+
+def _upload_files(s3, bucket: str, uploads: List[Tuple[str, str, str]]):
+    for path, key, content_type in uploads:
+        s3.upload_file(
+            Filename=path,
+            Bucket=bucket,
+            Key=key,
+            ExtraArgs={"ContentType": content_type, "CacheControl": IMMUTABLE_CACHE_CONTROL},
+        )
+
+
+async def process_logo_upload(file: UploadFile, key_prefix: str) -> LogoUpload:
+    """
+    Validate, resize and upload a logo.
+
+    Args:
+        file: The uploaded image (JPEG, PNG, GIF or WebP)
+        key_prefix: S3 prefix for this owner, e.g. "contractors/logos/<id>"
+
+    Raises:
+        HTTPException: 400 for invalid images, 500 if storage fails
+    """
+    if not is_installed("PIL"):
+        raise HTTPException(500, "Image processing not available")
+
+    try:
+        s3, bucket, region = get_s3()
+    except RuntimeError as e:
+        logger.error(f"S3 configuration error: {e}")
+        raise HTTPException(500, "File storage not configured")
+
+    workdir = tempfile.mkdtemp(prefix="aina-logo-")
+    try:
+        original_path = os.path.join(workdir, "original")
+        image_format, sha256 = await _spool(file, original_path)
+
+        try:
+            renditions = await run_in_image_pool(render_logo, original_path, workdir)
+        except InvalidImageError as e:
+            raise HTTPException(400, str(e))
+
+        base_key = f"{key_prefix}/{sha256[:16]}"
+        extension, content_type = IMAGE_TYPES[image_format]
+        original_key = f"{base_key}/original{extension}"
+        uploads = [(original_path, original_key, content_type)]
+        urls = {}
+        for rendition in renditions:
+            key = f"{base_key}/{rendition.name}.{rendition.format}"
+            uploads.append((rendition.path, key, IMAGE_TYPES[rendition.format][1]))
+            urls[f"{rendition.name}_{rendition.format}"] = public_url(bucket, region, key)
+
+        try:
+            await run_in_threadpool(_upload_files, s3, bucket, uploads)
+        except Exception as e:
+            logger.error(f"S3 upload error: {e}")
+            raise HTTPException(500, f"Failed to upload logo: {e}")
+        logger.info(f"Uploaded logo {original_key} with {len(renditions)} renditions")
+
+        return LogoUpload(
+            s3_key=original_key,
+            logo_url=urls["_".join(DEFAULT_RENDITION)],
+            renditions=urls,
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,264 @@
+# services/pdf_redaction.py
+
+"""
+PDF redaction engine.
+
+Redactions run in a process pool so PyMuPDF never blocks the event loop
+(or holds the GIL for the other requests on the worker). Input and output
+are spooled to temp files rather than passed around as bytes, and only the
+pages that actually carry boxes have their redactions applied.
+
+Boxes are plain (page_index, x, y, width, height) tuples so they pickle
+cheaply across the process boundary. By default they are in PyMuPDF page
+coordinates; flip_y=True converts from the manual-redaction canvas
+convention (y = page_height - (y + height)) on the worker, where the page
+heights are known.
+
+Settings:
+- REDACTION_WORKERS: pool size (0 runs in the threadpool, in-process)
+- REDACTION_JOB_THRESHOLD_BYTES: uploads above this size are processed
+  as background jobs instead of inline
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.logging_config import logger
+from core.state_backend import get_state_backend
+
+
+# (page_index, x, y, width, height), page_index 0-based
+Box = Tuple[int, float, float, float, float]
+
+# Chunk size when spooling uploads to disk
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+REDACTION_FILL = (0, 0, 0)
+
+# Job records live in the shared state backend so any worker can report them
+JOB_KEY_PREFIX = "redaction_job:"
+JOB_TTL_SECONDS = 86400  # 1 day, same as the presigned URL
+
+
+class InvalidPDFError(ValueError):
+    """The input could not be opened as a PDF."""
+
+
+# ============================================================
+# Worker side (runs in the pool processes)
+# ============================================================
+def group_boxes_by_page(boxes: Iterable[Box]) -> Dict[int, List[Box]]:
+    pages: Dict[int, List[Box]] = defaultdict(list)
+    for box in boxes:
+        pages[box[0]].append(box)
+    return dict(pages)
+
+
+def open_pdf(path: str):
+    import fitz
+
+    try:
+        return fitz.open(path, filetype="pdf")
+    except Exception as e:
+        raise InvalidPDFError(f"Failed to open PDF: {e}")
+
+
+def apply_boxes(doc, boxes: Iterable[Box], flip_y: bool = False) -> Dict[str, int]:
+    """
+    Add and apply redaction annotations for `boxes` on an open document.
+
+    Only pages with at least one box are loaded and redacted; boxes on
+    pages outside the document are skipped.
+
+    Args:
+        flip_y: Boxes use the manual-redaction canvas convention and are
+            converted with page_height - (y + height)
+    """
+    import fitz
+
+    page_count = len(doc)
+    applied = skipped = 0
+    pages_redacted = 0
+
+    for page_index, page_boxes in sorted(group_boxes_by_page(boxes).items()):
+        if page_index < 0 or page_index >= page_count:
+            skipped += len(page_boxes)
+            continue
+
+        page = doc.load_page(page_index)
+        page_height = page.rect.height
+        for _, x, y, width, height in page_boxes:
+            if flip_y:
+                y = page_height - (y + height)
+            page.add_redact_annot(fitz.Rect(x, y, x + width, y + height), fill=REDACTION_FILL)
+            applied += 1
+        page.apply_redactions()
+        pages_redacted += 1
+
+    return {
+        "pages": page_count,
+        "pages_redacted": pages_redacted,
+        "boxes_applied": applied,
+        "boxes_skipped": skipped,
+    }
+
+
+def save_pdf(doc, output_path: str):
+    # apply_redactions() already rewrote the content of the redacted
+    # pages, so a full clean=True pass over every page is not needed
+    doc.save(output_path, garbage=3, deflate=True)
+
+
+def redact_file(input_path: str, output_path: str, boxes: List[Box], flip_y: bool = False) -> Dict[str, int]:
+    """
+    Apply `boxes` to the PDF at input_path and write the result to output_path.
+
+    Returns:
+        Counts: pages, pages_redacted, boxes_applied, boxes_skipped
+    """
+    doc = open_pdf(input_path)
+    try:
+        stats = apply_boxes(doc, boxes, flip_y)
+        save_pdf(doc, output_path)
+    finally:
+        doc.close()
+    return stats
+
+
+# ============================================================
+# Pool management (API side)
+# ============================================================
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def get_redaction_pool() -> Optional[ProcessPoolExecutor]:
+    """The shared process pool, or None when REDACTION_WORKERS is 0."""
+    global _pool
+    if settings.REDACTION_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that runs threads (uvicorn, the
+                # state sweeper, httpx pools) is not safe
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.REDACTION_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown_redaction_pool(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+async def run_in_redaction_pool(func, *args):
+    """Run func(*args) in the redaction pool (or the threadpool when disabled)."""
+    pool = get_redaction_pool()
+    if pool is None:
+        return await run_in_threadpool(func, *args)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge PDF); start fresh next time
+        logger.error("Redaction worker pool broke; recreating on next request")
+        shutdown_redaction_pool(wait=False)
+        raise
+
+
+async def redact_pdf(input_path: str, output_path: str, boxes: List[Box], flip_y: bool = False) -> Dict[str, int]:
+    return await run_in_redaction_pool(redact_file, input_path, output_path, boxes, flip_y)
+
+
+# ============================================================
+# Temp file spooling
+# ============================================================
+class RedactionWorkspace:
+    """Temp directory holding one redaction's input and output files."""
+
+    def __init__(self):
+        self.path = tempfile.mkdtemp(prefix="aina-redact-")
+        self.input_path = os.path.join(self.path, "input.pdf")
+        self.output_path = os.path.join(self.path, "output.pdf")
+
+    @property
+    def input_size(self) -> int:
+        return os.path.getsize(self.input_path)
+
+    @property
+    def output_size(self) -> int:
+        return os.path.getsize(self.output_path)
+
+    async def spool(self, fileobj) -> int:
+        """Copy an upload's file object to input.pdf. Returns the size in bytes."""
+        def _copy():
+            fileobj.seek(0)
+            with open(self.input_path, "wb") as out:
+                shutil.copyfileobj(fileobj, out, SPOOL_CHUNK_BYTES)
+
+        await run_in_threadpool(_copy)
+        return self.input_size
+
+    def download(self, s3, bucket: str, key: str) -> str:
+        """Stream an S3 object to input.pdf. Returns its sha256 hex digest."""
+        digest = hashlib.sha256()
+        body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+        with open(self.input_path, "wb") as out:
+            for chunk in iter(lambda: body.read(SPOOL_CHUNK_BYTES), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        return digest.hexdigest()
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def upload_redacted_pdf(s3, bucket: str, workspace: RedactionWorkspace, s3_key: str):
+    """Stream output.pdf to S3 (multipart for large files) without reading it into memory."""
+    s3.upload_file(
+        Filename=workspace.output_path,
+        Bucket=bucket,
+        Key=s3_key,
+        ExtraArgs={"ContentType": "application/pdf"},
+    )
+
+
+def is_large_upload(size_bytes: int) -> bool:
+    threshold = settings.REDACTION_JOB_THRESHOLD_BYTES
+    return bool(threshold) and size_bytes > threshold
+
+
+
+# ============================================================
+# Background jobs
+# ============================================================
+def save_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    get_state_backend().set(JOB_KEY_PREFIX + job["job_id"], job, ttl_seconds=JOB_TTL_SECONDS)
+    return job
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return get_state_backend().get(JOB_KEY_PREFIX + job_id)
+
+
+def update_job(job_id: str, **fields) -> Dict[str, Any]:
+    job = get_job(job_id) or {"job_id": job_id}
+    job.update(fields)
+    return save_job(job)
@@ -0,0 +1,499 @@
+# services/pii_redaction.py
+
+"""
+Automatic PII redaction for stored documents.
+
+Each PDF is scanned in the redaction worker pool: PyMuPDF extracts word
+boxes per page, regexes find SSNs, phone numbers, emails, account numbers
+and the owner names of the document's units, and the matching word boxes
+go through the same apply/save path as manual redaction
+(services.pdf_redaction.apply_boxes).
+
+Extracted words are stored per page in S3 (PAGE_TEXT_PREFIX, keyed by the
+sha256 of the file), so re-running detection on an unchanged document
+(e.g. after owner names change) skips text extraction entirely, including
+from jobs/auto_redact_job.py, which starts a fresh process on every run.
+"""
+
+import asyncio
+import gzip
+import json
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Pattern, Sequence, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from core.cache import invalidate_tags, building_tag
+from core.config import settings
+from core.logging_config import logger
+from core.responses import dumps
+from core.s3_client import get_s3
+from core.supabase_client import get_supabase_client
+from services.pdf_redaction import (
+    Box,
+    InvalidPDFError,
+    RedactionWorkspace,
+    apply_boxes,
+    open_pdf,
+    run_in_redaction_pool,
+    save_pdf,
+    upload_redacted_pdf,
+    update_job,
+)
+
+
+# PyMuPDF "words" tuple: (x0, y0, x1, y1, text, block_no, line_no, word_no)
+Word = Tuple[float, float, float, float, str, int, int, int]
+
+PII_KINDS = ("ssn", "phone", "email", "account_number", "owner_name")
+
+PII_PATTERNS: Dict[str, Pattern] = {
+    "ssn": re.compile(r"(?<!\d)\d{3}[- ]\d{2}[- ]\d{4}(?!\d)"),
+    "phone": re.compile(r"(?<![\d-])(?:\+?1[ .-]?)?(?:\(\d{3}\) ?|\d{3}[ .-]?)\d{3}[ .-]\d{4}(?![\d-])"),
+    "email": re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
+    # Numbers introduced by an account keyword, or bare 10-17 digit runs
+    "account_number": re.compile(
+        r"(?i)\b(?:account|acct|a/c|routing|iban)\b\.?(?:[ ]*(?:no\.?|number|#))?[ :#.]*(?P<value>[A-Z]{0,2}\d[\d -]{4,}\d)"
+        r"|(?<![\d-])(?P<bare>\d{10,17})(?![\d-])"
+    ),
+}
+
+# Separators between several owners in one units.owner_name value
+OWNER_NAME_SEPARATORS = re.compile(r"\s*(?:[;,/&]|\band\b)\s*", re.IGNORECASE)
+
+# Extracted page words, one gzipped JSON object per file hash. Unchanged
+# files keep their hash, so the objects never go stale; an S3 lifecycle
+# rule on this prefix can expire them to bound storage.
+PAGE_TEXT_PREFIX = "pii-text/"
+
+# Documents fetched per Supabase round-trip
+DOCUMENT_BATCH_SIZE = 100
+
+
+class PIIMatch(NamedTuple):
+    kind: str
+    page: int
+    text: str
+    box: Box
+
+
+# ============================================================
+# Detection
+# ============================================================
+def split_owner_names(raw_names: Iterable[Optional[str]]) -> List[str]:
+    """
+    Individual names from units.owner_name values ("Jane & John Doe; Kai Akana").
+    Single words are dropped: a lone surname would redact too much.
+    """
+    names = set()
+    for raw in raw_names:
+        for part in OWNER_NAME_SEPARATORS.split(raw or ""):
+            part = " ".join(part.split())
+            if len(part.split()) >= 2:
+                names.add(part)
+    return sorted(names)
+
+
+def owner_name_pattern(names: Sequence[str]) -> Optional[Pattern]:
+    if not names:
+        return None
+    # Longest first so "Jane Doe Smith" wins over "Jane Doe"
+    alternatives = [
+        r"[ ]+".join(re.escape(token) for token in name.split())
+        for name in sorted(names, key=len, reverse=True)
+    ]
+    return re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)", re.IGNORECASE)
+
+
+def _lines(words: Iterable[Word]) -> List[List[Word]]:
+    lines: Dict[Tuple[int, int], List[Word]] = defaultdict(list)
+    for word in words:
+        lines[(word[5], word[6])].append(word)
+    return [sorted(line, key=lambda w: w[7]) for _, line in sorted(lines.items())]
+
+
+def find_pii(
+    page_index: int,
+    words: Sequence[Word],
+    owner_pattern: Optional[Pattern] = None,
+    kinds: Iterable[str] = PII_KINDS,
+) -> List[PIIMatch]:
+    """
+    Match PII patterns line by line and return one box per match,
+    covering the words the match touches.
+    """
+    patterns = [(kind, PII_PATTERNS[kind]) for kind in kinds if kind in PII_PATTERNS]
+    if owner_pattern is not None and "owner_name" in kinds:
+        patterns.append(("owner_name", owner_pattern))
+
+    matches = []
+    for line in _lines(words):
+        text = ""
+        spans = []
+        for word in line:
+            if text:
+                text += " "
+            spans.append((len(text), len(text) + len(word[4]), word))
+            text += word[4]
+
+        for kind, pattern in patterns:
+            for m in pattern.finditer(text):
+                group = next((g for g in ("value", "bare") if g in pattern.groupindex and m.group(g)), 0)
+                start, end = m.span(group)
+                covered = [w for s, e, w in spans if s < end and e > start]
+                if not covered:
+                    continue
+                x0 = min(w[0] for w in covered)
+                y0 = min(w[1] for w in covered)
+                x1 = max(w[2] for w in covered)
+                y1 = max(w[3] for w in covered)
+                matches.append(PIIMatch(kind, page_index, m.group(group), (page_index, x0, y0, x1 - x0, y1 - y0)))
+    return matches
+
+
+# ============================================================
+# Worker side (runs in the redaction pool)
+# ============================================================
+def scan_and_redact_file(
+    input_path: str,
+    output_path: str,
+    owner_names: List[str],
+    cached_words: Dict[int, List[Word]],
+    kinds: Sequence[str] = PII_KINDS,
+) -> Dict[str, Any]:
+    """
+    Detect PII on every page and, if anything matched, write the redacted
+    PDF to output_path.
+
+    Pages in cached_words are not re-extracted; newly extracted pages are
+    returned under "extracted" so the caller can cache them.
+    """
+    doc = open_pdf(input_path)
+    try:
+        owner_pattern = owner_name_pattern(owner_names)
+        extracted: Dict[int, List[Word]] = {}
+        matches: List[PIIMatch] = []
+
+        for page_index in range(len(doc)):
+            words = cached_words.get(page_index)
+            if words is None:
+                words = [tuple(w) for w in doc.load_page(page_index).get_text("words")]
+                extracted[page_index] = words
+            matches.extend(find_pii(page_index, words, owner_pattern, kinds))
+
+        stats = {"pages": len(doc), "pages_redacted": 0, "boxes_applied": 0, "boxes_skipped": 0}
+        if matches:
+            stats = apply_boxes(doc, [m.box for m in matches])
+            save_pdf(doc, output_path)
+    finally:
+        doc.close()
+
+    return {
+        **stats,
+        "matches": dict(Counter(m.kind for m in matches)),
+        "extracted": extracted,
+    }
+
+
+# ============================================================
+# Page text store
+# ============================================================
+def page_text_key(file_hash: str) -> str:
+    return f"{PAGE_TEXT_PREFIX}{file_hash}.json.gz"
+
+
+def get_cached_words(s3, bucket: str, file_hash: str) -> Dict[int, List[Word]]:
+    """Stored page words for a file, by page index ({} if none are stored)."""
+    try:
+        body = s3.get_object(Bucket=bucket, Key=page_text_key(file_hash))["Body"].read()
+    except Exception:
+        return {}
+    try:
+        pages = json.loads(gzip.decompress(body))
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable page text for {file_hash}: {e}")
+        return {}
+    return {int(page_index): [tuple(w) for w in words] for page_index, words in pages.items()}
+
+
+def cache_words(s3, bucket: str, file_hash: str, cached: Dict[int, List[Word]], extracted: Dict[int, List[Word]]):
+    """Store the words of every known page, so later scans skip extraction."""
+    pages = {str(page_index): words for page_index, words in {**cached, **extracted}.items()}
+    try:
+        s3.put_object(
+            Bucket=bucket,
+            Key=page_text_key(file_hash),
+            Body=gzip.compress(dumps(pages)),
+            ContentType="application/json",
+            ContentEncoding="gzip",
+        )
+    except Exception as e:
+        # Only costs a re-extraction next time
+        logger.warning(f"Could not store page text for {file_hash}: {e}")
+
+
+# ============================================================
+# Batch pipeline
+# ============================================================
+def load_documents(document_ids: Sequence[str]) -> Tuple[List[dict], Dict[str, List[str]]]:
+    """
+    Fetch documents and the owner names to look for in each.
+
+    Unit documents use their units' owners; building-level documents use
+    every owner in the building. A fixed number of queries per batch.
+    """
+    client = get_supabase_client()
+    documents: List[dict] = []
+    for i in range(0, len(document_ids), DOCUMENT_BATCH_SIZE):
+        chunk = list(document_ids[i:i + DOCUMENT_BATCH_SIZE])
+        rows = (
+            client.table("documents")
+            .select("id, building_id, s3_key, original_s3_key, filename, is_redacted, pii_redacted_s3_key")
+            .in_("id", chunk)
+            .execute()
+        ).data or []
+        documents.extend(rows)
+
+    doc_ids = [d["id"] for d in documents]
+    units_by_document: Dict[str, List[str]] = defaultdict(list)
+    if doc_ids:
+        links = (
+            client.table("document_units")
+            .select("document_id, unit_id")
+            .in_("document_id", doc_ids)
+            .execute()
+        ).data or []
+        for link in links:
+            units_by_document[link["document_id"]].append(link["unit_id"])
+
+    unit_ids = sorted({uid for uids in units_by_document.values() for uid in uids})
+    building_ids = sorted({d["building_id"] for d in documents if d["id"] not in units_by_document and d.get("building_id")})
+
+    owners_by_unit: Dict[str, str] = {}
+    owners_by_building: Dict[str, List[str]] = defaultdict(list)
+    if unit_ids:
+        for unit in (client.table("units").select("id, owner_name").in_("id", unit_ids).execute()).data or []:
+            owners_by_unit[unit["id"]] = unit.get("owner_name")
+    if building_ids:
+        rows = (
+            client.table("units")
+            .select("building_id, owner_name")
+            .in_("building_id", building_ids)
+            .execute()
+        ).data or []
+        for unit in rows:
+            owners_by_building[unit["building_id"]].append(unit.get("owner_name"))
+
+    owner_names = {}
+    for document in documents:
+        if document["id"] in units_by_document:
+            raw = [owners_by_unit.get(uid) for uid in units_by_document[document["id"]]]
+        else:
+            raw = owners_by_building.get(document.get("building_id"), [])
+        owner_names[document["id"]] = split_owner_names(raw)
+
+    return documents, owner_names
+
+
+def record_scan(document_id: str, status: str, file_hash: Optional[str] = None, redacted_key: Optional[str] = None):
+    """
+    Store the scan outcome on the document, so the batch job moves on to
+    other documents instead of rescanning this one.
+    """
+    update = {
+        "pii_scanned_at": datetime.utcnow().isoformat(),
+        "pii_scan_status": status,
+        "pii_scanned_sha256": file_hash,
+    }
+    if status != "failed":
+        # A failed scan keeps pointing at the last redacted copy, so it can still be deleted
+        update["pii_redacted_s3_key"] = redacted_key
+
+    client = get_supabase_client()
+    try:
+        client.table("documents").update(update).eq("id", document_id).execute()
+    except Exception as e:
+        # The scan result is still returned; the document is picked up again next run
+        logger.warning(f"Could not record PII scan of document {document_id}: {e}")
+
+
+def redacted_document_key(document: dict) -> str:
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    return f"redacted/documents/{document['id']}/{timestamp}_auto_redacted.pdf"
+
+
+def redacted_copy_keys(document: dict) -> Set[str]:
+    """
+    Redacted copies a documents row refers to. They are stored per document,
+    not content-addressed, so document_storage's refcounting doesn't cover them.
+    """
+    keys = {document.get("pii_redacted_s3_key")}
+    if document.get("original_s3_key") and document.get("s3_key") != document["original_s3_key"]:
+        # s3_key was replaced by a redacted copy
+        keys.add(document.get("s3_key"))
+    keys.discard(None)
+    return keys
+
+
+def delete_redacted_copies(documents: Iterable[dict]) -> int:
+    """
+    Delete the redacted copies of deleted documents. Failures are logged,
+    not raised — the documents are already gone.
+
+    Returns:
+        Number of objects deleted
+    """
+    keys = sorted(set().union(*(redacted_copy_keys(d) for d in documents)))
+    if not keys:
+        return 0
+
+    s3, bucket, _ = get_s3()
+    deleted = 0
+    for key in keys:
+        try:
+            s3.delete_object(Bucket=bucket, Key=key)
+            deleted += 1
+        except Exception as e:
+            logger.warning(f"Failed to delete redacted copy {key}: {e}")
+    return deleted
+
+
+def _discard_previous_copy(s3, bucket: str, document: dict, keep: Iterable[Optional[str]]):
+    """Delete the copy from an earlier scan once the row no longer refers to it."""
+    previous = document.get("pii_redacted_s3_key")
+    if not previous or previous in set(keep):
+        return
+    try:
+        s3.delete_object(Bucket=bucket, Key=previous)
+    except Exception as e:
+        logger.warning(f"Failed to delete previous redacted copy {previous}: {e}")
+
+
+async def auto_redact_document(
+    document: dict,
+    owner_names: List[str],
+    kinds: Sequence[str] = PII_KINDS,
+    replace_original: bool = False,
+) -> Dict[str, Any]:
+    """
+    Scan one document and upload a redacted copy if PII was found.
+
+    The outcome (clean, redacted or failed) is recorded on the document
+    row with record_scan(). With replace_original, the row is also
+    pointed at the redacted copy (the previous key is kept in
+    original_s3_key).
+
+    Returns:
+        {"document_id", "status": redacted|clean|skipped|failed, ...}
+    """
+    result: Dict[str, Any] = {"document_id": document["id"]}
+    s3_key = document.get("s3_key")
+    if not s3_key or not s3_key.lower().endswith(".pdf"):
+        return {**result, "status": "skipped", "reason": "not a PDF"}
+
+    workspace = RedactionWorkspace()
+    file_hash = None
+    try:
+        s3, bucket, _ = get_s3()
+        file_hash = await run_in_threadpool(workspace.download, s3, bucket, s3_key)
+        cached = await run_in_threadpool(get_cached_words, s3, bucket, file_hash)
+
+        scan = await run_in_redaction_pool(
+            scan_and_redact_file, workspace.input_path, workspace.output_path,
+            owner_names, cached, list(kinds),
+        )
+        if scan["extracted"]:
+            await run_in_threadpool(cache_words, s3, bucket, file_hash, cached, scan["extracted"])
+
+        result.update(
+            pages=scan["pages"],
+            pages_cached=len(cached),
+            matches=scan["matches"],
+        )
+        if not scan["matches"]:
+            await run_in_threadpool(record_scan, document["id"], "clean", file_hash)
+            await run_in_threadpool(_discard_previous_copy, s3, bucket, document, [s3_key])
+            return {**result, "status": "clean"}
+
+        redacted_key = redacted_document_key(document)
+        await run_in_threadpool(upload_redacted_pdf, s3, bucket, workspace, redacted_key)
+        result.update(status="redacted", redacted_s3_key=redacted_key, pages_redacted=scan["pages_redacted"])
+
+        if replace_original:
+            client = get_supabase_client()
+            await run_in_threadpool(
+                lambda: client.table("documents")
+                # A re-scan of a replaced document keeps the unredacted upload as the original
+                .update({
+                    "s3_key": redacted_key,
+                    "original_s3_key": document.get("original_s3_key") or s3_key,
+                    "is_redacted": True,
+                })
+                .eq("id", document["id"])
+                .execute()
+            )
+            if document.get("building_id"):
+                invalidate_tags(building_tag(document["building_id"]))
+        await run_in_threadpool(record_scan, document["id"], "redacted", file_hash, redacted_key)
+        current_key = redacted_key if replace_original else s3_key
+        await run_in_threadpool(_discard_previous_copy, s3, bucket, document, [redacted_key, current_key])
+        return result
+
+    except InvalidPDFError as e:
+        await run_in_threadpool(record_scan, document["id"], "failed", file_hash)
+        return {**result, "status": "failed", "error": str(e)}
+    except Exception as e:
+        logger.error(f"Auto-redaction failed for document {document['id']}: {e}")
+        await run_in_threadpool(record_scan, document["id"], "failed", file_hash)
+        return {**result, "status": "failed", "error": str(e)}
+    finally:
+        workspace.cleanup()
+
+
+async def run_auto_redaction(
+    document_ids: Sequence[str],
+    kinds: Sequence[str] = PII_KINDS,
+    replace_original: bool = False,
+    job_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Auto-redact many documents, as many at a time as there are redaction
+    workers. Progress is recorded on job_id when given.
+    """
+    try:
+        documents, owner_names = await run_in_threadpool(load_documents, list(document_ids))
+    except Exception as e:
+        logger.error(f"Auto-redaction could not load documents: {e}")
+        if job_id:
+            update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow().isoformat())
+        raise
+
+    found = {d["id"] for d in documents}
+    results: List[Dict[str, Any]] = [
+        {"document_id": doc_id, "status": "skipped", "reason": "not found"}
+        for doc_id in document_ids if doc_id not in found
+    ]
+    if job_id:
+        update_job(job_id, status="running", total=len(document_ids), processed=len(results), results=list(results))
+
+    semaphore = asyncio.Semaphore(max(1, settings.REDACTION_WORKERS))
+
+    async def process(document: dict):
+        async with semaphore:
+            result = await auto_redact_document(document, owner_names[document["id"]], kinds, replace_original)
+        results.append(result)
+        if job_id:
+            update_job(job_id, processed=len(results), results=list(results))
+
+    await asyncio.gather(*(process(document) for document in documents))
+
+    if job_id:
+        update_job(
+            job_id,
+            status="succeeded",
+            summary=dict(Counter(r["status"] for r in results)),
+            finished_at=datetime.utcnow().isoformat(),
+        )
+    return results
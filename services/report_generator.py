@@ -1,14 +1,16 @@
 # services/report_generator.py
 
-from typing import Optional, Dict, Any, List, Set
+from typing import Optional, Dict, Any, List, Set, Tuple
 from datetime import datetime, timedelta
 from uuid import uuid4
 import uuid
 import os
-import boto3
 from io import BytesIO
 
 from core.supabase_client import get_supabase_client
+from core.reference_data import reference_names
+from core.projections import select_projected
+from services.report_xlsx import upload_report_xlsx
 from core.permission_helpers import (
     is_admin,
     get_user_accessible_unit_ids,
@@ -93,96 +95,6 @@ def get_effective_role(user: Optional[CurrentUser]) -> str:
     return user.role or "public"
 
 
-# ============================================================
-# Helper — Sanitize event for role
-# ============================================================
-def sanitize_event_for_role(event: Dict[str, Any], role: str) -> Dict[str, Any]:
-    """
-    Sanitize event based on role visibility rules.
-    
-    Rules:
-    - public: No notes, no owner info
-    - owner: contractor_notes only, no internal notes
-    - contractor: contractor_notes only, no owner info, no internal notes
-    - property_manager: contractor_notes, pm_notes (no aoao_notes, admin_notes)
-    - aoao: contractor_notes, pm_notes, aoao_notes (no admin_notes)
-    - admin: All notes
-    """
-    sanitized = event.copy()
-    
-    if role == "public":
-        # Public: Remove all notes and owner info
-        sanitized.pop("contractor_notes", None)
-        sanitized.pop("pm_notes", None)
-        sanitized.pop("aoao_notes", None)
-        sanitized.pop("admin_notes", None)
-        # Remove owner-related fields if they exist
-        sanitized.pop("owner_name", None)
-        sanitized.pop("owner_email", None)
-        sanitized.pop("owner_phone", None)
-    elif role == "owner":
-        # Owner: Only contractor_notes
-        sanitized.pop("pm_notes", None)
-        sanitized.pop("aoao_notes", None)
-        sanitized.pop("admin_notes", None)
-    elif role == "contractor":
-        # Contractor: Only contractor_notes, no owner info
-        sanitized.pop("pm_notes", None)
-        sanitized.pop("aoao_notes", None)
-        sanitized.pop("admin_notes", None)
-        # Remove owner-related fields
-        sanitized.pop("owner_name", None)
-        sanitized.pop("owner_email", None)
-        sanitized.pop("owner_phone", None)
-    elif role == "property_manager":
-        # Property Manager: contractor_notes, pm_notes
-        sanitized.pop("aoao_notes", None)
-        sanitized.pop("admin_notes", None)
-    elif role == "aoao":
-        # AOAO: contractor_notes, pm_notes, aoao_notes
-        sanitized.pop("admin_notes", None)
-    # admin role: Keep all notes (no sanitization needed)
-    
-    return sanitized
-
-
-# ============================================================
-# Helper — Sanitize document for role
-# ============================================================
-def sanitize_document_for_role(document: Dict[str, Any], role: str) -> Dict[str, Any]:
-    """
-    Sanitize document based on role visibility rules.
-    
-    Rules:
-    - public: Only public documents (is_public=True), no sensitive info
-    - owner: Documents linked to their unit, no AOAO/PM/Admin-private docs
-    - contractor: Documents linked to their events, no owner info
-    - property_manager: Documents they have access to
-    - aoao: Documents in their buildings
-    - admin: All documents
-    """
-    sanitized = document.copy()
-    
-    if role == "public":
-        # Public: Only public documents, remove sensitive info
-        if not sanitized.get("is_public", False):
-            return None  # Filter out private documents
-        # Remove any sensitive fields
-        sanitized.pop("owner_name", None)
-        sanitized.pop("owner_email", None)
-        sanitized.pop("owner_phone", None)
-    elif role == "contractor":
-        # Contractor: Remove owner info
-        sanitized.pop("owner_name", None)
-        sanitized.pop("owner_email", None)
-        sanitized.pop("owner_phone", None)
-    
-    # TODO: Add document_category or is_private flag filtering for owner/PM/AOAO
-    # For now, we rely on permission checks to filter documents
-    
-    return sanitized
-
-
 # ============================================================
 # Helper — Get S3 client (using centralized utility)
 # ============================================================
@@ -197,19 +109,21 @@ REPORT_PRESIGNED_URL_EXPIRY_SECONDS = 604800  # 7 days
 # ============================================================
 # Helper — Upload report to S3
 # ============================================================
+def report_s3_key(filename: str) -> str:
+    """S3 key for a generated report file."""
+    # Sanitize filename
+    import re
+    safe_filename = re.sub(r"[^A-Za-z0-9._-]", "_", filename)
+    return f"reports/{datetime.utcnow().strftime('%Y/%m/%d')}/{safe_filename}"
+
+
 async def upload_report_to_s3(file_bytes: bytes, filename: str) -> UploadResult:
     """
     Upload report file to S3 and return download URL.
     Reuses existing S3 upload pattern from uploads router.
     """
     s3, bucket, region = get_s3()
-    
-    # Sanitize filename
-    import re
-    safe_filename = re.sub(r"[^A-Za-z0-9._-]", "_", filename)
-    
-    # S3 key for reports
-    s3_key = f"reports/{datetime.utcnow().strftime('%Y/%m/%d')}/{safe_filename}"
+    s3_key = report_s3_key(filename)
     
     try:
         # Upload to S3
@@ -232,6 +146,26 @@ async def upload_report_to_s3(file_bytes: bytes, filename: str) -> UploadResult:
         raise RuntimeError(f"S3 upload error: {e}")
 
 
+async def upload_xlsx_report_to_s3(report_data: Dict[str, Any], filename: str) -> Tuple[UploadResult, int]:
+    """
+    Render the report as an XLSX workbook (one sheet per section) and
+    upload it to S3. Returns the upload result and the file size.
+    """
+    s3, bucket, region = get_s3()
+    s3_key = report_s3_key(filename)
+    
+    try:
+        size_bytes = await upload_report_xlsx(s3, bucket, s3_key, report_data)
+        download_url = s3.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket, "Key": s3_key},
+            ExpiresIn=REPORT_PRESIGNED_URL_EXPIRY_SECONDS,
+        )
+        return UploadResult(s3_key=s3_key, download_url=download_url), size_bytes
+    except Exception as e:
+        raise RuntimeError(f"XLSX report error: {e}")
+
+
 # ============================================================
 # Helper — Enrich contractor with roles (centralized)
 # ============================================================
@@ -384,17 +318,14 @@ async def generate_building_report(
         user: Current user (None for public)
         context_role: Effective role (admin, aoao, property_manager, owner, contractor, public)
         internal: Whether this is an internal report (affects visibility)
-        format: "json" or "pdf"
+        format: "json", "pdf" or "xlsx"
     """
     client = get_supabase_client()
     
-    # Get building info
-    building_result = (
-        client.table("buildings")
-        .select("*")
-        .eq("id", building_id)
-        .limit(1)
-        .execute()
+    # Get building info (public reports leave out internal fields, see core/projections.py)
+    building_result = select_projected(
+        "buildings", context_role,
+        lambda q: q.eq("id", building_id).limit(1),
     )
     
     if not building_result.data:
@@ -403,12 +334,9 @@ async def generate_building_report(
     building = building_result.data[0]
     
     # Get units for this building
-    units_result = (
-        client.table("units")
-        .select("*")
-        .eq("building_id", building_id)
-        .order("unit_number")
-        .execute()
+    units_result = select_projected(
+        "units", context_role,
+        lambda q: q.eq("building_id", building_id).order("unit_number"),
     )
     units = units_result.data or []
     
@@ -419,14 +347,12 @@ async def generate_building_report(
             units = [u for u in units if u["id"] in accessible_unit_ids]
     
     # Get events for this building
-    events_query = client.table("events").select("*").eq("building_id", building_id)
-    
-    # Apply date filtering if needed (for custom reports)
-    # This will be handled by the custom report function
-    
-    events_result = events_query.order("occurred_at", desc=True).execute()
-    events_raw = events_result.data or []
-    events = events_raw.copy()
+    # Columns the role may not see are left out of the select (core/projections.py)
+    events_result = select_projected(
+        "events", context_role,
+        lambda q: q.eq("building_id", building_id).order("occurred_at", desc=True),
+    )
+    events = events_result.data or []
     
     # Filter events by unit access if needed
     if user and not is_admin(user) and internal:
@@ -444,14 +370,6 @@ async def generate_building_report(
     
     events_for_counts = events.copy()
     
-    # Sanitize events based on role
-    sanitized_events = []
-    for event in events:
-        sanitized = sanitize_event_for_role(event, context_role)
-        if sanitized:
-            sanitized_events.append(sanitized)
-    events = sanitized_events
-    
     # Store total event count before limiting (for public reports)
     total_events_count = len(events)
     
@@ -519,15 +437,8 @@ async def generate_building_report(
         category_ids = list(set([e.get("category_id") for e in events if e.get("category_id")]))
         
         if category_ids:
-            # Fetch category names from event_categories table
-            event_categories_result = (
-                client.table("event_categories")
-                .select("id, name")
-                .in_("id", category_ids)
-                .execute()
-            )
-            # Create a map: category_id -> category_name
-            category_name_map = {cat["id"]: cat["name"] for cat in (event_categories_result.data or [])}
+            # Category names come from the reference data registry
+            category_name_map = reference_names("event_categories", category_ids)
             
             # Replace event_type with category name for each event
             for event in events:
@@ -541,13 +452,14 @@ async def generate_building_report(
                     pass
     
     # Get documents for this building
-    documents_query = client.table("documents").select("*").eq("building_id", building_id)
-    
-    if not internal or context_role == "public":
-        # Public reports: Only public documents
-        documents_query = documents_query.eq("is_public", True)
-    
-    documents_result = documents_query.order("created_at", desc=True).execute()
+    def build_documents_query(query):
+        query = query.eq("building_id", building_id)
+        if not internal or context_role == "public":
+            # Public reports: Only public documents
+            query = query.eq("is_public", True)
+        return query.order("created_at", desc=True)
+
+    documents_result = select_projected("documents", context_role, build_documents_query)
     documents = documents_result.data or []
     
     # Filter documents by unit access if needed
@@ -596,14 +508,6 @@ async def generate_building_report(
         
         documents = filtered_documents
     
-    # Sanitize documents based on role
-    sanitized_documents = []
-    for document in documents:
-        sanitized = sanitize_document_for_role(document, context_role)
-        if sanitized:
-            sanitized_documents.append(sanitized)
-    documents = sanitized_documents
-    
     # Store total document count before limiting (for public reports)
     total_documents_count = len(documents)
     
@@ -648,27 +552,15 @@ async def generate_building_report(
         category_ids = list(set([d.get("category_id") for d in documents if d.get("category_id")]))
         subcategory_ids = list(set([d.get("subcategory_id") for d in documents if d.get("subcategory_id")]))
         
-        # Fetch category names from document_categories table
+        # Category names come from the reference data registry
         category_name_map = {}
         if category_ids:
-            document_categories_result = (
-                client.table("document_categories")
-                .select("id, name")
-                .in_("id", category_ids)
-                .execute()
-            )
-            category_name_map = {cat["id"]: cat["name"] for cat in (document_categories_result.data or [])}
+            category_name_map = reference_names("document_categories", category_ids)
         
-        # Fetch subcategory names from document_subcategories table
+        # Subcategory names come from the reference data registry
         subcategory_name_map = {}
         if subcategory_ids:
-            document_subcategories_result = (
-                client.table("document_subcategories")
-                .select("id, name")
-                .in_("id", subcategory_ids)
-                .execute()
-            )
-            subcategory_name_map = {subcat["id"]: subcat["name"] for subcat in (document_subcategories_result.data or [])}
+            subcategory_name_map = reference_names("document_subcategories", subcategory_ids)
         
         # Update documents with category and subcategory names
         # Keep category_id and subcategory_id, and add category and subcategory text names
@@ -1109,24 +1001,8 @@ async def generate_building_report(
                     unit["owners"] = []
     
     # For public reports, remove unnecessary fields to reduce payload size
+    # (building, units and documents were already selected without them)
     if not internal and context_role == "public":
-        # Remove fields from building
-        building_filtered = {k: v for k, v in building.items() if k not in ["created_at", "updated_at", "metadata", "metadata_last_refreshed"]}
-        
-        # Remove fields from units (but preserve owners field)
-        units_filtered = []
-        for unit in units:
-            filtered_unit = {k: v for k, v in unit.items() if k not in ["bedrooms", "bathrooms", "square_feet", "created_at", "updated_at", "parcel_number"]}
-            # Preserve owners field if it exists
-            if "owners" in unit:
-                filtered_unit["owners"] = unit["owners"]
-            units_filtered.append(filtered_unit)
-        
-        # Remove fields from documents
-        documents_filtered = []
-        for doc in documents:
-            documents_filtered.append({k: v for k, v in doc.items() if k not in ["filename", "file_size", "is_redacted", "unit_id", "content_type"]})
-        
         # Remove fields from contractors
         contractors_filtered = []
         for contractor in contractors:
@@ -1142,9 +1018,6 @@ async def generate_building_report(
         for pm in pm_companies:
             pm_companies_filtered.append({k: v for k, v in pm.items() if k not in ["phone", "email", "updated_at", "stripe_customer_id", "stripe_subscription_id", "subscription_status"]})
         
-        building = building_filtered
-        units = units_filtered
-        documents = documents_filtered
         contractors = contractors_filtered
         aoao_orgs = aoao_orgs_filtered
         pm_companies = pm_companies_filtered
@@ -1170,13 +1043,9 @@ async def generate_building_report(
                 
                 if contractor_event_ids:
                     # Get the last 5 events
-                    contractor_events_result = (
-                        client.table("events")
-                        .select("*")
-                        .in_("id", contractor_event_ids)
-                        .order("occurred_at", desc=True)
-                        .limit(5)
-                        .execute()
+                    contractor_events_result = select_projected(
+                        "events", context_role,
+                        lambda q: q.in_("id", contractor_event_ids).order("occurred_at", desc=True).limit(5),
                     )
                     
                     contractor_events = contractor_events_result.data or []
@@ -1233,22 +1102,14 @@ async def generate_building_report(
                                 # Remove unit_number field
                                 event.pop("unit_number", None)
                                 
-                                # Sanitize for public role
-                                sanitized = sanitize_event_for_role(event, context_role)
-                                if sanitized:
-                                    most_active_contractor_events.append(sanitized)
+                                most_active_contractor_events.append(event)
                             
                             # Replace event_type with category name
                             if most_active_contractor_events:
                                 category_ids = list(set([e.get("category_id") for e in most_active_contractor_events if e.get("category_id")]))
                                 if category_ids:
-                                    event_categories_result = (
-                                        client.table("event_categories")
-                                        .select("id, name")
-                                        .in_("id", category_ids)
-                                        .execute()
-                                    )
-                                    category_name_map = {cat["id"]: cat["name"] for cat in (event_categories_result.data or [])}
+                                    # Category names come from the reference data registry
+                                    category_name_map = reference_names("event_categories", category_ids)
                                     
                                     for event in most_active_contractor_events:
                                         category_id = event.get("category_id")
@@ -1295,6 +1156,18 @@ async def generate_building_report(
             format = "json"
             filename = f"{filename}.json"
     
+    if format == "xlsx":
+        try:
+            upload_result, size_bytes = await upload_xlsx_report_to_s3(report_data, f"{filename}.xlsx")
+            download_url = upload_result.download_url
+            filename = f"{filename}.xlsx"
+        except Exception as e:
+            # Fallback to JSON if XLSX generation fails
+            from core.logging_config import logger
+            logger.warning(f"XLSX report generation failed, returning JSON: {e}")
+            format = "json"
+            size_bytes = len(str(report_data).encode("utf-8"))
+    
     if format == "json":
         filename = f"{filename}.json"
     
@@ -1325,7 +1198,7 @@ async def generate_unit_report(
         user: Current user (None for public)
         context_role: Effective role
         internal: Whether this is an internal report
-        format: "json" or "pdf"
+        format: "json", "pdf" or "xlsx"
     """
     client = get_supabase_client()
     
@@ -1367,26 +1240,15 @@ async def generate_unit_report(
     event_ids = [row["event_id"] for row in (event_units_result.data or [])]
     
     events = []
-    events_raw = []
     if event_ids:
-        events_result = (
-            client.table("events")
-            .select("*")
-            .in_("id", event_ids)
-            .order("occurred_at", desc=True)
-            .execute()
+        # Columns the role may not see are left out of the select (core/projections.py)
+        events_result = select_projected(
+            "events", context_role,
+            lambda q: q.in_("id", event_ids).order("occurred_at", desc=True),
         )
-        events_raw = events_result.data or []
-        events = events_raw.copy()
+        events = events_result.data or []
     
-    # Sanitize events based on role
     events_for_counts = events.copy()
-    sanitized_events = []
-    for event in events:
-        sanitized = sanitize_event_for_role(event, context_role)
-        if sanitized:
-            sanitized_events.append(sanitized)
-    events = sanitized_events
     
     # Store total event count before limiting (for public reports)
     total_events_count = len(events)
@@ -1412,15 +1274,8 @@ async def generate_unit_report(
         category_ids = list(set([e.get("category_id") for e in events if e.get("category_id")]))
         
         if category_ids:
-            # Fetch category names from event_categories table
-            event_categories_result = (
-                client.table("event_categories")
-                .select("id, name")
-                .in_("id", category_ids)
-                .execute()
-            )
-            # Create a map: category_id -> category_name
-            category_name_map = {cat["id"]: cat["name"] for cat in (event_categories_result.data or [])}
+            # Category names come from the reference data registry
+            category_name_map = reference_names("event_categories", category_ids)
             
             # Replace event_type with category name for each event
             for event in events:
@@ -1453,22 +1308,15 @@ async def generate_unit_report(
     
     documents = []
     if combined_doc_ids:
-        documents_query = client.table("documents").select("*").in_("id", combined_doc_ids)
-        
-        if not internal or context_role == "public":
-            documents_query = documents_query.eq("is_public", True)
-        
-        documents_result = documents_query.order("created_at", desc=True).execute()
+        def build_documents_query(query):
+            query = query.in_("id", combined_doc_ids)
+            if not internal or context_role == "public":
+                query = query.eq("is_public", True)
+            return query.order("created_at", desc=True)
+
+        documents_result = select_projected("documents", context_role, build_documents_query)
         documents = documents_result.data or []
     
-    # Sanitize documents based on role
-    sanitized_documents = []
-    for document in documents:
-        sanitized = sanitize_document_for_role(document, context_role)
-        if sanitized:
-            sanitized_documents.append(sanitized)
-    documents = sanitized_documents
-    
     # Store total document count before limiting (for public reports)
     total_documents_count = len(documents)
     
@@ -1489,27 +1337,15 @@ async def generate_unit_report(
         category_ids = list(set([d.get("category_id") for d in documents if d.get("category_id")]))
         subcategory_ids = list(set([d.get("subcategory_id") for d in documents if d.get("subcategory_id")]))
         
-        # Fetch category names from document_categories table
+        # Category names come from the reference data registry
         category_name_map = {}
         if category_ids:
-            document_categories_result = (
-                client.table("document_categories")
-                .select("id, name")
-                .in_("id", category_ids)
-                .execute()
-            )
-            category_name_map = {cat["id"]: cat["name"] for cat in (document_categories_result.data or [])}
+            category_name_map = reference_names("document_categories", category_ids)
         
-        # Fetch subcategory names from document_subcategories table
+        # Subcategory names come from the reference data registry
         subcategory_name_map = {}
         if subcategory_ids:
-            document_subcategories_result = (
-                client.table("document_subcategories")
-                .select("id, name")
-                .in_("id", subcategory_ids)
-                .execute()
-            )
-            subcategory_name_map = {subcat["id"]: subcat["name"] for subcat in (document_subcategories_result.data or [])}
+            subcategory_name_map = reference_names("document_subcategories", subcategory_ids)
         
         # Update documents with category and subcategory names
         # Keep category_id and subcategory_id, and add category and subcategory text names
@@ -1917,13 +1753,9 @@ async def generate_unit_report(
                 
                 if contractor_event_ids:
                     # Get the last 5 events
-                    contractor_events_result = (
-                        client.table("events")
-                        .select("*")
-                        .in_("id", contractor_event_ids)
-                        .order("occurred_at", desc=True)
-                        .limit(5)
-                        .execute()
+                    contractor_events_result = select_projected(
+                        "events", context_role,
+                        lambda q: q.in_("id", contractor_event_ids).order("occurred_at", desc=True).limit(5),
                     )
                     
                     contractor_events = contractor_events_result.data or []
@@ -1980,22 +1812,14 @@ async def generate_unit_report(
                                 # Remove unit_number field
                                 event.pop("unit_number", None)
                                 
-                                # Sanitize for public role
-                                sanitized = sanitize_event_for_role(event, context_role)
-                                if sanitized:
-                                    most_active_contractor_events.append(sanitized)
+                                most_active_contractor_events.append(event)
                             
                             # Replace event_type with category name
                             if most_active_contractor_events:
                                 category_ids = list(set([e.get("category_id") for e in most_active_contractor_events if e.get("category_id")]))
                                 if category_ids:
-                                    event_categories_result = (
-                                        client.table("event_categories")
-                                        .select("id, name")
-                                        .in_("id", category_ids)
-                                        .execute()
-                                    )
-                                    category_name_map = {cat["id"]: cat["name"] for cat in (event_categories_result.data or [])}
+                                    # Category names come from the reference data registry
+                                    category_name_map = reference_names("event_categories", category_ids)
                                     
                                     for event in most_active_contractor_events:
                                         category_id = event.get("category_id")
@@ -2039,6 +1863,17 @@ async def generate_unit_report(
         except Exception:
             format = "json"
             filename = f"{filename}.json"
+    if format == "xlsx":
+        try:
+            upload_result, size_bytes = await upload_xlsx_report_to_s3(report_data, f"{filename}.xlsx")
+            download_url = upload_result.download_url
+            filename = f"{filename}.xlsx"
+        except Exception as e:
+            # Fallback to JSON if XLSX generation fails
+            from core.logging_config import logger
+            logger.warning(f"XLSX report generation failed, returning JSON: {e}")
+            format = "json"
+            size_bytes = len(str(report_data).encode("utf-8"))
     if format == "json":
         filename = f"{filename}.json"
 
@@ -2066,7 +1901,7 @@ async def generate_contractor_report(
         contractor_id: Contractor ID
         user: Current user
         context_role: Effective role
-        format: "json" or "pdf"
+        format: "json", "pdf" or "xlsx"
     """
     client = get_supabase_client()
     
@@ -2096,23 +1931,13 @@ async def generate_contractor_report(
     
     events = []
     if event_ids:
-        events_result = (
-            client.table("events")
-            .select("*")
-            .in_("id", event_ids)
-            .order("occurred_at", desc=True)
-            .execute()
+        # Contractors see only contractor_notes (core/projections.py)
+        events_result = select_projected(
+            "events", context_role,
+            lambda q: q.in_("id", event_ids).order("occurred_at", desc=True),
         )
         events = events_result.data or []
     
-    # Sanitize events based on role (contractors see only contractor_notes)
-    sanitized_events = []
-    for event in events:
-        sanitized = sanitize_event_for_role(event, context_role)
-        if sanitized:
-            sanitized_events.append(sanitized)
-    events = sanitized_events
-    
     # Get documents for this contractor (via document_contractors)
     document_contractors_result = (
         client.table("document_contractors")
@@ -2124,23 +1949,15 @@ async def generate_contractor_report(
     
     documents = []
     if document_ids:
-        documents_result = (
-            client.table("documents")
-            .select("*")
-            .in_("id", document_ids)
-            .order("created_at", desc=True)
-            .execute()
-        )
+        def build_documents_query(query):
+            query = query.in_("id", document_ids)
+            if context_role == "public":
+                query = query.eq("is_public", True)
+            return query.order("created_at", desc=True)
+
+        documents_result = select_projected("documents", context_role, build_documents_query)
         documents = documents_result.data or []
     
-    # Sanitize documents based on role
-    sanitized_documents = []
-    for document in documents:
-        sanitized = sanitize_document_for_role(document, context_role)
-        if sanitized:
-            sanitized_documents.append(sanitized)
-    documents = sanitized_documents
-    
     # Get units and buildings from events
     units_map = {}
     buildings_map = {}
@@ -2216,6 +2033,18 @@ async def generate_contractor_report(
             format = "json"
             filename = f"{filename}.json"
     
+    if format == "xlsx":
+        try:
+            upload_result, size_bytes = await upload_xlsx_report_to_s3(report_data, f"{filename}.xlsx")
+            download_url = upload_result.download_url
+            filename = f"{filename}.xlsx"
+        except Exception as e:
+            # Fallback to JSON if XLSX generation fails
+            from core.logging_config import logger
+            logger.warning(f"XLSX report generation failed, returning JSON: {e}")
+            format = "json"
+            size_bytes = len(str(report_data).encode("utf-8"))
+    
     if format == "json":
         filename = f"{filename}.json"
     
@@ -2231,6 +2060,13 @@ async def generate_contractor_report(
     )
 
 
+def _filter_ids(query, ids: List[str]):
+    """Restrict a query to `ids` (an empty list matches nothing)."""
+    if not ids:
+        return query.eq("id", "00000000-0000-0000-0000-000000000000")  # No matches
+    return query.in_("id", ids)
+
+
 async def generate_custom_report(
     filters: CustomReportFilters,
     user: Optional[CurrentUser],
@@ -2244,7 +2080,7 @@ async def generate_custom_report(
         filters: CustomReportFilters object
         user: Current user
         context_role: Effective role
-        format: "json" or "pdf"
+        format: "json", "pdf" or "xlsx"
     """
     client = get_supabase_client()
     
@@ -2260,11 +2096,8 @@ async def generate_custom_report(
     
     # Get events
     if filters.include_events:
-        events_query = client.table("events").select("*")
-        
-        if filters.building_id:
-            events_query = events_query.eq("building_id", filters.building_id)
-        
+        # Resolve the junction filters first; None means "don't filter by ID"
+        event_ids = None
         if filters.unit_ids:
             # Get events via event_units
             event_units_result = (
@@ -2274,10 +2107,6 @@ async def generate_custom_report(
                 .execute()
             )
             event_ids = [row["event_id"] for row in (event_units_result.data or [])]
-            if event_ids:
-                events_query = events_query.in_("id", event_ids)
-            else:
-                events_query = events_query.eq("id", "00000000-0000-0000-0000-000000000000")  # No matches
         
         if filters.contractor_ids:
             # Get events via event_contractors
@@ -2288,40 +2117,30 @@ async def generate_custom_report(
                 .execute()
             )
             contractor_event_ids = [row["event_id"] for row in (event_contractors_result.data or [])]
-            if contractor_event_ids:
-                if filters.unit_ids:
-                    # Intersect with unit events
-                    event_ids = [eid for eid in event_ids if eid in contractor_event_ids]
-                    events_query = events_query.in_("id", event_ids)
-                else:
-                    events_query = events_query.in_("id", contractor_event_ids)
+            if event_ids is not None:
+                # Intersect with unit events
+                event_ids = [eid for eid in event_ids if eid in contractor_event_ids]
             else:
-                events_query = events_query.eq("id", "00000000-0000-0000-0000-000000000000")  # No matches
-        
-        if filters.start_date:
-            events_query = events_query.gte("occurred_at", filters.start_date.isoformat())
-        
-        if filters.end_date:
-            events_query = events_query.lte("occurred_at", filters.end_date.isoformat())
-        
-        events_result = events_query.order("occurred_at", desc=True).execute()
-        events = events_result.data or []
-        
-        # Sanitize events
-        sanitized_events = []
-        for event in events:
-            sanitized = sanitize_event_for_role(event, context_role)
-            if sanitized:
-                sanitized_events.append(sanitized)
-        report_data["events"] = sanitized_events
+                event_ids = contractor_event_ids
+        
+        def build_events_query(query):
+            if filters.building_id:
+                query = query.eq("building_id", filters.building_id)
+            if event_ids is not None:
+                query = _filter_ids(query, event_ids)
+            if filters.start_date:
+                query = query.gte("occurred_at", filters.start_date.isoformat())
+            if filters.end_date:
+                query = query.lte("occurred_at", filters.end_date.isoformat())
+            return query.order("occurred_at", desc=True)
+        
+        # Columns the role may not see are left out of the select (core/projections.py)
+        events_result = select_projected("events", context_role, build_events_query)
+        report_data["events"] = events_result.data or []
     
     # Get documents
     if filters.include_documents:
-        documents_query = client.table("documents").select("*")
-        
-        if filters.building_id:
-            documents_query = documents_query.eq("building_id", filters.building_id)
-        
+        document_ids = None
         if filters.unit_ids:
             # Get documents via document_units
             document_units_result = (
@@ -2331,10 +2150,6 @@ async def generate_custom_report(
                 .execute()
             )
             document_ids = [row["document_id"] for row in (document_units_result.data or [])]
-            if document_ids:
-                documents_query = documents_query.in_("id", document_ids)
-            else:
-                documents_query = documents_query.eq("id", "00000000-0000-0000-0000-000000000000")  # No matches
         
         if filters.contractor_ids:
             # Get documents via document_contractors
@@ -2345,32 +2160,27 @@ async def generate_custom_report(
                 .execute()
             )
             contractor_document_ids = [row["document_id"] for row in (document_contractors_result.data or [])]
-            if contractor_document_ids:
-                if filters.unit_ids:
-                    # Intersect with unit documents
-                    document_ids = [did for did in document_ids if did in contractor_document_ids]
-                    documents_query = documents_query.in_("id", document_ids)
-                else:
-                    documents_query = documents_query.in_("id", contractor_document_ids)
+            if document_ids is not None:
+                # Intersect with unit documents
+                document_ids = [did for did in document_ids if did in contractor_document_ids]
             else:
-                documents_query = documents_query.eq("id", "00000000-0000-0000-0000-000000000000")  # No matches
-        
-        if filters.start_date:
-            documents_query = documents_query.gte("created_at", filters.start_date.isoformat())
-        
-        if filters.end_date:
-            documents_query = documents_query.lte("created_at", filters.end_date.isoformat())
-        
-        documents_result = documents_query.order("created_at", desc=True).execute()
-        documents = documents_result.data or []
-        
-        # Sanitize documents
-        sanitized_documents = []
-        for document in documents:
-            sanitized = sanitize_document_for_role(document, context_role)
-            if sanitized:
-                sanitized_documents.append(sanitized)
-        report_data["documents"] = sanitized_documents
+                document_ids = contractor_document_ids
+        
+        def build_documents_query(query):
+            if filters.building_id:
+                query = query.eq("building_id", filters.building_id)
+            if document_ids is not None:
+                query = _filter_ids(query, document_ids)
+            if context_role == "public":
+                query = query.eq("is_public", True)
+            if filters.start_date:
+                query = query.gte("created_at", filters.start_date.isoformat())
+            if filters.end_date:
+                query = query.lte("created_at", filters.end_date.isoformat())
+            return query.order("created_at", desc=True)
+        
+        documents_result = select_projected("documents", context_role, build_documents_query)
+        report_data["documents"] = documents_result.data or []
     
     # Calculate statistics
     report_data["statistics"] = {
@@ -2398,6 +2208,18 @@ async def generate_custom_report(
             format = "json"
             filename = f"{filename}.json"
     
+    if format == "xlsx":
+        try:
+            upload_result, size_bytes = await upload_xlsx_report_to_s3(report_data, f"{filename}.xlsx")
+            download_url = upload_result.download_url
+            filename = f"{filename}.xlsx"
+        except Exception as e:
+            # Fallback to JSON if XLSX generation fails
+            from core.logging_config import logger
+            logger.warning(f"XLSX report generation failed, returning JSON: {e}")
+            format = "json"
+            size_bytes = len(str(report_data).encode("utf-8"))
+    
     if format == "json":
         filename = f"{filename}.json"
     
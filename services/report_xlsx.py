@@ -0,0 +1,227 @@
+# services/report_xlsx.py
+
+"""
+XLSX rendition of the dashboard and custom reports.
+
+A report is already a dict of row lists, but a building with tens of
+thousands of events must not be turned into a second in-memory copy (or
+a pickled one) on its way to a workbook. Instead:
+
+1. The report sections are spooled to an NDJSON file, one row per line.
+2. A worker process reads the spool line by line into a write-only
+   openpyxl workbook (one sheet per section), which streams each sheet
+   to disk rather than keeping cells in memory.
+3. The workbook is uploaded with an S3 multipart upload, one
+   REPORT_UPLOAD_PART_BYTES part at a time.
+
+Settings:
+- REPORT_WORKERS: pool size (0 runs in the threadpool, in-process)
+- REPORT_UPLOAD_PART_BYTES: multipart part size
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.logging_config import logger
+from core.responses import dumps
+from core.utils import neutralize_formula
+
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Report key -> sheet title, in workbook order; sections a report lacks are skipped
+XLSX_SECTIONS: Tuple[Tuple[str, str], ...] = (
+    ("events", "Events"),
+    ("documents", "Documents"),
+    ("units", "Units"),
+    ("contractors", "Contractors"),
+    ("statistics", "Statistics"),
+)
+
+# Excel's cell limit; longer text is truncated rather than rejected
+MAX_CELL_CHARS = 32767
+
+
+# ============================================================
+# Spool (API side)
+# ============================================================
+def _section_rows(report_data: Dict[str, Any], key: str) -> Optional[List[Dict[str, Any]]]:
+    value = report_data.get(key)
+    if value is None and key == "units" and report_data.get("unit"):
+        # Unit reports carry a single unit
+        value = [report_data["unit"]]
+    if isinstance(value, dict):
+        # Statistics: one metric per row
+        return [{"metric": name, "value": metric} for name, metric in value.items()]
+    return value
+
+
+def _columns(rows: List[Dict[str, Any]]) -> List[str]:
+    columns: Dict[str, None] = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    return list(columns)
+
+
+def spool_report(report_data: Dict[str, Any], path: str) -> int:
+    """
+    Write the report sections to `path` as NDJSON: a {"sheet", "columns"}
+    header per section, then one list of cell values per row.
+    Returns the number of rows written.
+    """
+    count = 0
+    with open(path, "wb") as out:
+        for key, title in XLSX_SECTIONS:
+            rows = _section_rows(report_data, key)
+            if rows is None:
+                continue
+            columns = _columns(rows)
+            out.write(dumps({"sheet": title, "columns": columns}) + b"\n")
+            for row in rows:
+                out.write(dumps([row.get(column) for column in columns]) + b"\n")
+                count += 1
+    return count
+
+
+# ============================================================
+# Worker side (runs in the pool processes)
+# ============================================================
+def _cell(value: Any, illegal_characters) -> Any:
+    if isinstance(value, list):
+        value = "; ".join(str(item) for item in value)
+    elif isinstance(value, dict):
+        value = json.dumps(value)
+    if isinstance(value, str):
+        # Report text is user input: keep it from becoming a live formula
+        value = neutralize_formula(illegal_characters.sub("", value))[:MAX_CELL_CHARS]
+    return value
+
+
+def _read_spool(path: str) -> Iterator[Any]:
+    with open(path, "rb") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def write_workbook(spool_path: str, output_path: str) -> int:
+    """Convert a spool from spool_report() into an XLSX file. Returns the number of sheets."""
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheets = 0
+    for record in _read_spool(spool_path):
+        if isinstance(record, dict):
+            sheet = workbook.create_sheet(title=record["sheet"])
+            sheet.append(record["columns"])
+            sheets += 1
+        else:
+            sheet.append([_cell(value, ILLEGAL_CHARACTERS_RE) for value in record])
+    if not sheets:
+        workbook.create_sheet(title="Report")
+    workbook.save(output_path)
+    return sheets
+
+
+# ============================================================
+# Pool management (API side)
+# ============================================================
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def get_report_pool() -> Optional[ProcessPoolExecutor]:
+    """The shared process pool, or None when REPORT_WORKERS is 0."""
+    global _pool
+    if settings.REPORT_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, for the same reason as the redaction pool
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.REPORT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown_report_pool(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+async def run_in_report_pool(func, *args):
+    """Run func(*args) in the report pool (or the threadpool when disabled)."""
+    pool = get_report_pool()
+    if pool is None:
+        return await run_in_threadpool(func, *args)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        logger.error("Report worker pool broke; recreating on next request")
+        shutdown_report_pool(wait=False)
+        raise
+
+
+# ============================================================
+# Upload
+# ============================================================
+def multipart_upload(s3, bucket: str, s3_key: str, path: str, content_type: str) -> int:
+    """Upload `path` in REPORT_UPLOAD_PART_BYTES parts. Returns the object size."""
+    part_bytes = settings.REPORT_UPLOAD_PART_BYTES
+    upload_id = s3.create_multipart_upload(Bucket=bucket, Key=s3_key, ContentType=content_type)["UploadId"]
+    parts = []
+    size = 0
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(part_bytes)
+                if not chunk and parts:
+                    break
+                part_number = len(parts) + 1
+                response = s3.upload_part(
+                    Bucket=bucket, Key=s3_key, UploadId=upload_id, PartNumber=part_number, Body=chunk,
+                )
+                parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+                size += len(chunk)
+                if len(chunk) < part_bytes:
+                    break
+        s3.complete_multipart_upload(
+            Bucket=bucket, Key=s3_key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+        )
+    except Exception:
+        # Parts of an unfinished upload are billed until aborted
+        s3.abort_multipart_upload(Bucket=bucket, Key=s3_key, UploadId=upload_id)
+        raise
+    return size
+
+
+async def upload_report_xlsx(s3, bucket: str, s3_key: str, report_data: Dict[str, Any]) -> int:
+    """Render `report_data` as XLSX and upload it to `s3_key`. Returns the file size."""
+    workdir = tempfile.mkdtemp(prefix="aina-xlsx-")
+    try:
+        spool_path = os.path.join(workdir, "report.ndjson")
+        output_path = os.path.join(workdir, "report.xlsx")
+        rows = await run_in_threadpool(spool_report, report_data, spool_path)
+        sheets = await run_in_report_pool(write_workbook, spool_path, output_path)
+        size = await run_in_threadpool(multipart_upload, s3, bucket, s3_key, output_path, XLSX_CONTENT_TYPE)
+        logger.info(f"Uploaded XLSX report {s3_key}: {sheets} sheets, {rows} rows, {size} bytes")
+        return size
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
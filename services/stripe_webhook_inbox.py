@@ -0,0 +1,465 @@
+# services/stripe_webhook_inbox.py
+
+"""
+Stripe webhook inbox.
+
+The webhook endpoint only verifies the signature and records the event
+in stripe_webhook_events (primary key = Stripe event ID), then returns.
+A redelivered event hits the primary key and is acknowledged as a
+duplicate without being processed again.
+
+Processing happens afterwards: first as a background task right after
+the acknowledgement, then by jobs/stripe_webhook_worker.py, which retries
+failed events and picks up any that were interrupted.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from core.logging_config import logger
+from core.supabase_client import get_supabase_client
+from core.stripe_helpers import verify_contractor_subscription
+from core.subscription_helpers import create_or_update_user_subscription
+from services.document_purchases import handle_charge_refunded, record_checkout_session
+
+
+INBOX_TABLE = "stripe_webhook_events"
+
+# Give up on an event after this many failed attempts
+MAX_WEBHOOK_ATTEMPTS = 5
+
+# Events stuck in "processing" longer than this count as a failed attempt
+# (worker crashed) and are retried
+STALE_PROCESSING_MINUTES = 10
+
+SUBSCRIPTION_EVENTS = (
+    "customer.subscription.created",
+    "customer.subscription.updated",
+    "customer.subscription.deleted",
+    "customer.subscription.trial_will_end",
+)
+
+# stripe_billing_owners.owner_type -> table holding the subscription fields
+BUSINESS_OWNER_TABLES = {
+    "contractor": "contractors",
+    "aoao_organization": "aoao_organizations",
+    "pm_company": "property_management_companies",
+}
+
+OWNER_LABELS = {
+    "contractor": "contractor",
+    "aoao_organization": "AOAO organization",
+    "pm_company": "PM company",
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ============================================================
+# Inbox
+# ============================================================
+def record_event(event: Dict[str, Any]) -> bool:
+    """
+    Persist an event in the inbox.
+
+    Returns:
+        False if the event ID was already recorded (a Stripe retry)
+    """
+    client = get_supabase_client()
+    try:
+        client.table(INBOX_TABLE).insert({
+            "id": event["id"],
+            "type": event.get("type") or "unknown",
+            "payload": event,
+            "status": "pending",
+            "attempts": 0,
+            "received_at": _now(),
+        }).execute()
+        return True
+    except Exception as e:
+        error_msg = str(e).lower()
+        if "duplicate" in error_msg or "unique" in error_msg or "23505" in error_msg:
+            logger.info(f"Duplicate Stripe webhook event {event['id']} ignored")
+            return False
+        raise
+
+
+def claim_event(event_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Mark a pending/failed event as processing. The conditional update is
+    atomic, so only one worker gets the row back.
+    """
+    client = get_supabase_client()
+    res = (
+        client.table(INBOX_TABLE)
+        .update({"status": "processing", "locked_at": _now()})
+        .eq("id", event_id)
+        .in_("status", ["pending", "failed"])
+        .lt("attempts", MAX_WEBHOOK_ATTEMPTS)
+        .execute()
+    )
+    return res.data[0] if res.data else None
+
+
+def process_event(event_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Claim and process one inbox event.
+
+    Returns:
+        The handler result, or None if the event was not claimable
+        (already processed, being processed elsewhere, or out of attempts)
+    """
+    row = claim_event(event_id)
+    if row is None:
+        return None
+
+    client = get_supabase_client()
+    attempts = (row.get("attempts") or 0) + 1
+    try:
+        result = dispatch_event(row["payload"])
+    except Exception as e:
+        logger.error(f"Stripe webhook event {event_id} failed (attempt {attempts}): {e}")
+        client.table(INBOX_TABLE).update({
+            "status": "failed",
+            "attempts": attempts,
+            "last_error": str(e)[:2000],
+        }).eq("id", event_id).execute()
+        return {"status": "error", "reason": str(e)}
+
+    client.table(INBOX_TABLE).update({
+        "status": "processed",
+        "attempts": attempts,
+        "result": result,
+        "last_error": None,
+        "processed_at": _now(),
+    }).eq("id", event_id).execute()
+    return result
+
+
+def release_stale_claims() -> int:
+    """
+    Fail events stuck in "processing" (the worker died mid-event).
+
+    The interrupted run counts as an attempt, so an event that keeps
+    crashing the worker stops being retried after MAX_WEBHOOK_ATTEMPTS.
+    Returns the number of events released.
+    """
+    client = get_supabase_client()
+    stale_before = (datetime.now(timezone.utc) - timedelta(minutes=STALE_PROCESSING_MINUTES)).isoformat()
+    stale = (
+        client.table(INBOX_TABLE)
+        .select("id, attempts")
+        .eq("status", "processing")
+        .lt("locked_at", stale_before)
+        .execute()
+    ).data or []
+
+    for row in stale:
+        attempts = (row.get("attempts") or 0) + 1
+        logger.error(f"Stripe webhook event {row['id']} was interrupted while processing (attempt {attempts})")
+        # Same conditions as the select, in case the event finished meanwhile
+        client.table(INBOX_TABLE).update({
+            "status": "failed",
+            "attempts": attempts,
+            "last_error": "Processing was interrupted",
+        }).eq("id", row["id"]).eq("status", "processing").lt("locked_at", stale_before).execute()
+    return len(stale)
+
+
+def process_pending_events(limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    Worker loop body: release stale claims, then process pending and
+    failed events in arrival order.
+    """
+    client = get_supabase_client()
+    release_stale_claims()
+
+    rows = (
+        client.table(INBOX_TABLE)
+        .select("id")
+        .in_("status", ["pending", "failed"])
+        .lt("attempts", MAX_WEBHOOK_ATTEMPTS)
+        .order("received_at")
+        .limit(limit)
+        .execute()
+    ).data or []
+
+    results = []
+    for row in rows:
+        result = process_event(row["id"])
+        if result is not None:
+            results.append({"event_id": row["id"], **result})
+    return results
+
+
+# ============================================================
+# Dispatch
+# ============================================================
+def dispatch_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    event_type = event.get("type")
+    event_data = event.get("data", {}).get("object", {})
+    logger.info(f"Processing Stripe webhook event: {event_type}")
+
+    if event_type in SUBSCRIPTION_EVENTS:
+        return handle_subscription_event(event_type, event_data)
+    if event_type == "checkout.session.completed":
+        return handle_checkout_session_completed(event_data)
+    if event_type == "payment_intent.succeeded":
+        return handle_payment_intent_succeeded(event_data)
+    if event_type == "charge.refunded":
+        return handle_charge_refunded(event_data)
+
+    logger.debug(f"Ignoring webhook event type: {event_type}")
+    return {"status": "ignored", "reason": "event_type_not_handled"}
+
+
+# ============================================================
+# Subscriptions
+# ============================================================
+def find_billing_owners(customer_id: str, subscription_id: str) -> List[Dict[str, Any]]:
+    """Every entity linked to a Stripe customer or subscription (one indexed query)."""
+    client = get_supabase_client()
+    return (
+        client.table("stripe_billing_owners")
+        .select("owner_type, owner_id, user_id, role")
+        .or_(f"stripe_customer_id.eq.{customer_id},stripe_subscription_id.eq.{subscription_id}")
+        .execute()
+    ).data or []
+
+
+def resolve_subscription_state(event_type: str, customer_id: str, subscription_id: str, status: Optional[str]):
+    """(tier, status) for a subscription event, confirmed with Stripe unless deleted."""
+    if event_type == "customer.subscription.deleted":
+        return "free", "canceled"
+
+    is_active, verified_status, error = verify_contractor_subscription(
+        stripe_customer_id=customer_id,
+        stripe_subscription_id=subscription_id
+    )
+    if error:
+        logger.warning(f"Error verifying subscription for Stripe customer {customer_id}: {error}")
+        return "free", status or "unknown"
+    return ("paid" if is_active else "free"), verified_status or status or "unknown"
+
+
+def handle_subscription_event(event_type: str, event_data: Dict[str, Any]) -> Dict[str, Any]:
+    subscription_id = event_data.get("id")
+    customer_id = event_data.get("customer")
+
+    if not subscription_id or not customer_id:
+        logger.warning(f"Missing subscription_id or customer_id in webhook event: {event_type}")
+        return {"status": "ignored", "reason": "missing_ids"}
+
+    owners = find_billing_owners(customer_id, subscription_id)
+    if not owners:
+        # Nothing to update, so skip the round-trip to Stripe
+        logger.warning(f"No entity found for Stripe customer {customer_id} or subscription {subscription_id}")
+        return {"status": "ignored", "reason": "no_matching_owner"}
+
+    subscription_tier, subscription_status = resolve_subscription_state(
+        event_type, customer_id, subscription_id, event_data.get("status")
+    )
+
+    client = get_supabase_client()
+    update_data = {
+        "subscription_tier": subscription_tier,
+        "subscription_status": subscription_status,
+        "stripe_customer_id": customer_id,
+        "stripe_subscription_id": subscription_id
+    }
+
+    # One business entity of each type, as before
+    business = {}
+    for owner in owners:
+        if owner["owner_type"] in BUSINESS_OWNER_TABLES:
+            business.setdefault(owner["owner_type"], owner)
+
+    for owner_type, owner in business.items():
+        label = OWNER_LABELS[owner_type]
+        try:
+            (
+                client.table(BUSINESS_OWNER_TABLES[owner_type])
+                .update(update_data)
+                .eq("id", owner["owner_id"])
+                .execute()
+            )
+            logger.info(
+                f"Updated {label} {owner['owner_id']} subscription: "
+                f"tier={subscription_tier}, status={subscription_status}"
+            )
+        except Exception as e:
+            logger.error(f"Error updating {label} {owner['owner_id']} subscription: {e}")
+
+    if business:
+        return {
+            "status": "success",
+            "subscription_tier": subscription_tier,
+            "subscription_status": subscription_status
+        }
+
+    logger.warning(f"No business entity found for Stripe customer {customer_id} or subscription {subscription_id}")
+
+    updated_users = 0
+    for owner in owners:
+        if owner["owner_type"] != "user_subscription":
+            continue
+        user_id, role = owner["user_id"], owner["role"]
+        try:
+            create_or_update_user_subscription(
+                user_id=user_id,
+                role=role,
+                subscription_tier=subscription_tier,
+                subscription_status=subscription_status,
+                stripe_customer_id=customer_id,
+                stripe_subscription_id=subscription_id,
+                is_trial=subscription_status == "trialing"
+            )
+            updated_users += 1
+            logger.info(
+                f"Updated user {user_id} subscription for role {role}: "
+                f"tier={subscription_tier}, status={subscription_status}"
+            )
+        except Exception as e:
+            logger.error(f"Error updating user {user_id} subscription for role {role}: {e}")
+
+    if updated_users:
+        return {
+            "status": "success",
+            "subscription_tier": subscription_tier,
+            "subscription_status": subscription_status,
+            "user_subscriptions_updated": updated_users
+        }
+    return {"status": "ignored", "reason": "no_matching_owner"}
+
+
+# ============================================================
+# Purchases
+# ============================================================
+def handle_checkout_session_completed(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    # Paid document downloads are then verified without calling Stripe
+    documents_verified = record_checkout_session(event_data)
+    result = handle_premium_report_checkout(event_data)
+    if documents_verified:
+        if result.get("status") == "ignored":
+            result = {"status": "success"}
+        result["documents_verified"] = documents_verified
+    return result
+
+
+def handle_premium_report_checkout(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    session_id = event_data.get("id")
+    customer_details = event_data.get("customer_details") or {}
+    customer_email = customer_details.get("email")
+    amount_total = event_data.get("amount_total", 0)  # in cents
+    currency = event_data.get("currency", "usd")
+    payment_status = event_data.get("payment_status", "paid")
+    metadata = event_data.get("metadata") or {}
+
+    # Only premium report purchases carry report_type in metadata
+    report_type = metadata.get("report_type")
+    if not report_type:
+        logger.debug(f"Checkout session {session_id} completed but not a premium report purchase")
+        return {"status": "ignored", "reason": "not_premium_report"}
+
+    amount_decimal = round(amount_total / 100.0, 2)
+    purchase_data = {
+        "customer_email": customer_email or "unknown",
+        "customer_name": customer_details.get("name"),
+        "report_type": report_type,
+        "report_id": metadata.get("report_id"),
+        "building_id": metadata.get("building_id") or None,
+        "unit_id": metadata.get("unit_id") or None,
+        "contractor_id": metadata.get("contractor_id") or None,
+        "stripe_session_id": session_id,
+        "stripe_payment_intent_id": event_data.get("payment_intent"),
+        "stripe_customer_id": event_data.get("customer"),
+        "amount_cents": amount_total,
+        "amount_decimal": amount_decimal,
+        "currency": currency,
+        "payment_status": "paid" if payment_status == "paid" else "pending",
+        "purchased_at": datetime.utcnow().isoformat() + "Z"
+    }
+    # Remove None values for optional fields
+    purchase_data = {k: v for k, v in purchase_data.items() if v is not None}
+
+    client = get_supabase_client()
+    result = client.table("premium_report_purchases").insert(purchase_data).execute()
+    if not result.data:
+        logger.warning(f"Failed to insert premium report purchase for session {session_id}")
+        return {"status": "error", "reason": "insert_failed"}
+
+    logger.info(
+        f"Recorded premium report purchase: {report_type} report for {customer_email} "
+        f"(${amount_decimal} {currency.upper()})"
+    )
+    return {
+        "status": "success",
+        "purchase_id": result.data[0].get("id"),
+        "report_type": report_type
+    }
+
+
+def handle_payment_intent_succeeded(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    payment_intent_id = event_data.get("id")
+    amount = event_data.get("amount", 0)  # in cents
+    currency = event_data.get("currency", "usd")
+    metadata = event_data.get("metadata") or {}
+
+    report_type = metadata.get("report_type")
+    if not report_type:
+        return {"status": "ignored", "reason": "event_type_not_handled"}
+
+    client = get_supabase_client()
+
+    # The purchase may already exist from checkout.session.completed
+    existing = (
+        client.table("premium_report_purchases")
+        .select("id")
+        .eq("stripe_payment_intent_id", payment_intent_id)
+        .limit(1)
+        .execute()
+    )
+    if existing.data:
+        (
+            client.table("premium_report_purchases")
+            .update({"payment_status": "paid"})
+            .eq("stripe_payment_intent_id", payment_intent_id)
+            .execute()
+        )
+        logger.info(f"Updated premium report purchase payment status to paid: {payment_intent_id}")
+        return {"status": "success", "action": "updated"}
+
+    amount_decimal = round(amount / 100.0, 2)
+    purchase_data = {
+        "customer_email": metadata.get("customer_email", "unknown"),
+        "customer_name": metadata.get("customer_name"),
+        "report_type": report_type,
+        "report_id": metadata.get("report_id"),
+        "building_id": metadata.get("building_id") or None,
+        "unit_id": metadata.get("unit_id") or None,
+        "contractor_id": metadata.get("contractor_id") or None,
+        "stripe_payment_intent_id": payment_intent_id,
+        "stripe_customer_id": event_data.get("customer"),
+        "amount_cents": amount,
+        "amount_decimal": amount_decimal,
+        "currency": currency,
+        "payment_status": "paid",
+        "purchased_at": datetime.utcnow().isoformat() + "Z"
+    }
+    purchase_data = {k: v for k, v in purchase_data.items() if v is not None}
+
+    result = client.table("premium_report_purchases").insert(purchase_data).execute()
+    if not result.data:
+        return {"status": "error", "reason": "insert_failed"}
+
+    logger.info(
+        f"Recorded premium report purchase via payment intent: {report_type} report "
+        f"(${amount_decimal} {currency.upper()})"
+    )
+    return {
+        "status": "success",
+        "purchase_id": result.data[0].get("id"),
+        "report_type": report_type
+    }
@@ -10,7 +10,9 @@ from unittest.mock import Mock, patch
 from typing import Generator
 
 from main import create_app
-from dependencies.auth import CurrentUser
+from dependencies.auth import CurrentUser, get_current_user
+from tests.fake_s3 import FakeS3, install_fake_s3
+from tests.fake_supabase import FakeSupabase, install_fake_supabase
 
 
 @pytest.fixture(scope="function")
@@ -26,6 +28,33 @@ def client(app) -> Generator[TestClient, None, None]:
         yield test_client
 
 
+@pytest.fixture
+def login(app):
+    """
+    Authenticate requests as a user with the given role. Extra keyword
+    arguments (permissions, contractor_id, email, ...) go to CurrentUser.
+    """
+    def login(role: str, user_id: str = "admin-user", **fields) -> CurrentUser:
+        fields = {"email": f"{user_id}@example.com", "permissions": [], **fields}
+        user = CurrentUser(id=user_id, auth_user_id=user_id, role=role, **fields)
+        app.dependency_overrides[get_current_user] = lambda: user
+        return user
+    yield login
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def fake(monkeypatch) -> FakeSupabase:
+    """Empty in-memory Supabase installed as the client; modules override this to seed it."""
+    return install_fake_supabase(FakeSupabase(), monkeypatch)
+
+
+@pytest.fixture
+def s3(monkeypatch) -> FakeS3:
+    """In-memory S3 installed as the client."""
+    return install_fake_s3(FakeS3(), monkeypatch)
+
+
 @pytest.fixture
 def mock_current_user():
     """Create a mock current user for testing."""
@@ -67,3 +96,21 @@ def reset_cache():
     yield
     cache_clear()
 
+
+@pytest.fixture(autouse=True)
+def reset_reference_data():
+    """Drop reference-data snapshots so they don't leak between fake databases."""
+    from core.reference_data import get_reference_registry
+    get_reference_registry().invalidate()
+    yield
+    get_reference_registry().invalidate()
+
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Reset rate limiter state before each test."""
+    from core.rate_limiter import reset_rate_limits as _reset
+    _reset()
+    yield
+    _reset()
@@ -0,0 +1,151 @@
+# tests/fake_s3.py
+
+"""
+In-memory, recording stand-in for the boto3 S3 client.
+
+Covers the calls the routers make (upload_file, upload_fileobj, put_object,
+get_object, head_object, delete_object, generate_presigned_url and the
+multipart upload calls). Objects
+live in a dict keyed by (bucket, key); every call is recorded and reported
+through core.metrics.track_upstream like the instrumented real client.
+
+Example:
+    s3 = FakeS3()
+    install_fake_s3(s3, monkeypatch)
+    ...
+    assert s3.count("upload_fileobj") == 1
+"""
+
+import io
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from core.metrics import track_upstream
+
+
+DEFAULT_BUCKET = "aina-test-bucket"
+DEFAULT_REGION = "us-east-2"
+
+# Module prefixes whose `get_s3` is swapped for the fake
+PATCHED_MODULE_PREFIXES = ("core.", "routers.", "services.")
+
+
+class StoredObject(NamedTuple):
+    body: bytes
+    content_type: Optional[str]
+    extra: Dict[str, Any]
+
+
+class FakeS3Error(Exception):
+    """Raised where S3 would answer NoSuchKey."""
+
+
+class FakeS3:
+    """In-memory S3 client that records every call."""
+
+    def __init__(self, bucket: str = DEFAULT_BUCKET, region: str = DEFAULT_REGION):
+        self.bucket = bucket
+        self.region = region
+        self.objects: Dict[Tuple[str, str], StoredObject] = {}
+        self.calls: List[str] = []
+        # upload id -> (bucket, key, extra, {part number: body})
+        self.multipart_uploads: Dict[str, Tuple[str, str, Dict[str, Any], Dict[int, bytes]]] = {}
+
+    def _record(self, operation: str):
+        self.calls.append(operation)
+        with track_upstream("s3", operation):
+            pass
+
+    def _store(self, bucket: str, key: str, body: bytes, extra: Optional[Dict[str, Any]] = None):
+        extra = dict(extra or {})
+        self.objects[(bucket, key)] = StoredObject(body, extra.pop("ContentType", None), extra)
+
+    # ---- boto3 client API ------------------------------------------
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, ExtraArgs: Optional[Dict[str, Any]] = None, **_):
+        self._record("upload_file")
+        with open(Filename, "rb") as f:
+            self._store(Bucket, Key, f.read(), ExtraArgs)
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, ExtraArgs: Optional[Dict[str, Any]] = None, **_):
+        self._record("upload_fileobj")
+        self._store(Bucket, Key, Fileobj.read(), ExtraArgs)
+
+    def put_object(self, Bucket: str, Key: str, Body=b"", ContentType: Optional[str] = None, **kwargs):
+        self._record("put_object")
+        body = Body.read() if hasattr(Body, "read") else (Body.encode() if isinstance(Body, str) else Body)
+        self._store(Bucket, Key, body, {"ContentType": ContentType, **kwargs})
+        return {"ETag": f'"{len(body)}"'}
+
+    def get_object(self, Bucket: str, Key: str, **_):
+        self._record("get_object")
+        obj = self._get(Bucket, Key)
+        return {"Body": io.BytesIO(obj.body), "ContentLength": len(obj.body), "ContentType": obj.content_type}
+
+    def head_object(self, Bucket: str, Key: str, **_):
+        self._record("head_object")
+        obj = self._get(Bucket, Key)
+        return {"ContentLength": len(obj.body), "ContentType": obj.content_type}
+
+    def delete_object(self, Bucket: str, Key: str, **_):
+        self._record("delete_object")
+        self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def create_multipart_upload(self, Bucket: str, Key: str, **kwargs):
+        self._record("create_multipart_upload")
+        upload_id = f"upload-{len(self.multipart_uploads) + 1}"
+        self.multipart_uploads[upload_id] = (Bucket, Key, kwargs, {})
+        return {"Bucket": Bucket, "Key": Key, "UploadId": upload_id}
+
+    def upload_part(self, Bucket: str, Key: str, UploadId: str, PartNumber: int, Body=b"", **_):
+        self._record("upload_part")
+        body = Body.read() if hasattr(Body, "read") else Body
+        self.multipart_uploads[UploadId][3][PartNumber] = body
+        return {"ETag": f'"{PartNumber}-{len(body)}"'}
+
+    def complete_multipart_upload(self, Bucket: str, Key: str, UploadId: str, MultipartUpload: Dict[str, Any], **_):
+        self._record("complete_multipart_upload")
+        _, _, extra, parts = self.multipart_uploads.pop(UploadId)
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        self._store(Bucket, Key, b"".join(parts[number] for number in numbers), extra)
+        return {"Bucket": Bucket, "Key": Key}
+
+    def abort_multipart_upload(self, Bucket: str, Key: str, UploadId: str, **_):
+        self._record("abort_multipart_upload")
+        self.multipart_uploads.pop(UploadId, None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Optional[Dict[str, Any]] = None, ExpiresIn: int = 3600, **_):
+        # Presigning is local in boto3, so it is not counted as a call
+        params = Params or {}
+        return f"https://{params.get('Bucket', self.bucket)}.s3.{self.region}.amazonaws.com/{params.get('Key', '')}?X-Amz-Expires={ExpiresIn}"
+
+    # ---- helpers ----------------------------------------------------
+
+    def _get(self, bucket: str, key: str) -> StoredObject:
+        try:
+            return self.objects[(bucket, key)]
+        except KeyError:
+            raise FakeS3Error(f"NoSuchKey: {key}")
+
+    def body(self, key: str, bucket: Optional[str] = None) -> bytes:
+        return self._get(bucket or self.bucket, key).body
+
+    def count(self, operation: Optional[str] = None) -> int:
+        return sum(1 for call in self.calls if operation is None or call == operation)
+
+    def reset_calls(self):
+        self.calls.clear()
+
+
+def install_fake_s3(fake: FakeS3, monkeypatch) -> FakeS3:
+    """Point every loaded `get_s3` reference at `fake`."""
+    factory = lambda: (fake, fake.bucket, fake.region)  # noqa: E731
+    monkeypatch.setattr("core.s3_client.get_s3", factory)
+    for name, module in list(sys.modules.items()):
+        if module is None or not name.startswith(PATCHED_MODULE_PREFIXES):
+            continue
+        if hasattr(module, "get_s3"):
+            monkeypatch.setattr(module, "get_s3", factory)
+    return fake
@@ -0,0 +1,555 @@
+# tests/fake_supabase.py
+
+"""
+In-memory, recording stand-in for the Supabase client.
+
+Implements the slice of the postgrest/gotrue APIs the routers use:
+table().select/insert/upsert/update/delete, the filter builders
+(eq, neq, gt, gte, lt, lte, like, ilike, in_, is_, or_), order/limit/range,
+single/maybe_single, embedded resources ("units(*)", "events!inner(building_id)")
+with dotted filters, rpc() and auth.admin. Inserting an explicit id that
+already exists fails like a primary key violation, and read-only views can
+be registered as functions of the other tables (FakeSupabase.views).
+
+Every executed statement is recorded as a Call so tests can assert how many
+round-trips an endpoint makes. Calls are also reported through
+core.metrics.track_upstream, so Server-Timing and /metrics see them exactly
+like calls made through an instrumented real client.
+
+Example:
+    fake = FakeSupabase()
+    fake.seed("buildings", [{"id": "b1", "name": "Papakea"}])
+    install_fake_supabase(fake, monkeypatch)
+    ...
+    assert fake.count("buildings", "select") == 1
+"""
+
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from core.metrics import track_upstream
+
+
+# Embedded resources whose foreign key is not "<singular>_id"
+DEFAULT_FOREIGN_KEYS = {
+    ("contractor_role_assignments", "contractor_roles"): "role_id",
+}
+
+# Module prefixes whose `get_supabase_client` is swapped for the fake
+PATCHED_MODULE_PREFIXES = ("core.", "routers.", "services.", "dependencies.", "jobs.")
+
+
+class Call(NamedTuple):
+    """One executed statement."""
+    service: str    # "db" or "auth"
+    target: str     # table, rpc function or auth admin method
+    operation: str  # select / insert / upsert / update / delete / rpc / auth
+
+
+class FakeAPIError(Exception):
+    """Raised where PostgREST would answer with an error (e.g. .single() on 0 rows)."""
+
+
+def _singular(name: str) -> str:
+    if name.endswith("ies"):
+        return name[:-3] + "y"
+    if name.endswith("s"):
+        return name[:-1]
+    return name
+
+
+def _normalize(value: Any) -> Any:
+    """Compare values the way PostgREST's text protocol does."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return None
+    return str(value)
+
+
+def _like_regex(pattern: str, flags: int = 0) -> "re.Pattern":
+    parts = []
+    for ch in pattern:
+        if ch == "%":
+            parts.append(".*")
+        elif ch == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+    return re.compile("".join(parts), flags | re.DOTALL)
+
+
+def _split_columns(columns: str) -> List[str]:
+    """Split a select string on top-level commas."""
+    fields, depth, current = [], 0, []
+    for ch in columns:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0:
+            fields.append("".join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    if "".join(current).strip():
+        fields.append("".join(current).strip())
+    return fields
+
+
+def _lookup(row: Dict[str, Any], column: str) -> Any:
+    """Read `column` from a row, following dotted paths into embedded resources."""
+    value: Any = row
+    for part in column.split("."):
+        if isinstance(value, list):
+            value = [item.get(part) for item in value if isinstance(item, dict)]
+        elif isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+
+def _matches(value: Any, predicate: Callable[[Any], bool]) -> bool:
+    if isinstance(value, list):
+        return any(predicate(v) for v in value)
+    return predicate(value)
+
+
+class FakeQuery:
+    """Chainable request builder, mirroring postgrest's SyncRequestBuilder."""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._operation = "select"
+        self._columns = "*"
+        self._count: Optional[str] = None
+        self._payload: Any = None
+        self._on_conflict = "id"
+        self._filters: List = []
+        self._row_filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._order: List = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._single: Optional[str] = None
+
+    # ---- operations -------------------------------------------------
+
+    def select(self, columns: str = "*", count: Optional[str] = None, **_):
+        self._operation = "select"
+        self._columns = columns or "*"
+        self._count = count
+        return self
+
+    def insert(self, payload, **_):
+        self._operation = "insert"
+        self._payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = "id", **_):
+        self._operation = "upsert"
+        self._payload = payload
+        self._on_conflict = on_conflict or "id"
+        return self
+
+    def update(self, payload, **_):
+        self._operation = "update"
+        self._payload = payload
+        return self
+
+    def delete(self, **_):
+        self._operation = "delete"
+        return self
+
+    # ---- filters ----------------------------------------------------
+
+    def _filter(self, column: str, predicate: Callable[[Any], bool]):
+        self._filters.append((column, predicate))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v is not None and _normalize(v) == _normalize(value))
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v is not None and _normalize(v) != _normalize(value))
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def like(self, column, pattern):
+        regex = _like_regex(pattern)
+        return self._filter(column, lambda v: v is not None and bool(regex.fullmatch(str(v))))
+
+    def ilike(self, column, pattern):
+        regex = _like_regex(pattern, re.IGNORECASE)
+        return self._filter(column, lambda v: v is not None and bool(regex.fullmatch(str(v))))
+
+    def in_(self, column, values):
+        allowed = {_normalize(v) for v in values}
+        return self._filter(column, lambda v: v is not None and _normalize(v) in allowed)
+
+    def is_(self, column, value):
+        expected = None if value in (None, "null") else _normalize(value)
+        return self._filter(column, lambda v: _normalize(v) == expected)
+
+    def or_(self, filters: str, **_):
+        """PostgREST or=(...) syntax: "col.op.value,and(col2.op.value,...)"; values may be double-quoted."""
+        self._row_filters.append(self._logic_filter(filters, any))
+        return self
+
+    def _logic_filter(self, filters: str, combine) -> Callable[[Dict[str, Any]], bool]:
+        conditions = []
+        for condition in _split_columns(filters):
+            if condition.startswith(("and(", "or(")):
+                name, inner = condition.split("(", 1)
+                conditions.append(self._logic_filter(inner[:-1], all if name == "and" else any))
+                continue
+            column, op, value = condition.split(".", 2)
+            probe = FakeQuery(self._db, self._table)
+            if op == "in":
+                probe.in_(column, [v.strip().strip('"') for v in value.strip("()").split(",")])
+            else:
+                getattr(probe, "is_" if op == "is" else op)(column, value.strip('"'))
+            column, predicate = probe._filters[0]
+            conditions.append(
+                lambda row, column=column, predicate=predicate: _matches(_lookup(row, column), predicate)
+            )
+        return lambda row: combine(condition(row) for condition in conditions)
+
+    # ---- modifiers --------------------------------------------------
+
+    def order(self, column, desc: bool = False, **_):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, **_):
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int, **_):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self):
+        self._single = "single"
+        return self
+
+    def maybe_single(self):
+        self._single = "maybe_single"
+        return self
+
+    # ---- execution --------------------------------------------------
+
+    def execute(self):
+        self._db.record("db", self._table, self._operation)
+        handler = getattr(self, f"_execute_{self._operation}")
+        return handler()
+
+    def _selected_rows(self) -> List[Dict[str, Any]]:
+        # Plain filters run before embedding so joins only touch matching rows
+        rows = self._db.rows(self._table)
+        for column, predicate in self._filters:
+            if "." not in column:
+                rows = [row for row in rows if _matches(row.get(column), predicate)]
+        for row_filter in self._row_filters:
+            rows = [row for row in rows if row_filter(row)]
+
+        rows = [self._db.embed(self._table, row, self._columns) for row in rows]
+        rows = [row for row in rows if row is not None]
+        for column, predicate in self._filters:
+            if "." in column:
+                rows = [row for row in rows if _matches(_lookup(row, column), predicate)]
+        return rows
+
+    def _matching_stored_rows(self) -> List[Dict[str, Any]]:
+        rows = self._db.rows(self._table)
+        for column, predicate in self._filters:
+            rows = [row for row in rows if _matches(_lookup(row, column), predicate)]
+        for row_filter in self._row_filters:
+            rows = [row for row in rows if row_filter(row)]
+        return rows
+
+    def _execute_select(self):
+        for field in _split_columns(self._columns):
+            if field in self._db.missing_columns.get(self._table, ()):
+                raise FakeAPIError(f'column {self._table}.{field} does not exist')
+        rows = self._selected_rows()
+        total = len(rows)
+
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column) or ""), reverse=desc)
+
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+
+        rows = [self._db.project(row, self._columns) for row in rows]
+        count = total if self._count else None
+
+        return self._result(rows, count)
+
+    def _result(self, rows: List[Dict[str, Any]], count: Optional[int] = None):
+        """Response for `rows`, unwrapped by .single()/.maybe_single()."""
+        if self._single == "single":
+            if len(rows) != 1:
+                raise FakeAPIError(f"JSON object requested, multiple (or no) rows returned from {self._table}")
+            return SimpleNamespace(data=rows[0], count=count)
+        if self._single == "maybe_single":
+            return SimpleNamespace(data=rows[0] if rows else None, count=count)
+        return SimpleNamespace(data=rows, count=count)
+
+    def _execute_insert(self):
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        for row in payload:
+            if row.get("id") is not None and self._db.get_by_id(self._table, row["id"]) is not None:
+                raise FakeAPIError(
+                    f'duplicate key value violates unique constraint "{self._table}_pkey" (23505)'
+                )
+        created = [self._db.insert_row(self._table, row) for row in payload]
+        return self._result([dict(row) for row in created])
+
+    def _execute_upsert(self):
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        keys = [k.strip() for k in self._on_conflict.split(",")]
+        stored = []
+        for row in payload:
+            existing = next(
+                (r for r in self._db.rows(self._table) if all(_normalize(r.get(k)) == _normalize(row.get(k)) for k in keys)),
+                None,
+            )
+            if existing is not None:
+                existing.update(row)
+                self._db.changed(self._table)
+                stored.append(existing)
+            else:
+                stored.append(self._db.insert_row(self._table, row))
+        return SimpleNamespace(data=[dict(row) for row in stored], count=None)
+
+    def _execute_update(self):
+        rows = self._matching_stored_rows()
+        for row in rows:
+            row.update(self._payload)
+        self._db.changed(self._table)
+        return self._result([dict(row) for row in rows])
+
+    def _execute_delete(self):
+        doomed = {id(row) for row in self._matching_stored_rows()}
+        table = self._db.rows(self._table)
+        removed = [dict(row) for row in table if id(row) in doomed]
+        table[:] = [row for row in table if id(row) not in doomed]
+        self._db.changed(self._table)
+        return SimpleNamespace(data=removed, count=None)
+
+
+class FakeRPC:
+    """Result of client.rpc(); executes a registered Python handler."""
+
+    def __init__(self, db: "FakeSupabase", name: str, params: Optional[Dict[str, Any]]):
+        self._db = db
+        self._name = name
+        self._params = params or {}
+
+    def execute(self):
+        self._db.record("db", self._name, "rpc")
+        handler = self._db.rpc_handlers.get(self._name)
+        if handler is None:
+            raise FakeAPIError(f"Could not find the function public.{self._name}")
+        return SimpleNamespace(data=handler(self._db, **self._params), count=None)
+
+
+class FakeAuthAdmin:
+    """auth.admin subset: user lookups and metadata updates."""
+
+    def __init__(self, db: "FakeSupabase"):
+        self._db = db
+
+    def get_user_by_id(self, user_id: str):
+        self._db.record("auth", "get_user_by_id", "auth")
+        user = self._db.users.get(user_id)
+        if user is None:
+            raise FakeAPIError(f"User not found: {user_id}")
+        return SimpleNamespace(user=user)
+
+    def list_users(self, *_, **__):
+        self._db.record("auth", "list_users", "auth")
+        return list(self._db.users.values())
+
+    def update_user_by_id(self, user_id: str, attributes: Dict[str, Any]):
+        self._db.record("auth", "update_user_by_id", "auth")
+        user = self._db.users[user_id]
+        if "user_metadata" in attributes:
+            user.user_metadata = {**(user.user_metadata or {}), **attributes["user_metadata"]}
+        if "email" in attributes:
+            user.email = attributes["email"]
+        return SimpleNamespace(user=user)
+
+
+class FakeSupabase:
+    """In-memory Supabase client that records every round-trip."""
+
+    def __init__(self, foreign_keys: Optional[Dict] = None):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.users: Dict[str, SimpleNamespace] = {}
+        self.rpc_handlers: Dict[str, Callable] = {}
+        # Read-only views: name -> function(fake) returning the view's rows
+        self.views: Dict[str, Callable[["FakeSupabase"], List[Dict[str, Any]]]] = {}
+        self.foreign_keys = {**DEFAULT_FOREIGN_KEYS, **(foreign_keys or {})}
+        # Columns that don't exist in a table: selecting one fails like PostgREST
+        self.missing_columns: Dict[str, Set[str]] = {}
+        self.calls: List[Call] = []
+        self.auth = SimpleNamespace(admin=FakeAuthAdmin(self))
+        self._id_index: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+
+    # ---- client API -------------------------------------------------
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRPC:
+        return FakeRPC(self, name, params)
+
+    # ---- seeding ----------------------------------------------------
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        if table in self.views:
+            return self.views[table](self)
+        return self.tables.setdefault(table, [])
+
+    def seed(self, table: str, rows: List[Dict[str, Any]]):
+        self.rows(table).extend(dict(row) for row in rows)
+        self.changed(table)
+
+    def changed(self, table: str):
+        """Drop cached lookups for `table` after a write."""
+        self._id_index.pop(table, None)
+
+    def get_by_id(self, table: str, row_id: Any) -> Optional[Dict[str, Any]]:
+        index = self._id_index.get(table)
+        if index is None:
+            index = {_normalize(row.get("id")): row for row in self.rows(table)}
+            self._id_index[table] = index
+        return index.get(_normalize(row_id))
+
+    def add_user(self, user_id: str, email: Optional[str] = None, **metadata) -> SimpleNamespace:
+        user = SimpleNamespace(id=user_id, email=email or f"{user_id}@example.com", user_metadata=metadata)
+        self.users[user_id] = user
+        return user
+
+    def insert_row(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        stored = dict(row)
+        stored.setdefault("id", str(uuid.uuid4()))
+        stored.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        self.rows(table).append(stored)
+        self.changed(table)
+        return stored
+
+    # ---- embedding / projection ------------------------------------
+
+    def _parse_embed(self, field: str):
+        match = re.fullmatch(r"(?:\w+:)?(\w+)(!inner)?\((.*)\)", field, re.DOTALL)
+        if not match:
+            return None
+        return match.group(1), bool(match.group(2)), match.group(3)
+
+    def _resolve(self, table: str, row: Dict[str, Any], resource: str):
+        """Return the embedded row (to-one) or rows (to-many) for `resource`."""
+        fk = self.foreign_keys.get((table, resource), f"{_singular(resource)}_id")
+        if fk in row:
+            return self.get_by_id(resource, row.get(fk))
+
+        back_fk = self.foreign_keys.get((resource, table), f"{_singular(table)}_id")
+        target = _normalize(row.get("id"))
+        return [r for r in self.rows(resource) if _normalize(r.get(back_fk)) == target]
+
+    def embed(self, table: str, row: Dict[str, Any], columns: str) -> Optional[Dict[str, Any]]:
+        """Copy `row` and attach embedded resources; None when an !inner join is empty."""
+        result = dict(row)
+        for field in _split_columns(columns):
+            parsed = self._parse_embed(field)
+            if not parsed:
+                continue
+            resource, inner, sub_columns = parsed
+            related = self._resolve(table, row, resource)
+            if isinstance(related, list):
+                related = [self.embed(resource, r, sub_columns) for r in related]
+                related = [self.project(r, sub_columns) for r in related if r is not None]
+            elif related is not None:
+                related = self.embed(resource, related, sub_columns)
+                related = self.project(related, sub_columns) if related is not None else None
+            if inner and not related:
+                return None
+            result[resource] = related
+        return result
+
+    def project(self, row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+        fields = _split_columns(columns)
+        if "*" in fields:
+            return row
+        projected = {}
+        for field in fields:
+            parsed = self._parse_embed(field)
+            name = parsed[0] if parsed else field
+            if name in row:
+                projected[name] = row[name]
+        return projected
+
+    # ---- call accounting -------------------------------------------
+
+    def record(self, service: str, target: str, operation: str):
+        self.calls.append(Call(service, target, operation))
+        with track_upstream("supabase", operation):
+            pass
+
+    def count(self, target: Optional[str] = None, operation: Optional[str] = None, service: Optional[str] = None) -> int:
+        """Number of recorded calls, optionally narrowed by target/operation/service."""
+        return sum(
+            1 for call in self.calls
+            if (target is None or call.target == target)
+            and (operation is None or call.operation == operation)
+            and (service is None or call.service == service)
+        )
+
+    @property
+    def db_calls(self) -> int:
+        return self.count(service="db")
+
+    @property
+    def auth_calls(self) -> int:
+        return self.count(service="auth")
+
+    def reset_calls(self):
+        self.calls.clear()
+
+
+def install_fake_supabase(fake: FakeSupabase, monkeypatch) -> FakeSupabase:
+    """
+    Point every loaded `get_supabase_client` reference at `fake`.
+
+    Routers import the factory by name, so each module's binding is patched,
+    plus the source module for function-level imports.
+    """
+    factory = lambda: fake  # noqa: E731
+    monkeypatch.setattr("core.supabase_client.get_supabase_client", factory)
+    for name, module in list(sys.modules.items()):
+        if module is None or not name.startswith(PATCHED_MODULE_PREFIXES):
+            continue
+        if hasattr(module, "get_supabase_client"):
+            monkeypatch.setattr(module, "get_supabase_client", factory)
+    return fake
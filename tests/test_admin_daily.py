@@ -0,0 +1,136 @@
+# tests/test_admin_daily.py
+
+"""
+Tests for the admin daily snapshot: each day's window starts where the
+previous day's snapshot ended, re-runs on the same day rebuild the whole
+day, and the user total is an exact count.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import routers.admin_daily as admin_daily
+
+
+DAY_ONE = datetime(2024, 3, 1, 6, 0, tzinfo=timezone.utc)
+
+
+class Clock:
+    """Stands in for `datetime` in routers.admin_daily so runs happen at set times."""
+
+    current = DAY_ONE
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+    fromisoformat = staticmethod(datetime.fromisoformat)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(admin_daily, "datetime", Clock)
+    monkeypatch.setattr(Clock, "current", DAY_ONE)
+    return Clock
+
+
+@pytest.fixture
+def fake(fake):
+    fake.seed("buildings", [{"id": "building-1", "name": "Papakea Resort", "created_at": "2023-01-01T00:00:00+00:00"}])
+    return fake
+
+
+def add_event(fake, event_id, created_at):
+    fake.seed("events", [{"id": event_id, "building_id": "building-1", "created_at": created_at.isoformat()}])
+
+
+def add_user(fake, user_id, created_at):
+    fake.add_user(user_id).created_at = created_at.isoformat()
+
+
+def stored(fake, snapshot_date):
+    return next(row for row in fake.rows(admin_daily.SNAPSHOTS_TABLE) if row["snapshot_date"] == snapshot_date)
+
+
+def event_ids(snapshot):
+    return [event["id"] for event in snapshot["new_events"]]
+
+
+def test_first_run_covers_the_last_day(fake, clock):
+    add_event(fake, "old", DAY_ONE - timedelta(hours=30))
+    add_event(fake, "recent", DAY_ONE - timedelta(hours=2))
+
+    snapshot = admin_daily.get_daily_snapshot()
+
+    assert snapshot["window_start"] == (DAY_ONE - admin_daily.DEFAULT_WINDOW).isoformat()
+    assert event_ids(snapshot) == ["recent"]
+    assert stored(fake, "2024-03-01")["window_end"] == DAY_ONE.isoformat()
+
+
+def test_second_run_on_the_same_day_rebuilds_the_whole_day(fake, clock):
+    add_event(fake, "morning", DAY_ONE - timedelta(hours=1))
+    first = admin_daily.get_daily_snapshot()
+
+    clock.current = DAY_ONE + timedelta(hours=3)
+    add_event(fake, "midday", DAY_ONE + timedelta(hours=2))
+    second = admin_daily.get_daily_snapshot()
+
+    assert second["window_start"] == first["window_start"]
+    assert event_ids(second) == ["morning", "midday"]
+
+    rows = fake.rows(admin_daily.SNAPSHOTS_TABLE)
+    assert len(rows) == 1
+    assert event_ids(rows[0]["snapshot"]) == ["morning", "midday"]
+    assert rows[0]["window_end"] == clock.current.isoformat()
+
+
+def test_next_day_starts_at_the_previous_days_window_end(fake, clock):
+    add_event(fake, "day-one", DAY_ONE - timedelta(hours=1))
+    admin_daily.get_daily_snapshot()
+    clock.current = DAY_ONE + timedelta(hours=4)
+    admin_daily.get_daily_snapshot()
+
+    clock.current = DAY_ONE + timedelta(days=1)
+    add_event(fake, "day-two", DAY_ONE + timedelta(hours=12))
+    snapshot = admin_daily.get_daily_snapshot()
+
+    assert snapshot["window_start"] == (DAY_ONE + timedelta(hours=4)).isoformat()
+    assert event_ids(snapshot) == ["day-two"]
+    assert stored(fake, "2024-03-01")["window_end"] == (DAY_ONE + timedelta(hours=4)).isoformat()
+
+
+def test_window_is_capped_after_missed_runs(fake, clock):
+    fake.seed(admin_daily.SNAPSHOTS_TABLE, [{
+        "snapshot_date": "2024-01-01", "window_start": "2023-12-31T06:00:00+00:00",
+        "window_end": "2024-01-01T06:00:00+00:00", "snapshot": {},
+    }])
+
+    snapshot = admin_daily.get_daily_snapshot()
+
+    assert snapshot["window_start"] == (DAY_ONE - admin_daily.MAX_WINDOW).isoformat()
+
+
+def test_users_total_is_an_exact_count(fake, clock):
+    add_user(fake, "user-1", DAY_ONE - timedelta(days=10))
+    add_user(fake, "user-2", DAY_ONE - timedelta(hours=1))
+
+    snapshot = admin_daily.get_daily_snapshot()
+    assert snapshot["users_total"] == 2
+    assert [user["id"] for user in snapshot["new_users"]] == ["user-2"]
+
+    del fake.users["user-1"]
+    clock.current = DAY_ONE + timedelta(days=1)
+    snapshot = admin_daily.get_daily_snapshot()
+
+    assert snapshot["users_total"] == 1
+    assert snapshot["new_users"] == []
+
+
+def test_run_endpoint_persists_the_snapshot(client, fake, clock, login):
+    login("super_admin")
+    response = client.post("/admin-daily/run")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["snapshot"]["buildings_total"] == 1
+    assert stored(fake, "2024-03-01")["snapshot"]["snapshot_date"] == "2024-03-01"
@@ -0,0 +1,263 @@
+# tests/test_auto_redact.py
+
+"""
+Tests for automatic PII redaction: detection on PyMuPDF word boxes and the
+batched POST /documents/auto-redact job, including the page text cache.
+"""
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from core.cache import cache_clear
+from core.config import settings
+from services import pii_redaction
+from services.pdf_redaction import shutdown_redaction_pool
+from services.pii_redaction import PAGE_TEXT_PREFIX, find_pii, owner_name_pattern, split_owner_names
+
+
+BUILDING_ID = "building-1"
+UNIT_ID = "unit-101"
+
+UNIT_DOC = "00000000-0000-4000-8000-00000000d001"
+BUILDING_DOC = "00000000-0000-4000-8000-00000000d002"
+CLEAN_DOC = "00000000-0000-4000-8000-00000000d003"
+IMAGE_DOC = "00000000-0000-4000-8000-00000000d004"
+MISSING_DOC = "00000000-0000-4000-8000-00000000d005"
+
+
+def words_for(line: str, block: int = 0, line_no: int = 0):
+    """Fake PyMuPDF words for one line: 10pt per character."""
+    words, x = [], 0.0
+    for n, token in enumerate(line.split()):
+        words.append((x, 100.0, x + 10 * len(token), 112.0, token, block, line_no, n))
+        x += 10 * (len(token) + 1)
+    return words
+
+
+def owner_pdf(lines_per_page) -> bytes:
+    doc = fitz.open()
+    for lines in lines_per_page:
+        page = doc.new_page()
+        for n, line in enumerate(lines):
+            page.insert_text((72, 72 + 24 * n), line, fontsize=11)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def pdf_text(data: bytes) -> str:
+    doc = fitz.open(stream=data, filetype="pdf")
+    text = "\n".join(page.get_text() for page in doc)
+    doc.close()
+    return text
+
+
+# ============================================================
+# Detection
+# ============================================================
+def test_find_pii_kinds():
+    line = "SSN 123-45-6789 call (808) 555-0100 or jane.doe@example.com Account # 0001234567"
+    matches = find_pii(0, words_for(line))
+
+    found = {(m.kind, m.text) for m in matches}
+    assert ("ssn", "123-45-6789") in found
+    assert ("phone", "(808) 555-0100") in found
+    assert ("email", "jane.doe@example.com") in found
+    assert ("account_number", "0001234567") in found
+    assert len(matches) == 4
+
+
+def test_find_pii_boxes_cover_matched_words():
+    (match,) = find_pii(2, words_for("Owner Jane Doe paid"), owner_name_pattern(["Jane Doe"]), kinds=["owner_name"])
+
+    assert match.kind == "owner_name"
+    page, x, y, width, height = match.box
+    assert page == 2
+    # "Jane" starts at 60, "Doe" ends at 60 + 50 + 30
+    assert (x, y, width, height) == (60.0, 100.0, 80.0, 12.0)
+
+
+def test_split_owner_names():
+    names = split_owner_names(["Jane Doe & John Doe", "Kai Akana; Smith", None, "Leilani  Kahale"])
+    assert names == ["Jane Doe", "John Doe", "Kai Akana", "Leilani Kahale"]
+
+
+# ============================================================
+# Batch job
+# ============================================================
+@pytest.fixture
+def fake(fake):
+    fake.seed("buildings", [{"id": BUILDING_ID, "name": "Papakea Resort"}])
+    fake.seed("units", [
+        {"id": UNIT_ID, "building_id": BUILDING_ID, "unit_number": "101", "owner_name": "Jane Doe"},
+        {"id": "unit-102", "building_id": BUILDING_ID, "unit_number": "102", "owner_name": "Kai Akana"},
+    ])
+    fake.seed("documents", [
+        {"id": UNIT_DOC, "building_id": BUILDING_ID, "s3_key": "documents/doc-unit.pdf", "is_redacted": False},
+        {"id": BUILDING_DOC, "building_id": BUILDING_ID, "s3_key": "documents/doc-building.pdf", "is_redacted": False},
+        {"id": CLEAN_DOC, "building_id": BUILDING_ID, "s3_key": "documents/doc-clean.pdf", "is_redacted": False},
+        {"id": IMAGE_DOC, "building_id": BUILDING_ID, "s3_key": "documents/photo.jpg", "is_redacted": False},
+    ])
+    fake.seed("document_units", [{"document_id": UNIT_DOC, "unit_id": UNIT_ID}])
+    return fake
+
+
+@pytest.fixture
+def s3(s3):
+    s3.put_object(Bucket=s3.bucket, Key="documents/doc-unit.pdf", Body=owner_pdf([
+        ["Owner: Jane Doe", "SSN 123-45-6789"],
+        ["Nothing to see here"],
+        ["Contact kai@example.com about Kai Akana"],
+    ]))
+    s3.put_object(Bucket=s3.bucket, Key="documents/doc-building.pdf", Body=owner_pdf([["Roster: Kai Akana, unit 102"]]))
+    s3.put_object(Bucket=s3.bucket, Key="documents/doc-clean.pdf", Body=owner_pdf([["Annual meeting minutes"]]))
+    s3.reset_calls()
+    return s3
+
+
+@pytest.fixture
+def admin(login):
+    return login("admin")
+
+
+@pytest.fixture(params=[0, 2], ids=["threadpool", "process-pool"])
+def workers(request, monkeypatch):
+    monkeypatch.setattr(settings, "REDACTION_WORKERS", request.param)
+    yield request.param
+    shutdown_redaction_pool()
+
+
+def run_job(client, **payload):
+    response = client.post("/documents/auto-redact", json=payload)
+    assert response.status_code == 200, response.text
+    job = client.get(response.json()["status_url"]).json()
+    assert job["status"] == "succeeded", job
+    return {r["document_id"]: r for r in job["results"]}
+
+
+def test_auto_redact_batch(client, fake, s3, admin, workers):
+    results = run_job(
+        client,
+        document_ids=[UNIT_DOC, BUILDING_DOC, CLEAN_DOC, IMAGE_DOC, MISSING_DOC],
+        replace_original=True,
+    )
+
+    unit_doc = results[UNIT_DOC]
+    assert unit_doc["status"] == "redacted"
+    # Only the unit's own owner is searched for in unit documents
+    assert unit_doc["matches"] == {"ssn": 1, "email": 1, "owner_name": 1}
+    assert unit_doc["pages_redacted"] == 2
+    text = pdf_text(s3.body(unit_doc["redacted_s3_key"]))
+    assert "123-45-6789" not in text and "Jane Doe" not in text and "kai@example.com" not in text
+    assert "Nothing to see here" in text and "Kai Akana" in text
+
+    # Building-level documents use every owner in the building
+    assert results[BUILDING_DOC]["matches"] == {"owner_name": 1}
+    assert results[CLEAN_DOC]["status"] == "clean"
+    assert results[IMAGE_DOC]["status"] == "skipped"
+    assert results[MISSING_DOC]["reason"] == "not found"
+
+    row = fake.get_by_id("documents", UNIT_DOC)
+    assert row["s3_key"] == unit_doc["redacted_s3_key"]
+    assert row["original_s3_key"] == "documents/doc-unit.pdf"
+    assert row["is_redacted"] is True
+    assert fake.get_by_id("documents", CLEAN_DOC)["is_redacted"] is False
+
+
+def test_rerun_uses_cached_page_text(client, fake, s3, admin, monkeypatch):
+    monkeypatch.setattr(settings, "REDACTION_WORKERS", 0)
+
+    first = run_job(client, document_ids=[UNIT_DOC])[UNIT_DOC]
+    assert first["pages_cached"] == 0
+    assert [key for _, key in s3.objects if key.startswith(PAGE_TEXT_PREFIX)]
+
+    # The page text is in S3, not the process cache, so a fresh process reuses it
+    cache_clear()
+    second = run_job(client, document_ids=[UNIT_DOC], kinds=["ssn"])[UNIT_DOC]
+    assert second["pages_cached"] == second["pages"] == 3
+    assert second["matches"] == {"ssn": 1}
+
+
+def test_job_is_private_to_its_creator(client, fake, s3, admin, login):
+    response = client.post("/documents/auto-redact", json={"document_ids": [CLEAN_DOC]})
+    job_url = response.json()["status_url"]
+
+    login("property_manager", user_id="pm-user")
+    assert client.get(job_url).status_code == 404
+
+
+def test_batch_job_does_not_rescan_documents(fake, s3, monkeypatch):
+    from jobs.auto_redact_job import run
+
+    monkeypatch.setattr(settings, "REDACTION_WORKERS", 0)
+    for n, doc_id in enumerate([CLEAN_DOC, BUILDING_DOC, UNIT_DOC]):
+        fake.get_by_id("documents", doc_id)["created_at"] = f"2024-01-0{n + 1}T00:00:00+00:00"
+
+    first = run(limit=2)
+    # Newest first: the unit document, then the building document
+    assert [r["document_id"] for r in first] == [UNIT_DOC, BUILDING_DOC]
+    # Default mode keeps s3_key, but the scan is still recorded
+    row = fake.get_by_id("documents", BUILDING_DOC)
+    assert row["is_redacted"] is False
+    assert (row["pii_scan_status"], row["pii_redacted_s3_key"]) == ("redacted", first[1]["redacted_s3_key"])
+    assert row["pii_scanned_sha256"]
+
+    second = run(limit=2)
+    assert [r["document_id"] for r in second] == [CLEAN_DOC]
+    assert fake.get_by_id("documents", CLEAN_DOC)["pii_scan_status"] == "clean"
+
+    redacted_copies = [key for _, key in s3.objects if key.startswith("redacted/")]
+    assert run(limit=2) == []
+    assert [key for _, key in s3.objects if key.startswith("redacted/")] == redacted_copies
+
+
+def test_failed_scans_are_retried_later(fake, s3, monkeypatch):
+    from jobs.auto_redact_job import find_unscanned_documents
+
+    monkeypatch.setattr(settings, "REDACTION_WORKERS", 0)
+    fake.get_by_id("documents", CLEAN_DOC).update(pii_scanned_at="2000-01-01T00:00:00", pii_scan_status="failed")
+    # Failed too recently to retry
+    fake.get_by_id("documents", UNIT_DOC).update(pii_scanned_at="2999-01-01T00:00:00", pii_scan_status="failed")
+    fake.get_by_id("documents", BUILDING_DOC).update(pii_scanned_at="2000-01-01T00:00:00", pii_scan_status="clean")
+
+    assert find_unscanned_documents(10) == [CLEAN_DOC]
+
+
+def redacted_objects(s3):
+    return [key for _, key in s3.objects if key.startswith("redacted/")]
+
+
+def test_rescan_replaces_the_previous_copy(client, fake, s3, admin, monkeypatch):
+    monkeypatch.setattr(settings, "REDACTION_WORKERS", 0)
+    keys = iter(f"redacted/documents/{UNIT_DOC}/{n}_auto_redacted.pdf" for n in range(3))
+    monkeypatch.setattr(pii_redaction, "redacted_document_key", lambda document: next(keys))
+
+    run_job(client, document_ids=[UNIT_DOC])
+    run_job(client, document_ids=[UNIT_DOC], kinds=["ssn"])
+    assert redacted_objects(s3) == [f"redacted/documents/{UNIT_DOC}/1_auto_redacted.pdf"]
+
+    third = run_job(client, document_ids=[UNIT_DOC], replace_original=True)[UNIT_DOC]
+    row = fake.get_by_id("documents", UNIT_DOC)
+    assert redacted_objects(s3) == [row["s3_key"]] == [third["redacted_s3_key"]]
+    assert row["original_s3_key"] == "documents/doc-unit.pdf"
+
+    # Re-scanning the replaced document keeps its copy and the original key
+    assert run_job(client, document_ids=[UNIT_DOC], kinds=["ssn"])[UNIT_DOC]["status"] == "clean"
+    row = fake.get_by_id("documents", UNIT_DOC)
+    assert redacted_objects(s3) == [row["s3_key"]]
+    assert row["original_s3_key"] == "documents/doc-unit.pdf"
+
+
+def test_deleting_a_document_deletes_its_redacted_copies(client, fake, s3, admin, monkeypatch):
+    from routers.documents import delete_document
+
+    monkeypatch.setattr(settings, "REDACTION_WORKERS", 0)
+    run_job(client, document_ids=[UNIT_DOC], replace_original=True)
+    run_job(client, document_ids=[BUILDING_DOC])
+    assert len(redacted_objects(s3)) == 2
+
+    delete_document(UNIT_DOC)
+    delete_document(BUILDING_DOC)
+
+    assert redacted_objects(s3) == []
@@ -0,0 +1,42 @@
+# tests/test_benchmarks.py
+
+"""
+Smoke test for the benchmark suite: every scenario runs cleanly on a tiny dataset.
+"""
+
+from benchmarks.datasets import DatasetSpec
+from benchmarks.compression import run_compression_benchmark
+from benchmarks.run import run_benchmarks, compare, percentile
+
+
+def test_benchmark_scenarios_run_cleanly():
+    spec = DatasetSpec(buildings=2, units=5, events=4, documents=4, contractors=3, uploaders=2)
+    document = run_benchmarks(spec, iterations=2, warmup=0)
+
+    assert document["dataset"]["buildings"] == 2
+    for name, stats in document["scenarios"].items():
+        if "skipped" in stats:
+            continue
+        assert stats["errors"] == 0, (name, stats["status_codes"])
+        assert stats["requests"] == 2
+        assert stats["p50_ms"] <= stats["p99_ms"]
+
+    assert document["scenarios"]["building_report"]["supabase_calls_per_request"] > 0
+    assert compare(document, document)[1].endswith("+0.0%")
+
+
+def test_percentile_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compression_benchmark_reports_bytes_on_wire():
+    spec = DatasetSpec(buildings=2, units=5, events=20, documents=20, contractors=3, uploaders=2)
+    document = run_compression_benchmark(spec, iterations=1)
+
+    report = document["endpoints"]["dashboard_building_report"]
+    assert report["gzip"]["content_encoding"] == "gzip"
+    assert report["gzip"]["bytes"] < report["identity"]["bytes"]
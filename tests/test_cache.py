@@ -58,3 +58,180 @@ def test_cache_clear():
     assert cache_get("key1") is None
     assert cache_get("key2") is None
 
+
+
+def test_cache_lru_eviction():
+    """Test that the least recently used entry is evicted at max_entries."""
+    from core.cache import SimpleCache
+    from core.state_backend import MemoryBackend
+    
+    cache = SimpleCache(MemoryBackend(max_entries=2))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+    
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_max_bytes_eviction():
+    """Test that entries are evicted when max_bytes is exceeded."""
+    from core.cache import SimpleCache
+    from core.state_backend import MemoryBackend
+    
+    cache = SimpleCache(MemoryBackend(max_bytes=3000))
+    for i in range(5):
+        cache.set(f"rows:{i}", "x" * 1000)
+    
+    stats = cache.stats()
+    assert stats["bytes"] <= 3000
+    assert stats["entries"] < 5
+    assert cache.get("rows:4") is not None
+
+
+def test_cache_proactive_expiry():
+    """Test that expired entries are purged without being read."""
+    from unittest.mock import patch
+    from core.cache import SimpleCache
+    from core.state_backend import MemoryBackend
+    
+    backend = MemoryBackend()
+    cache = SimpleCache(backend)
+    with patch("time.monotonic", return_value=100.0):
+        cache.set("short", 1, ttl_seconds=5)
+        cache.set("long", 2, ttl_seconds=500)
+    
+    with patch("time.monotonic", return_value=200.0):
+        assert backend.cleanup_expired() == 1
+    
+    assert backend.stats()["entries"] == 1
+
+
+def test_cache_delete_prefix():
+    """Test namespaced invalidation by prefix."""
+    from core.cache import cache_delete_prefix
+    
+    cache_set("buildings:list:u1", [1])
+    cache_set("buildings:list:u2", [2])
+    cache_set("units:list:u1", [3])
+    
+    assert cache_delete_prefix("buildings:list:") == 2
+    assert cache_get("buildings:list:u1") is None
+    assert cache_get("units:list:u1") == [3]
+
+
+def test_cache_stats_hits_and_misses():
+    """Test hit/miss counters."""
+    from core.cache import get_cache
+    
+    cache = get_cache()
+    cache.reset_stats()
+    cache_set("stats_key", "v")
+    cache_get("stats_key")
+    cache_get("missing_key")
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["sets"] == 1
+
+
+def test_cached_decorator_single_flight():
+    """Test that concurrent misses for one key call the function once."""
+    import threading
+    import time
+    from core.cache import cached
+    
+    calls = []
+    
+    @cached(ttl_seconds=60, key_prefix="test")
+    def slow_lookup(building_id):
+        calls.append(building_id)
+        time.sleep(0.1)
+        return {"id": building_id}
+    
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(slow_lookup("b1")))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    assert calls == ["b1"]
+    assert results == [{"id": "b1"}] * 5
+    
+    slow_lookup.invalidate("b1")
+    slow_lookup("b1")
+    assert calls == ["b1", "b1"]
+
+
+def test_cached_decorator_async():
+    """Test that the decorator supports async functions."""
+    import asyncio
+    from core.cache import cached
+    
+    calls = []
+    
+    @cached(ttl_seconds=60, key_prefix="test")
+    async def fetch(unit_id):
+        calls.append(unit_id)
+        await asyncio.sleep(0.01)
+        return unit_id.upper()
+    
+    async def run():
+        return await asyncio.gather(*[fetch("u1") for _ in range(3)])
+    
+    assert asyncio.run(run()) == ["U1", "U1", "U1"]
+    assert calls == ["u1"]
+
+
+def test_cache_tag_invalidation():
+    """Test that invalidating a tag drops every entry carrying it."""
+    from core.cache import invalidate_tags, building_tag, user_access_tag
+    
+    cache_set("buildings:list:u1", [1], tags=["buildings", user_access_tag("u1")])
+    cache_set("buildings:units:b1:u1", [2], tags=[building_tag("b1"), user_access_tag("u1")])
+    cache_set("buildings:units:b2:u2", [3], tags=[building_tag("b2"), user_access_tag("u2")])
+    
+    invalidate_tags(user_access_tag("u1"))
+    assert cache_get("buildings:list:u1") is None
+    assert cache_get("buildings:units:b1:u1") is None
+    assert cache_get("buildings:units:b2:u2") == [3]
+    
+    invalidate_tags(building_tag("b2"))
+    assert cache_get("buildings:units:b2:u2") is None
+
+
+def test_cache_tag_write_during_load():
+    """Test that a write landing while a value loads is not masked by the cache."""
+    from core.cache import get_cache, invalidate_tags
+    
+    cache = get_cache()
+    
+    def loader():
+        # A write endpoint publishes an invalidation mid-load
+        invalidate_tags("buildings")
+        return ["stale"]
+    
+    assert cache.get_or_set("buildings:list:u1", loader, tags=["buildings"]) == ["stale"]
+    assert cache_get("buildings:list:u1") is None
+
+
+def test_cache_tag_token_evicted():
+    """Test that losing a tag token to LRU eviction invalidates its entries."""
+    from core.state_backend import MemoryBackend
+    
+    backend = MemoryBackend()
+    cache = SimpleCache(backend)
+    cache.set("units:b1", [1], tags=["building:b1"])
+    assert cache.get("units:b1") == [1]
+    
+    backend.delete("cache:tag:building:b1")
+    assert cache.get("units:b1") is None
+    assert cache.size() == 0
@@ -0,0 +1,151 @@
+# tests/test_compression.py
+
+"""
+Tests for gzip/Brotli response compression: negotiation, the size
+threshold, per-route opt-out and streaming bodies.
+"""
+
+import gzip
+import json
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+import core.compression as compression
+from core.compression import (
+    CompressionMiddleware,
+    negotiate_encoding,
+    no_compression,
+    no_compression_for_downloads,
+)
+from core.config import settings
+
+
+ROWS = [{"id": n, "building": "Papakea Resort", "status": "resolved"} for n in range(500)]
+
+
+def make_app(passthrough_middleware: bool = False) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+    if passthrough_middleware:
+        # BaseHTTPMiddleware re-streams known-length bodies in chunks
+        @app.middleware("http")
+        async def passthrough(request, call_next):
+            return await call_next(request)
+
+    @app.get("/rows")
+    def rows():
+        return ROWS
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/pdf")
+    def pdf():
+        return Response(b"%PDF-1.7" + b"\0" * 5000, media_type="application/pdf")
+
+    @app.get("/secret", dependencies=[Depends(no_compression)])
+    def secret():
+        return ROWS
+
+    @app.get("/report", dependencies=[Depends(no_compression_for_downloads)])
+    def report(format: str = "json"):
+        return ROWS
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(
+            (json.dumps(row) + "\n" for row in ROWS), media_type="application/x-ndjson",
+        )
+
+    return app
+
+
+@pytest.fixture(params=[False, True], ids=["direct", "behind-base-middleware"])
+def client(request):
+    return TestClient(make_app(passthrough_middleware=request.param))
+
+
+def get(client, path, encoding="gzip"):
+    return client.get(path, headers={"Accept-Encoding": encoding})
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, None),
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("deflate, gzip;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("*", compression.SUPPORTED_ENCODINGS[0]),
+    ("*;q=0.2, gzip;q=0", "br" if compression.brotli is not None else None),
+    ("GZIP ; q=1.0", "gzip"),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_large_json_is_gzipped(client):
+    response = get(client, "/rows")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == response.num_bytes_downloaded
+    assert response.num_bytes_downloaded < len(json.dumps(ROWS)) / 5
+    assert response.json() == ROWS
+
+
+def test_identity_and_small_bodies_are_sent_as_is(client):
+    assert "content-encoding" not in get(client, "/rows", encoding="identity").headers
+    assert "content-encoding" not in get(client, "/small").headers
+
+
+def test_binary_and_opted_out_routes_are_not_compressed(client):
+    assert "content-encoding" not in get(client, "/pdf").headers
+    assert "content-encoding" not in get(client, "/secret").headers
+    assert "content-encoding" not in get(client, "/report?format=pdf").headers
+    assert "content-encoding" not in get(client, "/report?format=xlsx").headers
+    assert get(client, "/report").headers["content-encoding"] == "gzip"
+
+
+def test_streaming_body_is_compressed_per_chunk(client):
+    response = get(client, "/stream")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert [json.loads(line) for line in response.text.splitlines()] == ROWS
+
+
+def test_large_bodies_are_compressed_off_the_event_loop(client, monkeypatch):
+    calls = []
+
+    async def recording_threadpool(func, *args):
+        calls.append(func.__name__)
+        return func(*args)
+
+    monkeypatch.setattr(compression, "run_in_threadpool", recording_threadpool)
+    monkeypatch.setattr(settings, "COMPRESSION_THREAD_BYTES", 10_000)
+
+    assert get(client, "/rows").json() == ROWS
+    assert calls == ["compress_body"]
+
+
+def test_compression_can_be_disabled(client, monkeypatch):
+    monkeypatch.setattr(settings, "COMPRESSION_ENABLED", False)
+    assert "content-encoding" not in get(client, "/rows").headers
+
+
+def test_brotli_is_preferred_when_installed(client):
+    pytest.importorskip("brotli")
+    response = get(client, "/rows", encoding="gzip, br")
+
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == ROWS
+
+
+def test_compress_body_roundtrip():
+    body = json.dumps(ROWS).encode()
+    assert gzip.decompress(compression.compress_body(body, "gzip")) == body
@@ -0,0 +1,183 @@
+# tests/test_document_purchases.py
+
+"""
+Tests for verified document purchases: paid downloads are verified with
+Stripe once, then resolved locally until they expire or are refunded.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import settings
+from services import document_purchases
+from tests.fake_s3 import FakeS3, install_fake_s3
+from tests.fake_supabase import FakeSupabase, install_fake_supabase
+
+
+DOC_ID = "00000000-0000-4000-8000-00000000a001"
+OTHER_DOC_ID = "00000000-0000-4000-8000-00000000a002"
+SESSION_ID = "cs_test_123"
+PAYMENT_INTENT_ID = "pi_test_123"
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeSupabase()
+    fake.seed("documents", [
+        {"id": DOC_ID, "s3_key": "documents/bylaws.pdf", "is_public": True, "building_id": "building-1"},
+        {"id": OTHER_DOC_ID, "s3_key": "documents/budget.pdf", "is_public": True, "building_id": "building-1"},
+    ])
+    install_fake_s3(FakeS3(), monkeypatch)
+    return install_fake_supabase(fake, monkeypatch)
+
+
+@pytest.fixture
+def stripe_calls(monkeypatch):
+    calls = []
+
+    def get_session(session_id, document_id=None):
+        calls.append(("session", session_id, document_id))
+        return SimpleNamespace(
+            id=session_id, payment_intent=PAYMENT_INTENT_ID,
+            metadata={"document_ids": f"{DOC_ID}, {OTHER_DOC_ID}"},
+        )
+
+    def verify_payment_intent(payment_intent_id, document_id=None):
+        calls.append(("payment_intent", payment_intent_id, document_id))
+        return True
+
+    monkeypatch.setattr(document_purchases, "get_verified_stripe_session", get_session)
+    monkeypatch.setattr(document_purchases, "verify_stripe_payment_intent", verify_payment_intent)
+    monkeypatch.setattr(document_purchases, "get_refunded_charge_payment_intent", lambda charge_id: PAYMENT_INTENT_ID)
+    return calls
+
+
+def checkout_event(event_id="evt_checkout", document_ids=f"{DOC_ID}, {OTHER_DOC_ID}"):
+    return {
+        "id": event_id,
+        "type": "checkout.session.completed",
+        "data": {"object": {
+            "id": SESSION_ID, "payment_status": "paid", "payment_intent": PAYMENT_INTENT_ID,
+            "metadata": {"document_ids": document_ids},
+        }},
+    }
+
+
+def download(client, document_id=DOC_ID, **params):
+    return client.get(f"/uploads/documents/{document_id}/download", params=params)
+
+
+def post_event(client, event):
+    return client.post("/webhooks/stripe/subscription", content=json.dumps(event))
+
+
+def test_first_download_verifies_with_stripe_then_resolves_locally(client, fake, stripe_calls):
+    for _ in range(3):
+        assert download(client, stripe_session_id=SESSION_ID).status_code == 200
+
+    assert stripe_calls == [("session", SESSION_ID, DOC_ID)]
+    (purchase,) = fake.rows("verified_document_purchases")
+    assert purchase["stripe_ref"] == SESSION_ID
+    assert purchase["stripe_payment_intent_id"] == PAYMENT_INTENT_ID
+    assert purchase["source"] == "verification"
+    # Later downloads are served from the cache, not the table
+    assert fake.count("verified_document_purchases", "select") == 2
+
+
+def test_failed_verification_is_not_recorded(client, fake, monkeypatch):
+    monkeypatch.setattr(document_purchases, "get_verified_stripe_session", lambda *_: None)
+
+    assert download(client, stripe_session_id=SESSION_ID).status_code == 402
+    assert fake.rows("verified_document_purchases") == []
+
+
+def test_checkout_webhook_records_purchased_documents(client, fake, stripe_calls):
+    # The payload lists one document; the session Stripe returns is authoritative
+    post_event(client, checkout_event(document_ids=DOC_ID))
+
+    result = fake.get_by_id("stripe_webhook_events", "evt_checkout")["result"]
+    assert result == {"status": "success", "documents_verified": 2}
+
+    assert download(client, stripe_session_id=SESSION_ID).status_code == 200
+    assert download(client, OTHER_DOC_ID, stripe_session_id=SESSION_ID).status_code == 200
+    # Only the webhook asked Stripe; the downloads resolved locally
+    assert stripe_calls == [("session", SESSION_ID, None)]
+
+
+def test_unsigned_checkout_event_is_rejected(client, fake, stripe_calls, monkeypatch):
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", "whsec_test")
+
+    assert post_event(client, checkout_event()).status_code == 400
+    assert fake.rows("stripe_webhook_events") == []
+    assert fake.rows("verified_document_purchases") == []
+
+
+def test_forged_checkout_event_grants_nothing(client, fake, monkeypatch):
+    # No webhook secret configured, and Stripe doesn't know the session
+    monkeypatch.setattr(document_purchases, "get_verified_stripe_session", lambda *_: None)
+
+    assert post_event(client, checkout_event()).status_code == 200
+    assert fake.get_by_id("stripe_webhook_events", "evt_checkout")["result"]["status"] == "ignored"
+    assert fake.rows("verified_document_purchases") == []
+    assert download(client, stripe_session_id=SESSION_ID).status_code == 402
+
+
+def test_refund_revokes_access(client, fake, stripe_calls):
+    assert download(client, stripe_session_id=SESSION_ID).status_code == 200
+    assert download(client, stripe_payment_intent_id=PAYMENT_INTENT_ID).status_code == 200
+
+    post_event(client, {
+        "id": "evt_refund",
+        "type": "charge.refunded",
+        "data": {"object": {"id": "ch_1", "payment_intent": PAYMENT_INTENT_ID, "refunded": True}},
+    })
+    assert fake.get_by_id("stripe_webhook_events", "evt_refund")["result"]["purchases_revoked"] == 2
+
+    # Cached grants are invalidated and Stripe is not consulted again
+    assert download(client, stripe_session_id=SESSION_ID).status_code == 402
+    assert download(client, stripe_payment_intent_id=PAYMENT_INTENT_ID).status_code == 402
+    assert len(stripe_calls) == 2
+
+
+def test_partial_refund_keeps_access(client, fake, stripe_calls):
+    assert download(client, stripe_payment_intent_id=PAYMENT_INTENT_ID).status_code == 200
+
+    post_event(client, {
+        "id": "evt_partial",
+        "type": "charge.refunded",
+        "data": {"object": {"id": "ch_1", "payment_intent": PAYMENT_INTENT_ID, "refunded": False}},
+    })
+
+    assert fake.get_by_id("stripe_webhook_events", "evt_partial")["result"]["reason"] == "partial_refund"
+    assert download(client, stripe_payment_intent_id=PAYMENT_INTENT_ID).status_code == 200
+
+
+def test_unconfirmed_refund_keeps_access(client, fake, stripe_calls, monkeypatch):
+    monkeypatch.setattr(document_purchases, "get_refunded_charge_payment_intent", lambda charge_id: None)
+    assert download(client, stripe_payment_intent_id=PAYMENT_INTENT_ID).status_code == 200
+
+    post_event(client, {
+        "id": "evt_forged_refund",
+        "type": "charge.refunded",
+        "data": {"object": {"id": "ch_forged", "payment_intent": PAYMENT_INTENT_ID, "refunded": True}},
+    })
+
+    assert fake.get_by_id("stripe_webhook_events", "evt_forged_refund")["result"]["reason"] == "refund_not_confirmed"
+    assert download(client, stripe_payment_intent_id=PAYMENT_INTENT_ID).status_code == 200
+
+
+def test_expired_purchase_is_verified_again(client, fake, stripe_calls):
+    fake.seed("verified_document_purchases", [{
+        "stripe_ref": PAYMENT_INTENT_ID, "document_id": DOC_ID, "ref_type": "payment_intent",
+        "source": "verification", "revoked_at": None,
+        "expires_at": (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat(),
+    }])
+
+    assert download(client, stripe_payment_intent_id=PAYMENT_INTENT_ID).status_code == 200
+    assert stripe_calls == [("payment_intent", PAYMENT_INTENT_ID, DOC_ID)]
+
+    (purchase,) = fake.rows("verified_document_purchases")
+    assert datetime.fromisoformat(purchase["expires_at"]) > datetime.now(timezone.utc)
@@ -0,0 +1,161 @@
+# tests/test_document_storage.py
+
+"""
+Tests for content-addressed document storage: identical uploads share one
+S3 object, and the object is deleted with the last document using it.
+"""
+
+import hashlib
+import io
+
+import pytest
+
+from services.document_storage import content_key, release_object
+
+
+BUILDING_ID = "00000000-0000-4000-8000-000000000001"
+
+ARCHIVE_PDF = b"%PDF-1.4 county archive minutes 1998"
+OTHER_PDF = b"%PDF-1.4 reserve study 2024"
+
+
+@pytest.fixture
+def fake(fake):
+    fake.seed("buildings", [{"id": BUILDING_ID, "name": "Papakea Resort"}])
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def admin(login):
+    return login("super_admin", permissions=["upload:write", "documents:write"])
+
+
+def upload(client, data, title="Minutes"):
+    response = client.post(
+        "/uploads/",
+        files={"file": ("minutes.pdf", io.BytesIO(data), "application/pdf")},
+        data={"title": title, "building_id": BUILDING_ID},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_identical_uploads_share_one_object(client, fake, s3):
+    first = upload(client, ARCHIVE_PDF, title="Minutes 1998")
+    second = upload(client, ARCHIVE_PDF, title="Minutes 1998 (copy)")
+
+    sha256 = hashlib.sha256(ARCHIVE_PDF).hexdigest()
+    key = content_key(sha256, ".pdf")
+    assert first["upload"]["s3_key"] == second["upload"]["s3_key"] == key
+    assert (first["upload"]["deduplicated"], second["upload"]["deduplicated"]) == (False, True)
+    assert s3.count("upload_file") == 1
+    assert s3.body(key) == ARCHIVE_PDF
+
+    assert [row["content_sha256"] for row in fake.rows("documents")] == [sha256, sha256]
+    assert [(row["sha256"], row["ref_count"]) for row in fake.rows("document_objects")] == [(sha256, 2)]
+
+
+def test_different_content_gets_its_own_object(client, fake, s3):
+    first = upload(client, ARCHIVE_PDF)
+    second = upload(client, OTHER_PDF)
+
+    assert first["upload"]["s3_key"] != second["upload"]["s3_key"]
+    assert s3.count("upload_file") == 2
+    assert len(fake.rows("document_objects")) == 2
+
+
+def test_object_is_deleted_with_last_reference(client, fake, s3):
+    first = upload(client, ARCHIVE_PDF)
+    second = upload(client, ARCHIVE_PDF)
+    key = first["upload"]["s3_key"]
+
+    assert client.delete(f"/documents/{first['document']['id']}").status_code == 200
+    assert s3.count("delete_object") == 0
+    assert s3.body(key) == ARCHIVE_PDF
+    assert fake.rows("document_objects")[0]["ref_count"] == 1
+
+    assert client.delete(f"/documents/{second['document']['id']}").status_code == 200
+    assert s3.count("delete_object") == 1
+    assert (s3.bucket, key) not in s3.objects
+    assert fake.rows("document_objects") == []
+
+
+def test_failed_s3_upload_releases_the_reference(client, fake, s3, monkeypatch):
+    def broken_upload(**kwargs):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(s3, "upload_file", broken_upload)
+    response = client.post(
+        "/uploads/",
+        files={"file": ("minutes.pdf", io.BytesIO(ARCHIVE_PDF), "application/pdf")},
+        data={"title": "Minutes", "building_id": BUILDING_ID},
+    )
+
+    assert response.status_code == 500
+    assert fake.rows("document_objects") == []
+    assert fake.rows("documents") == []
+
+
+def test_rpcs_are_used_when_available(client, fake, s3):
+    calls = []
+    fake.rpc_handlers["acquire_document_object"] = lambda db, **params: calls.append("acquire") or [
+        {"s3_key": params["p_s3_key"], "created": True, "status": "pending"}
+    ]
+    fake.rpc_handlers["release_document_object"] = lambda db, **params: calls.append("release") or [
+        {"s3_key": content_key(params["p_sha256"], ".pdf"), "ref_count": 0}
+    ]
+
+    document = upload(client, ARCHIVE_PDF)["document"]
+    assert client.delete(f"/documents/{document['id']}").status_code == 200
+
+    assert calls == ["acquire", "release"]
+    # Only the status update after the PUT goes to the table
+    assert fake.count("document_objects") == fake.count("document_objects", "update") == 1
+    assert s3.count("delete_object") == 1
+
+
+def acquire_pending(fake, sha256, key):
+    """Another upload of the same content registered the object and is still uploading."""
+    fake.seed("document_objects", [{"sha256": sha256, "s3_key": key, "ref_count": 1, "status": "pending"}])
+
+
+def test_upload_after_stored_object_skips_s3(client, fake, s3):
+    upload(client, ARCHIVE_PDF)
+    s3.reset_calls()
+
+    assert fake.rows("document_objects")[0]["status"] == "stored"
+    second = upload(client, ARCHIVE_PDF)
+    assert second["upload"]["deduplicated"] is True
+    assert s3.calls == []
+
+
+def test_pending_object_missing_from_s3_is_uploaded_again(client, fake, s3):
+    sha256 = hashlib.sha256(ARCHIVE_PDF).hexdigest()
+    key = content_key(sha256, ".pdf")
+    # The first uploader's PUT failed (or hasn't happened): nothing in S3
+    acquire_pending(fake, sha256, key)
+
+    response = upload(client, ARCHIVE_PDF)
+
+    assert response["upload"]["s3_key"] == key
+    assert response["upload"]["deduplicated"] is False
+    assert s3.body(key) == ARCHIVE_PDF
+    assert [(row["ref_count"], row["status"]) for row in fake.rows("document_objects")] == [(2, "stored")]
+
+    # The failed first uploader releases its reference; the object stays
+    assert release_object(sha256) is None
+    assert s3.body(key) == ARCHIVE_PDF
+
+
+def test_pending_object_already_in_s3_is_reused(client, fake, s3):
+    sha256 = hashlib.sha256(ARCHIVE_PDF).hexdigest()
+    key = content_key(sha256, ".pdf")
+    acquire_pending(fake, sha256, key)
+    s3.put_object(Bucket=s3.bucket, Key=key, Body=ARCHIVE_PDF)
+    s3.reset_calls()
+
+    response = upload(client, ARCHIVE_PDF)
+
+    assert response["upload"]["deduplicated"] is True
+    assert s3.calls == ["head_object"]
+    assert fake.rows("document_objects")[0]["status"] == "stored"
@@ -0,0 +1,138 @@
+# tests/test_events_bulk.py
+
+"""
+Tests for POST /events/bulk: references and permissions are checked with
+one query per table, events and junction rows are written in batches,
+and every item gets its own result.
+"""
+
+import pytest
+
+
+
+BUILDING_ID = "00000000-0000-4000-8000-0000000b0001"
+OTHER_BUILDING_ID = "00000000-0000-4000-8000-0000000b0002"
+MISSING_BUILDING_ID = "00000000-0000-4000-8000-0000000b0009"
+CONTRACTOR_ID = "00000000-0000-4000-8000-0000000c0001"
+MISSING_CONTRACTOR_ID = "00000000-0000-4000-8000-0000000c0009"
+
+
+def unit_id(i: int, building: int = 1) -> str:
+    return f"00000000-0000-4000-8{building:03d}-{i:012d}"
+
+
+@pytest.fixture
+def fake(fake):
+    fake.seed("buildings", [
+        {"id": BUILDING_ID, "name": "Papakea Resort"},
+        {"id": OTHER_BUILDING_ID, "name": "Kaanapali Shores"},
+    ])
+    fake.seed("units", [{"id": unit_id(i), "building_id": BUILDING_ID, "unit_number": str(100 + i)} for i in range(20)])
+    fake.seed("units", [{"id": unit_id(0, building=2), "building_id": OTHER_BUILDING_ID, "unit_number": "A1"}])
+    fake.seed("contractors", [{"id": CONTRACTOR_ID, "company_name": "Maui Plumbing"}])
+    fake.seed("user_building_access", [{"id": "uba-1", "user_id": "pm-user", "building_id": BUILDING_ID}])
+    return fake
+
+
+def event(n: int, building_id=BUILDING_ID, **extra):
+    return {
+        "building_id": building_id,
+        "event_type": "maintenance",
+        "title": f"Historical event {n}",
+        "occurred_at": "2023-06-01T00:00:00Z",
+        **extra,
+    }
+
+
+def post_bulk(client, events):
+    response = client.post("/events/bulk", json={"events": events})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_bulk_import_uses_set_based_queries_and_batches(client, fake, login):
+    login("admin")
+    events = [
+        event(n, unit_ids=[unit_id(n % 20), unit_id((n + 1) % 20)], contractor_ids=[CONTRACTOR_ID])
+        for n in range(250)
+    ]
+    fake.reset_calls()
+
+    body = post_bulk(client, events)
+
+    assert body["status"] == "success"
+    assert body["count"] == 250
+    assert [r["index"] for r in body["results"]] == list(range(250))
+    assert len(fake.rows("events")) == 250
+    assert len(fake.rows("event_units")) == 500
+    assert len(fake.rows("event_contractors")) == 250
+
+    for table in ("buildings", "units", "contractors"):
+        assert fake.count(table, "select") == 1
+    assert fake.count("events", "insert") == 3          # batches of 100
+    assert fake.count("event_units", "upsert") == 1
+    assert fake.count("event_contractors", "upsert") == 1
+
+
+def test_invalid_items_are_reported_individually(client, fake, login):
+    login("admin")
+    body = post_bulk(client, [
+        event(0, unit_ids=[unit_id(1)]),
+        event(1, building_id=MISSING_BUILDING_ID),
+        event(2, unit_ids=[unit_id(0, building=2)]),
+        event(3, contractor_ids=[MISSING_CONTRACTOR_ID]),
+    ])
+
+    assert body["status"] == "partial_success"
+    assert (body["count"], body["errors"]) == (1, 3)
+    statuses = [r["status"] for r in body["results"]]
+    assert statuses == ["created", "error", "error", "error"]
+    assert "does not exist" in body["results"][1]["error"]
+    assert "do not belong" in body["results"][2]["error"]
+    assert "Contractors not found" in body["results"][3]["error"]
+    assert [row["event_id"] for row in fake.rows("event_units")] == [body["results"][0]["event"]["id"]]
+
+
+def test_building_access_is_checked_once_per_request(client, fake, login):
+    login("property_manager", user_id="pm-user")
+    fake.reset_calls()
+
+    body = post_bulk(client, [event(0), event(1, building_id=OTHER_BUILDING_ID), event(2)])
+
+    assert [r["status"] for r in body["results"]] == ["created", "error", "created"]
+    assert fake.count("user_building_access", "select") == 1
+
+
+def test_contractor_is_linked_to_their_events(client, fake, login):
+    login("contractor", user_id="contractor-user", contractor_id=CONTRACTOR_ID)
+
+    body = post_bulk(client, [event(0, building_id=OTHER_BUILDING_ID)])
+
+    assert body["status"] == "success"
+    event_id = body["results"][0]["event"]["id"]
+    assert [(r["event_id"], r["contractor_id"]) for r in fake.rows("event_contractors")] == [(event_id, CONTRACTOR_ID)]
+
+
+def test_repeated_links_are_written_once(client, fake, login):
+    login("contractor", user_id="contractor-user", contractor_id=CONTRACTOR_ID)
+
+    body = post_bulk(client, [
+        event(0, unit_ids=[unit_id(1), unit_id(1)], contractor_ids=[CONTRACTOR_ID, CONTRACTOR_ID.upper()]),
+        event(1, contractor_ids=[CONTRACTOR_ID]),
+    ])
+
+    assert body["status"] == "success"
+    event_ids = [r["event"]["id"] for r in body["results"]]
+    assert [(r["event_id"], r["unit_id"]) for r in fake.rows("event_units")] == [(event_ids[0], unit_id(1))]
+    assert [(r["event_id"], r["contractor_id"]) for r in fake.rows("event_contractors")] == [
+        (event_ids[0], CONTRACTOR_ID), (event_ids[1], CONTRACTOR_ID),
+    ]
+
+
+def test_building_ids_are_matched_in_any_uuid_format(client, fake, login):
+    login("admin")
+
+    body = post_bulk(client, [event(0, building_id=BUILDING_ID.upper(), unit_ids=[unit_id(1)])])
+
+    assert body["status"] == "success"
+    assert body["results"][0]["event"]["building_id"] == BUILDING_ID
@@ -0,0 +1,141 @@
+# tests/test_exports.py
+
+"""
+Tests for the streaming building exports: keyset pages cover every row
+exactly once, rows are sanitized per role, and the body is produced one
+page at a time.
+"""
+
+import csv
+import io
+import json
+import math
+
+import pytest
+
+import services.exports as exports
+from dependencies.auth import CurrentUser
+from services.exports import iter_keyset_pages, stream_export
+
+
+BUILDING_ID = "00000000-0000-4000-8000-000000000001"
+PAGE_SIZE = 7
+EVENT_COUNT = 45
+
+
+def event_row(n):
+    return {
+        "id": f"event-{n:03d}", "building_id": BUILDING_ID, "title": f"Event {n}",
+        # Several events share a timestamp, so pages must break ties on id
+        "created_at": f"2024-01-{1 + n // 4:02d}T00:00:00+00:00",
+        "contractor_notes": "ladder in garage", "pm_notes": "invoice pending",
+        "admin_notes": "do not share", "owner_email": "owner@example.com",
+    }
+
+
+@pytest.fixture
+def fake(fake, monkeypatch):
+    fake.seed("buildings", [{"id": BUILDING_ID, "name": "Papakea Resort"}])
+    # Seeded out of order: the export sorts on (created_at, id)
+    fake.seed("events", [event_row(n) for n in reversed(range(EVENT_COUNT))])
+    fake.seed("event_units", [{"event_id": f"event-{n:03d}", "unit_id": f"unit-{n % 3}"} for n in range(EVENT_COUNT)])
+    fake.seed("documents", [
+        {"id": "doc-1", "building_id": BUILDING_ID, "title": "Minutes", "created_at": "2024-02-01T00:00:00+00:00",
+         "filename": "minutes.pdf", "owner_phone": "808-555-0100"},
+        {"id": "doc-2", "building_id": BUILDING_ID, "title": "Unit 2 lease", "created_at": "2024-02-02T00:00:00+00:00"},
+        {"id": "doc-3", "building_id": "building-other", "title": "Elsewhere", "created_at": "2024-02-03T00:00:00+00:00"},
+    ])
+    fake.seed("document_units", [{"document_id": "doc-2", "unit_id": "unit-2"}])
+    fake.seed("user_building_access", [{"id": "uba-1", "user_id": "owner-1", "building_id": BUILDING_ID}])
+    fake.seed("user_units_access", [{"user_id": "owner-1", "unit_id": "unit-1"}])
+    monkeypatch.setattr(exports, "EXPORT_PAGE_SIZE", PAGE_SIZE)
+    return fake
+
+
+def test_keyset_pages_cover_every_row_once(fake):
+    pages = list(iter_keyset_pages("events", "admin", lambda q: q.eq("building_id", BUILDING_ID), page_size=PAGE_SIZE))
+
+    ids = [row["id"] for page in pages for row in page]
+    assert ids == [f"event-{n:03d}" for n in range(EVENT_COUNT)]
+    assert [len(page) for page in pages[:-1]] == [PAGE_SIZE] * (len(pages) - 1)
+    assert fake.count("events", "select") == math.ceil(EVENT_COUNT / PAGE_SIZE)
+
+
+def test_admin_csv_export_has_every_event(client, fake, login):
+    login("super_admin")
+    response = client.get(f"/exports/buildings/{BUILDING_ID}/events.csv")
+
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == EVENT_COUNT
+    assert rows[0]["admin_notes"] == "do not share"
+    assert rows[0]["unit_ids"] == "unit-0"
+
+
+def test_export_is_streamed_one_page_at_a_time(fake):
+    user = CurrentUser(id="admin", auth_user_id="admin", email="a@example.com", role="admin", permissions=[])
+    chunks = stream_export(fake, "events", BUILDING_ID, user, "admin", "ndjson", page_size=PAGE_SIZE)
+
+    first = next(chunks)
+    # Only the first page has been read so far
+    assert len(first.splitlines()) == PAGE_SIZE
+    assert fake.count("events", "select") == 1
+
+    remaining = list(chunks)
+    assert len(remaining) == math.ceil(EVENT_COUNT / PAGE_SIZE) - 1
+
+
+def test_contractor_ndjson_export_drops_restricted_columns(client, fake, login):
+    login("contractor")
+    response = client.get(f"/exports/buildings/{BUILDING_ID}/events.ndjson")
+
+    assert response.status_code == 200, response.text
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert len(events) == EVENT_COUNT
+    assert events[0]["contractor_notes"] == "ladder in garage"
+    assert not set(events[0]) & {"pm_notes", "admin_notes", "owner_email"}
+
+
+def test_owner_export_is_limited_to_accessible_units(client, fake, login):
+    login("owner", user_id="owner-1")
+
+    events = client.get(f"/exports/buildings/{BUILDING_ID}/events.ndjson").text.splitlines()
+    assert {json.loads(line)["unit_ids"][0] for line in events} == {"unit-1"}
+    assert len(events) == len([n for n in range(EVENT_COUNT) if n % 3 == 1])
+
+    documents = [json.loads(line) for line in client.get(f"/exports/buildings/{BUILDING_ID}/documents.ndjson").text.splitlines()]
+    # doc-1 has no unit links (building-wide); doc-2 belongs to a unit the owner can't access
+    assert [document["id"] for document in documents] == ["doc-1"]
+    assert documents[0]["owner_phone"] == "808-555-0100"
+
+
+def test_unlisted_roles_get_public_columns(client, fake, login):
+    login("aoao_staff", user_id="owner-1")
+
+    response = client.get(f"/exports/buildings/{BUILDING_ID}/documents.csv")
+
+    assert response.status_code == 200, response.text
+    header = response.text.splitlines()[0].split(",")
+    assert "title" in header
+    assert "filename" not in header and "owner_phone" not in header
+
+
+def test_unknown_building_and_format(client, fake, login):
+    login("super_admin")
+    assert client.get("/exports/buildings/missing/events.csv").status_code == 404
+    assert client.get(f"/exports/buildings/{BUILDING_ID}/events.xml").status_code == 422
+
+
+def test_csv_export_neutralizes_formulas(client, fake, login):
+    fake.rows("events")[0].update(title='=HYPERLINK("http://evil","click")', admin_notes="@SUM(A1)", pm_notes="-2+3")
+    login("super_admin")
+
+    rows = list(csv.DictReader(io.StringIO(client.get(f"/exports/buildings/{BUILDING_ID}/events.csv").text)))
+    event = next(row for row in rows if row["id"] == "event-044")
+
+    assert event["title"] == '\'=HYPERLINK("http://evil","click")'
+    assert (event["admin_notes"], event["pm_notes"]) == ("'@SUM(A1)", "'-2+3")
+    assert event["contractor_notes"] == "ladder in garage"
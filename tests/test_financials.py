@@ -0,0 +1,173 @@
+# tests/test_financials.py
+
+"""
+Tests for the financial breakdowns: tier/status counts come from the
+aggregation RPC, Stripe is called once per listed subscription (and
+cached per subscription), and the premium report breakdown is served
+from a single purchases query.
+"""
+
+import pytest
+
+import routers.financials as financials
+from core.cache import cache_delete
+
+
+def subscription_counts(db, p_start, p_end):
+    """financial_subscription_counts over the fake tables (created_in_period omitted)."""
+    groups = {}
+    for source, table, _, _ in financials.BREAKDOWN_SOURCES:
+        for row in db.rows(table):
+            key = (source, row.get("subscription_tier"), row.get("subscription_status"))
+            groups[key] = groups.get(key, 0) + 1
+    return [
+        {"source": source, "subscription_tier": tier, "subscription_status": status,
+         "is_trial": False, "total": total, "created_in_period": 0}
+        for (source, tier, status), total in groups.items()
+    ]
+
+
+@pytest.fixture
+def fake(fake):
+    fake.seed("user_subscriptions", [
+        {"id": "us-1", "user_id": "user-1", "subscription_tier": "paid", "subscription_status": "active",
+         "stripe_subscription_id": "sub_1", "created_at": "2024-01-01T00:00:00+00:00"},
+        {"id": "us-2", "user_id": "user-2", "subscription_tier": "paid", "subscription_status": "trialing",
+         "stripe_subscription_id": "sub_2", "created_at": "2024-01-02T00:00:00+00:00"},
+        {"id": "us-3", "user_id": "user-3", "subscription_tier": "paid", "subscription_status": "canceled",
+         "stripe_subscription_id": "sub_3", "created_at": "2024-01-03T00:00:00+00:00"},
+        {"id": "us-4", "user_id": "user-4", "subscription_tier": "free", "subscription_status": "active",
+         "created_at": "2024-01-04T00:00:00+00:00"},
+    ])
+    fake.seed("contractors", [
+        {"id": "c-1", "company_name": "Maui Plumbing", "subscription_tier": "paid", "subscription_status": "active",
+         "stripe_customer_id": "cus_1", "created_at": "2024-01-05T00:00:00+00:00"},
+    ])
+    fake.seed("aoao_organizations", [
+        {"id": "o-1", "organization_name": "Papakea AOAO", "subscription_tier": "free", "subscription_status": "active",
+         "created_at": "2024-01-06T00:00:00+00:00"},
+    ])
+    fake.seed("premium_report_purchases", [
+        {"id": "p-1", "report_type": "building", "payment_status": "paid", "amount_cents": 1500,
+         "amount_decimal": 15.0, "purchased_at": "2024-02-01T00:00:00+00:00"},
+        {"id": "p-2", "report_type": "building", "payment_status": "paid", "amount_cents": 1500,
+         "amount_decimal": 15.0, "purchased_at": "2024-02-03T00:00:00+00:00"},
+        {"id": "p-3", "report_type": "unit", "payment_status": "paid", "amount_cents": 500,
+         "amount_decimal": 5.0, "purchased_at": "2024-02-02T00:00:00+00:00"},
+        {"id": "p-4", "report_type": "unit", "payment_status": "pending", "amount_cents": 500,
+         "amount_decimal": 5.0, "purchased_at": "2024-02-02T00:00:00+00:00"},
+        {"id": "p-5", "report_type": "unit", "payment_status": "paid", "amount_cents": 500,
+         "amount_decimal": 5.0, "purchased_at": "2024-03-15T00:00:00+00:00"},
+    ])
+    fake.rpc_handlers["financial_subscription_counts"] = subscription_counts
+    return fake
+
+
+@pytest.fixture
+def stripe_calls(monkeypatch):
+    calls = []
+
+    def get_subscription_revenue(stripe_subscription_id=None, stripe_customer_id=None):
+        calls.append(stripe_subscription_id or stripe_customer_id)
+        interval = "year" if stripe_customer_id else "month"
+        return {"amount": 1200, "amount_decimal": 12.0, "currency": "usd", "interval": interval}
+
+    monkeypatch.setattr(financials, "get_subscription_revenue", get_subscription_revenue)
+    return calls
+
+
+@pytest.fixture
+def super_admin(login):
+    return login("super_admin")
+
+
+def test_subscription_breakdown_counts_come_from_sql(client, fake, stripe_calls, super_admin):
+    response = client.get("/financials/subscriptions/breakdown")
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["status_counts"] == {
+        "user": {"active": 1, "trialing": 1, "canceled": 1},
+        "contractor": {"active": 1},
+        "aoao_organization": {},
+        "pm_company": {},
+    }
+    assert {sub["subscription_id"] for sub in body["subscriptions"]} == {"us-1", "us-2", "c-1"}
+    assert body["total_monthly_revenue"] == 1200 * 2 + 100
+    assert body["total_annual_revenue"] == 1200 * 12 * 2 + 1200
+
+    # Only the tables with paid active/trialing subscriptions are listed
+    assert fake.count("user_subscriptions", "select") == 1
+    assert fake.count("contractors", "select") == 1
+    assert fake.count("aoao_organizations", "select") == 0
+    assert fake.count("property_management_companies", "select") == 0
+    assert sorted(stripe_calls) == ["cus_1", "sub_1", "sub_2"]
+
+
+def test_stripe_revenue_is_cached_per_subscription(client, fake, stripe_calls, super_admin):
+    client.get("/financials/subscriptions/breakdown")
+    cache_delete("financials:subscriptions:breakdown")
+    fake.insert_row("user_subscriptions", {
+        "id": "us-5", "user_id": "user-5", "subscription_tier": "paid",
+        "subscription_status": "active", "stripe_subscription_id": "sub_5",
+    })
+
+    response = client.get("/financials/subscriptions/breakdown")
+
+    assert response.json()["total_subscriptions"] == 4
+    # The rebuilt breakdown only asks Stripe about the new subscription
+    assert sorted(stripe_calls) == ["cus_1", "sub_1", "sub_2", "sub_5"]
+
+
+def test_stripe_errors_are_not_cached(client, fake, super_admin, monkeypatch):
+    calls = []
+
+    def get_subscription_revenue(stripe_subscription_id=None, stripe_customer_id=None):
+        calls.append(stripe_subscription_id or stripe_customer_id)
+        return {"error": "Stripe not configured"}
+
+    monkeypatch.setattr(financials, "get_subscription_revenue", get_subscription_revenue)
+    client.get("/financials/subscriptions/breakdown")
+    cache_delete("financials:subscriptions:breakdown")
+    response = client.get("/financials/subscriptions/breakdown")
+
+    assert response.json()["total_monthly_revenue"] == 0
+    assert len(calls) == 6
+
+
+def test_premium_reports_breakdown_uses_one_query(client, fake, super_admin):
+    response = client.get(
+        "/financials/premium-reports/breakdown",
+        params={"start_date": "2024-02-01T00:00:00+00:00", "end_date": "2024-02-28T00:00:00+00:00"},
+    )
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [purchase["id"] for purchase in body["purchases"]] == ["p-2", "p-3", "p-1"]
+    assert body["total_purchases"] == 3
+    assert body["total_revenue_cents"] == 3500
+    assert body["total_revenue_decimal"] == 35.0
+    assert body["report_type_breakdown"] == {
+        "building": {"count": 2, "revenue_cents": 3000, "revenue_decimal": 30.0},
+        "unit": {"count": 1, "revenue_cents": 500, "revenue_decimal": 5.0},
+    }
+    assert fake.count("premium_report_purchases", "select") == 1
+    assert fake.count("financial_premium_report_totals") == 0
+
+
+def test_breakdowns_are_cached_per_window(client, fake, super_admin):
+    window = {"start_date": "2024-02-01T00:00:00+00:00", "end_date": "2024-03-31T00:00:00+00:00"}
+    first = client.get("/financials/premium-reports/breakdown", params=window).json()
+    client.get("/financials/premium-reports/breakdown", params=window)
+
+    assert first["total_purchases"] == 4
+    assert fake.count("premium_report_purchases", "select") == 1
+
+    client.get("/financials/premium-reports/breakdown", params={**window, "end_date": "2024-02-28T00:00:00+00:00"})
+    assert fake.count("premium_report_purchases", "select") == 2
+
+
+def test_breakdowns_require_super_admin(client, fake, login):
+    login("admin")
+    assert client.get("/financials/subscriptions/breakdown").status_code == 403
+    assert client.get("/financials/premium-reports/breakdown").status_code == 403
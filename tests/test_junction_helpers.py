@@ -0,0 +1,88 @@
+# tests/test_junction_helpers.py
+
+"""
+Tests for set-based junction writes: event/document units and contractors
+are updated by applying the difference, in a fixed number of round-trips.
+"""
+
+import pytest
+
+from core.junction_helpers import JUNCTION_TABLES, set_junction_links
+
+
+BUILDING_ID = "00000000-0000-4000-8000-000000000001"
+EVENT_ID = "00000000-0000-4000-8000-0000000e0001"
+
+
+def unit_id(i: int) -> str:
+    return f"00000000-0000-4000-8000-{i:012d}"
+
+
+@pytest.fixture
+def fake(fake):
+    fake.seed("buildings", [{"id": BUILDING_ID, "name": "Papakea Resort"}])
+    fake.seed("events", [{"id": EVENT_ID, "building_id": BUILDING_ID, "title": "Roof repair", "status": "open"}])
+    # Tagged to units 0-79
+    fake.seed("event_units", [{"event_id": EVENT_ID, "unit_id": unit_id(i)} for i in range(80)])
+    return fake
+
+
+@pytest.fixture
+def admin(login):
+    return login("super_admin")
+
+
+def linked_units(fake):
+    return sorted(row["unit_id"] for row in fake.rows("event_units") if row["event_id"] == EVENT_ID)
+
+
+def test_update_applies_only_the_difference(client, fake, admin):
+    desired = [unit_id(i) for i in range(40, 120)]
+    fake.reset_calls()
+
+    response = client.put(f"/events/{EVENT_ID}", json={"status": "resolved", "unit_ids": desired})
+
+    assert response.status_code == 200, response.text
+    assert linked_units(fake) == sorted(desired)
+    # One read of the current set, one bulk insert, one bulk delete
+    assert fake.count("event_units", "select") == 1
+    assert fake.count("event_units", "upsert") == 1
+    assert fake.count("event_units", "delete") == 1
+    assert fake.count("event_units", "insert") == 0
+
+
+def test_unchanged_set_writes_nothing(fake):
+    fake.reset_calls()
+
+    assert set_junction_links("event_units", EVENT_ID, [unit_id(i) for i in range(80)]) == {"inserted": 0, "deleted": 0}
+    assert fake.count("event_units") == 1
+
+
+def test_rpc_is_used_when_available(fake):
+    calls = []
+
+    def rpc(db, p_table, p_owner_id, p_target_ids):
+        calls.append((p_table, p_owner_id, p_target_ids))
+        return [{"inserted": 1, "deleted": 79}]
+
+    fake.rpc_handlers["set_junction_links"] = rpc
+    fake.reset_calls()
+
+    result = set_junction_links("event_units", EVENT_ID, [unit_id(0), unit_id(500), unit_id(0)])
+
+    assert result == {"inserted": 1, "deleted": 79}
+    assert calls == [("event_units", EVENT_ID, [unit_id(0), unit_id(500)])]
+    assert fake.count("event_units") == 0
+
+
+def test_new_owner_without_links_skips_the_write(fake):
+    fake.reset_calls()
+
+    assert set_junction_links("document_contractors", "doc-new", [], created=True) == {"inserted": 0, "deleted": 0}
+    assert fake.db_calls == 0
+
+
+def test_unknown_table_is_rejected(fake):
+    assert "units" not in JUNCTION_TABLES
+    with pytest.raises(ValueError):
+        set_junction_links("units", EVENT_ID, [])
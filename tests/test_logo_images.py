@@ -0,0 +1,118 @@
+# tests/test_logo_images.py
+
+"""
+Tests for the logo pipeline: uploads are identified by magic bytes,
+resized into WebP/PNG renditions and stored with immutable cache headers.
+"""
+
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from core.config import settings
+from services.logo_images import (
+    IMMUTABLE_CACHE_CONTROL,
+    LOGO_RENDITIONS,
+    MAX_LOGO_BYTES,
+    detect_image_format,
+    shutdown_image_pool,
+)
+
+
+CONTRACTOR_ID = "00000000-0000-4000-8000-0000000c0001"
+
+
+def png_bytes(width=2400, height=1200, mode="RGBA") -> bytes:
+    image = Image.new(mode, (width, height), (200, 30, 30, 255) if mode == "RGBA" else (200, 30, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def fake(fake):
+    fake.seed("contractors", [{"id": CONTRACTOR_ID, "company_name": "Maui Plumbing"}])
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def admin(login):
+    return login("super_admin", permissions=["contractors:write"])
+
+
+@pytest.fixture(params=[0, 1], ids=["threadpool", "process-pool"])
+def workers(request, monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_WORKERS", request.param)
+    yield request.param
+    shutdown_image_pool()
+
+
+def upload_logo(client, data, filename="logo.png"):
+    return client.post(
+        f"/contractors/{CONTRACTOR_ID}/logo",
+        files={"file": (filename, io.BytesIO(data), "image/png")},
+    )
+
+
+def test_logo_is_resized_into_cacheable_renditions(client, fake, s3, workers):
+    original = png_bytes()
+    response = upload_logo(client, original)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert set(body["renditions"]) == {f"{name}_{fmt}" for name in LOGO_RENDITIONS for fmt in ("webp", "png")}
+    assert body["logo_url"] == body["renditions"]["report_header_webp"]
+    assert fake.get_by_id("contractors", CONTRACTOR_ID)["logo_url"] == body["logo_url"]
+
+    # Original plus 2 renditions x 2 formats, all immutable
+    assert s3.count("upload_file") == 5
+    for (_, key), stored in s3.objects.items():
+        assert stored.extra["CacheControl"] == IMMUTABLE_CACHE_CONTROL
+        assert key.startswith(f"contractors/logos/{CONTRACTOR_ID}/")
+
+    for name, (max_width, max_height) in LOGO_RENDITIONS.items():
+        key = body["renditions"][f"{name}_webp"].split(".amazonaws.com/", 1)[1]
+        data = s3.body(key)
+        assert len(data) < len(original)
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.format == "WEBP"
+            assert image.width <= max_width and image.height <= max_height
+
+
+def test_file_type_comes_from_magic_bytes(client, fake, s3):
+    response = upload_logo(client, b"<svg onload=alert(1)>", filename="logo.png")
+
+    assert response.status_code == 400
+    assert s3.count() == 0
+
+    # A JPEG with the wrong extension is still accepted
+    buffer = io.BytesIO()
+    Image.new("RGB", (300, 300)).save(buffer, "JPEG")
+    assert upload_logo(client, buffer.getvalue(), filename="logo.gif").status_code == 200
+
+
+def test_oversized_upload_is_rejected(client, fake, s3):
+    data = b"\x89PNG\r\n\x1a\n" + b"\0" * MAX_LOGO_BYTES
+
+    response = upload_logo(client, data)
+
+    assert response.status_code == 400
+    assert "exceeds" in response.json()["detail"]
+    assert s3.count() == 0
+
+
+def test_corrupt_image_is_rejected(client, fake, s3):
+    response = upload_logo(client, png_bytes()[:200])
+
+    assert response.status_code == 400
+    assert s3.count() == 0
+
+
+def test_detect_image_format():
+    assert detect_image_format(b"\xff\xd8\xff\xe0\x00\x10JFIF") == "jpeg"
+    assert detect_image_format(b"\x89PNG\r\n\x1a\n\x00\x00") == "png"
+    assert detect_image_format(b"GIF89a\x01\x00") == "gif"
+    assert detect_image_format(b"RIFF\x24\x00\x00\x00WEBPVP8 ") == "webp"
+    assert detect_image_format(b"%PDF-1.7") is None
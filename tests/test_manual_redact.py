@@ -0,0 +1,122 @@
+# tests/test_manual_redact.py
+
+"""
+Tests for POST /documents/redact-manual: redaction in the worker pool,
+streamed S3 upload, and job mode for large PDFs.
+"""
+
+import io
+import json
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from core.config import settings
+from services.pdf_redaction import redact_file, shutdown_redaction_pool
+
+
+PAGES = 3
+SECRET = "SSN 123-45-6789"
+
+# Canvas box over the text drawn at y=72 (flipped as page_height - (y + height))
+PAGE_HEIGHT = 842
+TEXT_BOX = {"x": 60, "y": PAGE_HEIGHT - 80, "width": 300, "height": 22}
+
+
+def sample_pdf(pages: int = PAGES) -> bytes:
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page(width=595, height=PAGE_HEIGHT)
+        page.insert_text((72, 72), f"{SECRET} page {n + 1}", fontsize=12)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def page_texts(data: bytes):
+    doc = fitz.open(stream=data, filetype="pdf")
+    texts = [page.get_text() for page in doc]
+    doc.close()
+    return texts
+
+
+@pytest.fixture
+def as_uploader(login):
+    def as_uploader(user_id="uploader-1", role="super_admin"):
+        return login(role, user_id=user_id, permissions=["upload:write"])
+    return as_uploader
+
+
+@pytest.fixture(params=[0, 1], ids=["threadpool", "process-pool"])
+def workers(request, monkeypatch):
+    monkeypatch.setattr(settings, "REDACTION_WORKERS", request.param)
+    yield request.param
+    shutdown_redaction_pool()
+
+
+def post_redaction(client, boxes, mode=None, data=None):
+    form = {"redaction_boxes": json.dumps(boxes)}
+    if mode:
+        form["mode"] = mode
+    return client.post(
+        "/documents/redact-manual",
+        files={"file": ("owner.pdf", io.BytesIO(data or sample_pdf()), "application/pdf")},
+        data=form,
+    )
+
+
+def test_redacts_only_boxed_pages_and_streams_to_s3(client, s3, as_uploader, workers):
+    as_uploader()
+    response = post_redaction(client, [{"page": 2, **TEXT_BOX}])
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["redaction_count"] == 1
+    assert body["s3_key"].startswith("redacted/") and body["s3_key"].endswith("_owner_redacted.pdf")
+
+    assert s3.count("upload_file") == 1
+    texts = page_texts(s3.body(body["s3_key"]))
+    assert SECRET in texts[0] and SECRET in texts[2]
+    assert SECRET not in texts[1]
+
+
+def test_boxes_on_missing_pages_are_skipped(tmp_path):
+    source = tmp_path / "in.pdf"
+    source.write_bytes(sample_pdf())
+
+    stats = redact_file(str(source), str(tmp_path / "out.pdf"), [(0, 60, 60, 300, 22), (9, 0, 0, 10, 10)])
+
+    assert stats == {"pages": PAGES, "pages_redacted": 1, "boxes_applied": 1, "boxes_skipped": 1}
+    assert SECRET not in page_texts((tmp_path / "out.pdf").read_bytes())[0]
+
+
+def test_invalid_pdf_is_rejected(client, s3, as_uploader):
+    as_uploader()
+    response = post_redaction(client, [{"page": 1, **TEXT_BOX}], data=b"not a pdf")
+
+    assert response.status_code == 400
+    assert s3.count() == 0
+
+
+def test_job_mode_runs_in_background_and_reports_status(client, s3, as_uploader, monkeypatch):
+    monkeypatch.setattr(settings, "REDACTION_WORKERS", 0)
+    monkeypatch.setattr(settings, "REDACTION_JOB_THRESHOLD_BYTES", 100)
+    as_uploader("uploader-1", role="owner")
+
+    # Above the threshold, so "auto" becomes a job
+    response = post_redaction(client, [{"page": 1, **TEXT_BOX}])
+    assert response.status_code == 200, response.text
+    job_id = response.json()["job_id"]
+
+    status = client.get(f"/documents/redact-manual/jobs/{job_id}")
+    assert status.status_code == 200
+    job = status.json()
+    assert job["status"] == "succeeded"
+    assert job["pages_redacted"] == 1
+    assert job["document_url"].endswith("X-Amz-Expires=86400")
+    assert SECRET not in page_texts(s3.body(job["s3_key"]))[0]
+
+    # Other non-admin users cannot see the job
+    as_uploader("someone-else", role="owner")
+    assert client.get(f"/documents/redact-manual/jobs/{job_id}").status_code == 404
@@ -0,0 +1,117 @@
+# tests/test_metrics.py
+
+"""
+Tests for request instrumentation: upstream accounting, Server-Timing and /metrics.
+"""
+
+import httpx
+import pytest
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.metrics import (
+    instrument_requests,
+    instrument_supabase_client,
+    collect_request_stats,
+    track_upstream,
+    reset_metrics,
+    render_metrics,
+    REQUESTS_TOTAL,
+    REQUEST_UPSTREAM_CALLS,
+    Histogram,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def make_fake_supabase():
+    """Supabase-shaped object whose HTTP clients answer from a mock transport."""
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+    return SimpleNamespace(
+        postgrest=SimpleNamespace(session=httpx.Client(transport=transport, base_url="http://db")),
+        auth=SimpleNamespace(_http_client=httpx.Client(transport=transport, base_url="http://auth")),
+    )
+
+
+def test_supabase_calls_counted_per_operation():
+    """Test that PostgREST and auth calls are tallied on the current request."""
+    client = instrument_supabase_client(make_fake_supabase())
+    instrument_supabase_client(client)  # idempotent
+    session = client.postgrest.session
+
+    with collect_request_stats() as stats:
+        session.get("/rest/v1/buildings")
+        session.get("/rest/v1/units")
+        session.post("/rest/v1/events", json={})
+        session.post("/rest/v1/units", json={}, headers={"Prefer": "resolution=merge-duplicates"})
+        session.patch("/rest/v1/units", json={})
+        session.post("/rest/v1/rpc/financial_subscription_counts", json={})
+        client.auth._http_client.get("/admin/users")
+
+    assert stats.count("supabase") == 7
+    assert stats.count("supabase", "select") == 2
+    assert stats.count("supabase", "insert") == 1
+    assert stats.count("supabase", "upsert") == 1
+    assert stats.count("supabase", "update") == 1
+    assert stats.count("supabase", "rpc") == 1
+    assert stats.count("supabase", "auth") == 1
+
+
+def test_middleware_counts_calls_from_sync_endpoints():
+    """Test that calls made in the threadpool land on the request and in Server-Timing."""
+    app = FastAPI()
+    app.middleware("http")(instrument_requests)
+
+    @app.get("/things/{thing_id}")
+    def get_thing(thing_id: str):
+        for _ in range(3):
+            with track_upstream("supabase", "select"):
+                pass
+        with track_upstream("s3", "GetObject"):
+            pass
+        return {"id": thing_id}
+
+    with TestClient(app) as client:
+        response = client.get("/things/abc")
+        client.get("/nowhere")
+
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("app;dur=")
+    assert 'supabase;desc="3 calls"' in timing
+    assert 's3;desc="1 call"' in timing
+
+    assert REQUESTS_TOTAL.value(method="GET", route="/things/{thing_id}", status="200") == 1
+    assert REQUESTS_TOTAL.value(method="GET", route="<unmatched>", status="404") == 1
+    assert REQUEST_UPSTREAM_CALLS.total(method="GET", route="/things/{thing_id}", service="supabase") == 3
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test Prometheus text rendering of a histogram."""
+    hist = Histogram("test_latency_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0))
+    hist.observe(0.05, route="/a")
+    hist.observe(0.5, route="/a")
+
+    lines = hist.render()
+    assert '# TYPE test_latency_seconds histogram' in lines
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 2' in lines
+    assert 'test_latency_seconds_count{route="/a"} 2' in lines
+
+
+def test_metrics_endpoint(client):
+    """Test that the app exposes metrics and timing headers."""
+    response = client.get("/health/app")
+    assert "Server-Timing" in response.headers
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'aina_http_requests_total{method="GET",route="/health/app",status="200"} 1' in metrics.text
+    assert render_metrics().startswith("# HELP")
@@ -0,0 +1,200 @@
+# tests/test_projections.py
+
+"""
+Tests for role-aware report projections: the select list must expose
+exactly what the old select("*") + pop sanitizers returned, and restricted
+columns must never reach a public report.
+"""
+
+import pytest
+
+import core.projections as projections
+from core.projections import (
+    PROJECTED_ROLES,
+    PUBLIC_COLUMNS,
+    RESTRICTED_COLUMNS,
+    projection,
+    select_projected,
+    visible_columns,
+)
+from tests.fake_supabase import FakeSupabase, install_fake_supabase
+
+
+BUILDING_ID = "00000000-0000-4000-8000-000000000001"
+
+ROLES = ("public", "owner", "contractor", "property_manager", "aoao", "admin")
+
+NOTES = ("contractor_notes", "pm_notes", "aoao_notes", "admin_notes")
+OWNER_CONTACT = ("owner_name", "owner_email", "owner_phone")
+
+
+# Visibility rules of the sanitizers the projections replace
+def legacy_sanitize_event(event, role):
+    hidden = {
+        "public": NOTES + OWNER_CONTACT,
+        "owner": NOTES[1:],
+        "contractor": NOTES[1:] + OWNER_CONTACT,
+        "property_manager": NOTES[2:],
+        "aoao": NOTES[3:],
+    }.get(role, ())
+    return {k: v for k, v in event.items() if k not in hidden}
+
+
+def legacy_sanitize_public_document(document):
+    # sanitize_document_for_role plus the public building report's copy
+    hidden = OWNER_CONTACT + ("filename", "file_size", "is_redacted", "unit_id", "content_type")
+    return {k: v for k, v in document.items() if k not in hidden}
+
+
+def full_row(entity):
+    columns = PUBLIC_COLUMNS[entity] + tuple(RESTRICTED_COLUMNS.get(entity, {}))
+    return {column: f"{column}-value" for column in columns}
+
+
+def project(row, entity, role):
+    columns = visible_columns(entity, role)
+    if columns == ("*",):
+        return dict(row)
+    return {column: row[column] for column in columns if column in row}
+
+
+@pytest.fixture(autouse=True)
+def reset_missing_columns():
+    projections._missing_columns.clear()
+    yield
+    projections._missing_columns.clear()
+
+
+@pytest.mark.parametrize("role", ROLES + ("aoao_staff",))
+def test_event_projection_matches_legacy_sanitizer(role):
+    event = full_row("events")
+    assert project(event, "events", role) == legacy_sanitize_event(event, role)
+
+
+def test_public_document_projection_matches_legacy_filter():
+    document = full_row("documents")
+    expected = legacy_sanitize_public_document(document)
+    # The unredacted key is now admin-only as well
+    expected.pop("original_s3_key")
+    assert project(document, "documents", "public") == expected
+
+
+def test_restricted_columns_are_limited_to_their_roles():
+    for entity, restricted in RESTRICTED_COLUMNS.items():
+        for column, roles in restricted.items():
+            for role in PROJECTED_ROLES[entity]:
+                assert (column in visible_columns(entity, role)) == (role in roles), (entity, column, role)
+
+    assert projection("events", "admin").startswith("id, ")
+    assert projection("units", "owner") == "*"
+    with pytest.raises(KeyError):
+        visible_columns("contractors", "public")
+
+
+def test_public_building_report_omits_restricted_columns(client, monkeypatch):
+    fake = FakeSupabase()
+    fake.seed("buildings", [{
+        "id": BUILDING_ID, "name": "Papakea Resort", "slug": "papakea",
+        "metadata": {"source": "county"}, "created_at": "2020-01-01T00:00:00+00:00",
+    }])
+    fake.seed("units", [{
+        "id": "unit-1", "building_id": BUILDING_ID, "unit_number": "101",
+        "parcel_number": "2-4-4-001", "square_feet": 640,
+    }])
+    fake.seed("events", [{
+        "id": "event-1", "building_id": BUILDING_ID, "title": "Roof repair",
+        "occurred_at": "2024-05-01T00:00:00+00:00", "admin_notes": "do not share",
+        "contractor_notes": "ladder in garage", "owner_email": "owner@example.com",
+    }])
+    fake.seed("documents", [
+        {"id": "doc-1", "building_id": BUILDING_ID, "title": "Minutes", "is_public": True,
+         "filename": "minutes-internal.pdf", "owner_phone": "808-555-0100", "original_s3_key": "raw.pdf"},
+        {"id": "doc-2", "building_id": BUILDING_ID, "title": "Private", "is_public": False},
+    ])
+    install_fake_supabase(fake, monkeypatch)
+
+    response = client.get(f"/reports/public/building/{BUILDING_ID}")
+
+    assert response.status_code == 200, response.text
+    data = response.json()["data"]
+    assert "metadata" not in data["building"] and "created_at" not in data["building"]
+    assert [set(unit) & {"parcel_number", "square_feet"} for unit in data["units"]] == [set()]
+
+    [event] = data["events"]
+    assert not set(event) & set(NOTES + OWNER_CONTACT)
+
+    assert [document["id"] for document in data["documents"]] == ["doc-1"]
+    assert not set(data["documents"][0]) & {"filename", "owner_phone", "original_s3_key"}
+
+
+def bulk_upload_document(**overrides):
+    """A documents row as routers/documents_bulk.py writes it."""
+    return {
+        "id": "doc-bulk", "title": "County Archive - Building Permit - B-2019-1234",
+        "document_url": "https://county.example.gov/permits/B-2019-1234.pdf",
+        "building_id": BUILDING_ID, "unit_id": "unit-1", "event_id": None,
+        "category_id": "cat-public", "document_type": "Permit", "permit_number": "B-2019-1234",
+        "permit_type": "Building Permit", "folder": "2019", "tmk": "2-4-4-001-0001",
+        "description": "Lanai railing replacement", "source": "County of Maui", "is_public": True,
+        "uploaded_by": "admin-user", "uploaded_by_role": "admin", **overrides,
+    }
+
+
+BULK_UPLOAD_COLUMNS = ("document_type", "permit_number", "permit_type", "folder", "tmk", "description", "source")
+
+
+@pytest.mark.parametrize("role", ROLES)
+def test_bulk_upload_columns_survive_the_projection(role, monkeypatch):
+    fake = FakeSupabase()
+    fake.seed("documents", [bulk_upload_document()])
+    install_fake_supabase(fake, monkeypatch)
+
+    [document] = select_projected("documents", role, lambda q: q.eq("building_id", BUILDING_ID)).data
+
+    expected = bulk_upload_document()
+    assert {column: document[column] for column in BULK_UPLOAD_COLUMNS} == {
+        column: expected[column] for column in BULK_UPLOAD_COLUMNS
+    }
+    # The public building report never exposed the unit link
+    assert ("unit_id" in document) == (role != "public")
+
+
+def test_public_building_report_keeps_permit_details(client, monkeypatch):
+    fake = FakeSupabase()
+    fake.seed("buildings", [{"id": BUILDING_ID, "name": "Papakea Resort", "slug": "papakea"}])
+    fake.seed("documents", [bulk_upload_document()])
+    install_fake_supabase(fake, monkeypatch)
+
+    response = client.get(f"/reports/public/building/{BUILDING_ID}")
+
+    assert response.status_code == 200, response.text
+    [document] = response.json()["data"]["documents"]
+    assert document["permit_number"] == "B-2019-1234"
+    assert document["description"] == "Lanai railing replacement"
+
+
+def test_missing_column_is_dropped_and_query_retried(monkeypatch):
+    fake = FakeSupabase()
+    fake.seed("events", [{"id": "event-1", "building_id": BUILDING_ID, "title": "Roof repair"}])
+    fake.missing_columns["events"] = {"aoao_notes"}
+    install_fake_supabase(fake, monkeypatch)
+
+    result = select_projected("events", "admin", lambda q: q.eq("building_id", BUILDING_ID))
+
+    assert [row["id"] for row in result.data] == ["event-1"]
+    assert "aoao_notes" not in visible_columns("events", "admin")
+    assert fake.count("events", "select") == 2
+
+    # Later queries skip the column straight away
+    fake.reset_calls()
+    select_projected("events", "aoao")
+    assert fake.count("events", "select") == 1
+
+
+def test_missing_id_column_is_not_swallowed(monkeypatch):
+    fake = FakeSupabase()
+    fake.missing_columns["events"] = {"id"}
+    install_fake_supabase(fake, monkeypatch)
+
+    with pytest.raises(Exception, match="does not exist"):
+        select_projected("events", "public")
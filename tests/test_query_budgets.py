@@ -0,0 +1,246 @@
+# tests/test_query_budgets.py
+
+"""
+Query-count regression tests for hot endpoints.
+
+Each endpoint runs against the recording FakeSupabase at several dataset
+sizes. Table round-trips must stay within a fixed budget and must not grow
+with the number of rows (no N+1). Auth admin lookups are bounded by the
+number of distinct users involved, which the datasets keep fixed.
+"""
+
+import io
+import math
+import pytest
+
+from core.reference_data import get_reference_registry
+from tests.fake_supabase import FakeSupabase, install_fake_supabase
+
+
+DATASET_SIZES = (5, 50, 200)
+
+BUILDING_ID = "00000000-0000-4000-8000-000000000001"
+BUILDING_SLUG = "papakea"
+PUBLIC_DOCUMENTS_CATEGORY_ID = "f5ae850f-cc31-44ff-b5bc-ee7d708a0c31"
+UPLOADER_IDS = ("uploader-1", "uploader-2", "uploader-3")
+CONTRACTOR_IDS = ("contractor-1", "contractor-2", "contractor-3")
+
+# Maximum table round-trips per request (independent of dataset size)
+QUERY_BUDGETS = {
+    "list_documents": 4,
+    "list_unit_events": 5,
+    "get_public_building_report": 25,
+    "search_public": 7,
+    "send_bulk_message": 6,       # selects; inserts are batched per 100 recipients
+    "bulk_upload_documents": 3,   # selects; inserts are batched per 100 rows
+}
+
+
+def unit_id(i: int) -> str:
+    return f"unit-{i}"
+
+
+def seed_dataset(fake: FakeSupabase, size: int) -> FakeSupabase:
+    """One building with `size` units, events, documents and owners."""
+    fake.seed("buildings", [
+        {"id": BUILDING_ID, "name": "Papakea Resort", "address": "3543 Lower Honoapiilani Rd",
+         "city": "Lahaina", "state": "HI", "zip": "96761", "slug": BUILDING_SLUG},
+        {"id": "building-other", "name": "Kaanapali Shores", "address": "100 Kai Ala Dr",
+         "city": "Lahaina", "state": "HI", "zip": "96761", "slug": "kaanapali-shores"},
+    ])
+    fake.seed("units", [
+        {"id": unit_id(i), "building_id": BUILDING_ID, "unit_number": str(100 + i), "owner_name": f"Owner {i}"}
+        for i in range(size)
+    ])
+
+    fake.seed("contractor_roles", [{"id": "role-1", "name": "Plumber"}, {"id": "role-2", "name": "Electrician"}])
+    fake.seed("contractors", [
+        {"id": cid, "company_name": f"Contractor {n}", "subscription_tier": "paid" if n == 0 else "free"}
+        for n, cid in enumerate(CONTRACTOR_IDS)
+    ])
+    fake.seed("contractor_role_assignments", [
+        {"contractor_id": cid, "role_id": "role-1" if n % 2 == 0 else "role-2"}
+        for n, cid in enumerate(CONTRACTOR_IDS)
+    ])
+
+    fake.seed("event_categories", [{"id": "event-cat-1", "name": "Maintenance"}])
+    fake.seed("events", [
+        {"id": f"event-{i}", "building_id": BUILDING_ID, "title": f"Event {i}", "event_type": "maintenance",
+         "category_id": "event-cat-1", "created_by": UPLOADER_IDS[i % len(UPLOADER_IDS)],
+         "created_at": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00", "occurred_at": "2024-01-01"}
+        for i in range(size)
+    ])
+    # Every event touches unit 0 so the unit's history grows with the dataset
+    fake.seed("event_units", [{"event_id": f"event-{i}", "unit_id": unit_id(0)} for i in range(size)])
+    fake.seed("event_units", [{"event_id": f"event-{i}", "unit_id": unit_id(i)} for i in range(1, size)])
+    fake.seed("event_contractors", [
+        {"event_id": f"event-{i}", "contractor_id": CONTRACTOR_IDS[i % len(CONTRACTOR_IDS)]} for i in range(size)
+    ])
+
+    fake.seed("document_categories", [{"id": PUBLIC_DOCUMENTS_CATEGORY_ID, "name": "Public Documents"}])
+    fake.seed("document_subcategories", [{"id": "doc-sub-1", "name": "Permits", "category_id": PUBLIC_DOCUMENTS_CATEGORY_ID}])
+    fake.seed("documents", [
+        {"id": f"doc-{i}", "building_id": BUILDING_ID, "title": f"Document {i}", "is_public": True,
+         "category_id": PUBLIC_DOCUMENTS_CATEGORY_ID, "subcategory_id": "doc-sub-1",
+         "uploaded_by": UPLOADER_IDS[i % len(UPLOADER_IDS)], "uploaded_by_role": "admin",
+         "created_at": f"2024-02-01T00:{i // 60:02d}:{i % 60:02d}+00:00"}
+        for i in range(size)
+    ])
+    fake.seed("document_units", [{"document_id": f"doc-{i}", "unit_id": unit_id(i)} for i in range(size)])
+    fake.seed("document_contractors", [
+        {"document_id": f"doc-{i}", "contractor_id": CONTRACTOR_IDS[i % len(CONTRACTOR_IDS)]} for i in range(size)
+    ])
+
+    fake.seed("property_management_companies", [{"id": "pm-1", "name": "Maui PM"}])
+    fake.seed("pm_company_building_access", [{"pm_company_id": "pm-1", "building_id": BUILDING_ID}])
+    fake.seed("aoao_organizations", [{"id": "aoao-1", "organization_name": "Papakea AOAO"}])
+    fake.seed("aoao_organization_building_access", [{"aoao_organization_id": "aoao-1", "building_id": BUILDING_ID}])
+
+    fake.add_user("admin-user", role="admin", full_name="Admin")
+    for uploader in UPLOADER_IDS:
+        fake.add_user(uploader, role="admin", full_name=uploader.title())
+    fake.add_user("pm-user", role="property_manager", pm_company_id="pm-1", organization_name="Maui PM")
+    fake.add_user("aoao-user", role="aoao", aoao_organization_id="aoao-1", organization_name="Papakea AOAO")
+    for i in range(size):
+        fake.add_user(f"owner-{i}", role="owner")
+    fake.seed("user_unit_access", [{"user_id": f"owner-{i}", "unit_id": unit_id(i)} for i in range(size)])
+
+    return fake
+
+
+@pytest.fixture
+def admin_user(login):
+    return login("admin")
+
+
+@pytest.fixture
+def make_fake(monkeypatch):
+    """Build, seed and install a fake Supabase client of the given size."""
+    def _make(size: int) -> FakeSupabase:
+        fake = install_fake_supabase(seed_dataset(FakeSupabase(), size), monkeypatch)
+        # Reference data is preloaded at startup, so it isn't part of a request's budget
+        get_reference_registry().refresh()
+        fake.reset_calls()
+        return fake
+    return _make
+
+
+def measure(make_fake, request_fn):
+    """Run `request_fn` once per dataset size and return {size: (fake, response)}."""
+    results = {}
+    for size in DATASET_SIZES:
+        fake = make_fake(size)
+        response = request_fn(size)
+        assert response.status_code == 200, response.text
+        results[size] = (fake, response)
+    return results
+
+
+def assert_flat_budget(name, results, operations=None):
+    """Table calls are within budget and identical at every dataset size."""
+    counts = {
+        size: sum(fake.count(operation=op) for op in operations) if operations else fake.count(service="db")
+        for size, (fake, _) in results.items()
+    }
+    assert max(counts.values()) <= QUERY_BUDGETS[name], f"{name} over budget: {counts}"
+    assert len(set(counts.values())) == 1, f"{name} query count grows with data: {counts}"
+
+
+def test_list_documents_budget(client, admin_user, make_fake):
+    results = measure(make_fake, lambda size: client.get("/documents", params={"limit": 1000}))
+
+    assert_flat_budget("list_documents", results)
+    for size, (fake, response) in results.items():
+        assert len(response.json()) == size
+        # Uploader names are looked up once per distinct uploader, not per document
+        assert fake.count("get_user_by_id") <= len(UPLOADER_IDS)
+
+
+def test_list_unit_events_budget(client, admin_user, make_fake):
+    results = measure(make_fake, lambda size: client.get(f"/units/{unit_id(0)}/events", params={"limit": 1000}))
+
+    assert_flat_budget("list_unit_events", results)
+    for size, (fake, response) in results.items():
+        events = response.json()
+        assert len(events) == size
+        assert all(event["contractors"] for event in events)
+        assert fake.auth_calls == 0
+
+
+def test_public_building_report_budget(client, make_fake):
+    results = measure(make_fake, lambda size: client.get(f"/reports/public/building/{BUILDING_SLUG}"))
+
+    assert_flat_budget("get_public_building_report", results)
+    for size, (fake, response) in results.items():
+        # Public reports show the 5 most recent events
+        assert len(response.json()["data"]["events"]) == min(size, 5)
+        # Event creators are resolved once per distinct creator
+        assert fake.count("get_user_by_id") <= len(UPLOADER_IDS)
+
+
+@pytest.mark.parametrize("query", ["papakea", "papakea 101", "101"])
+def test_search_public_budget(client, make_fake, query):
+    results = measure(make_fake, lambda size: client.get("/reports/public/search", params={"query": query}))
+
+    assert_flat_budget("search_public", results)
+    for size, (fake, response) in results.items():
+        assert response.json()["buildings"] or response.json()["units"]
+
+
+def test_send_bulk_message_budget(client, admin_user, make_fake):
+    payload = {"recipient_types": ["owners"], "subject": "Water shutoff", "body": "Tuesday 9am-noon.", "building_id": BUILDING_ID}
+    results = measure(make_fake, lambda size: client.post("/messages/bulk", json=payload))
+
+    assert_flat_budget("send_bulk_message", results, operations=("select",))
+    for size, (fake, response) in results.items():
+        # Recipients are written in batches of 100, not one insert per message
+        assert fake.count("messages", "insert") == math.ceil((size + len(UPLOADER_IDS)) / 100)
+        assert fake.count("list_users") == 1
+        # Owners in the building plus the other admins, never the sender
+        assert len(fake.rows("messages")) == size + len(UPLOADER_IDS)
+
+
+def test_bulk_upload_documents_budget(client, admin_user, make_fake):
+    def upload(size):
+        lines = ["document_url,permit_number,permit_type,unit_id,event_id"]
+        lines += [
+            f"https://example.com/permit-{i}.pdf,BP-{i},Building,{unit_id(i)},event-{i}"
+            for i in range(size)
+        ]
+        csv_file = io.BytesIO("\n".join(lines).encode())
+        return client.post(
+            "/documents/bulk-upload",
+            files={"file": ("permits.csv", csv_file, "text/csv")},
+            data={"building_id": BUILDING_ID, "source": "Maui County Permits"},
+        )
+
+    results = measure(make_fake, upload)
+
+    assert_flat_budget("bulk_upload_documents", results, operations=("select",))
+    for size, (fake, response) in results.items():
+        body = response.json()
+        assert body["status"] == "success", body.get("errors")
+        assert body["count"] == size
+        assert fake.count("documents", "insert") == math.ceil(size / 100)
+
+
+def test_bulk_upload_documents_reports_bad_rows(client, admin_user, make_fake):
+    fake = make_fake(5)
+    lines = [
+        "document_url,unit_id,event_id",
+        f"https://example.com/a.pdf,{unit_id(1)},event-1",
+        "https://example.com/b.pdf,unit-missing,",
+        "https://example.com/c.pdf,,event-missing",
+        "https://example.com/d.pdf,,",
+    ]
+    response = client.post(
+        "/documents/bulk-upload",
+        files={"file": ("permits.csv", io.BytesIO("\n".join(lines).encode()), "text/csv")},
+        data={"building_id": BUILDING_ID},
+    )
+
+    body = response.json()
+    assert body["status"] == "partial_success"
+    assert body["count"] == 2
+    assert body["errors"] == ["Row 3: Unit unit-missing does not exist", "Row 4: Event event-missing does not exist"]
+    assert fake.count(operation="select") == QUERY_BUDGETS["bulk_upload_documents"]
@@ -0,0 +1,97 @@
+# tests/test_rate_limiter.py
+
+"""
+Tests for the sliding-window rate limiter.
+"""
+
+from contextlib import contextmanager
+from unittest.mock import patch
+from core.rate_limiter import SlidingWindowRateLimiter, check_rate_limit
+from core.state_backend import MemoryBackend
+
+
+@contextmanager
+def frozen_time(now: float):
+    """Freeze both the wall clock (windows) and monotonic clock (TTLs)."""
+    with patch("time.time", return_value=now), patch("time.monotonic", return_value=now):
+        yield
+
+
+def test_rate_limit_allows_up_to_max():
+    """Test that requests up to the limit are allowed and the next is denied."""
+    limiter = SlidingWindowRateLimiter(MemoryBackend())
+    
+    with frozen_time(1000.0):
+        results = [limiter.hit("ip:1.2.3.4", 3, 60) for _ in range(4)]
+    
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results] == [2, 1, 0, 0]
+    assert results[0].reset_seconds == 20  # 1000 % 60 == 40s elapsed
+
+
+def test_rate_limit_weights_previous_window():
+    """Test that the previous window still counts, weighted by overlap."""
+    limiter = SlidingWindowRateLimiter(MemoryBackend())
+    
+    with frozen_time(59.0):
+        for _ in range(10):
+            assert limiter.hit("user:a", 10, 60).allowed
+    
+    # 15s into the next window: 10 * 0.75 = 7.5 still counted
+    with frozen_time(75.0):
+        allowed = [limiter.hit("user:a", 10, 60).allowed for _ in range(3)]
+    
+    assert allowed == [True, True, False]
+
+
+def test_rate_limit_keys_are_independent():
+    """Test that identifiers and window lengths are tracked separately."""
+    limiter = SlidingWindowRateLimiter(MemoryBackend())
+    
+    with frozen_time(10.0):
+        assert limiter.hit("ip:a", 1, 60).allowed
+        assert not limiter.hit("ip:a", 1, 60).allowed
+        assert limiter.hit("ip:b", 1, 60).allowed
+        assert limiter.hit("ip:a", 1, 900).allowed
+
+
+def test_rate_limit_sweep_evicts_idle_keys():
+    """Test that idle keys are evicted and memory stays bounded."""
+    limiter = SlidingWindowRateLimiter(MemoryBackend())
+    
+    with frozen_time(10.0):
+        for i in range(100):
+            limiter.hit(f"ip:{i}", 5, 60)
+        assert limiter.size() == 100
+    
+    # Counters live for two windows
+    with frozen_time(100.0):
+        assert limiter.sweep() == 0
+    
+    with frozen_time(131.0):
+        assert limiter.sweep() == 100
+        assert limiter.size() == 0
+
+
+def test_check_rate_limit_returns_tuple():
+    """Test the backwards-compatible check_rate_limit helper."""
+    allowed, remaining = check_rate_limit("ip:compat", max_requests=2, window_seconds=60)
+    
+    assert allowed is True
+    assert remaining == 1
+
+
+def test_rate_limit_headers_on_success(client):
+    """Test that successful rate-limited responses carry X-RateLimit-* headers."""
+    with patch("routers.auth.get_supabase_client") as mock_supabase:
+        mock_supabase.return_value.auth.reset_password_for_email.return_value = None
+        
+        response = client.post(
+            "/auth/initiate-password-setup",
+            json={"email": "headers@example.com"}
+        )
+    
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Limit"] == "5"
+    assert response.headers["X-RateLimit-Remaining"] == "4"
+    assert "X-RateLimit-Reset" in response.headers
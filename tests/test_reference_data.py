@@ -0,0 +1,98 @@
+# tests/test_reference_data.py
+
+"""
+Tests for the reference-data registry: lookup tables are loaded once and
+served from memory, reloaded on a miss, and a failed reload keeps the
+previous snapshot.
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from core import reference_data
+from core.reference_data import (
+    get_reference_registry,
+    invalidate_reference_data,
+    lookup_reference,
+    require_document_category,
+)
+from routers.contractors import validate_role_names
+
+
+CATEGORY_ID = "00000000-0000-4000-8000-0000000ca001"
+OTHER_CATEGORY_ID = "00000000-0000-4000-8000-0000000ca002"
+SUBCATEGORY_ID = "00000000-0000-4000-8000-00000005b001"
+
+
+@pytest.fixture
+def fake(fake):
+    fake.seed("document_categories", [
+        {"id": CATEGORY_ID, "name": "Inspections"},
+        {"id": OTHER_CATEGORY_ID, "name": "Financials"},
+    ])
+    fake.seed("document_subcategories", [{"id": SUBCATEGORY_ID, "name": "Roof", "category_id": CATEGORY_ID}])
+    fake.seed("contractor_roles", [{"id": "role-1", "name": "Plumber"}, {"id": "role-2", "name": "Electrician"}])
+    return fake
+
+
+def test_tables_are_loaded_once(fake):
+    fake.reset_calls()
+
+    for _ in range(5):
+        assert require_document_category(CATEGORY_ID, SUBCATEGORY_ID)["name"] == "Inspections"
+
+    assert fake.count("document_categories", "select") == 1
+    assert fake.count("document_subcategories", "select") == 1
+
+
+def test_subcategory_must_belong_to_category(fake):
+    with pytest.raises(HTTPException) as exc:
+        require_document_category(OTHER_CATEGORY_ID, SUBCATEGORY_ID)
+
+    assert exc.value.status_code == 400
+    assert "does not belong" in exc.value.detail
+
+
+def test_new_row_is_found_by_reloading_on_miss(fake, monkeypatch):
+    new_id = "00000000-0000-4000-8000-0000000ca003"
+    require_document_category(CATEGORY_ID)
+    fake.seed("document_categories", [{"id": new_id, "name": "Permits"}])
+
+    # A snapshot that was just loaded is trusted
+    assert lookup_reference("document_categories", new_id) is None
+
+    monkeypatch.setattr(reference_data, "MISS_RELOAD_SECONDS", 0)
+    assert lookup_reference("document_categories", new_id)["name"] == "Permits"
+
+    with pytest.raises(HTTPException) as exc:
+        require_document_category("00000000-0000-4000-8000-0000000ca009")
+    assert exc.value.status_code == 400
+
+
+def test_failed_reload_serves_previous_snapshot(fake, monkeypatch):
+    registry = get_reference_registry()
+    assert len(registry.get("contractor_roles")) == 2
+
+    def broken_load(name):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(registry, "_load", broken_load)
+    assert registry.refresh(["contractor_roles"]) == {}
+    assert registry.get("contractor_roles").id_for("plumber") == "role-1"
+
+    invalidate_reference_data("contractor_roles")
+    with pytest.raises(RuntimeError):
+        registry.get("contractor_roles")
+
+
+def test_contractor_roles_are_validated_from_snapshot(client, fake, login):
+    assert validate_role_names(["plumber", "PLUMBER", "electrician"]) == ["Plumber", "Electrician"]
+    with pytest.raises(HTTPException) as exc:
+        validate_role_names(["Roofer"])
+    assert exc.value.detail == {"error": "Invalid role: Roofer"}
+
+    login("admin")
+    fake.reset_calls()
+    assert client.get("/contractors", params={"role": "electrician"}).status_code == 200
+    assert client.get("/contractors", params={"role": "roofer"}).status_code == 400
+    assert fake.count("contractor_roles", "select") == 0
@@ -0,0 +1,193 @@
+# tests/test_report_xlsx.py
+
+"""
+Tests for XLSX reports: one sheet per section, written in the report
+worker pool and uploaded to S3 in multipart parts.
+"""
+
+import io
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from core.config import settings
+from services.report_xlsx import (
+    XLSX_CONTENT_TYPE,
+    shutdown_report_pool,
+    spool_report,
+    write_workbook,
+)
+
+
+BUILDING_ID = "00000000-0000-4000-8000-000000000001"
+EVENT_COUNT = 300
+
+
+@pytest.fixture
+def fake(fake):
+    fake.seed("buildings", [{"id": BUILDING_ID, "name": "Papakea Resort"}])
+    fake.seed("units", [{"id": "unit-1", "building_id": BUILDING_ID, "unit_number": "101"}])
+    fake.seed("events", [
+        {"id": f"event-{n:03d}", "building_id": BUILDING_ID, "title": f"Event {n}",
+         "occurred_at": f"2024-01-01T00:{n // 60:02d}:{n % 60:02d}+00:00",
+         # Control characters are not allowed in XLSX cells
+         "body": "Leak\x0b fixed " + "x" * 200, "admin_notes": "do not share"}
+        for n in range(EVENT_COUNT)
+    ])
+    fake.seed("documents", [{"id": "doc-1", "building_id": BUILDING_ID, "title": "Minutes"}])
+    return fake
+
+
+@pytest.fixture(params=[0, 1], ids=["threadpool", "process-pool"])
+def workers(request, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_WORKERS", request.param)
+    yield request.param
+    shutdown_report_pool()
+
+
+def load_workbook(body: bytes):
+    return openpyxl.load_workbook(io.BytesIO(body), read_only=True)
+
+
+def sheet_rows(workbook, title):
+    return [list(row) for row in workbook[title].iter_rows(values_only=True)]
+
+
+def stored_key(s3, download_url):
+    return download_url.split(".amazonaws.com/")[1].split("?")[0]
+
+
+def test_custom_report_xlsx_has_a_sheet_per_section(client, fake, s3, login, workers):
+    login("super_admin")
+    response = client.post("/reports/dashboard/custom", json={"building_id": BUILDING_ID, "format": "xlsx"})
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["filename"].endswith(".xlsx") and "data" not in body
+
+    key = stored_key(s3, body["download_url"])
+    assert s3.objects[(s3.bucket, key)].content_type == XLSX_CONTENT_TYPE
+    assert body["size_bytes"] == len(s3.body(key))
+    assert s3.count("complete_multipart_upload") == 1
+
+    workbook = load_workbook(s3.body(key))
+    assert workbook.sheetnames == ["Events", "Documents", "Units", "Contractors", "Statistics"]
+
+    events = sheet_rows(workbook, "Events")
+    header = events[0]
+    assert "admin_notes" in header and len(events) == EVENT_COUNT + 1
+    assert events[1][header.index("body")].startswith("Leak fixed")
+    assert ["total_events", EVENT_COUNT] in sheet_rows(workbook, "Statistics")
+
+
+def test_xlsx_columns_follow_the_role_projection(client, fake, s3, login, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_WORKERS", 0)
+    login("contractor")
+    response = client.post("/reports/dashboard/custom", json={"building_id": BUILDING_ID, "format": "xlsx"})
+
+    assert response.status_code == 200, response.text
+    workbook = load_workbook(s3.body(stored_key(s3, response.json()["download_url"])))
+    assert "admin_notes" not in sheet_rows(workbook, "Events")[0]
+
+
+def test_building_report_xlsx(client, fake, s3, login, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_WORKERS", 0)
+    login("super_admin")
+    response = client.get(f"/reports/dashboard/building/{BUILDING_ID}?format=xlsx")
+
+    assert response.status_code == 200, response.text
+    workbook = load_workbook(s3.body(stored_key(s3, response.json()["download_url"])))
+    units = sheet_rows(workbook, "Units")
+    assert [row[units[0].index("unit_number")] for row in units[1:]] == ["101"]
+    assert len(sheet_rows(workbook, "Events")) == EVENT_COUNT + 1
+
+
+def test_workbook_is_uploaded_in_parts(client, fake, s3, login, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_WORKERS", 0)
+    monkeypatch.setattr(settings, "REPORT_UPLOAD_PART_BYTES", 4096)
+    login("super_admin")
+    response = client.post("/reports/dashboard/custom", json={"building_id": BUILDING_ID, "format": "xlsx"})
+
+    size = response.json()["size_bytes"]
+    assert s3.count("upload_part") == size // 4096 + 1
+    assert not s3.multipart_uploads
+    load_workbook(s3.body(stored_key(s3, response.json()["download_url"])))
+
+
+def test_failed_upload_is_aborted_and_falls_back_to_json(client, fake, s3, login, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_WORKERS", 0)
+
+    def failing_complete(**_):
+        raise RuntimeError("InternalError")
+
+    monkeypatch.setattr(s3, "complete_multipart_upload", failing_complete)
+    login("super_admin")
+    response = client.post("/reports/dashboard/custom", json={"building_id": BUILDING_ID, "format": "xlsx"})
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["filename"].endswith(".json") and len(body["data"]["events"]) == EVENT_COUNT
+    assert s3.count("abort_multipart_upload") == 1 and not s3.multipart_uploads
+
+
+def test_download_url_responses_are_not_compressed(client, fake, s3, login, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_WORKERS", 0)
+    monkeypatch.setattr(settings, "COMPRESSION_MIN_BYTES", 0)
+    login("super_admin")
+    headers = {"Accept-Encoding": "gzip"}
+
+    building = client.get(f"/reports/dashboard/building/{BUILDING_ID}?format=xlsx", headers=headers)
+    custom = client.post(
+        "/reports/dashboard/custom", json={"building_id": BUILDING_ID, "format": "xlsx"}, headers=headers,
+    )
+    for response in (building, custom):
+        assert response.status_code == 200, response.text
+        assert response.json()["download_url"]
+        assert "content-encoding" not in response.headers
+
+    json_report = client.get(f"/reports/dashboard/building/{BUILDING_ID}", headers=headers)
+    assert json_report.headers["content-encoding"] == "gzip"
+
+
+def test_unknown_format_is_rejected(client, fake, login):
+    login("super_admin")
+    response = client.post("/reports/dashboard/custom", json={"building_id": BUILDING_ID, "format": "ods"})
+    assert response.status_code == 400
+
+
+def test_unit_report_sections(tmp_path):
+    report = {
+        "unit": {"id": "unit-1", "unit_number": "101"},
+        "events": [{"id": "e1", "unit_ids": ["unit-1", "unit-2"]}, {"id": "e2", "extra": {"a": 1}}],
+        "statistics": {"total_events": 2},
+    }
+    spool = tmp_path / "report.ndjson"
+    output = tmp_path / "report.xlsx"
+
+    assert spool_report(report, str(spool)) == 4
+    assert write_workbook(str(spool), str(output)) == 3
+
+    workbook = openpyxl.load_workbook(output, read_only=True)
+    assert workbook.sheetnames == ["Events", "Units", "Statistics"]
+    assert sheet_rows(workbook, "Events") == [
+        ["id", "unit_ids", "extra"], ["e1", "unit-1; unit-2"], ["e2", None, '{"a": 1}'],
+    ]
+    assert sheet_rows(workbook, "Units") == [["id", "unit_number"], ["unit-1", "101"]]
+
+
+def test_user_text_never_becomes_a_formula(tmp_path):
+    titles = ['=HYPERLINK("http://evil","click")', "+1+1", "-2+3", "@SUM(A1)", "\t=1", "Leak fixed"]
+    report = {"events": [{"title": title, "cost": -5} for title in titles]}
+    spool = tmp_path / "report.ndjson"
+    output = tmp_path / "report.xlsx"
+
+    spool_report(report, str(spool))
+    write_workbook(str(spool), str(output))
+
+    sheet = openpyxl.load_workbook(output)["Events"]
+    cells = [row[0] for row in sheet.iter_rows(min_row=2)]
+    assert all(cell.data_type == "s" for cell in cells)
+    assert [cell.value for cell in cells] == [f"'{title}" for title in titles[:-1]] + ["Leak fixed"]
+    # Numbers are not text and stay numbers
+    assert sheet["B2"].value == -5
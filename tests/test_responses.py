@@ -0,0 +1,105 @@
+# tests/test_responses.py
+
+"""
+Tests for the fast JSON response path: output must match what FastAPI's
+jsonable_encoder / response_model path produced.
+"""
+
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import List
+from uuid import UUID
+
+import pytest
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+import core.responses as responses
+from benchmarks.serialization import make_rows, run_serialization_benchmark
+from core.responses import FastJSONResponse, dumps, model_list_response
+from models.event import EventRead
+
+
+PAYLOAD = {
+    "id": UUID("1cc862c3-e58e-4af3-8b0a-ab47128bac5c"),
+    "occurred_at": datetime(2024, 5, 1, 8, 30, 15, 120000, tzinfo=timezone.utc),
+    "due": date(2024, 6, 1),
+    "amount": Decimal("1250.50"),
+    "units": Decimal("12"),
+    "tags": {"roof"},
+    "title": "Lānai repair",
+    "nested": [{"count": 3, "ok": True, "none": None}],
+    "counts_by_year": {2023: 4},
+}
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "stdlib"])
+def serializer(request, monkeypatch):
+    if request.param:
+        if responses.orjson is None:
+            pytest.skip("orjson not installed")
+    else:
+        monkeypatch.setattr(responses, "orjson", None)
+    return request.param
+
+
+def test_dumps_matches_jsonable_encoder(serializer):
+    assert json.loads(dumps(PAYLOAD)) == json.loads(json.dumps(jsonable_encoder(PAYLOAD)))
+    assert FastJSONResponse(PAYLOAD).body == dumps(PAYLOAD)
+
+
+def test_model_list_response_matches_response_model():
+    rows = make_rows(20)
+    app = FastAPI()
+
+    @app.get("/model", response_model=List[EventRead])
+    def model():
+        return rows
+
+    @app.get("/once", response_model=List[EventRead])
+    def once():
+        return model_list_response(rows, EventRead)
+
+    client = TestClient(app)
+    expected = client.get("/model").json()
+    response = client.get("/once")
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected
+    # Columns EventRead doesn't declare are still dropped
+    assert "contractor_notes" not in response.json()[0]
+
+
+def test_model_list_response_skips_validated_rows():
+    event = EventRead(**make_rows(1)[0])
+    # Already validated: not re-run through the validators
+    object.__setattr__(event, "title", 123)
+
+    with pytest.warns(UserWarning):
+        body = json.loads(model_list_response([event], EventRead).body)
+    assert body[0]["title"] == 123
+
+    with pytest.raises(ValidationError):
+        model_list_response([{"id": "event-1"}], EventRead)
+
+
+def test_list_events_uses_validated_once_path(client, fake, login, monkeypatch):
+    fake.seed("events", make_rows(3))
+    login("admin")
+    response = client.get("/events")
+
+    assert response.status_code == 200, response.text
+    events = response.json()
+    assert len(events) == 3
+    assert all("contractor_notes" not in event for event in events)
+    assert events[0]["created_at"].endswith("Z")
+
+
+def test_serialization_benchmark_runs():
+    document = run_serialization_benchmark(rows=50, iterations=1, warmup=0)
+
+    assert set(document["routes"]) == {"default", "fast_json", "model", "model_once"}
+    assert document["routes"]["fast_json"]["bytes"] == document["routes"]["default"]["bytes"]
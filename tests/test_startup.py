@@ -0,0 +1,41 @@
+# tests/test_startup.py
+
+"""
+Tests for cold start: heavy optional dependencies stay out of `import main`.
+
+The import-time report is written to $TEST_ARTIFACTS_DIR/importtime.txt
+(or the test's tmp dir) so CI can keep it as an artifact.
+"""
+
+import os
+import sys
+
+from benchmarks.importtime import profile_imports, format_report, deferred_packages_loaded
+from core.lazy_imports import LazyModule, optional_module
+
+
+def test_heavy_dependencies_are_not_imported_at_startup(tmp_path):
+    records = profile_imports("main")
+
+    artifacts_dir = os.environ.get("TEST_ARTIFACTS_DIR") or str(tmp_path)
+    os.makedirs(artifacts_dir, exist_ok=True)
+    with open(os.path.join(artifacts_dir, "importtime.txt"), "w") as f:
+        f.write(format_report(records))
+
+    assert deferred_packages_loaded(records) == []
+
+
+def test_lazy_module_imports_on_first_attribute_access():
+    sys.modules.pop("graphlib", None)
+    graphlib = LazyModule("graphlib")
+
+    assert "graphlib" not in sys.modules
+    assert not graphlib.is_loaded
+
+    sorter = graphlib.TopologicalSorter({"b": {"a"}})
+    assert list(sorter.static_order()) == ["a", "b"]
+    assert graphlib.is_loaded
+
+
+def test_optional_module_missing_package():
+    assert optional_module("definitely_not_installed_pkg") is None
@@ -0,0 +1,149 @@
+# tests/test_state_backend.py
+
+"""
+Tests for the pluggable state backends behind cache, rate limiter and CSRF.
+"""
+
+import fnmatch
+import pytest
+from core.cache import SimpleCache
+from core.config import settings
+from core.csrf import CSRF_SESSION_PREFIX, CSRF_TOKEN_PREFIX, get_csrf_token
+from core.rate_limiter import SlidingWindowRateLimiter
+from core.state_backend import MemoryBackend, SQLiteBackend, RedisBackend, get_state_backend, set_state_backend
+
+
+class FakeRedis:
+    """Minimal in-process stand-in for the redis-py client methods we use."""
+    
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.executed = 0
+    
+    def get(self, key):
+        return self.data.get(key)
+    
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls.pop(key, None)
+        if ex:
+            self.ttls[key] = ex
+    
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.ttls.pop(key, None)
+    
+    def incrby(self, key, amount):
+        value = int(self.data.get(key, b"0")) + amount
+        self.data[key] = str(value).encode()
+        return value
+    
+    def expire(self, key, seconds, nx=False):
+        if key in self.data and not (nx and key in self.ttls):
+            self.ttls[key] = seconds
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+    
+    def scan_iter(self, match):
+        return [k.encode() for k in list(self.data) if fnmatch.fnmatch(k, match)]
+
+
+class FakePipeline:
+    """Queues commands and runs them together on execute(), like MULTI/EXEC."""
+    
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+    
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+    
+    def execute(self):
+        self.redis.executed += 1
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "state.sqlite3"))
+    return RedisBackend("redis://fake", client=FakeRedis())
+
+
+def test_backend_get_set_delete(backend):
+    """Test basic key/value operations."""
+    backend.set("cache:a", {"rows": [1, 2]}, ttl_seconds=60)
+    
+    assert backend.get("cache:a") == {"rows": [1, 2]}
+    
+    backend.delete("cache:a")
+    assert backend.get("cache:a") is None
+
+
+def test_backend_incr_and_prefix(backend):
+    """Test counters and prefix operations."""
+    assert backend.incr("ratelimit:x", 1, ttl_seconds=60) == 1
+    assert backend.incr("ratelimit:x", 1, ttl_seconds=60) == 2
+    assert backend.get("ratelimit:x") == 2
+    
+    backend.set("cache:b", "value")
+    assert backend.keys("ratelimit:") == ["ratelimit:x"]
+    assert backend.delete_prefix("ratelimit:") == 1
+    assert backend.get("cache:b") == "value"
+
+
+def test_redis_counter_and_ttl_are_set_together():
+    """Test that INCRBY and EXPIRE run in one transaction and keep the first expiry."""
+    redis = FakeRedis()
+    backend = RedisBackend("redis://fake", client=redis)
+    
+    assert backend.incr("ratelimit:x", 1, ttl_seconds=60) == 1
+    assert backend.incr("ratelimit:x", 1, ttl_seconds=30) == 2
+    assert redis.executed == 2
+    assert redis.ttls["aina:ratelimit:x"] == 60
+    
+    # A counter left without a TTL picks one up on its next increment
+    redis.ttls.clear()
+    assert backend.incr("ratelimit:x", 1, ttl_seconds=60) == 3
+    assert redis.ttls["aina:ratelimit:x"] == 60
+
+
+def test_sqlite_backend_shared_between_workers(tmp_path):
+    """Test that two SQLite backends on one file share cache and limits."""
+    path = str(tmp_path / "state.sqlite3")
+    worker_a = SQLiteBackend(path)
+    worker_b = SQLiteBackend(path)
+    
+    SimpleCache(worker_a).set("buildings:list", ["b1"], ttl_seconds=60)
+    assert SimpleCache(worker_b).get("buildings:list") == ["b1"]
+    
+    limiter_a = SlidingWindowRateLimiter(worker_a)
+    limiter_b = SlidingWindowRateLimiter(worker_b)
+    assert limiter_a.hit("ip:1", 2, 3600).allowed
+    assert limiter_b.hit("ip:1", 2, 3600).allowed
+    assert not limiter_a.hit("ip:1", 2, 3600).allowed
+
+
+def test_csrf_tokens_expire_with_the_session():
+    """Test that both CSRF keys are written with the session TTL."""
+    redis = FakeRedis()
+    previous = get_state_backend()
+    set_state_backend(RedisBackend("redis://fake", client=redis))
+    try:
+        token = get_csrf_token("session-1")
+        assert get_csrf_token("session-1") == token
+    finally:
+        set_state_backend(previous)
+    
+    assert redis.ttls == {
+        f"aina:{CSRF_SESSION_PREFIX}session-1": settings.CSRF_TOKEN_TTL_SECONDS,
+        f"aina:{CSRF_TOKEN_PREFIX}{token}": settings.CSRF_TOKEN_TTL_SECONDS,
+    }
@@ -0,0 +1,211 @@
+# tests/test_stripe_webhooks.py
+
+"""
+Tests for the Stripe webhook inbox: events are recorded and acknowledged,
+redeliveries are not reprocessed, owners resolve in one query, and
+failed events are retried by the worker.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+
+from core.config import settings
+from services import stripe_webhook_inbox
+from services.stripe_webhook_inbox import BUSINESS_OWNER_TABLES, MAX_WEBHOOK_ATTEMPTS, process_pending_events
+from tests.fake_supabase import FakeSupabase, install_fake_supabase
+
+
+CUSTOMER_ID = "cus_123"
+SUBSCRIPTION_ID = "sub_123"
+WEBHOOK_SECRET = "whsec_test"
+
+
+def billing_owners_view(fake: FakeSupabase):
+    """Python version of the stripe_billing_owners view."""
+    rows = []
+    for owner_type, table in BUSINESS_OWNER_TABLES.items():
+        for row in fake.rows(table):
+            rows.append({
+                "owner_type": owner_type, "owner_id": row["id"], "user_id": None, "role": None,
+                "stripe_customer_id": row.get("stripe_customer_id"),
+                "stripe_subscription_id": row.get("stripe_subscription_id"),
+            })
+    for row in fake.rows("user_subscriptions"):
+        rows.append({
+            "owner_type": "user_subscription", "owner_id": row["id"], "user_id": row["user_id"], "role": row["role"],
+            "stripe_customer_id": row.get("stripe_customer_id"),
+            "stripe_subscription_id": row.get("stripe_subscription_id"),
+        })
+    return rows
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeSupabase()
+    fake.views["stripe_billing_owners"] = billing_owners_view
+    fake.seed("contractors", [
+        {"id": "contractor-1", "company_name": "Maui Plumbing", "stripe_customer_id": CUSTOMER_ID,
+         "subscription_tier": "free"},
+        {"id": "contractor-2", "company_name": "Other Co", "stripe_customer_id": "cus_other"},
+    ])
+    fake.seed("aoao_organizations", [])
+    fake.seed("property_management_companies", [])
+    fake.seed("user_subscriptions", [
+        {"id": "sub-row-1", "user_id": "user-1", "role": "owner", "stripe_subscription_id": "sub_user"},
+    ])
+    return install_fake_supabase(fake, monkeypatch)
+
+
+@pytest.fixture
+def stripe_calls(monkeypatch):
+    calls = []
+
+    def verify(stripe_customer_id, stripe_subscription_id):
+        calls.append((stripe_customer_id, stripe_subscription_id))
+        return True, "active", None
+
+    monkeypatch.setattr(stripe_webhook_inbox, "verify_contractor_subscription", verify)
+    return calls
+
+
+def subscription_event(event_id="evt_1", customer=CUSTOMER_ID, subscription=SUBSCRIPTION_ID, event_type="customer.subscription.updated"):
+    return {
+        "id": event_id,
+        "type": event_type,
+        "data": {"object": {"id": subscription, "customer": customer, "status": "active"}},
+    }
+
+
+def post_event(client, event):
+    return client.post("/webhooks/stripe/subscription", content=json.dumps(event))
+
+
+def test_event_is_acknowledged_and_processed_once(client, fake, stripe_calls):
+    first = post_event(client, subscription_event())
+    assert first.status_code == 200
+    assert first.json() == {"status": "queued", "event_id": "evt_1"}
+
+    contractor = fake.get_by_id("contractors", "contractor-1")
+    assert contractor["subscription_tier"] == "paid"
+    assert contractor["stripe_subscription_id"] == SUBSCRIPTION_ID
+
+    inbox = fake.get_by_id("stripe_webhook_events", "evt_1")
+    assert inbox["status"] == "processed"
+    assert inbox["attempts"] == 1
+    assert inbox["result"]["subscription_tier"] == "paid"
+
+    # Stripe redelivers the same event
+    second = post_event(client, subscription_event())
+    assert second.json() == {"status": "duplicate", "event_id": "evt_1"}
+    assert len(stripe_calls) == 1
+    assert fake.count("contractors", "update") == 1
+
+
+def test_owner_lookup_is_a_single_query(client, fake, stripe_calls):
+    post_event(client, subscription_event())
+
+    assert fake.count("stripe_billing_owners", "select") == 1
+    for table in ("aoao_organizations", "property_management_companies", "user_subscriptions"):
+        assert fake.count(table, "select") == 0
+
+
+def test_user_subscriptions_are_updated_when_no_business_owner(client, fake, stripe_calls, monkeypatch):
+    updated = []
+    monkeypatch.setattr(stripe_webhook_inbox, "create_or_update_user_subscription", lambda **kwargs: updated.append(kwargs))
+
+    post_event(client, subscription_event("evt_user", customer="cus_user", subscription="sub_user"))
+
+    assert [(u["user_id"], u["role"], u["subscription_tier"]) for u in updated] == [("user-1", "owner", "paid")]
+    assert fake.get_by_id("stripe_webhook_events", "evt_user")["result"]["user_subscriptions_updated"] == 1
+
+
+def test_unknown_customer_skips_stripe_call(client, fake, stripe_calls):
+    post_event(client, subscription_event("evt_unknown", customer="cus_nobody", subscription="sub_nobody"))
+
+    assert stripe_calls == []
+    assert fake.get_by_id("stripe_webhook_events", "evt_unknown")["result"]["reason"] == "no_matching_owner"
+
+
+def test_failed_event_is_retried_by_worker(client, fake, stripe_calls, monkeypatch):
+    def unavailable(**_):
+        raise RuntimeError("Stripe unavailable")
+
+    monkeypatch.setattr(stripe_webhook_inbox, "verify_contractor_subscription", unavailable)
+    assert post_event(client, subscription_event("evt_retry")).status_code == 200
+
+    inbox = fake.get_by_id("stripe_webhook_events", "evt_retry")
+    assert inbox["status"] == "failed"
+    assert inbox["last_error"] == "Stripe unavailable"
+
+    monkeypatch.setattr(stripe_webhook_inbox, "verify_contractor_subscription", lambda **_: (True, "active", None))
+    results = process_pending_events()
+
+    assert [r["event_id"] for r in results] == ["evt_retry"]
+    inbox = fake.get_by_id("stripe_webhook_events", "evt_retry")
+    assert inbox["status"] == "processed"
+    assert inbox["attempts"] == 2
+    assert process_pending_events() == []
+
+
+def test_interrupted_event_counts_as_an_attempt(client, fake, stripe_calls):
+    stale = "2020-01-01T00:00:00+00:00"
+    fake.seed("stripe_webhook_events", [{
+        "id": "evt_crash", "type": "customer.subscription.updated", "payload": subscription_event("evt_crash"),
+        "status": "processing", "attempts": 0, "locked_at": stale, "received_at": stale,
+    }])
+
+    def crash_while_processing(event):
+        # The worker dies after claiming: the claim is never released
+        fake.get_by_id("stripe_webhook_events", "evt_crash")["locked_at"] = stale
+        raise SystemExit
+
+    for attempt in range(1, MAX_WEBHOOK_ATTEMPTS):
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(stripe_webhook_inbox, "dispatch_event", crash_while_processing)
+            with pytest.raises(SystemExit):
+                process_pending_events()
+        inbox = fake.get_by_id("stripe_webhook_events", "evt_crash")
+        assert (inbox["status"], inbox["attempts"]) == ("processing", attempt)
+
+    # The last interrupted run exhausts the attempts; the event is not claimed again
+    assert process_pending_events() == []
+    inbox = fake.get_by_id("stripe_webhook_events", "evt_crash")
+    assert (inbox["status"], inbox["attempts"]) == ("failed", MAX_WEBHOOK_ATTEMPTS)
+    assert inbox["last_error"] == "Processing was interrupted"
+    assert stripe_calls == []
+
+
+def test_event_without_id_is_rejected(client, fake):
+    assert post_event(client, {"type": "customer.subscription.updated"}).status_code == 400
+
+
+def signature_header(payload: str, secret: str) -> str:
+    timestamp = int(time.time())
+    digest = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+@pytest.mark.parametrize("headers", [{}, {"stripe-signature": "t=1,v1=forged"}], ids=["unsigned", "bad-signature"])
+def test_unverified_events_are_not_recorded(client, fake, stripe_calls, monkeypatch, headers):
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    response = client.post("/webhooks/stripe/subscription", content=json.dumps(subscription_event()), headers=headers)
+
+    assert response.status_code == 400
+    assert fake.rows("stripe_webhook_events") == []
+    assert stripe_calls == []
+
+
+def test_signed_events_are_recorded(client, fake, stripe_calls, monkeypatch):
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    payload = json.dumps(subscription_event())
+    response = client.post(
+        "/webhooks/stripe/subscription", content=payload,
+        headers={"stripe-signature": signature_header(payload, WEBHOOK_SECRET)},
+    )
+
+    assert response.json() == {"status": "queued", "event_id": "evt_1"}
+    assert fake.get_by_id("stripe_webhook_events", "evt_1")["status"] == "processed"
@@ -0,0 +1,154 @@
+# tests/test_subscription_ledger.py
+
+"""
+Tests for GET /subscriptions/all: filters, sorting and paging run against
+the subscription_ledger view in one query, `total` counts every match,
+and pages are cached briefly.
+"""
+
+import pytest
+
+import routers.subscriptions as subscriptions
+
+
+TYPES = ["user", "contractor", "aoao_organization", "pm_company"]
+LEDGER_SIZE = 150
+
+
+def ledger_row(n):
+    subscription_type = TYPES[n % len(TYPES)]
+    row = {
+        "subscription_type": subscription_type,
+        "id": f"sub-{n:03d}",
+        "subscription_tier": "paid" if n % 2 else "free",
+        "subscription_status": "trialing" if n % 5 == 0 else "active",
+        "is_trial": n % 5 == 0,
+        "created_at": f"2024-01-01T00:{n // 60:02d}:{n % 60:02d}+00:00",
+        "updated_at": "2024-06-01T00:00:00+00:00",
+    }
+    if subscription_type == "user":
+        row.update(user_id=f"user-{n}", user_email=f"user-{n}@example.com", user_name=None, role="owner")
+    elif subscription_type == "aoao_organization":
+        row["organization_name"] = f"AOAO {n}"
+    else:
+        row["company_name"] = f"Company {n}"
+    return row
+
+
+@pytest.fixture
+def fake(fake):
+    fake.seed("subscription_ledger", [ledger_row(n) for n in range(LEDGER_SIZE)])
+    return fake
+
+
+def ids(body):
+    return [sub["id"] for sub in body["subscriptions"]]
+
+
+def test_default_page_is_the_newest_100(client, fake, login):
+    login("admin")
+    response = client.get("/subscriptions/all")
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["total"] == LEDGER_SIZE
+    assert (body["limit"], body["offset"]) == (100, 0)
+    assert ids(body) == [f"sub-{n:03d}" for n in reversed(range(LEDGER_SIZE))][:100]
+    assert fake.count("subscription_ledger", "select") == 1
+
+
+def test_pages_cover_every_match_once(client, fake, login):
+    login("admin")
+    seen = []
+    offset = 0
+    while True:
+        body = client.get("/subscriptions/all", params={"sort_order": "asc", "limit": 40, "offset": offset}).json()
+        seen += ids(body)
+        offset += 40
+        if offset >= body["total"]:
+            break
+
+    assert seen == [f"sub-{n:03d}" for n in range(LEDGER_SIZE)]
+    assert fake.count("subscription_ledger", "select") == 4
+
+
+def test_filters_are_combined_and_counted(client, fake, login):
+    login("admin")
+    response = client.get("/subscriptions/all", params={
+        "subscription_tier": "paid", "subscription_status": "active",
+        "subscription_type": "contractor", "limit": 5,
+    })
+
+    body = response.json()
+    expected = [
+        n for n in reversed(range(LEDGER_SIZE))
+        if n % 4 == 1 and n % 2 and n % 5
+    ]
+    assert body["total"] == len(expected)
+    assert ids(body) == [f"sub-{n:03d}" for n in expected[:5]]
+    assert {sub["company_name"] for sub in body["subscriptions"]} == {f"Company {n}" for n in expected[:5]}
+    assert all("organization_name" not in sub for sub in body["subscriptions"])
+
+
+def test_ties_are_broken_on_id(client, fake, login):
+    login("admin")
+    body = client.get("/subscriptions/all", params={"sort_by": "subscription_type", "sort_order": "asc", "limit": 3}).json()
+
+    assert [sub["subscription_type"] for sub in body["subscriptions"]] == ["aoao_organization"] * 3
+    assert ids(body) == ["sub-002", "sub-006", "sub-010"]
+
+
+def test_user_entries_get_a_display_name(client, fake, login):
+    login("admin")
+    body = client.get("/subscriptions/all", params={"subscription_type": "user", "limit": 1}).json()
+
+    assert body["subscriptions"][0]["user_name"] == f"User {body['subscriptions'][0]['user_id']}"
+
+
+def test_pages_are_cached_per_query(client, fake, login):
+    login("admin")
+    first = client.get("/subscriptions/all", params={"limit": 10})
+    client.get("/subscriptions/all", params={"limit": 10})
+    assert fake.count("subscription_ledger", "select") == 1
+
+    fake.reset_calls()
+    client.get("/subscriptions/all", params={"limit": 10, "offset": 10})
+    assert fake.count("subscription_ledger", "select") == 1
+    assert first.json()["total"] == LEDGER_SIZE
+
+
+@pytest.mark.parametrize("params", [
+    {"subscription_type": "vendor"},
+    {"sort_by": "stripe_customer_id"},
+    {"sort_order": "sideways"},
+])
+def test_invalid_parameters_are_rejected(client, fake, login, params):
+    login("admin")
+    assert client.get("/subscriptions/all", params=params).status_code == 400
+
+
+def test_page_size_is_bounded(client, fake, login):
+    login("admin")
+    assert client.get("/subscriptions/all", params={"limit": 1001}).status_code == 422
+    assert client.get("/subscriptions/all", params={"limit": 0}).status_code == 422
+
+
+def test_non_admins_are_forbidden(client, fake, login):
+    login("owner")
+    assert client.get("/subscriptions/all").status_code == 403
+    assert fake.count("subscription_ledger") == 0
+
+
+def test_pages_are_cached_for_30_seconds(client, fake, login, monkeypatch):
+    stored = {}
+    original = subscriptions.cache_set
+
+    def cache_set(key, value, ttl_seconds=300, **kwargs):
+        stored[key] = ttl_seconds
+        return original(key, value, ttl_seconds=ttl_seconds, **kwargs)
+
+    monkeypatch.setattr(subscriptions, "cache_set", cache_set)
+    login("admin")
+    client.get("/subscriptions/all")
+
+    assert list(stored.values()) == [30]